@@ -0,0 +1,103 @@
+""" Multi-threaded benchmark test for the in-memory cache backend. """
+
+import time
+from threading import Barrier, Thread
+from typing import List
+
+from pymongo import MongoClient
+
+from benchmark_tests.test_database_setup import BENCHMARK_DB, BENCHMARK_COLL
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.in_memory_backend.InMemoryCacheBackend import InMemoryCacheBackend
+
+
+def _worker(
+    backend: InMemoryCacheBackend,
+    keys: List[QueryInfo],
+    nr_operations: int,
+    barrier: Barrier,
+):
+    """Runs a read-heavy mix of cache hits and fills, every 10th operation is a fill."""
+    barrier.wait()
+    nr_keys = len(keys)
+    for i in range(nr_operations):
+        key = keys[i % nr_keys]
+        if i % 10 == 0:
+            backend.set(key, [{"i": i}], 1.0)
+        else:
+            backend.get(key)
+
+
+def threaded_cache_access_test(
+    nr_threads: int,
+    nr_operations: int = 100000,
+    nr_keys: int = 1000,
+    shared_collection: bool = False,
+):
+    """
+    Measures the throughput of the in-memory backend with the given number of threads.
+    :param nr_threads: The number of threads accessing the cache.
+    :param nr_operations: The number of operations per thread.
+    :param nr_keys: The number of distinct keys per thread.
+    :param shared_collection: If true, all threads access the cache of the same collection, otherwise every
+        thread accesses the cache of its own collection.
+    :return: The number of operations per second.
+    """
+    # The backends do not talk to the database, so no server is needed
+    client = MongoClient("localhost", connect=False)
+    db = client[BENCHMARK_DB]
+
+    backends = []
+    for thread_nr in range(nr_threads):
+        if shared_collection and backends:
+            backends.append(backends[0])
+            continue
+        backends.append(
+            InMemoryCacheBackend(
+                db[f"{BENCHMARK_COLL}_{thread_nr}"],
+                max_num_items=nr_keys // 2,
+                cache_cleanup_cycle_time=None,
+            )
+        )
+
+    barrier = Barrier(nr_threads + 1)
+    threads = []
+    for thread_nr in range(nr_threads):
+        keys = [
+            QueryInfo("FIND", query={"thread": thread_nr, "key": i})
+            for i in range(nr_keys)
+        ]
+        thread = Thread(
+            target=_worker,
+            args=(backends[thread_nr], keys, nr_operations, barrier),
+        )
+        thread.start()
+        threads.append(thread)
+
+    barrier.wait()
+    start = time.time_ns()
+    for thread in threads:
+        thread.join()
+    end = time.time_ns()
+    client.close()
+
+    return nr_threads * nr_operations / ((end - start) / 1e9)
+
+
+def main():
+    for shared_collection in [False, True]:
+        print(
+            "Threads accessing the same collection"
+            if shared_collection
+            else "Threads accessing their own collection"
+        )
+        for nr_threads in [1, 2, 4, 8, 16, 32]:
+            ops_per_second = threaded_cache_access_test(
+                nr_threads, shared_collection=shared_collection
+            )
+            print(f"{nr_threads} threads: {ops_per_second:.0f} operations per second")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Coalesces concurrent executions of the same query on an asyncio event loop."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent executions of the same query on an asyncio event loop.
+
+    The first caller for a key executes the coroutine function, concurrent callers for the same key await a future
+    with its outcome instead of executing the function again. They receive the same result or the same exception.
+    A caller, which waits longer than the timeout, executes the function on its own. If the first caller is
+    cancelled, the waiting callers execute the function on their own instead of being cancelled as well.
+    All callers have to run on the same event loop.
+    """
+
+    _timeout: Optional[float] = None
+    _calls: Dict[Hashable, asyncio.Future] = None
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        :param timeout: The maximum time in seconds to wait for the execution of another caller, None waits forever.
+        """
+        self._timeout = timeout
+        # Only accessed from the event loop, so no lock is needed
+        self._calls = {}
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Execute the coroutine function, unless an execution for the key is already in flight, then await its outcome.
+        :param key: The key identifying the execution.
+        :param function: The coroutine function to execute.
+        :return: The result of the function.
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            try:
+                # Shielded, such that a caller, which times out or is cancelled, does not cancel the others
+                return await asyncio.wait_for(asyncio.shield(call), self._timeout)
+            except asyncio.TimeoutError:
+                # The execution takes too long, do not wait any longer
+                return await function()
+            except asyncio.CancelledError:
+                if not call.cancelled():
+                    raise
+                # The first caller was cancelled, this caller was not
+                return await function()
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        try:
+            result = await function()
+            call.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            # Mark the exception as retrieved, there may be no other caller
+            call.exception()
+            raise
+        finally:
+            del self._calls[key]
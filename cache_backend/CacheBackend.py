@@ -1,7 +1,8 @@
-""" Enumerations for the backends """
+"""Enumerations for the backends"""
 import enum
 from typing import Type
 
+from cache_backend.base.AsyncCacheBackendBase import AsyncCacheBackendBase
 from cache_backend.base.CacheBackendBase import CacheBackendBase
 
 
@@ -11,6 +12,9 @@ class CacheBackend(enum.Enum):
     IN_MEMORY = 1
     MONGODB = 2
     SQLITE = 3
+    SHARED_MEMORY = 4
+    TIERED = 5
+    REDIS = 6
 
 
 class CacheBackendFactory:
@@ -32,6 +36,46 @@ class CacheBackendFactory:
 
             return MongoDBCacheBackend
         elif cache_backend == CacheBackend.SQLITE:
-            raise NotImplementedError("SQLite cache backend not implemented yet")
+            from cache_backend.sqlite_backend.SQLiteCacheBackend import (
+                SQLiteCacheBackend,
+            )
+
+            return SQLiteCacheBackend
+        elif cache_backend == CacheBackend.SHARED_MEMORY:
+            from cache_backend.shared_memory_backend.SharedMemoryCacheBackend import (
+                SharedMemoryCacheBackend,
+            )
+
+            return SharedMemoryCacheBackend
+        elif cache_backend == CacheBackend.TIERED:
+            from cache_backend.tiered_backend.TieredCacheBackend import (
+                TieredCacheBackend,
+            )
+
+            return TieredCacheBackend
+        elif cache_backend == CacheBackend.REDIS:
+            from cache_backend.redis_backend.RedisCacheBackend import RedisCacheBackend
+
+            return RedisCacheBackend
         else:
             raise Exception("Invalid cache backend")
+
+    @staticmethod
+    def get_async_cache_backend(
+        cache_backend: CacheBackend,
+    ) -> Type[AsyncCacheBackendBase]:
+        """Get the asynchronous cache backend, only the in-memory and the MongoDB backend have one"""
+        if cache_backend == CacheBackend.IN_MEMORY:
+            from cache_backend.in_memory_backend.AsyncInMemoryCacheBackend import (
+                AsyncInMemoryCacheBackend,
+            )
+
+            return AsyncInMemoryCacheBackend
+        elif cache_backend == CacheBackend.MONGODB:
+            from cache_backend.mongodb_backend.AsyncMongoDBCacheBackend import (
+                AsyncMongoDBCacheBackend,
+            )
+
+            return AsyncMongoDBCacheBackend
+        else:
+            raise Exception("Invalid async cache backend")
@@ -1,9 +1,10 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
 
-from cache_backend.Constants import QUERY_INFO
+from cache_backend.Constants import QUERY_INFO, QUERY_KEY
 from cache_backend.QueryInfo import QueryInfo
+from cache_backend.ValueSize import get_value_size
 
 
 @dataclass()
@@ -15,15 +16,20 @@ class CacheEntry:
     execution_time: float  # in milliseconds
     timestamp: datetime = None
     access_count: int = 0
+    size: int = None  # in bytes
+    expires_at: Optional[float] = None  # time.monotonic() based, None if the entry never expires
 
     def __post_init__(self):
         """Initialize the cache entry."""
         self.timestamp = datetime.now()
+        if self.size is None:
+            self.size = get_value_size(self.value)
 
     def to_dict(self):
         """Convert the entry to dict"""
-        entry_dict = self.__dict__
+        entry_dict = dict(self.__dict__)
 
-        entry_dict[QUERY_INFO] = entry_dict[QUERY_INFO].__dict__
+        entry_dict[QUERY_INFO] = self.query_info.to_dict()
+        entry_dict[QUERY_KEY] = self.query_info.key
 
         return entry_dict
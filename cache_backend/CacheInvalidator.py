@@ -0,0 +1,263 @@
+"""Decides which cached queries are affected by a write to the collection."""
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Set
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.QueryMatcher import QueryMatcher
+from cache_backend.RawDocuments import decode_document
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+
+# Aggregation stages, which read documents of other collections or of the same collection a second time
+_STAGES_READING_COLLECTIONS = {"$lookup", "$graphLookup", "$unionWith", "$facet"}
+
+
+class _ValueNeeded(Exception):
+    """Raised by needs_value to stop the check, once the cached result is requested."""
+
+
+class CacheInvalidator:
+    """
+    Decides which cached queries are affected by a write to the collection.
+
+    A cached query is affected if the write can change its result. Inserted documents are matched against the
+    filter of the query, the documents of a cached result are matched against the filter of an update or delete.
+    Whenever the outcome cannot be decided locally, e.g. for unsupported operators, update pipelines or most
+    aggregations, the query counts as affected, so the cache never serves a stale result.
+    """
+
+    @staticmethod
+    def is_affected(query_info: QueryInfo, value: Any, write_info: WriteInfo) -> bool:
+        """
+        Check if the write can change the result of the cached query.
+        :param query_info: The cached query.
+        :param value: The cached result of the query.
+        :param write_info: The write to the collection.
+        :return: False if the result of the query is guaranteed to be unchanged, True otherwise.
+        """
+        return CacheInvalidator.is_affected_lazily(
+            query_info, lambda: value, write_info
+        )
+
+    @staticmethod
+    def is_affected_lazily(
+        query_info: QueryInfo, get_value: Callable[[], Any], write_info: WriteInfo
+    ) -> bool:
+        """
+        Check if the write can change the result of the cached query, the cached result is only loaded if the
+        decision depends on it, e.g. not for inserts or aggregations.
+        :param query_info: The cached query.
+        :param get_value: Function, which loads the cached result of the query.
+        :param write_info: The write to the collection.
+        :return: False if the result of the query is guaranteed to be unchanged, True otherwise.
+        """
+        try:
+            return CacheInvalidator._is_affected(query_info, get_value, write_info)
+        except Exception:
+            # Unexpected documents or queries must never keep a stale entry in the cache
+            return True
+
+    @staticmethod
+    def needs_value(query_info: QueryInfo, write_info: WriteInfo) -> bool:
+        """
+        Check if the decision, whether the write can change the result of the cached query, depends on the cached
+        result, e.g. for backends, which cannot load the result within is_affected_lazily.
+        :param query_info: The cached query.
+        :param write_info: The write to the collection.
+        :return: True if the cached result has to be passed to is_affected.
+        """
+        needed = False
+
+        def get_value() -> Any:
+            nonlocal needed
+            needed = True
+            raise _ValueNeeded()
+
+        CacheInvalidator.is_affected_lazily(query_info, get_value, write_info)
+        return needed
+
+    @staticmethod
+    def get_affected_keys(entries: Iterable, write_info: WriteInfo) -> List[QueryInfo]:
+        """
+        Get the keys of the cached queries, which are affected by the write.
+        :param entries: The cached (key, value) pairs.
+        :param write_info: The write to the collection.
+        :return: The keys of the affected queries.
+        """
+        return [
+            key
+            for key, value in entries
+            if CacheInvalidator.is_affected(key, value, write_info)
+        ]
+
+    @staticmethod
+    def _is_affected(
+        query_info: QueryInfo, get_value: Callable[[], Any], write_info: WriteInfo
+    ) -> bool:
+        """Check if the write can change the result of the cached query, may raise for unexpected input."""
+        operation = write_info.operation
+        if operation == WriteOperation.INSERT:
+            return any(
+                CacheInvalidator._may_enter_result(query_info, document)
+                for document in write_info.documents or []
+            )
+
+        if operation == WriteOperation.DELETE:
+            return CacheInvalidator._may_touch_result(
+                query_info, get_value, CacheInvalidator._get_write_filter(write_info)
+            )
+
+        if operation == WriteOperation.UPDATE:
+            if write_info.upsert:
+                return True
+            update_fields = CacheInvalidator._get_update_fields(write_info.update)
+            query_fields = CacheInvalidator._get_query_fields(query_info)
+            if update_fields is None or query_fields is None:
+                return True
+            # Updated documents can start or stop matching the query or change their position in the result
+            if update_fields & query_fields:
+                return True
+            return CacheInvalidator._may_touch_result(
+                query_info, get_value, CacheInvalidator._get_write_filter(write_info)
+            )
+
+        if operation == WriteOperation.REPLACE:
+            if write_info.upsert:
+                return True
+            if CacheInvalidator._may_enter_result(
+                query_info, write_info.replacement or {}
+            ):
+                return True
+            return CacheInvalidator._may_touch_result(
+                query_info, get_value, CacheInvalidator._get_write_filter(write_info)
+            )
+
+        return True
+
+    @staticmethod
+    def _may_enter_result(query_info: QueryInfo, document: Mapping[str, Any]) -> bool:
+        """Check if the document, which is new in the collection, can be part of the result of the query."""
+        if CacheInvalidator._is_analysable_find(query_info):
+            return CacheInvalidator._matches_new_document(query_info.query, document)
+
+        if query_info.function_name == "AGGREGATE" and "collation" not in (
+            query_info.options or {}
+        ):
+            pipeline = list(query_info.pipeline or [])
+            if not pipeline or any(
+                stage_name in _STAGES_READING_COLLECTIONS
+                for stage in pipeline
+                for stage_name in stage
+            ):
+                return True
+            # Only a leading $match decides which documents of the collection enter the pipeline
+            first_stage = pipeline[0]
+            if len(first_stage) != 1 or "$match" not in first_stage:
+                return True
+            return CacheInvalidator._matches_new_document(
+                first_stage["$match"], document
+            )
+
+        return True
+
+    @staticmethod
+    def _matches_new_document(
+        query: Optional[Mapping[str, Any]], document: Mapping[str, Any]
+    ) -> bool:
+        """Check if the document, which is new in the collection, can match the query."""
+        if "_id" not in document:
+            # The _id is assigned by the server or kept from the replaced document, so it is unknown here
+            fields = QueryMatcher.get_fields(query)
+            if fields is None or "_id" in fields:
+                return True
+        return QueryMatcher.matches(query, document) is not False
+
+    @staticmethod
+    def _is_analysable_find(query_info: QueryInfo) -> bool:
+        """
+        Check if the query is a find, whose arguments are understood locally. Positional arguments and
+        collations change how the query is evaluated, so these queries are treated as affected by every write.
+        """
+        if query_info.function_name not in ("FIND", "FIND_ONE"):
+            return False
+        options = query_info.options or {}
+        return "args" not in options and "collation" not in options
+
+    @staticmethod
+    def _get_write_filter(write_info: WriteInfo) -> Optional[Mapping[str, Any]]:
+        """Get the filter of the write, a collation can make it match more documents than locally, so it matches all."""
+        if write_info.collation is not None:
+            return None
+        return write_info.filter
+
+    @staticmethod
+    def _may_touch_result(
+        query_info: QueryInfo,
+        get_value: Callable[[], Any],
+        write_filter: Optional[Mapping[str, Any]],
+    ) -> bool:
+        """Check if the write filter can select a document, which is part of the cached result."""
+        if not CacheInvalidator._is_analysable_find(query_info):
+            # The result of an aggregation cannot be traced back to the documents of the collection
+            return True
+        if query_info.skip:
+            # Removing a document before the window of the result shifts the window
+            return True
+
+        filter_fields = QueryMatcher.get_fields(write_filter)
+        if filter_fields is None or not QueryMatcher.projection_keeps_fields(
+            query_info.projection, filter_fields
+        ):
+            return True
+
+        value = get_value()
+        if query_info.function_name == "FIND_ONE":
+            documents = [] if value is None else [value]
+        else:
+            documents = value if isinstance(value, list) else None
+        if documents is None:
+            return True
+
+        return any(
+            QueryMatcher.matches(write_filter, decode_document(document)) is not False
+            for document in documents
+        )
+
+    @staticmethod
+    def _get_query_fields(query_info: QueryInfo) -> Optional[Set[str]]:
+        """Get the top level fields, which decide if and where a document is part of the result of the query."""
+        if not CacheInvalidator._is_analysable_find(query_info):
+            return None
+        fields = QueryMatcher.get_fields(query_info.query)
+        if fields is None:
+            return None
+
+        sort = query_info.sort
+        if sort is None:
+            return fields
+        if isinstance(sort, str):
+            sort = [sort]
+        elif isinstance(sort, Mapping):
+            sort = list(sort.keys())
+        for item in sort:
+            name = item[0] if isinstance(item, (list, tuple)) else item
+            if not isinstance(name, str):
+                return None
+            fields.add(name.split(".", 1)[0])
+        return fields
+
+    @staticmethod
+    def _get_update_fields(update: Any) -> Optional[Set[str]]:
+        """Get the top level fields, which are modified by the update document, or None for update pipelines."""
+        if not isinstance(update, Mapping):
+            return None
+
+        fields = set()
+        for operator, changes in update.items():
+            if not operator.startswith("$") or not isinstance(changes, Mapping):
+                return None
+            for name, change in changes.items():
+                fields.add(name.split(".", 1)[0])
+                if operator == "$rename":
+                    if not isinstance(change, str):
+                        return None
+                    fields.add(change.split(".", 1)[0])
+        return fields
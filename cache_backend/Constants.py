@@ -1,9 +1,24 @@
 VALUE = "value"
+VALUE_CODEC = "value_codec"
 QUERY_INFO = "query_info"
 CACHE_DATABASE = "CacheDatabase"
 CACHE_ENTRIES = "CacheEntries"
+CACHE_CHUNKS = "CacheChunks"
 COLLECTION_NAME = "collection_name"
 HASH_VAL = "hash_val"
 EXECUTION_TIME = "execution_time"
 ACCESS_COUNT = "access_count"
 TIMESTAMP = "timestamp"
+SIZE = "size"
+PRIORITY = "priority"
+EXPIRES_AT = "expires_at"
+QUERY_KEY = "query_key"
+NUM_CHUNKS = "num_chunks"
+ENTRY_ID = "entry_id"
+CHUNK_NUMBER = "n"
+CHUNK_DATA = "data"
+RESUME_TOKENS = "ResumeTokens"
+RESUME_TOKEN = "resume_token"
+SQLITE_DATABASE_FILE = "pymongo_cache.sqlite"
+SHARED_MEMORY_FILE_PREFIX = "pymongo_cache"
+REDIS_KEY_PREFIX = "pymongo_cache"
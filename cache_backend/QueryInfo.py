@@ -1,12 +1,22 @@
 """Class representing a pymongo query and its information."""
-from dataclasses import dataclass
-from hashlib import md5
+from dataclasses import dataclass, fields
+from hashlib import blake2b
 from typing import Dict, Any, Optional, Mapping, Sequence
 
+import bson
+from bson.errors import InvalidDocument
+
 
 @dataclass
 class QueryInfo:
-    """Class representing a pymongo query and its information."""
+    """
+    Class representing a pymongo query and its information.
+
+    The key of the query is the canonical BSON encoding of all fields. It is computed on construction, the hash
+    and the equality of two queries are both based on it. The key is a snapshot of the documents of the query, so
+    changing the filter or the pipeline of the caller afterward does not change the key, under which the result
+    is cached. The fields of the query must not be modified.
+    """
 
     function_name: Optional[str]
     query: Optional[Dict[str, Any]] = None
@@ -15,8 +25,49 @@ class QueryInfo:
     skip: Optional[int] = None
     limit: Optional[int] = None
     pipeline: Optional[Sequence[Mapping[str, Any]]] = None
+    # Further arguments, which influence the result of the query, e.g. collation or hint
+    options: Optional[Dict[str, Any]] = None
+
+    # Key, digest and hash, which are computed on construction, these are no dataclass fields
+    _key = None
+    _digest = None
+    _hash = None
+
+    def __post_init__(self):
+        """Compute the key, so the key does not change with the arguments of the caller."""
+        self._key = self._encode()
+        self._digest = blake2b(self._key, digest_size=16).digest()
+        # 64 bit signed, so it can be stored as a BSON int64
+        self._hash = int.from_bytes(self._digest[:8], "little", signed=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the query to a dict, which can be passed to the constructor again."""
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    @property
+    def key(self) -> bytes:
+        """The canonical encoding of the query, which identifies it in the cache."""
+        return self._key
+
+    @property
+    def digest(self) -> bytes:
+        """The 128 bit digest of the key of the query."""
+        return self._digest
+
+    def _encode(self) -> bytes:
+        """Encode the query canonically, queries which cannot be encoded as BSON fall back to their repr."""
+        query_dict = self.to_dict()
+        try:
+            return bson.encode(query_dict)
+        except (InvalidDocument, TypeError, OverflowError):
+            return repr(query_dict).encode()
 
     def __hash__(self):
         """Return the hash of the query."""
-        hash_val = int(md5(str(self).encode()).hexdigest(), 16) % (10**8)
-        return hash_val
+        return self._hash
+
+    def __eq__(self, other):
+        """Two queries are equal, if their keys are equal."""
+        if not isinstance(other, QueryInfo):
+            return NotImplemented
+        return self.key == other.key
@@ -0,0 +1,347 @@
+"""Local evaluation of MongoDB query filters against documents."""
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Mapping, Optional, Set, Tuple
+
+from bson import ObjectId
+
+# Types, for which python equality and ordering agree with MongoDB, as long as both values have the same type
+_EXACT_TYPES = (str, bytes, datetime, ObjectId)
+# Type classes, for which the ordering of python agrees with MongoDB
+_ORDERED_TYPE_CLASSES = (bool, float, str, datetime, ObjectId)
+# Top level operators, which do not restrict the matched documents
+_IGNORED_TOP_LEVEL_OPERATORS = {"$comment"}
+
+# Sentinel for a field, which does not exist in the document
+_MISSING = object()
+
+
+class QueryMatcher:
+    """
+    Evaluates MongoDB query filters against documents without a round trip to the server.
+
+    All checks use a three-valued logic: True and False are definite answers, None means that the filter uses
+    operators or values, which are not supported locally. Callers must treat None as "might match".
+    Supported are implicit equality, $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $exists, $not, $and, $or and $nor
+    on top level fields and dotted paths through embedded documents.
+    """
+
+    @staticmethod
+    def matches(
+        query: Optional[Mapping[str, Any]], document: Mapping[str, Any]
+    ) -> Optional[bool]:
+        """
+        Check if the document matches the query.
+        :param query: The query filter, None or an empty filter match every document.
+        :param document: The document to check.
+        :return: True if the document matches, False if it does not, None if it cannot be decided locally.
+        """
+        if query is None:
+            return True
+        if not isinstance(query, Mapping):
+            return None
+
+        results = []
+        for key, condition in query.items():
+            if key == "$and":
+                result = QueryMatcher._match_all(condition, document)
+            elif key == "$or":
+                result = QueryMatcher._match_any(condition, document)
+            elif key == "$nor":
+                result = _not(QueryMatcher._match_any(condition, document))
+            elif key in _IGNORED_TOP_LEVEL_OPERATORS:
+                continue
+            elif key.startswith("$"):
+                return None
+            else:
+                result = QueryMatcher._match_field(key, condition, document)
+
+            if result is False:
+                return False
+            results.append(result)
+
+        return _all(results)
+
+    @staticmethod
+    def get_fields(query: Optional[Mapping[str, Any]]) -> Optional[Set[str]]:
+        """
+        Get the top level fields, which are referenced by the query.
+        :param query: The query filter.
+        :return: The names of the top level fields or None if the query uses operators, which can reference
+            arbitrary fields, e.g. $where or $expr.
+        """
+        if query is None:
+            return set()
+        if not isinstance(query, Mapping):
+            return None
+
+        fields = set()
+        for key, condition in query.items():
+            if key in ("$and", "$or", "$nor"):
+                if not isinstance(condition, (list, tuple)):
+                    return None
+                for sub_query in condition:
+                    sub_fields = QueryMatcher.get_fields(sub_query)
+                    if sub_fields is None:
+                        return None
+                    fields |= sub_fields
+            elif key in _IGNORED_TOP_LEVEL_OPERATORS:
+                continue
+            elif key.startswith("$"):
+                return None
+            else:
+                fields.add(key.split(".", 1)[0])
+        return fields
+
+    @staticmethod
+    def projection_keeps_fields(projection: Any, fields: Set[str]) -> bool:
+        """
+        Check if documents, which are projected with the projection, still contain the given top level fields.
+        :param projection: The projection of the query.
+        :param fields: The names of the top level fields.
+        :return: True if the fields are kept, False if they may be removed.
+        """
+        if projection is None:
+            return True
+        if not isinstance(projection, Mapping):
+            # A list of field names is an inclusion projection
+            projection = {name: 1 for name in projection}
+
+        for name, flag in projection.items():
+            if "." in name or not isinstance(flag, (bool, int)):
+                # Embedded fields, $slice, $elemMatch and computed fields are not analysed
+                return False
+        included = {name for name, flag in projection.items() if flag}
+        excluded = {name for name, flag in projection.items() if not flag}
+        if fields & excluded:
+            return False
+        if included - {"_id"}:
+            # Inclusion projection, _id is included unless it is excluded explicitly
+            return fields <= included | {"_id"}
+        return True
+
+    @staticmethod
+    def _match_all(queries: Any, document: Mapping[str, Any]) -> Optional[bool]:
+        """Check if the document matches all queries."""
+        if not isinstance(queries, (list, tuple)):
+            return None
+        results = []
+        for query in queries:
+            result = QueryMatcher.matches(query, document)
+            if result is False:
+                return False
+            results.append(result)
+        return _all(results)
+
+    @staticmethod
+    def _match_any(queries: Any, document: Mapping[str, Any]) -> Optional[bool]:
+        """Check if the document matches any of the queries."""
+        if not isinstance(queries, (list, tuple)):
+            return None
+        results = []
+        for query in queries:
+            result = QueryMatcher.matches(query, document)
+            if result is True:
+                return True
+            results.append(result)
+        return _any(results)
+
+    @staticmethod
+    def _match_field(
+        path: str, condition: Any, document: Mapping[str, Any]
+    ) -> Optional[bool]:
+        """Check if the field at the path of the document fulfills the condition."""
+        resolved, value = _resolve_path(document, path)
+        if not resolved:
+            return None
+
+        if isinstance(condition, Mapping) and any(
+            isinstance(key, str) and key.startswith("$") for key in condition
+        ):
+            return _match_operators(condition, value)
+
+        return _match_equal(value, condition)
+
+
+def _match_operators(condition: Mapping[str, Any], value: Any) -> Optional[bool]:
+    """Check if the value fulfills all operators of the condition."""
+    results = []
+    for operator, target in condition.items():
+        if operator == "$eq":
+            result = _match_equal(value, target)
+        elif operator == "$ne":
+            result = _not(_match_equal(value, target))
+        elif operator == "$in":
+            result = _match_in(value, target)
+        elif operator == "$nin":
+            result = _not(_match_in(value, target))
+        elif operator in _COMPARISONS:
+            result = _match_comparison(value, target, _COMPARISONS[operator])
+        elif operator == "$exists":
+            result = (value is not _MISSING) == bool(target)
+        elif operator == "$not":
+            if not isinstance(target, Mapping):
+                return None
+            result = _not(_match_operators(target, value))
+        else:
+            return None
+
+        if result is False:
+            return False
+        results.append(result)
+    return _all(results)
+
+
+def _match_equal(value: Any, target: Any) -> Optional[bool]:
+    """Check if the value equals the target with the semantics of MongoDB, arrays match if any element matches."""
+    if target is None:
+        # null matches missing fields and null values
+        if value is _MISSING or value is None:
+            return True
+        if isinstance(value, list):
+            return _any(_match_equal(element, None) for element in value)
+        return False
+    if value is _MISSING:
+        return False
+
+    if isinstance(value, list):
+        results = [_equal(value, target)]
+        results.extend(_equal(element, target) for element in value)
+        return _any(results)
+    return _equal(value, target)
+
+
+def _match_in(value: Any, targets: Any) -> Optional[bool]:
+    """Check if the value equals any of the targets."""
+    if not isinstance(targets, (list, tuple)):
+        return None
+    return _any(_match_equal(value, target) for target in targets)
+
+
+def _match_comparison(
+    value: Any, target: Any, compare: Callable[[Any, Any], bool]
+) -> Optional[bool]:
+    """Check if the value fulfills the comparison, arrays match if any element fulfills it."""
+    if value is _MISSING:
+        return None if target is None else False
+    if isinstance(value, list):
+        if isinstance(target, list):
+            return None
+        return _any(_compare(element, target, compare) for element in value)
+    return _compare(value, target, compare)
+
+
+def _compare(
+    value: Any, target: Any, compare: Callable[[Any, Any], bool]
+) -> Optional[bool]:
+    """Compare two values with the semantics of MongoDB, values of different types never match."""
+    type_class = _get_type_class(value)
+    target_type_class = _get_type_class(target)
+    if type_class is None or target_type_class is None:
+        return None
+    if type_class != target_type_class:
+        return False
+    if type_class not in _ORDERED_TYPE_CLASSES:
+        # MongoDB orders these types differently than python, e.g. binary data by length first
+        return None
+    return compare(_normalize(value), _normalize(target))
+
+
+def _equal(value: Any, target: Any) -> Optional[bool]:
+    """Check if two values are equal with the semantics of MongoDB."""
+    if isinstance(value, Mapping) and isinstance(target, Mapping):
+        # Embedded documents are only equal, if their fields are in the same order
+        if list(value.keys()) != list(target.keys()):
+            return False
+        return _all(_equal(value[key], target[key]) for key in value)
+    if isinstance(value, (list, tuple)) and isinstance(target, (list, tuple)):
+        if len(value) != len(target):
+            return False
+        return _all(_equal(a, b) for a, b in zip(value, target))
+
+    type_class = _get_type_class(value)
+    target_type_class = _get_type_class(target)
+    if type_class is None or target_type_class is None:
+        if value is None and target is None:
+            return True
+        return None
+    if type_class != target_type_class:
+        return False
+    return _normalize(value) == _normalize(target)
+
+
+def _get_type_class(value: Any) -> Optional[type]:
+    """Get the class of values, which can be compared with each other, or None for unsupported types."""
+    if isinstance(value, bool):
+        return bool
+    if isinstance(value, (int, float)):
+        # NaN is equal to itself in MongoDB, but not in python
+        return float if value == value else None
+    for exact_type in _EXACT_TYPES:
+        if isinstance(value, exact_type):
+            return exact_type
+    if isinstance(value, Mapping):
+        return Mapping
+    if isinstance(value, (list, tuple)):
+        return list
+    return None
+
+
+def _normalize(value: Any) -> Any:
+    """Normalize values, such that python compares them like MongoDB."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # MongoDB stores UTC, pymongo decodes naive datetimes by default
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _resolve_path(document: Mapping[str, Any], path: str) -> Tuple[bool, Any]:
+    """
+    Get the value at the dotted path of the document.
+    :return: A tuple of a flag, which is False if the path cannot be resolved locally (e.g. it traverses an
+        array), and the value, which is _MISSING if the field does not exist.
+    """
+    value = document
+    for part in path.split("."):
+        if isinstance(value, list):
+            return False, None
+        if not isinstance(value, Mapping):
+            return True, _MISSING
+        value = value.get(part, _MISSING)
+        if value is _MISSING:
+            return True, _MISSING
+    return True, value
+
+
+def _not(result: Optional[bool]) -> Optional[bool]:
+    """Three-valued negation."""
+    return None if result is None else not result
+
+
+def _all(results: Iterable[Optional[bool]]) -> Optional[bool]:
+    """Three-valued conjunction."""
+    unknown = False
+    for result in results:
+        if result is False:
+            return False
+        if result is None:
+            unknown = True
+    return None if unknown else True
+
+
+def _any(results: Iterable[Optional[bool]]) -> Optional[bool]:
+    """Three-valued disjunction."""
+    unknown = False
+    for result in results:
+        if result is True:
+            return True
+        if result is None:
+            unknown = True
+    return None if unknown else False
+
+
+_COMPARISONS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
@@ -0,0 +1,18 @@
+"""Functions for reading documents, which are cached as RawBSONDocument."""
+from typing import Any
+
+import bson
+from bson.raw_bson import RawBSONDocument
+
+
+def decode_document(document: Any) -> Any:
+    """
+    Get a decoded copy of a RawBSONDocument, other values are returned unchanged.
+    Reading the fields of a RawBSONDocument directly keeps them decoded in the document, which is avoided for
+    cached documents, whose fields are only read by the cache itself.
+    :param document: The document to decode.
+    :return: The decoded document.
+    """
+    if isinstance(document, RawBSONDocument):
+        return bson.decode(document.raw)
+    return document
@@ -0,0 +1,181 @@
+"""Computes the results of find queries from the cached results of related queries."""
+from datetime import datetime, timezone
+from typing import Any, List, Mapping, Optional, Tuple
+
+from bson import ObjectId
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.QueryMatcher import QueryMatcher
+from cache_backend.RawDocuments import decode_document
+
+# Sort directions, which can be applied locally
+_DIRECTIONS = {1: 1, -1: -1, "asc": 1, "ascending": 1, "desc": -1, "descending": -1}
+
+
+class ResultWindow:
+    """
+    Computes the results of find queries from the cached results of related queries.
+
+    Two find queries are related, if they only differ in their sort, skip and limit, i.e. they have the same base
+    key. A cached result with the same sort covers the requested window, if it starts at or before the requested
+    skip and either reaches the end of the result set or contains the whole window. A cached result, which is
+    complete, i.e. it was neither skipped nor limited, can additionally be sorted locally in any order.
+    """
+
+    @staticmethod
+    def get_base_key(query_info: QueryInfo) -> Optional[QueryInfo]:
+        """
+        Get the key, which is shared by all related queries.
+        :param query_info: The query.
+        :return: The base key or None if the query cannot be answered from related queries.
+        """
+        if query_info.function_name not in ("FIND", "FIND_ONE"):
+            return None
+        if query_info.options and "args" in query_info.options:
+            # Positional arguments can contain sort, skip and limit
+            return None
+        return QueryInfo(
+            "FIND",
+            query=query_info.query,
+            projection=query_info.projection,
+            options=query_info.options,
+        )
+
+    @staticmethod
+    def get_window(
+        requested: QueryInfo, cached: QueryInfo, value: Any
+    ) -> Optional[List[Any]]:
+        """
+        Compute the result of the requested query from the cached result of a related find query.
+        :param requested: The requested query.
+        :param cached: The cached find query, which has the same base key.
+        :param value: The cached result.
+        :return: The documents of the requested query or None if they cannot be computed from the cached result.
+        """
+        if cached.function_name != "FIND" or not isinstance(value, list):
+            return None
+        requested_sort = _normalize_sort(requested.sort)
+        cached_sort = _normalize_sort(cached.sort)
+        if requested_sort is None or cached_sort is None:
+            return None
+
+        requested_skip = requested.skip or 0
+        requested_limit = (
+            1 if requested.function_name == "FIND_ONE" else _get_limit(requested)
+        )
+        cached_skip = cached.skip or 0
+        cached_limit = _get_limit(cached)
+        # A result, which is shorter than its limit, reaches the end of the result set
+        reaches_end = cached_limit is None or len(value) < cached_limit
+
+        if requested_sort != cached_sort:
+            if cached_skip != 0 or not reaches_end:
+                return None
+            if requested_sort:
+                value = _sort_locally(value, requested_sort, requested)
+                if value is None:
+                    return None
+        elif requested_skip < cached_skip:
+            return None
+
+        start = (
+            requested_skip - cached_skip
+            if requested_sort == cached_sort
+            else requested_skip
+        )
+        if requested_limit is None:
+            if not reaches_end:
+                return None
+            return value[start:]
+        end = start + requested_limit
+        if end > len(value) and not reaches_end:
+            return None
+        return value[start:end]
+
+
+def _get_limit(query_info: QueryInfo) -> Optional[int]:
+    """Get the limit of the query, None if it is unlimited. A negative limit is a limit as well."""
+    if not query_info.limit:
+        return None
+    return abs(query_info.limit)
+
+
+def _normalize_sort(sort: Any) -> Optional[Tuple[Tuple[str, int], ...]]:
+    """Normalize the sort to a tuple of field names and directions, None if it is not supported."""
+    if sort is None:
+        return ()
+    if isinstance(sort, str):
+        return ((sort, 1),)
+    items = sort.items() if isinstance(sort, Mapping) else sort
+    normalized = []
+    for item in items:
+        if isinstance(item, str):
+            key, direction = item, 1
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            key, direction = item
+        else:
+            return None
+        if not isinstance(key, str) or not isinstance(direction, (int, str)):
+            return None
+        if isinstance(direction, str):
+            direction = direction.lower()
+        if isinstance(direction, bool) or direction not in _DIRECTIONS:
+            # E.g. sorting by the text score
+            return None
+        normalized.append((key, _DIRECTIONS[direction]))
+    return tuple(normalized)
+
+
+def _sort_locally(
+    documents: List[Any], sort: Tuple[Tuple[str, int], ...], query_info: QueryInfo
+) -> Optional[List[Any]]:
+    """Sort the documents like MongoDB or return None if the sort cannot be reproduced locally."""
+    if query_info.options and "collation" in query_info.options:
+        # Strings are compared according to the collation
+        return None
+    fields = {key.split(".", 1)[0] for key, _ in sort}
+    if not QueryMatcher.projection_keeps_fields(query_info.projection, fields):
+        return None
+
+    try:
+        # Raw documents are decoded once for all sort keys, the sorted result contains the cached documents
+        decorated = [(decode_document(document), document) for document in documents]
+        # Sorting is stable, so sorting by the last key first yields the order of all keys
+        for key, direction in reversed(sort):
+            decorated.sort(
+                key=lambda item: _get_sort_value(item[0], key),
+                reverse=direction == -1,
+            )
+    except (TypeError, ValueError):
+        return None
+    return [document for _, document in decorated]
+
+
+def _get_sort_value(document: Any, path: str) -> Tuple[int, Any]:
+    """Get the value of the document, by which it is sorted, as a tuple of the BSON type order and the value."""
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, Mapping):
+            if isinstance(value, list):
+                raise ValueError("Sorting by values in arrays is not supported")
+            value = None
+            break
+        value = value.get(part)
+
+    if value is None:
+        return 1, 0
+    if isinstance(value, bool):
+        return 8, value
+    if isinstance(value, (int, float)):
+        if value != value:
+            raise ValueError("Sorting by NaN is not supported")
+        return 2, value
+    if isinstance(value, str):
+        return 3, value
+    if isinstance(value, ObjectId):
+        return 7, value
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return 9, value
+    raise ValueError(f"Sorting by values of type {type(value)} is not supported")
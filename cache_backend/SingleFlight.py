@@ -0,0 +1,68 @@
+"""Coalesces concurrent executions of the same query."""
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """An execution, which is in flight, and its outcome."""
+
+    def __init__(self):
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent executions of the same query.
+
+    The first caller for a key executes the function, concurrent callers for the same key wait for its outcome
+    instead of executing the function again. They receive the same result or the same exception. A caller, which
+    waits longer than the timeout, executes the function on its own, so a hanging execution never blocks the other
+    callers forever.
+    """
+
+    _timeout: Optional[float] = None
+    _calls: Dict[Hashable, _Call] = None
+    _lock: Lock = None
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        :param timeout: The maximum time in seconds to wait for the execution of another caller, None waits forever.
+        """
+        self._timeout = timeout
+        self._calls = {}
+        self._lock = Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """
+        Execute the function, unless an execution for the key is already in flight, then wait for its outcome.
+        :param key: The key identifying the execution.
+        :param function: The function to execute.
+        :return: The result of the function.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            if not call.done.wait(self._timeout):
+                # The execution takes too long, do not wait any longer
+                return function()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,50 @@
+"""Functions for determining the size of values stored in the cache."""
+import sys
+from typing import Any, Optional
+
+import bson
+from bson.errors import InvalidDocument
+from bson.raw_bson import RawBSONDocument
+
+from cache_backend.Constants import VALUE
+from cache_backend.codec.ValueCodec import EncodedValue
+
+
+def get_value_size(value: Any) -> int:
+    """
+    Get the size of a value in bytes, which is the length of its BSON encoding.
+    Values, which cannot be encoded as BSON, fall back to the size of the python object.
+    :param value: The value to get the size of.
+    :return: The size of the value in bytes.
+    """
+    if isinstance(value, EncodedValue):
+        # The compressed data is all, which is kept in memory
+        return len(value.data)
+    raw_size = _get_raw_value_size(value)
+    if raw_size is not None:
+        return raw_size
+    try:
+        return len(bson.encode({VALUE: value}))
+    except (InvalidDocument, TypeError, OverflowError):
+        return sys.getsizeof(value)
+
+
+def _get_raw_value_size(value: Any) -> Optional[int]:
+    """
+    Get the length of the BSON encoding of a RawBSONDocument or a list of them without encoding them again.
+    :return: The size in bytes or None if the value is no raw document.
+    """
+    # Document header and trailing null byte plus the type byte and the name of the value field
+    outer_size = 4 + 1 + 1 + len(VALUE) + 1
+    if isinstance(value, RawBSONDocument):
+        return outer_size + len(value.raw)
+    if not isinstance(value, list) or not value:
+        return None
+
+    # Array header and trailing null byte, each element has a type byte and its index as null terminated name
+    size = outer_size + 4 + 1
+    for index, document in enumerate(value):
+        if not isinstance(document, RawBSONDocument):
+            return None
+        size += 1 + len(str(index)) + 1 + len(document.raw)
+    return size
@@ -0,0 +1,30 @@
+"""Class representing a write to a collection and its information."""
+import enum
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Sequence, Union
+
+
+class WriteOperation(enum.Enum):
+    """Defines the kind of write, which determines how the cache is invalidated."""
+
+    INSERT = 0
+    UPDATE = 1
+    REPLACE = 2
+    DELETE = 3
+
+
+@dataclass
+class WriteInfo:
+    """Class representing a write to a collection and its information."""
+
+    operation: WriteOperation
+    # The filter selecting the documents, which are updated, replaced or deleted
+    filter: Optional[Mapping[str, Any]] = None
+    # The update document or update pipeline
+    update: Optional[Union[Mapping[str, Any], Sequence[Mapping[str, Any]]]] = None
+    # The replacement document
+    replacement: Optional[Mapping[str, Any]] = None
+    # The inserted documents
+    documents: Optional[Sequence[Mapping[str, Any]]] = None
+    upsert: bool = False
+    collation: Optional[Mapping[str, Any]] = None
@@ -0,0 +1,127 @@
+"""Base class for asynchronous cache backends."""
+from abc import abstractmethod, ABCMeta
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo.asynchronous.collection import AsyncCollection
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.base.ValueCodingMixin import ValueCodingMixin
+from cache_backend.codec.CodecStats import CodecStatsRecorder
+from cache_backend.codec.ValueCodec import ValueCodec
+
+_async_cache_backend_registry: Dict[Tuple[str, str], "AsyncCacheBackendBase"] = {}
+
+
+class AsyncCacheBackendBase(ValueCodingMixin, metaclass=ABCMeta):
+    """
+    Base class for asynchronous cache backends, which are used by the asyncio wrappers.
+
+    The methods have the same contract as the ones of CacheBackendBase, but are coroutines, such that backends,
+    which do I/O, do not block the event loop.
+    """
+
+    collection: AsyncCollection = None
+    max_item_size: int = 0
+    ttl: int = 0
+    max_num_items: int = 0
+    max_total_bytes: Optional[int] = None
+    cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU
+    lfu_aging_interval: Optional[float] = None  # In seconds
+
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        ttl: int = 0,
+        max_item_size: int = 1 * 10**6,
+        max_num_items: int = 1000,
+        cache_cleanup_cycle_time: Optional[float] = None,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+    ):
+        """
+        :param cache_cleanup_cycle_time: The time between the cleanups of backends, which clean up periodically.
+        :param value_codec: The codec, which compresses the stored values, None stores them as they are.
+        :param compression_threshold: The minimum size of a value in bytes, which is compressed by the value codec.
+        """
+        self.collection = collection
+        self.max_item_size = max_item_size
+        self.max_num_items = max_num_items
+        self.max_total_bytes = max_total_bytes
+        self.ttl = ttl
+        self.cleanup_strategy = cleanup_strategy
+        self.lfu_aging_interval = lfu_aging_interval
+        self.value_codec = value_codec
+        self.compression_threshold = compression_threshold
+        self._codec_stats = CodecStatsRecorder()
+
+        _async_cache_backend_registry[(collection.database.name, collection.name)] = (
+            self
+        )
+
+    @abstractmethod
+    async def get(self, key: QueryInfo) -> Optional[Any]:
+        """Get the value from the cache."""
+        pass
+
+    @abstractmethod
+    async def set(
+        self,
+        key: QueryInfo,
+        value: Any,
+        execution_time_millis: float,
+        ttl: Optional[int] = None,
+    ) -> None:
+        """Set the value in the cache.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
+        :param value: The value to set.
+        :param key: The key to set.
+        :param execution_time_millis: The execution time of the query in milliseconds.
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, key: QueryInfo) -> None:
+        """Delete the value from the cache."""
+        pass
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Clear the cache."""
+        pass
+
+    async def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from the cache.
+        Backends, which cannot inspect their entries, clear the whole cache.
+        :param write_info: The write to the collection.
+        """
+        await self.clear()
+
+    @abstractmethod
+    async def get_all(self) -> Dict[QueryInfo, Any]:
+        """Get all the values from the cache."""
+        pass
+
+    @staticmethod
+    async def clear_cache_for_database_and_collection(
+        collection_name: str, database_name: str
+    ) -> None:
+        """Clear the cache for the database and collection."""
+        cache_backend = _async_cache_backend_registry.get(
+            (database_name, collection_name)
+        )
+        # Collections, which are not wrapped, have no cache
+        if cache_backend is not None:
+            await cache_backend.clear()
+
+    @staticmethod
+    def get_cache_backend_for_database_and_collection(
+        collection_name: str, database_name: str
+    ) -> Optional["AsyncCacheBackendBase"]:
+        """Get the cache backend of the database and collection or None if the collection has no cache."""
+        return _async_cache_backend_registry.get((database_name, collection_name))
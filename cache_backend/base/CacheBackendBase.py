@@ -2,22 +2,30 @@
 import time
 from abc import abstractmethod, ABCMeta
 from threading import Thread
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from pymongo.collection import Collection
 
 from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.base.ValueCodingMixin import ValueCodingMixin
+from cache_backend.codec.CodecStats import CodecStatsRecorder
+from cache_backend.codec.ValueCodec import ValueCodec
 
 _cache_backend_registry: Dict[Tuple[str, str], "CacheBackendBase"] = {}
 
 
-class CacheBackendBase(metaclass=ABCMeta):
+class CacheBackendBase(ValueCodingMixin, metaclass=ABCMeta):
     """Base class for cache backends."""
 
     collection: Collection = None
     max_item_size: int = 0
     ttl: int = 0
     max_num_items: int = 0
+    max_total_bytes: Optional[int] = None
+    cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU
+    lfu_aging_interval: Optional[float] = None  # In seconds
     _cache_cleanup_thread: Any = None
     _cache_cleanup_cycle_time: float = 0  # In seconds
     _cache_cleanup_handler = None
@@ -29,15 +37,26 @@ class CacheBackendBase(metaclass=ABCMeta):
         max_item_size: int = 1 * 10**6,
         max_num_items: int = 1000,
         cache_cleanup_cycle_time: Optional[float] = None,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
     ):
         self.collection = collection
         self.max_item_size = max_item_size
         self.max_num_items = max_num_items
+        self.max_total_bytes = max_total_bytes
         self.ttl = ttl
+        self.cleanup_strategy = cleanup_strategy
+        self.lfu_aging_interval = lfu_aging_interval
+        self.value_codec = value_codec
+        self.compression_threshold = compression_threshold
+        self._codec_stats = CodecStatsRecorder()
         if cache_cleanup_cycle_time is not None:
+            self._cache_cleanup_cycle_time = cache_cleanup_cycle_time
             self._cache_cleanup_thread = Thread(target=self._cache_cleanup, daemon=True)
             self._cache_cleanup_thread.start()
-            self._cache_cleanup_cycle_time = cache_cleanup_cycle_time
 
         _cache_backend_registry[(collection.database.name, collection.name)] = self
 
@@ -46,6 +65,14 @@ class CacheBackendBase(metaclass=ABCMeta):
         """Get the value from the cache."""
         pass
 
+    def get_with_ttl(self, key: QueryInfo) -> Tuple[Optional[Any], Optional[float]]:
+        """
+        Get the value from the cache and its remaining time to live, e.g. to copy the entry into another cache.
+        :return: The value and the remaining time to live in seconds, which is 0 if the entry does not expire and
+            None if it is not known.
+        """
+        return self.get(key), None
+
     @abstractmethod
     def set(
         self,
@@ -55,7 +82,7 @@ class CacheBackendBase(metaclass=ABCMeta):
         ttl: Optional[int] = None,
     ) -> None:
         """Set the value in the cache.
-        :param ttl: The time to live for the key.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
         :param value: The value to set.
         :param key: The key to set.
         :param execution_time_millis: The execution time of the query in milliseconds.
@@ -72,11 +99,31 @@ class CacheBackendBase(metaclass=ABCMeta):
         """Clear the cache."""
         pass
 
+    def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from the cache.
+        Backends, which cannot inspect their entries, clear the whole cache.
+        :param write_info: The write to the collection.
+        """
+        self.clear()
+
     @abstractmethod
     def get_all(self) -> Dict[QueryInfo, Any]:
         """Get all the values from the cache."""
         pass
 
+    def _get_expiry_time(self, ttl: Optional[int] = None) -> Optional[float]:
+        """
+        Get the point in time at which an entry, which is set now, expires.
+        :param ttl: The time to live of the entry in seconds, the TTL of the backend is used if None.
+        :return: The expiry time based on time.monotonic() or None if the entry does not expire.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        if not ttl:
+            return None
+        return time.monotonic() + ttl
+
     def get_ttl(self) -> Optional[int]:
         """Get the TTL for the key."""
         return self.ttl
@@ -94,7 +141,6 @@ class CacheBackendBase(metaclass=ABCMeta):
         """Clean up the cache."""
         while True:
             if self._cache_cleanup_handler is not None:
-                print("Running cache cleanup.")
                 self._cache_cleanup_internal()
             time.sleep(self._cache_cleanup_cycle_time)
 
@@ -103,4 +149,25 @@ class CacheBackendBase(metaclass=ABCMeta):
         collection_name: str, database_name: str
     ) -> None:
         """Clear the cache for the database and collection."""
-        _cache_backend_registry[(database_name, collection_name)].clear()
+        cache_backend = _cache_backend_registry.get((database_name, collection_name))
+        # Collections, which are not wrapped, have no cache
+        if cache_backend is not None:
+            cache_backend.clear()
+
+    @staticmethod
+    def get_cache_backend_for_database_and_collection(
+        collection_name: str, database_name: str
+    ) -> Optional["CacheBackendBase"]:
+        """Get the cache backend of the database and collection or None if the collection has no cache."""
+        return _cache_backend_registry.get((database_name, collection_name))
+
+    @staticmethod
+    def get_cache_backends_for_database(
+        database_name: str,
+    ) -> List["CacheBackendBase"]:
+        """Get the cache backends of all collections of the database."""
+        return [
+            cache_backend
+            for (name, _), cache_backend in list(_cache_backend_registry.items())
+            if name == database_name
+        ]
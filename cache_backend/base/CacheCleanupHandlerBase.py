@@ -1,7 +1,8 @@
 """Implements a handler for the cleanup of the cache."""
 import enum
+import time
 from abc import abstractmethod, ABCMeta
-from typing import List
+from typing import List, Optional
 
 from pymongo.collection import Collection
 
@@ -14,6 +15,8 @@ class CleanupStrategy(enum.Enum):
     LRU = 0
     LFU = 1
     EXECUTION_TIME = 2
+    # GreedyDual-Size-Frequency: ranks entries by (execution_time * hits) / size with inflation aging
+    GDSF = 3
 
 
 class CacheCleanupHandlerBase(metaclass=ABCMeta):
@@ -22,6 +25,9 @@ class CacheCleanupHandlerBase(metaclass=ABCMeta):
     _collection: Collection = None
     _max_item_size: int = 0
     _max_num_items: int = 0
+    _max_total_bytes: Optional[int] = None
+    _lfu_aging_interval: Optional[float] = None  # In seconds
+    _last_aging: float = 0
 
     def __init__(
         self,
@@ -29,11 +35,16 @@ class CacheCleanupHandlerBase(metaclass=ABCMeta):
         max_item_size: int = 1 * 10**6,
         max_num_items: int = 1000,
         cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
     ):
         self._collection = collection
         self._max_item_size = max_item_size
         self._max_num_items = max_num_items
+        self._max_total_bytes = max_total_bytes
         self._cleanup_strategy = cleanup_strategy
+        self._lfu_aging_interval = lfu_aging_interval
+        self._last_aging = time.monotonic()
 
     def _get_entries_to_remove_from_cache(
         self, entries_to_cleanup: int
@@ -45,14 +56,96 @@ class CacheCleanupHandlerBase(metaclass=ABCMeta):
             return self.get_n_least_frequent_entries(entries_to_cleanup)
         elif self._cleanup_strategy == CleanupStrategy.EXECUTION_TIME:
             return self.get_n_fastest_entries(entries_to_cleanup)
+        elif self._cleanup_strategy == CleanupStrategy.GDSF:
+            return self.get_n_least_valuable_entries(entries_to_cleanup)
 
-    def cleanup_cache(self):
-        entries_to_cleanup = self.get_elements_in_cache() - self._max_num_items
-        if entries_to_cleanup <= 0:
+    def cleanup_cache(self, num_new_entries: int = 0, num_new_bytes: int = 0):
+        """
+        Remove entries from the cache until it is within its limits.
+        :param num_new_entries: The number of entries which are about to be added to the cache.
+        :param num_new_bytes: The number of bytes which are about to be added to the cache.
+        """
+        self.remove_expired_entries()
+        self._age_access_counts_if_due()
+
+        entries_to_cleanup = (
+            self.get_elements_in_cache() + num_new_entries - self._max_num_items
+        )
+        if entries_to_cleanup > 0:
+            self.evict_entries(entries_to_cleanup)
+
+        if self._max_total_bytes is None:
             return
 
-        entries_to_remove = self._get_entries_to_remove_from_cache(entries_to_cleanup)
-        self.delete_entries(entries_to_remove)
+        # Evict entry by entry according to the strategy until the byte budget is met
+        while self.get_bytes_in_cache() + num_new_bytes > self._max_total_bytes:
+            if not self.evict_entries(1):
+                break
+
+    def evict_entries(self, n: int) -> int:
+        """
+        Remove n entries from the cache according to the cleanup strategy.
+        Backends, which can select and delete the entries in one statement, override this.
+        :param n: The number of entries to remove.
+        :return: The number of removed entries.
+        """
+        entries_to_remove = self._get_entries_to_remove_from_cache(n)
+        if entries_to_remove:
+            self.delete_entries(entries_to_remove)
+        return len(entries_to_remove)
+
+    def exceeds_max_item_size(self, size: int) -> bool:
+        """
+        Check if an entry of the given size is too large to be stored in the cache.
+        :param size: The size of the entry in bytes.
+        :return: True if the entry must not be stored in the cache.
+        """
+        if self._max_item_size and size > self._max_item_size:
+            return True
+        return self._max_total_bytes is not None and size > self._max_total_bytes
+
+    @staticmethod
+    def calculate_priority(
+        inflation: float, access_count: int, execution_time: float, size: int
+    ) -> float:
+        """
+        Calculate the GreedyDual-Size-Frequency priority of an entry.
+        :param inflation: The current inflation value, which is the priority of the last evicted entry.
+        :param access_count: The number of cache hits of the entry.
+        :param execution_time: The execution time of the query in milliseconds.
+        :param size: The size of the entry in bytes.
+        :return: The priority of the entry, entries with the lowest priority are evicted first.
+        """
+        # The fill counts as the first use of the entry
+        return inflation + (access_count + 1) * execution_time / max(size, 1)
+
+    def _age_access_counts_if_due(self) -> None:
+        """Halve the access counts of all entries, if the LFU aging interval has passed."""
+        if (
+            self._cleanup_strategy != CleanupStrategy.LFU
+            or self._lfu_aging_interval is None
+        ):
+            return
+
+        now = time.monotonic()
+        if now - self._last_aging >= self._lfu_aging_interval:
+            self._last_aging = now
+            self.halve_access_counts()
+
+    def remove_expired_entries(self) -> None:
+        """
+        Remove the entries, whose TTL has passed, from the cache.
+        Backends, which expire their entries on the client side, override this.
+        """
+        pass
+
+    @abstractmethod
+    def halve_access_counts(self) -> None:
+        """
+        Halve the access counts of all entries in the cache, such that entries which were
+        frequently used in the past do not stay in the cache forever.
+        """
+        pass
 
     @abstractmethod
     def get_elements_in_cache(self) -> int:
@@ -62,6 +155,14 @@ class CacheCleanupHandlerBase(metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def get_bytes_in_cache(self) -> int:
+        """
+        Get the size of all entries in the cache.
+        :return: The current size of the cache in bytes
+        """
+        pass
+
     @abstractmethod
     def get_n_oldest_entries(self, n: int) -> List[QueryInfo]:
         """
@@ -89,6 +190,15 @@ class CacheCleanupHandlerBase(metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def get_n_least_valuable_entries(self, n: int) -> List[QueryInfo]:
+        """
+        Get the n entries with the lowest GreedyDual-Size-Frequency priority in the cache.
+        :param n: The number of entries to get.
+        :return: The n least valuable entries in the cache.
+        """
+        pass
+
     @abstractmethod
     def delete_entries(self, entries: List[QueryInfo]) -> None:
         """
@@ -0,0 +1,78 @@
+"""Mixin, which encodes the values of a cache backend with its value codec."""
+import time
+from typing import Any, Optional
+
+import bson
+from bson.errors import InvalidDocument
+
+from cache_backend.Constants import VALUE
+from cache_backend.codec.CodecStats import CodecStats, CodecStatsRecorder
+from cache_backend.codec.ValueCodec import EncodedValue, ValueCodec, get_value_codec
+
+
+class ValueCodingMixin:
+    """
+    Mixin, which encodes the values of a cache backend with its value codec.
+
+    It is shared by the synchronous and the asynchronous backends, the backend provides the collection, whose codec
+    options are used for decoding.
+    """
+
+    value_codec: Optional[ValueCodec] = None
+    compression_threshold: int = 4096  # In bytes
+    _codec_stats: CodecStatsRecorder = None
+
+    def _encode_value(self, value: Any) -> Any:
+        """
+        Encode the value with the codec of the backend before it is stored.
+        :param value: The value to store.
+        :return: The encoded value or the value itself, if there is no codec, the value is smaller than the
+            compression threshold, cannot be encoded as BSON or does not get smaller.
+        """
+        if self.value_codec is None:
+            return value
+
+        start = time.perf_counter_ns()
+        try:
+            data = bson.encode({VALUE: value})
+        except (InvalidDocument, TypeError, OverflowError):
+            data = None
+        if data is None or len(data) < self.compression_threshold:
+            self._codec_stats.record_raw(time.perf_counter_ns() - start)
+            return value
+
+        compressed_data = self.value_codec.compress(data)
+        encode_time_ns = time.perf_counter_ns() - start
+        if len(compressed_data) >= len(data) and self.value_codec.name != "identity":
+            self._codec_stats.record_raw(encode_time_ns)
+            return value
+        self._codec_stats.record_encoded(
+            len(data), len(compressed_data), encode_time_ns
+        )
+        return EncodedValue(self.value_codec.name, compressed_data)
+
+    def _decode_value(self, value: Any) -> Any:
+        """
+        Decode a stored value.
+        :param value: The stored value.
+        :return: The original value, values, which were not encoded, are returned unchanged.
+        """
+        if not isinstance(value, EncodedValue):
+            return value
+
+        start = time.perf_counter_ns()
+        if self.value_codec is not None and self.value_codec.name == value.codec_name:
+            codec = self.value_codec
+        else:
+            # The value was stored with another codec, e.g. by another process
+            codec = get_value_codec(value.codec_name)
+        decoded_value = bson.decode(
+            codec.decompress(value.data),
+            codec_options=self.collection.database.codec_options,
+        )[VALUE]
+        self._codec_stats.record_decoded(time.perf_counter_ns() - start)
+        return decoded_value
+
+    def get_codec_stats(self) -> CodecStats:
+        """Get the compression ratio and the time spent for encoding and decoding the values of the collection."""
+        return self._codec_stats.get_stats()
@@ -0,0 +1,61 @@
+"""Sources of change events, which are used to invalidate the cache."""
+from abc import abstractmethod, ABCMeta
+from typing import Any, Mapping, Optional
+
+from pymongo.database import Database
+
+
+class ChangeEventSource(metaclass=ABCMeta):
+    """
+    Base class for sources of change events of a database.
+
+    The opened stream has to provide the interface of a pymongo ChangeStream, which is used by the listener:
+    try_next() returns the next event or None if no event arrived in time, resume_token is the token after the
+    last returned event and close() closes the stream.
+    """
+
+    @abstractmethod
+    def open(
+        self,
+        resume_after: Optional[Mapping[str, Any]] = None,
+        start_after: Optional[Mapping[str, Any]] = None,
+    ) -> Any:
+        """
+        Open a stream of the change events of the database.
+        :param resume_after: The resume token after which the stream continues, None to start with new events.
+        :param start_after: Like resume_after, but the token may also be the one of an invalidate event.
+        :return: The opened stream.
+        """
+        pass
+
+
+class MongoChangeEventSource(ChangeEventSource):
+    """Reads the change events of a database from a MongoDB change stream."""
+
+    _database: Database = None
+    _max_await_time_ms: int = 1000
+
+    def __init__(self, database: Database, max_await_time_ms: int = 1000):
+        """
+        :param database: The database to watch.
+        :param max_await_time_ms: The maximum time to wait for new events in a single try_next() call.
+        """
+        self._database = database
+        self._max_await_time_ms = max_await_time_ms
+
+    def open(
+        self,
+        resume_after: Optional[Mapping[str, Any]] = None,
+        start_after: Optional[Mapping[str, Any]] = None,
+    ) -> Any:
+        """
+        Open a change stream of the database.
+        :param resume_after: The resume token after which the stream continues, None to start with new events.
+        :param start_after: Like resume_after, but the token may also be the one of an invalidate event.
+        :return: The opened change stream.
+        """
+        return self._database.watch(
+            resume_after=resume_after,
+            start_after=start_after,
+            max_await_time_ms=self._max_await_time_ms,
+        )
@@ -0,0 +1,243 @@
+"""Listener, which invalidates the cache based on the change events of a database."""
+import logging
+import time
+from threading import Event, Thread
+from typing import Any, Mapping, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+from cache_backend.base.CacheBackendBase import CacheBackendBase
+from cache_backend.change_stream.ChangeEventSource import ChangeEventSource
+from cache_backend.change_stream.ResumeTokenStore import ResumeTokenStore
+
+# Error codes of change streams, which cannot be resumed with the stored resume token
+_NON_RESUMABLE_ERROR_CODES = {
+    280,  # ChangeStreamFatalError
+    286,  # ChangeStreamHistoryLost
+}
+
+_logger = logging.getLogger(__name__)
+
+
+class ChangeStreamListener:
+    """
+    Listener, which invalidates the cache based on the change events of a database.
+
+    The listener reads the events of one database in a separate thread and routes them to the cache backends of the
+    affected collections. Inserts, updates, replacements and deletes invalidate the affected entries selectively,
+    every other event clears the cache of the collection. The resume token is saved periodically, so a restarted
+    listener continues after the last processed event. If the stream cannot be resumed, e.g. because the history
+    was lost or the stored token is invalid, the caches of the database are cleared and the token is dropped, since
+    events may have been missed. Unexpected errors are logged and also clear the caches.
+    """
+
+    _database_name: str = None
+    _event_source: ChangeEventSource = None
+    _resume_token_store: Optional[ResumeTokenStore] = None
+    _token_save_interval: float = 1  # In seconds
+    _retry_interval: float = 1  # In seconds
+    _thread: Optional[Thread] = None
+    _stop_event: Event = None
+
+    def __init__(
+        self,
+        database_name: str,
+        event_source: ChangeEventSource,
+        resume_token_store: Optional[ResumeTokenStore] = None,
+        token_save_interval: float = 1,
+        retry_interval: float = 1,
+    ):
+        """
+        :param database_name: The name of the watched database.
+        :param event_source: The source of the change events of the database.
+        :param resume_token_store: The store for the resume token, the token is not persisted if None.
+        :param token_save_interval: The minimum time between two saves of the resume token in seconds.
+        :param retry_interval: The time to wait before the stream is opened again after an error in seconds.
+        """
+        self._database_name = database_name
+        self._event_source = event_source
+        self._resume_token_store = resume_token_store
+        self._token_save_interval = token_save_interval
+        self._retry_interval = retry_interval
+        self._stop_event = Event()
+
+    def start(self) -> None:
+        """Start listening for change events in a separate thread."""
+        self._stop_event.clear()
+        self._thread = Thread(target=self._listen, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop listening for change events.
+        :param timeout: The maximum time to wait for the listener thread in seconds.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def handle_event(self, event: Mapping[str, Any]) -> None:
+        """
+        Invalidate the cache entries, which are affected by the change event.
+        :param event: The change event.
+        """
+        operation_type = event.get("operationType")
+        namespace = event.get("ns") or {}
+        collection_name = namespace.get("coll")
+
+        if collection_name is None:
+            # Events of the whole database, e.g. dropDatabase or invalidate
+            for cache_backend in CacheBackendBase.get_cache_backends_for_database(
+                self._database_name
+            ):
+                cache_backend.clear()
+            return
+
+        if operation_type == "rename":
+            target = event.get("to") or {}
+            CacheBackendBase.clear_cache_for_database_and_collection(
+                collection_name=target.get("coll"),
+                database_name=target.get("db", self._database_name),
+            )
+
+        cache_backend = CacheBackendBase.get_cache_backend_for_database_and_collection(
+            collection_name=collection_name,
+            database_name=namespace.get("db", self._database_name),
+        )
+        if cache_backend is None:
+            return
+
+        write_info = self._get_write_info(event)
+        if write_info is None:
+            cache_backend.clear()
+        else:
+            cache_backend.invalidate(write_info)
+
+    @staticmethod
+    def _get_write_info(event: Mapping[str, Any]) -> Optional[WriteInfo]:
+        """Get the write, which caused the change event, or None if the event is no write of a document."""
+        operation_type = event.get("operationType")
+        document_key = event.get("documentKey")
+
+        if operation_type == "insert" and event.get("fullDocument") is not None:
+            return WriteInfo(WriteOperation.INSERT, documents=[event["fullDocument"]])
+
+        if document_key is None:
+            return None
+
+        if operation_type == "delete":
+            return WriteInfo(WriteOperation.DELETE, filter=document_key)
+
+        if operation_type == "replace" and event.get("fullDocument") is not None:
+            return WriteInfo(
+                WriteOperation.REPLACE,
+                filter=document_key,
+                replacement=event["fullDocument"],
+            )
+
+        if operation_type == "update" and event.get("updateDescription") is not None:
+            description = event["updateDescription"]
+            changed_fields = dict(description.get("updatedFields") or {})
+            for truncated_array in description.get("truncatedArrays") or []:
+                changed_fields[truncated_array["field"]] = None
+            removed_fields = {
+                name: "" for name in description.get("removedFields") or []
+            }
+            return WriteInfo(
+                WriteOperation.UPDATE,
+                filter=document_key,
+                update={"$set": changed_fields, "$unset": removed_fields},
+            )
+
+        return None
+
+    def _listen(self) -> None:
+        """Read the change events until the listener is stopped."""
+        resume_token = None
+        if self._resume_token_store is not None:
+            resume_token = self._resume_token_store.load(self._database_name)
+        saved_token = resume_token
+        # Whether the resume token is the one of an invalidate event, after which a stream can only be started
+        invalidated = False
+        last_save = time.monotonic()
+
+        while not self._stop_event.is_set():
+            stream = None
+            try:
+                if invalidated:
+                    stream = self._event_source.open(start_after=resume_token)
+                else:
+                    stream = self._event_source.open(resume_after=resume_token)
+                while not self._stop_event.is_set():
+                    event = stream.try_next()
+                    if event is not None:
+                        self.handle_event(event)
+                        if event.get("operationType") == "invalidate":
+                            # The stream is closed after an invalidate event, start a new one right after it,
+                            # so writes between the event and the new stream are not missed
+                            resume_token = event["_id"]
+                            invalidated = True
+                            break
+                    if stream.resume_token is not None:
+                        resume_token = stream.resume_token
+                        invalidated = False
+
+                    if time.monotonic() - last_save >= self._token_save_interval:
+                        self._save_resume_token(resume_token, saved_token)
+                        saved_token = resume_token
+                        last_save = time.monotonic()
+            except OperationFailure as e:
+                # A stream, which cannot be opened with the token, cannot be resumed, e.g. the token is invalid
+                failed_resume = stream is None and resume_token is not None
+                if e.code not in _NON_RESUMABLE_ERROR_CODES and not failed_resume:
+                    self._stop_event.wait(self._retry_interval)
+                    continue
+                # Events since the resume token are lost, so no entry of the database can be trusted anymore
+                self._clear_caches()
+                resume_token = None
+                invalidated = False
+                self._save_resume_token(resume_token, saved_token)
+                saved_token = resume_token
+            except PyMongoError:
+                self._stop_event.wait(self._retry_interval)
+            except Exception:
+                _logger.exception(
+                    "Change stream listener of database %s failed", self._database_name
+                )
+                # The event, which failed, may have changed any cached result of the database
+                self._clear_caches()
+                if stream is not None and stream.resume_token is not None:
+                    resume_token = stream.resume_token
+                    invalidated = False
+                self._stop_event.wait(self._retry_interval)
+            finally:
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except PyMongoError:
+                        pass
+
+        self._save_resume_token(resume_token, saved_token)
+
+    def _clear_caches(self) -> None:
+        """Clear the caches of all collections of the database."""
+        for cache_backend in CacheBackendBase.get_cache_backends_for_database(
+            self._database_name
+        ):
+            cache_backend.clear()
+
+    def _save_resume_token(
+        self,
+        resume_token: Optional[Mapping[str, Any]],
+        saved_token: Optional[Mapping[str, Any]],
+    ) -> None:
+        """Save the resume token, if it changed since the last save."""
+        if self._resume_token_store is None or resume_token == saved_token:
+            return
+        try:
+            self._resume_token_store.save(self._database_name, resume_token)
+        except PyMongoError:
+            # The token is saved again with the next event, a lost save only causes events to be replayed
+            pass
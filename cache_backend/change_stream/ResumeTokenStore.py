@@ -0,0 +1,71 @@
+"""Stores for the resume tokens of change streams."""
+from abc import abstractmethod, ABCMeta
+from typing import Any, Mapping, Optional
+
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+from cache_backend.Constants import CACHE_DATABASE, RESUME_TOKENS, RESUME_TOKEN
+
+
+class ResumeTokenStore(metaclass=ABCMeta):
+    """Base class for stores of the resume tokens of change streams, one token is kept per database."""
+
+    @abstractmethod
+    def load(self, database_name: str) -> Optional[Mapping[str, Any]]:
+        """
+        Load the resume token of the database.
+        :param database_name: The name of the watched database.
+        :return: The stored resume token or None if there is none.
+        """
+        pass
+
+    @abstractmethod
+    def save(
+        self, database_name: str, resume_token: Optional[Mapping[str, Any]]
+    ) -> None:
+        """
+        Save the resume token of the database.
+        :param database_name: The name of the watched database.
+        :param resume_token: The resume token, None removes the stored token.
+        """
+        pass
+
+
+class MongoResumeTokenStore(ResumeTokenStore):
+    """Stores the resume tokens in the cache database of the MongoDB instance."""
+
+    _token_collection: Collection = None
+
+    def __init__(self, client: MongoClient):
+        # Use a plain Database and Collection, such that the token collection is never cached itself
+        self._token_collection = Collection(
+            Database(client, CACHE_DATABASE), RESUME_TOKENS
+        )
+
+    def load(self, database_name: str) -> Optional[Mapping[str, Any]]:
+        """
+        Load the resume token of the database.
+        :param database_name: The name of the watched database.
+        :return: The stored resume token or None if there is none.
+        """
+        item = self._token_collection.find_one({"_id": database_name})
+        if item is None:
+            return None
+        return item[RESUME_TOKEN]
+
+    def save(
+        self, database_name: str, resume_token: Optional[Mapping[str, Any]]
+    ) -> None:
+        """
+        Save the resume token of the database.
+        :param database_name: The name of the watched database.
+        :param resume_token: The resume token, None removes the stored token.
+        """
+        if resume_token is None:
+            self._token_collection.delete_one({"_id": database_name})
+            return
+        self._token_collection.replace_one(
+            {"_id": database_name}, {RESUME_TOKEN: resume_token}, upsert=True
+        )
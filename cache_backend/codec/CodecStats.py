@@ -0,0 +1,60 @@
+"""Statistics of the value codec of a cache backend."""
+from dataclasses import dataclass, replace
+from threading import Lock
+
+
+@dataclass
+class CodecStats:
+    """Statistics of the value codec of the cache backend of a collection."""
+
+    # Values, which were stored compressed, and values, which were stored as they are
+    encoded_values: int = 0
+    raw_values: int = 0
+    # Sizes of the BSON encodings and of the compressed data of the encoded values in bytes
+    input_bytes: int = 0
+    output_bytes: int = 0
+    decoded_values: int = 0
+    encode_time_ns: int = 0
+    decode_time_ns: int = 0
+
+    @property
+    def compression_ratio(self) -> float:
+        """The ratio of the uncompressed to the compressed size of the encoded values, 1 if nothing was encoded."""
+        if not self.output_bytes:
+            return 1.0
+        return self.input_bytes / self.output_bytes
+
+
+class CodecStatsRecorder:
+    """Records the statistics of a value codec, which is used by several threads."""
+
+    def __init__(self):
+        self._stats = CodecStats()
+        self._lock = Lock()
+
+    def record_raw(self, encode_time_ns: int) -> None:
+        """Record a value, which is stored as it is, e.g. because it is below the compression threshold."""
+        with self._lock:
+            self._stats.raw_values += 1
+            self._stats.encode_time_ns += encode_time_ns
+
+    def record_encoded(
+        self, input_bytes: int, output_bytes: int, encode_time_ns: int
+    ) -> None:
+        """Record a value, which is stored compressed."""
+        with self._lock:
+            self._stats.encoded_values += 1
+            self._stats.input_bytes += input_bytes
+            self._stats.output_bytes += output_bytes
+            self._stats.encode_time_ns += encode_time_ns
+
+    def record_decoded(self, decode_time_ns: int) -> None:
+        """Record the decoding of a compressed value."""
+        with self._lock:
+            self._stats.decoded_values += 1
+            self._stats.decode_time_ns += decode_time_ns
+
+    def get_stats(self) -> CodecStats:
+        """Get a snapshot of the statistics."""
+        with self._lock:
+            return replace(self._stats)
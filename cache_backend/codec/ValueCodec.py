@@ -0,0 +1,128 @@
+"""Codecs, which compress the encoded values of the cache."""
+import zlib
+from abc import abstractmethod, ABCMeta
+from dataclasses import dataclass
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+@dataclass(frozen=True)
+class EncodedValue:
+    """A cached value, which is stored as the compressed BSON encoding of the value."""
+
+    codec_name: str
+    data: bytes
+
+
+class ValueCodec(metaclass=ABCMeta):
+    """Base class for the codecs, which compress the BSON encoding of cached values."""
+
+    # The name of the codec, which is stored with every encoded value
+    name: str = None
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compress the data.
+        :param data: The BSON encoding of the value.
+        :return: The compressed data.
+        """
+        pass
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        """
+        Decompress the data.
+        :param data: The compressed data.
+        :return: The BSON encoding of the value.
+        """
+        pass
+
+
+class IdentityCodec(ValueCodec):
+    """Codec, which stores the BSON encoding of values without compression."""
+
+    name = "identity"
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCodec(ValueCodec):
+    """Codec, which compresses values with zlib from the standard library."""
+
+    name = "zlib"
+    _level: int = 6
+
+    def __init__(self, level: int = 6):
+        """
+        :param level: The compression level from 1 (fastest) to 9 (smallest).
+        """
+        self._level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self._level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCodec(ValueCodec):
+    """Codec, which compresses values with Zstandard, requires the zstandard package."""
+
+    name = "zstd"
+    _level: int = 3
+
+    def __init__(self, level: int = 3):
+        """
+        :param level: The compression level, higher levels compress better but slower.
+        """
+        if zstandard is None:
+            raise ImportError("The zstd codec requires the zstandard package")
+        self._level = level
+
+    def compress(self, data: bytes) -> bytes:
+        # Compressor objects are not thread-safe, so a new one is used for every value
+        return zstandard.ZstdCompressor(level=self._level).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zstandard.ZstdDecompressor().decompress(data)
+
+
+class LZ4Codec(ValueCodec):
+    """Codec, which compresses values with LZ4, requires the lz4 package."""
+
+    name = "lz4"
+
+    def __init__(self):
+        if lz4_frame is None:
+            raise ImportError("The lz4 codec requires the lz4 package")
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4_frame.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4_frame.decompress(data)
+
+
+def get_value_codec(name: str) -> ValueCodec:
+    """
+    Get a codec by its name, e.g. to decode values, which were stored by another process.
+    :param name: The name of the codec.
+    :return: The codec with the default settings, the settings only matter for compressing.
+    """
+    for codec_class in (IdentityCodec, ZlibCodec, ZstdCodec, LZ4Codec):
+        if codec_class.name == name:
+            return codec_class()
+    raise ValueError(f"Unknown value codec: {name}")
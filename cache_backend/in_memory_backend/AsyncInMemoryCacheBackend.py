@@ -0,0 +1,102 @@
+"""Asynchronous cache backend, which keeps the entries in memory."""
+from typing import Any, Dict, Optional
+
+from pymongo.asynchronous.collection import AsyncCollection
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo
+from cache_backend.base.AsyncCacheBackendBase import AsyncCacheBackendBase
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.CodecStats import CodecStats
+from cache_backend.codec.ValueCodec import ValueCodec
+from cache_backend.in_memory_backend.InMemoryCacheBackend import InMemoryCacheBackend
+
+
+class AsyncInMemoryCacheBackend(AsyncCacheBackendBase):
+    """
+    Asynchronous cache backend, which keeps the entries in an InMemoryCacheBackend.
+
+    The in-memory backend does no I/O and holds its lock only while it updates its dicts, so it is called directly
+    on the event loop instead of in a thread pool. Its cleanup thread removes expired entries and applies the
+    limits, like for the synchronous wrappers.
+    """
+
+    _backend: InMemoryCacheBackend = None
+
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        ttl: int = 0,
+        max_item_size: int = 1 * 10**6,
+        max_num_items: int = 1000,
+        cache_cleanup_cycle_time: Optional[float] = 1,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+    ):
+        self._backend = InMemoryCacheBackend(
+            collection,
+            ttl,
+            max_item_size,
+            max_num_items,
+            cache_cleanup_cycle_time=cache_cleanup_cycle_time,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+        )
+        super().__init__(
+            collection,
+            ttl,
+            max_item_size,
+            max_num_items,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+        )
+
+    def get_codec_stats(self) -> CodecStats:
+        """Get the statistics of the value codec of the in-memory backend."""
+        return self._backend.get_codec_stats()
+
+    async def get(self, key: QueryInfo) -> Any:
+        """Get the value from the cache."""
+        return self._backend.get(key)
+
+    async def set(
+        self, key: QueryInfo, value: Any, execution_time_millis: float, ttl: int = None
+    ) -> None:
+        """Set the value in the cache.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
+        :param value: The value to set.
+        :param key: The key to set.
+        :param execution_time_millis: The execution time of the query in milliseconds.
+        """
+        self._backend.set(key, value, execution_time_millis, ttl)
+
+    async def delete(self, key: QueryInfo) -> None:
+        """Delete the value from the cache."""
+        self._backend.delete(key)
+
+    async def clear(self) -> None:
+        """Clear the cache."""
+        self._backend.clear()
+
+    async def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from the cache.
+        :param write_info: The write to the collection.
+        """
+        self._backend.invalidate(write_info)
+
+    async def get_all(self) -> Dict[QueryInfo, Any]:
+        """Get all the values from the cache."""
+        return {
+            key: self._backend._decode_value(entry.value)
+            for key, entry in self._backend.get_all().items()
+        }
@@ -0,0 +1,172 @@
+"""Implements the index of the cached documents by their _id, which answers find_one lookups by _id."""
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from bson import ObjectId
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.RawDocuments import decode_document
+
+# Options of cached queries, which neither change the documents nor the _id lookups
+_OPTIONS_KEEPING_DOCUMENTS = {
+    "collation",
+    "hint",
+    "allow_disk_use",
+    "allowDiskUse",
+    "no_cursor_timeout",
+    "allow_partial_results",
+    "let",
+    "min",
+    "max",
+}
+# Aggregation stages, which only select documents without changing them
+_STAGES_KEEPING_DOCUMENTS = {"$match", "$sort", "$skip", "$limit", "$sample"}
+
+
+class EntityIndex:
+    """
+    Indexes the documents of cached find, find_one and aggregate results by their _id.
+
+    Only results, which contain whole documents, are indexed, i.e. finds without a projection and aggregations,
+    which only select documents. A find_one, which is an equality lookup on _id, is then answered by any cached
+    result containing the document. The index only references the documents of the cached results, it is kept in
+    sync with the cache by adding and removing the entries together with the cache.
+    """
+
+    def __init__(self):
+        self._documents: Dict[Hashable, Dict[QueryInfo, Mapping[str, Any]]] = {}
+        # The _ids of the documents of every indexed result, such that removing it does not read the result again
+        self._ids: Dict[QueryInfo, List[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @staticmethod
+    def get_documents(
+        key: QueryInfo, value: Any
+    ) -> List[Tuple[Hashable, Mapping[str, Any]]]:
+        """
+        Get the documents of a cached result, which can be indexed, together with their normalized _id.
+        :param key: The key of the cached result.
+        :param value: The cached result.
+        :return: The normalized _ids and the documents, empty if the result cannot be indexed.
+        """
+        if not _keeps_documents(key):
+            return []
+        if key.function_name == "FIND_ONE":
+            documents = [value]
+        elif isinstance(value, list):
+            documents = value
+        else:
+            return []
+
+        indexed_documents = []
+        for document in documents:
+            decoded_document = decode_document(document)
+            if isinstance(decoded_document, Mapping) and "_id" in decoded_document:
+                id_key = _get_id_key(decoded_document["_id"])
+                if id_key is not None:
+                    indexed_documents.append((id_key, document))
+        return indexed_documents
+
+    @staticmethod
+    def get_requested_id(query_info: QueryInfo) -> Optional[Hashable]:
+        """
+        Get the normalized _id, which a find_one looks up.
+        :param query_info: The query.
+        :return: The normalized _id or None if the query is no plain equality lookup on _id.
+        """
+        if query_info.function_name != "FIND_ONE":
+            return None
+        if query_info.projection is not None or query_info.skip:
+            return None
+        if query_info.options and set(query_info.options) - {"hint"}:
+            # A collation can match other strings than the _id itself
+            return None
+
+        query = query_info.query
+        if not isinstance(query, Mapping):
+            # pymongo treats a filter, which is no mapping, as the _id
+            return None if query is None else _get_id_key(query)
+        if len(query) != 1 or "_id" not in query:
+            return None
+        value = query["_id"]
+        if isinstance(value, Mapping):
+            if len(value) != 1 or "$eq" not in value:
+                return None
+            value = value["$eq"]
+        return _get_id_key(value)
+
+    def add(
+        self, key: QueryInfo, documents: List[Tuple[Hashable, Mapping[str, Any]]]
+    ) -> None:
+        """
+        Add the documents of a cached result to the index.
+        :param key: The key of the cached result.
+        :param documents: The documents as returned by get_documents.
+        """
+        if not documents:
+            return
+        for id_key, document in documents:
+            self._documents.setdefault(id_key, {})[key] = document
+        self._ids[key] = [id_key for id_key, _ in documents]
+
+    def remove(self, key: QueryInfo) -> None:
+        """
+        Remove the documents of a cached result from the index.
+        :param key: The key of the cached result.
+        """
+        for id_key in self._ids.pop(key, ()):
+            keys = self._documents.get(id_key)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del self._documents[id_key]
+
+    def get(self, id_key: Hashable) -> Dict[QueryInfo, Mapping[str, Any]]:
+        """
+        Get the cached documents with the _id.
+        :param id_key: The normalized _id.
+        :return: The keys of the cached results, which contain the document, mapped to the document.
+        """
+        return self._documents.get(id_key, {})
+
+    def clear(self) -> None:
+        """Remove all documents from the index."""
+        self._documents.clear()
+        self._ids.clear()
+
+
+def _keeps_documents(key: QueryInfo) -> bool:
+    """Check if the result of the query consists of whole, unchanged documents."""
+    if key.options and set(key.options) - _OPTIONS_KEEPING_DOCUMENTS:
+        # E.g. positional arguments or show_record_id
+        return False
+    if key.function_name in ("FIND", "FIND_ONE"):
+        return key.projection is None
+    if key.function_name == "AGGREGATE":
+        return isinstance(key.pipeline, (list, tuple)) and all(
+            isinstance(stage, Mapping)
+            and len(stage) == 1
+            and next(iter(stage)) in _STAGES_KEEPING_DOCUMENTS
+            for stage in key.pipeline
+        )
+    return False
+
+
+def _get_id_key(value: Any) -> Optional[Hashable]:
+    """Normalize the _id, such that python compares it like MongoDB, None if the type is not supported."""
+    if isinstance(value, bool):
+        return bool, value
+    if isinstance(value, (int, float)):
+        # Numbers of all types are equal in MongoDB, NaN is not equal to itself in python
+        return (float, value) if value == value else None
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return datetime, value
+    for exact_type in (str, bytes, ObjectId, uuid.UUID):
+        if isinstance(value, exact_type):
+            return exact_type, value
+    return None
@@ -0,0 +1,148 @@
+"""Implements the frequency buckets used for the LFU strategy of the in-memory cache."""
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+
+class _FrequencyNode:
+    """A node in the linked list of frequencies, holding all keys with the same access frequency."""
+
+    __slots__ = ("frequency", "keys", "prev", "next")
+
+    def __init__(self, frequency: int):
+        self.frequency = frequency
+        self.keys: "OrderedDict[Hashable, None]" = OrderedDict()
+        self.prev: Optional["_FrequencyNode"] = None
+        self.next: Optional["_FrequencyNode"] = None
+
+
+class FrequencyBuckets:
+    """
+    Keeps the keys of the cache ordered by their access frequency.
+
+    The buckets form a linked list sorted by the frequency, where each bucket holds its keys in insertion order.
+    Adding, incrementing, removing and finding the least frequent key are all O(1).
+    """
+
+    def __init__(self):
+        self._nodes: Dict[Hashable, _FrequencyNode] = {}
+        self._head: Optional[_FrequencyNode] = None
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._nodes
+
+    def add(self, key: Hashable, frequency: int = 0) -> None:
+        """
+        Add a key with the given frequency. Adding with a frequency other than the lowest one is O(number of buckets).
+        :param key: The key to add.
+        :param frequency: The initial frequency of the key.
+        """
+        if key in self._nodes:
+            self.remove(key)
+
+        prev = None
+        node = self._head
+        while node is not None and node.frequency < frequency:
+            prev, node = node, node.next
+
+        if node is None or node.frequency != frequency:
+            node = self._insert_node_after(prev, frequency)
+
+        node.keys[key] = None
+        self._nodes[key] = node
+
+    def increment(self, key: Hashable) -> None:
+        """
+        Increment the frequency of the key by one.
+        :param key: The key to increment.
+        """
+        node = self._nodes.get(key)
+        if node is None:
+            return
+
+        next_node = node.next
+        if next_node is None or next_node.frequency != node.frequency + 1:
+            next_node = self._insert_node_after(node, node.frequency + 1)
+
+        next_node.keys[key] = None
+        self._nodes[key] = next_node
+        del node.keys[key]
+        if not node.keys:
+            self._unlink_node(node)
+
+    def remove(self, key: Hashable) -> None:
+        """
+        Remove the key from the buckets.
+        :param key: The key to remove.
+        """
+        node = self._nodes.pop(key, None)
+        if node is None:
+            return
+
+        del node.keys[key]
+        if not node.keys:
+            self._unlink_node(node)
+
+    def clear(self) -> None:
+        """Remove all keys."""
+        self._nodes.clear()
+        self._head = None
+
+    def least_frequent(self, n: int) -> List[Hashable]:
+        """
+        Get the n least frequent keys, keys with the same frequency are returned in insertion order.
+        :param n: The number of keys to get.
+        :return: The n least frequent keys.
+        """
+        keys = []
+        node = self._head
+        while node is not None and len(keys) < n:
+            for key in node.keys:
+                keys.append(key)
+                if len(keys) == n:
+                    break
+            node = node.next
+        return keys
+
+    def halve(self) -> None:
+        """Halve the frequency of all keys, buckets which end up with the same frequency are merged."""
+        node = self._head
+        while node is not None:
+            node.frequency //= 2
+            prev = node.prev
+            if prev is not None and prev.frequency == node.frequency:
+                for key in node.keys:
+                    prev.keys[key] = None
+                    self._nodes[key] = prev
+                next_node = node.next
+                self._unlink_node(node)
+                node = next_node
+            else:
+                node = node.next
+
+    def _insert_node_after(
+        self, prev: Optional[_FrequencyNode], frequency: int
+    ) -> _FrequencyNode:
+        """Insert a new bucket after the given one, or at the head if prev is None."""
+        node = _FrequencyNode(frequency)
+        node.prev = prev
+        if prev is None:
+            node.next = self._head
+            self._head = node
+        else:
+            node.next = prev.next
+            prev.next = node
+        if node.next is not None:
+            node.next.prev = node
+        return node
+
+    def _unlink_node(self, node: _FrequencyNode) -> None:
+        """Remove an empty bucket from the linked list."""
+        if node.prev is None:
+            self._head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next is not None:
+            node.next.prev = node.prev
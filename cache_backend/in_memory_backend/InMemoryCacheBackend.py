@@ -1,26 +1,35 @@
 """Implementation of the MemoryCacheBackend class, which implements the CacheBackend interface."""
 import copy
-from datetime import datetime
+import time
+from collections import OrderedDict
 from threading import Lock
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional
 
 from pymongo.collection import Collection
 
 from cache_backend.CacheEntry import CacheEntry
+from cache_backend.CacheInvalidator import CacheInvalidator
 from cache_backend.QueryInfo import QueryInfo
+from cache_backend.ResultWindow import ResultWindow
+from cache_backend.WriteInfo import WriteInfo
 from cache_backend.base.CacheBackendBase import CacheBackendBase
 from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.ValueCodec import ValueCodec
+from cache_backend.in_memory_backend.EntityIndex import EntityIndex
 from cache_backend.in_memory_backend.InMemoryCacheCleanupHandler import (
     InMemoryCacheCleanupHandler,
 )
 
-_cache_lock: Lock = Lock()
-
 
 class InMemoryCacheBackend(CacheBackendBase):
     """Implementation of the MemoryCacheBackend class, which implements the CacheBackend interface."""
 
-    _cache: Dict[QueryInfo, CacheEntry] = {}
+    _cache: "OrderedDict[QueryInfo, CacheEntry]" = None
+    _cache_lock: Lock = None
+    # Maps the base key of find queries to the keys of the cached queries, which only differ in sort, skip and limit
+    _related_keys: Dict[QueryInfo, Dict[QueryInfo, None]] = None
+    _entity_index: EntityIndex = None
+    _eviction_listener: Optional[Callable[[List[CacheEntry]], None]] = None
 
     def __init__(
         self,
@@ -29,67 +38,253 @@ class InMemoryCacheBackend(CacheBackendBase):
         max_item_size: int = 1 * 10**6,
         max_num_items: int = 1000,
         cache_cleanup_cycle_time: float = 1,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        eviction_listener: Optional[Callable[[List[CacheEntry]], None]] = None,
     ):
+        """
+        :param eviction_listener: Called with the entries, which were evicted to make room, outside the lock.
+        """
         super().__init__(
             collection,
             ttl,
             max_item_size,
             max_num_items,
             cache_cleanup_cycle_time=cache_cleanup_cycle_time,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
         )
-        self._cache = {}
+        # Each backend has its own lock, so collections do not block each other
+        self._cache_lock = Lock()
+        # The cleanup handler shares the ordered dict, the least recently used entry is always at the front
+        self._cache = OrderedDict()
+        self._related_keys = {}
+        self._entity_index = EntityIndex()
+        self._eviction_listener = eviction_listener
         self._cache_cleanup_handler = InMemoryCacheCleanupHandler(
             collection,
             max_item_size,
             max_num_items,
-            cleanup_strategy=CleanupStrategy.LRU,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            cache=self._cache,
+            removal_listener=self._entry_removed,
         )
 
     def get(self, key: QueryInfo) -> Any:
-        """Get the value from the cache."""
-        with _cache_lock:
+        """
+        Get the value from the cache. If the key is not cached, a find_one by _id is answered by any cached result,
+        which contains the document, and a find query is computed from the cached result of a related query, which
+        only differs in sort, skip and limit, if possible.
+        """
+        with self._cache_lock:
             entry = self._cache.get(key, None)
+            if entry is None:
+                document = self._get_from_entity_index(key)
+                if document is not None:
+                    return document
+                related_entries = self._get_related_entries(key)
+            elif entry.expires_at is None or entry.expires_at > time.monotonic():
+                entry.access_count += 1
+                self._cache_cleanup_handler.entry_accessed(key)
+                value = entry.value
+                removed_entries = None
+            else:
+                self._cache_cleanup_handler.delete_entries([key])
+                removed_entries = self._cache_cleanup_handler.take_removed_entries()
+
+        if entry is None:
+            return self._get_from_related_entries(key, related_entries)
+        if removed_entries is not None:
+            # Free the expired entry outside the lock
+            del removed_entries
+            return None
+        # Decompress the value outside the lock
+        return self._decode_value(value)
+
+    def _get_from_entity_index(self, key: QueryInfo) -> Any:
+        """Get the document of a find_one by _id from the cached results, which contain it."""
+        id_key = EntityIndex.get_requested_id(key)
+        if id_key is None:
+            return None
+        now = time.monotonic()
+        for related_key, document in self._entity_index.get(id_key).items():
+            entry = self._cache[related_key]
+            if entry.expires_at is None or entry.expires_at > now:
+                entry.access_count += 1
+                self._cache_cleanup_handler.entry_accessed(related_key)
+                return document
+        return None
 
-        if entry is not None:
-            # Update the timestamp and access count when the entry is accessed
-            entry.timestamp = datetime.now()
-            entry.access_count += 1
-            return entry.value
+    def _get_related_entries(self, key: QueryInfo) -> List[CacheEntry]:
+        """Get the entries of the cached queries, which only differ from the key in sort, skip and limit."""
+        base_key = ResultWindow.get_base_key(key)
+        if base_key is None or base_key not in self._related_keys:
+            return []
+        now = time.monotonic()
+        entries = []
+        for related_key in self._related_keys[base_key]:
+            entry = self._cache[related_key]
+            if entry.expires_at is None or entry.expires_at > now:
+                entries.append(entry)
+        return entries
+
+    def _get_from_related_entries(
+        self, key: QueryInfo, related_entries: List[CacheEntry]
+    ) -> Any:
+        """Compute the result of the key from the first related entry, which covers it."""
+        # Sorting and slicing happens outside the lock, cached results are never modified in place
+        for entry in related_entries:
+            window = ResultWindow.get_window(
+                key, entry.query_info, self._decode_value(entry.value)
+            )
+            if window is None:
+                continue
+
+            with self._cache_lock:
+                if self._cache.get(entry.query_info) is entry:
+                    entry.access_count += 1
+                    self._cache_cleanup_handler.entry_accessed(entry.query_info)
+
+            if key.function_name == "FIND_ONE":
+                # An empty window cannot be distinguished from a miss, so it is not served
+                return window[0] if window else None
+            return window
         return None
 
+    def _entry_added(self, key: QueryInfo) -> None:
+        """Add the key to the index of related queries, the entity index is updated by the caller."""
+        if key.function_name != "FIND":
+            return
+        base_key = ResultWindow.get_base_key(key)
+        if base_key is not None:
+            self._related_keys.setdefault(base_key, {})[key] = None
+
+    def _entry_removed(self, key: QueryInfo, entry: CacheEntry) -> None:
+        """Remove the entry from the index of related queries and the entity index, called by the cleanup handler."""
+        self._entity_index.remove(key)
+        if key.function_name != "FIND":
+            return
+        base_key = ResultWindow.get_base_key(key)
+        related_keys = self._related_keys.get(base_key)
+        if related_keys is not None:
+            related_keys.pop(key, None)
+            if not related_keys:
+                del self._related_keys[base_key]
+
     def set(
         self, key: QueryInfo, value: Any, execution_time_millis: float, ttl: int = None
     ) -> None:
         """Set the value in the cache.
-        :param ttl: The time to live for the key.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
         :param value: The value to set.
         :param key: The key to set.
         :param execution_time_millis: The execution time of the query in milliseconds.
         """
-        with _cache_lock:
-            self._cache_cleanup_internal()
+        # Create the entry and collect its documents for the entity index outside the lock, since determining its
+        # size requires encoding the value
+        stored_value = self._encode_value(value)
+        # Compressed results are not indexed, the index would keep their decoded documents in memory
+        documents = (
+            EntityIndex.get_documents(key, value) if stored_value is value else []
+        )
+        cache_entry = CacheEntry(
+            key,
+            stored_value,
+            self.collection.name,
+            key.__hash__(),
+            execution_time_millis,
+            expires_at=self._get_expiry_time(ttl),
+        )
 
-            self._cache[key] = CacheEntry(
-                key, value, self.collection.name, key.__hash__(), execution_time_millis
-            )
+        with self._cache_lock:
+            self._cache_cleanup_handler.delete_entries([key])
+            if not self._cache_cleanup_handler.exceeds_max_item_size(cache_entry.size):
+                # Make room for the new entry before it is inserted
+                self._cache_cleanup_handler.cleanup_cache(
+                    num_new_entries=1, num_new_bytes=cache_entry.size
+                )
+
+                self._cache[key] = cache_entry
+                self._cache_cleanup_handler.entry_added(key)
+                self._entry_added(key)
+                self._entity_index.add(key, documents)
+            removed_entries = self._cache_cleanup_handler.take_removed_entries()
+            evicted_entries = self._cache_cleanup_handler.take_evicted_entries()
+
+        # Free the evicted entries outside the lock, releasing large results can take a while
+        del removed_entries
+        self._entries_evicted(evicted_entries)
 
     def delete(self, key: QueryInfo) -> None:
         """Delete the value from the cache."""
 
-        with _cache_lock:
-            if key in self._cache:
-                del self._cache[key]
+        with self._cache_lock:
+            self._cache_cleanup_handler.delete_entries([key])
+            removed_entries = self._cache_cleanup_handler.take_removed_entries()
+
+        del removed_entries
 
     def clear(self) -> None:
         """Clear the cache."""
-        with _cache_lock:
+        with self._cache_lock:
+            removed_entries = list(self._cache.values())
             self._cache.clear()
+            self._related_keys.clear()
+            self._entity_index.clear()
+            self._cache_cleanup_handler.cache_cleared()
+
+        del removed_entries
+
+    def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from the cache.
+        :param write_info: The write to the collection.
+        """
+        with self._cache_lock:
+            entries = [(key, entry.value) for key, entry in self._cache.items()]
+
+        # Match the entries outside the lock, such that readers are not blocked, values are only decoded if the
+        # decision depends on the cached result
+        affected_keys = [
+            key
+            for key, value in entries
+            if CacheInvalidator.is_affected_lazily(
+                key, lambda value=value: self._decode_value(value), write_info
+            )
+        ]
+
+        with self._cache_lock:
+            self._cache_cleanup_handler.delete_entries(affected_keys)
+            removed_entries = self._cache_cleanup_handler.take_removed_entries()
+
+        del removed_entries
 
     def get_all(self) -> Dict[QueryInfo, Any]:
         """Get all the values from the cache."""
-        with _cache_lock:
-            return copy.deepcopy(self._cache)
+        with self._cache_lock:
+            entries = OrderedDict(self._cache)
+
+        return copy.deepcopy(entries)
+
+    def _entries_evicted(self, evicted_entries: List[CacheEntry]) -> None:
+        """Pass the evicted entries to the eviction listener."""
+        if evicted_entries and self._eviction_listener is not None:
+            self._eviction_listener(evicted_entries)
 
     def _cache_cleanup_internal(self) -> None:
         """Clean up the cache."""
-        self._cache_cleanup_handler.cleanup_cache()
+        with self._cache_lock:
+            self._cache_cleanup_handler.cleanup_cache()
+            removed_entries = self._cache_cleanup_handler.take_removed_entries()
+            evicted_entries = self._cache_cleanup_handler.take_evicted_entries()
+
+        del removed_entries
+        self._entries_evicted(evicted_entries)
@@ -1,5 +1,9 @@
 """Implements the cleanup handler for the in-memory cache."""
-from typing import List, Dict
+import heapq
+import time
+from collections import OrderedDict
+from itertools import count, islice
+from typing import Callable, Dict, List, Optional, Tuple
 
 from pymongo.collection import Collection
 
@@ -9,12 +13,33 @@ from cache_backend.base.CacheCleanupHandlerBase import (
 )
 from cache_backend.CacheEntry import CacheEntry
 from cache_backend.QueryInfo import QueryInfo
+from cache_backend.in_memory_backend.FrequencyBuckets import FrequencyBuckets
 
 
 class InMemoryCacheCleanupHandler(CacheCleanupHandlerBase):
-    """Implements the cleanup handler for the in-memory cache."""
+    """
+    Implements the cleanup handler for the in-memory cache.
 
-    _cache: Dict[QueryInfo, CacheEntry] = {}
+    The handler works directly on the ordered dict of the backend. For the LRU strategy an accessed entry is moved
+    to the end of the dict, so the front of the dict always holds the least recently used entries. For the LFU
+    strategy the keys are additionally kept in frequency buckets. For the GDSF strategy the keys are kept in a
+    priority queue, where outdated priorities are skipped lazily. Entries with a TTL are kept in a min-heap
+    ordered by their expiry time, so expired entries are removed without scanning the cache. The backend has to
+    notify the handler about added, accessed and removed entries.
+    """
+
+    _cache: "OrderedDict[QueryInfo, CacheEntry]" = None
+    _frequency_buckets: Optional[FrequencyBuckets] = None
+    _priority_queue: Optional[List[Tuple[float, int, QueryInfo]]] = None
+    _priority_versions: Optional[Dict[QueryInfo, int]] = None
+    _inflation: float = 0
+    _version_counter = None
+    _total_bytes: int = 0
+    _expiry_queue: List[Tuple[float, int, QueryInfo]] = None
+    _expiry_counter = None
+    _removed_entries: List[CacheEntry] = None
+    _evicted_entries: List[CacheEntry] = None
+    _removal_listener: Optional[Callable[[QueryInfo, CacheEntry], None]] = None
 
     def __init__(
         self,
@@ -22,9 +47,136 @@ class InMemoryCacheCleanupHandler(CacheCleanupHandlerBase):
         max_item_size: int = 1 * 10**6,
         max_num_items: int = 1000,
         cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        cache: Optional["OrderedDict[QueryInfo, CacheEntry]"] = None,
+        removal_listener: Optional[Callable[[QueryInfo, CacheEntry], None]] = None,
     ):
-        super().__init__(collection, max_item_size, max_num_items, cleanup_strategy)
-        self._cache = {}
+        super().__init__(
+            collection,
+            max_item_size,
+            max_num_items,
+            cleanup_strategy,
+            lfu_aging_interval,
+            max_total_bytes,
+        )
+        self._cache = cache if cache is not None else OrderedDict()
+        self._total_bytes = sum(entry.size for entry in self._cache.values())
+        self._expiry_queue = []
+        self._expiry_counter = count()
+        self._removed_entries = []
+        self._evicted_entries = []
+        self._removal_listener = removal_listener
+        if cleanup_strategy == CleanupStrategy.LFU:
+            self._frequency_buckets = FrequencyBuckets()
+        elif cleanup_strategy == CleanupStrategy.GDSF:
+            self._priority_queue = []
+            self._priority_versions = {}
+            self._inflation = 0
+            self._version_counter = count()
+
+    def entry_added(self, key: QueryInfo) -> None:
+        """
+        Notify the handler that an entry was added to the cache.
+        :param key: The key of the added entry.
+        """
+        entry = self._cache[key]
+        self._total_bytes += entry.size
+        if entry.expires_at is not None:
+            self._push_expiry(key, entry)
+        if self._frequency_buckets is not None:
+            self._frequency_buckets.add(key, entry.access_count)
+        elif self._priority_queue is not None:
+            self._push_priority(key)
+
+    def entry_accessed(self, key: QueryInfo) -> None:
+        """
+        Notify the handler that an entry was accessed.
+        :param key: The key of the accessed entry.
+        """
+        if self._cleanup_strategy == CleanupStrategy.LRU:
+            self._cache.move_to_end(key)
+        elif self._frequency_buckets is not None:
+            self._frequency_buckets.increment(key)
+        elif self._priority_queue is not None:
+            self._push_priority(key)
+
+    def entry_removed(self, key: QueryInfo, entry: CacheEntry) -> None:
+        """
+        Notify the handler that an entry was removed from the cache.
+        :param key: The key of the removed entry.
+        :param entry: The removed entry.
+        """
+        self._total_bytes -= entry.size
+        if self._removal_listener is not None:
+            self._removal_listener(key, entry)
+        if self._frequency_buckets is not None:
+            self._frequency_buckets.remove(key)
+        elif self._priority_queue is not None:
+            self._priority_versions.pop(key, None)
+
+    def cache_cleared(self) -> None:
+        """Notify the handler that the cache was cleared."""
+        self._total_bytes = 0
+        self._expiry_queue.clear()
+        if self._frequency_buckets is not None:
+            self._frequency_buckets.clear()
+        elif self._priority_queue is not None:
+            self._priority_queue.clear()
+            self._priority_versions.clear()
+            self._inflation = 0
+
+    def _push_priority(self, key: QueryInfo) -> None:
+        """Push the current priority of the entry to the priority queue, replacing the previous one."""
+        entry = self._cache[key]
+        priority = self.calculate_priority(
+            self._inflation, entry.access_count, entry.execution_time, entry.size
+        )
+        version = next(self._version_counter)
+        self._priority_versions[key] = version
+        heapq.heappush(self._priority_queue, (priority, version, key))
+
+        # Rebuild the queue if it mostly consists of outdated priorities
+        if len(self._priority_queue) > 2 * len(self._priority_versions) + 64:
+            self._priority_queue = [
+                item
+                for item in self._priority_queue
+                if self._priority_versions.get(item[2]) == item[1]
+            ]
+            heapq.heapify(self._priority_queue)
+
+    def _push_expiry(self, key: QueryInfo, entry: CacheEntry) -> None:
+        """Push the expiry time of the entry to the expiry queue."""
+        heapq.heappush(
+            self._expiry_queue, (entry.expires_at, next(self._expiry_counter), key)
+        )
+
+        # Entries, which were removed before they expired, stay in the queue until their expiry time
+        if len(self._expiry_queue) > 2 * len(self._cache) + 64:
+            self._expiry_queue = [
+                item for item in self._expiry_queue if self._is_current_expiry(item)
+            ]
+            heapq.heapify(self._expiry_queue)
+
+    def _is_current_expiry(self, item: Tuple[float, int, QueryInfo]) -> bool:
+        """Check if the item of the expiry queue belongs to an entry, which is still in the cache."""
+        entry = self._cache.get(item[2])
+        return entry is not None and entry.expires_at == item[0]
+
+    def remove_expired_entries(self) -> None:
+        """Remove the entries, whose TTL has passed, from the cache."""
+        now = time.monotonic()
+        while self._expiry_queue and self._expiry_queue[0][0] <= now:
+            item = heapq.heappop(self._expiry_queue)
+            if self._is_current_expiry(item):
+                self.delete_entries([item[2]])
+
+    def halve_access_counts(self) -> None:
+        """Halve the access counts of all entries in the cache."""
+        for entry in self._cache.values():
+            entry.access_count //= 2
+        if self._frequency_buckets is not None:
+            self._frequency_buckets.halve()
 
     def get_elements_in_cache(self) -> int:
         """
@@ -33,16 +185,20 @@ class InMemoryCacheCleanupHandler(CacheCleanupHandlerBase):
         """
         return len(self._cache)
 
+    def get_bytes_in_cache(self) -> int:
+        """
+        Get the size of all entries in the cache.
+        :return: The current size of the cache in bytes
+        """
+        return self._total_bytes
+
     def get_n_oldest_entries(self, n: int) -> List[QueryInfo]:
         """
-        Get the n oldest entries in the cache.
+        Get the n least recently used entries in the cache.
         :param n: The number of entries to get.
-        :return: The n oldest entries in the cache.
+        :return: The n least recently used entries in the cache.
         """
-        entries = list(self._cache.values())
-        entries.sort(key=lambda x: x.timestamp)
-        entries = [entry.query_info for entry in entries[:n]]
-        return entries
+        return list(islice(self._cache.keys(), n))
 
     def get_n_least_frequent_entries(self, n: int) -> List[QueryInfo]:
         """
@@ -50,6 +206,9 @@ class InMemoryCacheCleanupHandler(CacheCleanupHandlerBase):
         :param n: The number of entries to get.
         :return: The n least frequent entries in the cache.
         """
+        if self._frequency_buckets is not None:
+            return self._frequency_buckets.least_frequent(n)
+
         entries = list(self._cache.values())
         entries.sort(key=lambda x: x.access_count)
         entries = [entry.query_info for entry in entries[:n]]
@@ -66,11 +225,63 @@ class InMemoryCacheCleanupHandler(CacheCleanupHandlerBase):
         entries = [entry.query_info for entry in entries[:n]]
         return entries
 
+    def get_n_least_valuable_entries(self, n: int) -> List[QueryInfo]:
+        """
+        Get the n entries with the lowest GreedyDual-Size-Frequency priority in the cache.
+        The entries are taken from the priority queue and the inflation is raised to the highest of their
+        priorities, so the returned entries have to be deleted afterward.
+        :param n: The number of entries to get.
+        :return: The n least valuable entries in the cache.
+        """
+        keys = []
+        while self._priority_queue and len(keys) < n:
+            priority, version, key = heapq.heappop(self._priority_queue)
+            if self._priority_versions.get(key) != version:
+                # The priority is outdated, since the entry was accessed or removed in the meantime
+                continue
+            self._inflation = max(self._inflation, priority)
+            keys.append(key)
+        return keys
+
+    def evict_entries(self, n: int) -> int:
+        """
+        Remove n entries from the cache according to the cleanup strategy and remember them as evicted.
+        :param n: The number of entries to remove.
+        :return: The number of removed entries.
+        """
+        num_removed_entries = len(self._removed_entries)
+        num_evicted_entries = super().evict_entries(n)
+        self._evicted_entries.extend(self._removed_entries[num_removed_entries:])
+        return num_evicted_entries
+
+    def take_evicted_entries(self) -> List[CacheEntry]:
+        """
+        Take the entries, which were evicted to make room since the last call. Unlike deleted, invalidated and
+        expired entries, their values are still valid.
+        :return: The evicted entries.
+        """
+        evicted_entries = self._evicted_entries
+        self._evicted_entries = []
+        return evicted_entries
+
+    def take_removed_entries(self) -> List[CacheEntry]:
+        """
+        Take the entries, which were removed from the cache since the last call.
+        The backend frees them after releasing its lock, so the deallocation of large values does not block
+        other threads.
+        :return: The removed entries.
+        """
+        removed_entries = self._removed_entries
+        self._removed_entries = []
+        return removed_entries
+
     def delete_entries(self, entries_to_remove: List[QueryInfo]) -> None:
         """
         Delete the given entries from the cache.
         :param entries_to_remove: The entries to remove.
         """
-        for entry in entries_to_remove:
-            if entry in self._cache:
-                del self._cache[entry]
+        for key in entries_to_remove:
+            entry = self._cache.pop(key, None)
+            if entry is not None:
+                self.entry_removed(key, entry)
+                self._removed_entries.append(entry)
@@ -0,0 +1,496 @@
+"""Asynchronous cache backend, which stores the entries in the MongoDB instance."""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne, WriteConcern
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import PyMongoError
+
+from cache_backend.CacheEntry import CacheEntry
+from cache_backend.CacheInvalidator import CacheInvalidator
+from cache_backend.Constants import (
+    CACHE_CHUNKS,
+    CACHE_DATABASE,
+    CACHE_ENTRIES,
+    CHUNK_NUMBER,
+    NUM_CHUNKS,
+    QUERY_INFO,
+    SIZE,
+    VALUE,
+)
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo
+from cache_backend.base.AsyncCacheBackendBase import AsyncCacheBackendBase
+from cache_backend.base.CacheCleanupHandlerBase import (
+    CacheCleanupHandlerBase,
+    CleanupStrategy,
+)
+from cache_backend.codec.ValueCodec import ValueCodec
+from cache_backend.mongodb_backend.MongoDBCacheBackend import MongoDBCacheBackend
+from cache_backend.mongodb_backend.MongoDBCacheDocuments import (
+    COUNTER_SYNC_INTERVAL,
+    MongoDBCacheDocuments,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+class AsyncMongoDBCacheBackend(AsyncCacheBackendBase):
+    """
+    Asynchronous cache backend, which stores the entries in the cache collection of the MongoDB instance.
+
+    The entries, chunks, filters and updates are built by MongoDBCacheDocuments like the ones of the
+    MongoDBCacheBackend, so synchronous and asynchronous processes share the entries. Hits are served by an indexed
+    find_one, their access statistics are written in batches as one unordered bulk write. The number and the size of
+    the entries of the collection are counted locally and synchronized every few seconds, the first entries
+    according to the cleanup strategy are evicted, when a set exceeds max_num_items or max_total_bytes. Expired
+    entries are removed by the TTL index. The indexes are created on the first use. If a cache_cleanup_cycle_time
+    is set, a task on the event loop of the first hit writes the buffered statistics of idle periods.
+    """
+
+    _cache_collection: AsyncCollection = None
+    _chunk_collection: AsyncCollection = None
+    # The database qualified name of the collection, by which its entries are tagged
+    _collection_name: str = None
+    _indexes_created: bool = False
+    _access_batch_size: int = 100
+    _access_flush_interval: float = 1  # In seconds
+    _cache_cleanup_cycle_time: Optional[float] = None  # In seconds
+    _cleanup_task: Optional[asyncio.Task] = None
+    _chunk_threshold: int = 8 * 1024 * 1024
+    # Maps the _id of an accessed entry to the number of hits and the time of the last hit
+    _pending_accesses: Dict[Any, Tuple[int, datetime]] = None
+    _pending_since: float = 0
+    _num_entries: int = 0
+    _num_bytes: int = 0
+    _last_counter_sync: Optional[float] = None
+    _last_aging: float = 0
+    _inflation: float = 0
+
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        ttl: int = 0,
+        max_item_size: int = 1 * 10**6,
+        max_num_items: int = 1000,
+        cache_cleanup_cycle_time: Optional[float] = 1,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        access_batch_size: int = 100,
+        access_flush_interval: float = 1,
+        chunk_threshold: int = 8 * 1024 * 1024,
+    ):
+        """
+        :param access_batch_size: The number of accessed entries, whose statistics are written together.
+        :param access_flush_interval: The maximum time in seconds, for which the statistics of a hit are buffered.
+        :param chunk_threshold: The size in bytes, above which values are stored in chunks.
+        """
+        super().__init__(
+            collection,
+            ttl,
+            max_item_size,
+            max_num_items,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+        )
+        self._collection_name = collection.full_name
+        self._access_batch_size = access_batch_size
+        self._access_flush_interval = access_flush_interval
+        self._chunk_threshold = chunk_threshold
+        self._cache_cleanup_cycle_time = cache_cleanup_cycle_time
+        self._pending_accesses = {}
+        self._last_aging = time.monotonic()
+        self._cache_collection = self._get_cache_collection()
+        self._chunk_collection = self._get_chunk_collection()
+
+    def _get_cache_collection(self) -> AsyncCollection:
+        """Get the cache collection, which is shared with the MongoDBCacheBackend."""
+        db = AsyncDatabase(self.collection.database.client, CACHE_DATABASE)
+        return AsyncCollection(db, CACHE_ENTRIES)
+
+    def _get_chunk_collection(self) -> AsyncCollection:
+        """Get the collection of the chunks of large values."""
+        db = AsyncDatabase(self.collection.database.client, CACHE_DATABASE)
+        return AsyncCollection(db, CACHE_CHUNKS)
+
+    async def _create_indexes(self) -> None:
+        """Create the indexes of the collections, if it was not done before, a failed attempt is repeated."""
+        if self._indexes_created:
+            return
+        await self._cache_collection.create_indexes(
+            MongoDBCacheBackend.get_index_models()
+        )
+        await self._chunk_collection.create_indexes(
+            MongoDBCacheBackend.get_chunk_index_models()
+        )
+        self._indexes_created = True
+
+    async def get(self, key: QueryInfo) -> Any:
+        """Get the value from the cache."""
+        await self._create_indexes()
+        entry = await self._cache_collection.find_one(
+            {
+                **MongoDBCacheDocuments.get_key_filter(self._collection_name, key),
+                **MongoDBCacheDocuments.get_unexpired_filter(),
+            },
+            projection=MongoDBCacheDocuments.get_value_projection(),
+        )
+        if entry is None:
+            return None
+
+        value = await self._get_entry_value(entry)
+        if value is not None:
+            await self._record_access(entry["_id"])
+        return value
+
+    async def _get_entry_value(self, entry: Dict[str, Any]) -> Any:
+        """Get the value of a stored entry, chunked values are read from their chunks."""
+        data = entry.get(VALUE)
+        if entry.get(NUM_CHUNKS):
+            data = await self._read_chunks(entry["_id"], entry[NUM_CHUNKS])
+            if data is None:
+                return None
+        return MongoDBCacheDocuments.decode_entry_value(
+            entry, data, self._decode_value, self.collection.database.codec_options
+        )
+
+    async def _read_entry_value(self, item: Dict[str, Any]) -> Any:
+        """Read the value of an entry, which was found without its value, None if it was removed meanwhile."""
+        entry = await self._cache_collection.find_one(
+            MongoDBCacheDocuments.get_entry_id_filter(item),
+            projection=MongoDBCacheDocuments.get_value_projection(),
+        )
+        if entry is None:
+            return None
+        return await self._get_entry_value(entry)
+
+    async def _read_chunks(
+        self, entry_id: ObjectId, num_chunks: int
+    ) -> Optional[bytes]:
+        """
+        Read the chunks of a value in order.
+        :return: The data of the value or None if not all chunks exist.
+        """
+        chunks = await (
+            self._chunk_collection.find(
+                MongoDBCacheDocuments.get_chunk_filter(entry_id),
+                projection=MongoDBCacheDocuments.get_chunk_projection(),
+            )
+            .sort(CHUNK_NUMBER, ASCENDING)
+            .to_list()
+        )
+        return MongoDBCacheDocuments.join_chunks(chunks, num_chunks)
+
+    async def _record_access(self, entry_id: Any) -> None:
+        """Record a hit of an entry, the statistics are written once the batch is full or the flush interval passed."""
+        self._start_cleanup_task()
+        now = time.monotonic()
+        if not self._pending_accesses:
+            self._pending_since = now
+        count = self._pending_accesses.get(entry_id, (0, None))[0]
+        self._pending_accesses[entry_id] = (count + 1, datetime.now())
+        if (
+            len(self._pending_accesses) >= self._access_batch_size
+            or now - self._pending_since >= self._access_flush_interval
+        ):
+            await self.flush_access_stats()
+
+    def _start_cleanup_task(self) -> None:
+        """Start the task, which flushes the statistics periodically, on the running event loop if it does not run."""
+        if self._cache_cleanup_cycle_time is None:
+            return
+        loop = asyncio.get_running_loop()
+        # A task of a closed event loop never finishes, so it is replaced as well
+        if (
+            self._cleanup_task is None
+            or self._cleanup_task.done()
+            or self._cleanup_task.get_loop() is not loop
+        ):
+            self._cleanup_task = loop.create_task(self._cache_cleanup())
+
+    async def _cache_cleanup(self) -> None:
+        """Write the buffered statistics every cache_cleanup_cycle_time seconds, also if the cache is idle."""
+        while True:
+            await asyncio.sleep(self._cache_cleanup_cycle_time)
+            try:
+                await self.flush_access_stats()
+            except PyMongoError:
+                _logger.exception("Writing the access statistics of the cache failed")
+
+    async def flush_access_stats(self) -> None:
+        """Write the statistics of the recorded hits as one unordered bulk write."""
+        pending_accesses = self._pending_accesses
+        self._pending_accesses = {}
+        if not pending_accesses:
+            return
+
+        # Entries, which were removed in the meantime, are not matched
+        await self._cache_collection.with_options(
+            write_concern=WriteConcern(w=0)
+        ).bulk_write(
+            [
+                UpdateOne(
+                    {"_id": entry_id},
+                    MongoDBCacheDocuments.get_access_update(
+                        self.cleanup_strategy, self._inflation, count, timestamp
+                    ),
+                )
+                for entry_id, (count, timestamp) in pending_accesses.items()
+            ],
+            ordered=False,
+        )
+
+    def _exceeds_max_item_size(self, size: int) -> bool:
+        """Check if an entry of the given size is too large to be stored in the cache."""
+        if self.max_item_size and size > self.max_item_size:
+            return True
+        return self.max_total_bytes is not None and size > self.max_total_bytes
+
+    async def set(
+        self, key: QueryInfo, value: Any, execution_time_millis: float, ttl: int = None
+    ) -> None:
+        """Set the value in the cache.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
+        :param value: The value to set.
+        :param key: The key to set.
+        :param execution_time_millis: The execution time of the query in milliseconds.
+        """
+        stored_value = self._encode_value(value)
+        cache_entry = CacheEntry(
+            key,
+            stored_value,
+            self._collection_name,
+            key.__hash__(),
+            execution_time_millis,
+        )
+        if self._exceeds_max_item_size(cache_entry.size):
+            return
+        await self._create_indexes()
+        await self._make_room(cache_entry.size)
+
+        entry_dict = MongoDBCacheDocuments.create_entry(
+            cache_entry,
+            stored_value,
+            CacheCleanupHandlerBase.calculate_priority(
+                self._inflation,
+                cache_entry.access_count,
+                execution_time_millis,
+                cache_entry.size,
+            ),
+            self.ttl if ttl is None else ttl,
+        )
+        if cache_entry.size > self._chunk_threshold:
+            chunks = MongoDBCacheDocuments.create_chunks(
+                entry_dict, stored_value, self._collection_name
+            )
+            if chunks is None:
+                return
+            # The chunks are written acknowledged before the entry, such that a found entry has all chunks
+            await self._chunk_collection.insert_many(chunks)
+            # Chunks without an entry are never removed if they do not expire, so the insert has to be acknowledged
+            try:
+                await self._cache_collection.insert_one(
+                    entry_dict, bypass_document_validation=True
+                )
+            except PyMongoError:
+                await self._delete_chunks([entry_dict["_id"]])
+                return
+        else:
+            # Do not wait for writing to be acknowledged, such that we don't slow down the query
+            await self._cache_collection.with_options(
+                write_concern=WriteConcern(w=0)
+            ).insert_one(entry_dict, bypass_document_validation=True)
+        self._num_entries += 1
+        self._num_bytes += cache_entry.size
+
+    async def _sync_counters_if_due(self) -> None:
+        """Recount the entries of the collection, if the counters were not synchronized recently."""
+        now = time.monotonic()
+        if (
+            self._last_counter_sync is not None
+            and now - self._last_counter_sync < COUNTER_SYNC_INTERVAL
+        ):
+            return
+        self._last_counter_sync = now
+
+        # Both queries use the indexes on the collection name
+        self._num_entries = await self._cache_collection.count_documents(
+            MongoDBCacheDocuments.get_collection_filter(self._collection_name)
+        )
+        cursor = await self._cache_collection.aggregate(
+            MongoDBCacheDocuments.get_size_pipeline(self._collection_name)
+        )
+        result = await cursor.to_list()
+        self._num_bytes = result[0]["total"] if result else 0
+
+    async def _age_access_counts_if_due(self) -> None:
+        """Halve the access counts of all entries, if the LFU aging interval has passed."""
+        if (
+            self.cleanup_strategy != CleanupStrategy.LFU
+            or self.lfu_aging_interval is None
+        ):
+            return
+
+        now = time.monotonic()
+        if now - self._last_aging >= self.lfu_aging_interval:
+            self._last_aging = now
+            await self.flush_access_stats()
+            await self._cache_collection.update_many(
+                MongoDBCacheDocuments.get_collection_filter(self._collection_name),
+                MongoDBCacheDocuments.get_halve_access_counts_update(),
+            )
+
+    async def _make_room(self, size: int) -> None:
+        """
+        Evict the first entries according to the cleanup strategy, until a new entry fits into the limits.
+        :param size: The size of the new entry in bytes.
+        """
+        await self._sync_counters_if_due()
+        await self._age_access_counts_if_due()
+
+        num_excess_entries = self._num_entries + 1 - self.max_num_items
+        if num_excess_entries > 0:
+            await self._evict_entries(num_excess_entries)
+
+        if self.max_total_bytes is None:
+            return
+        # Evict entry by entry according to the strategy until the byte budget is met
+        while self._num_bytes + size > self.max_total_bytes:
+            if not await self._evict_entries(1):
+                break
+
+    async def _evict_entries(self, n: int) -> int:
+        """
+        Remove the first n entries of the collection according to the cleanup strategy.
+        :return: The number of removed entries.
+        """
+        await self.flush_access_stats()
+        entries = await (
+            self._cache_collection.find(
+                MongoDBCacheDocuments.get_collection_filter(self._collection_name),
+                projection=MongoDBCacheDocuments.get_eviction_projection(),
+            )
+            .sort(
+                MongoDBCacheDocuments.get_eviction_field(self.cleanup_strategy),
+                ASCENDING,
+            )
+            .limit(n)
+            .to_list()
+        )
+        self._inflation = MongoDBCacheDocuments.get_inflation(
+            self._inflation, self.cleanup_strategy, entries
+        )
+        await self._delete_entries(entries)
+        return len(entries)
+
+    async def _delete_entries(
+        self,
+        entries: List[Dict[str, Any]],
+        write_concern: Optional[WriteConcern] = None,
+    ) -> None:
+        """
+        Delete entries and the chunks of their values and uncount the removed ones.
+        :param entries: The entries with their _id, size and the number of chunks of their value.
+        :param write_concern: The write concern of the deletes, the one of the cache collection if None.
+        """
+        if not entries:
+            return
+        cache_collection = self._cache_collection
+        if write_concern is not None:
+            cache_collection = cache_collection.with_options(
+                write_concern=write_concern
+            )
+        result = await cache_collection.delete_many(
+            MongoDBCacheDocuments.get_entry_ids_filter(entries)
+        )
+        await self._delete_chunks(
+            MongoDBCacheDocuments.get_chunked_entry_ids(entries), write_concern
+        )
+        if result.acknowledged and result.deleted_count != len(entries):
+            # Another process removed some of the entries first, it is not known which ones were removed here
+            self._num_entries = max(self._num_entries - result.deleted_count, 0)
+            self._last_counter_sync = None
+            return
+        self._num_entries = max(self._num_entries - len(entries), 0)
+        self._num_bytes = max(
+            self._num_bytes - sum(entry.get(SIZE, 0) for entry in entries), 0
+        )
+
+    async def _delete_chunks(
+        self, entry_ids: List[Any], write_concern: Optional[WriteConcern] = None
+    ) -> None:
+        """Delete the chunks of the values of entries."""
+        if not entry_ids:
+            return
+        chunk_collection = self._chunk_collection
+        if write_concern is not None:
+            chunk_collection = chunk_collection.with_options(
+                write_concern=write_concern
+            )
+        await chunk_collection.delete_many(
+            MongoDBCacheDocuments.get_chunks_of_entries_filter(entry_ids)
+        )
+
+    async def delete(self, key: QueryInfo) -> None:
+        """Delete the value and its chunks from the cache."""
+        entry = await self._cache_collection.find_one_and_delete(
+            MongoDBCacheDocuments.get_key_filter(self._collection_name, key),
+            projection={SIZE: 1, NUM_CHUNKS: 1},
+        )
+        if entry is None:
+            return
+        self._num_entries = max(self._num_entries - 1, 0)
+        self._num_bytes = max(self._num_bytes - entry.get(SIZE, 0), 0)
+        if entry.get(NUM_CHUNKS):
+            await self._delete_chunks([entry["_id"]], WriteConcern(w=0))
+
+    async def clear(self) -> None:
+        """Clear the cache."""
+        for collection in (self._cache_collection, self._chunk_collection):
+            await collection.with_options(write_concern=WriteConcern(w=0)).delete_many(
+                MongoDBCacheDocuments.get_collection_filter(self._collection_name)
+            )
+        self._num_entries = 0
+        self._num_bytes = 0
+
+    async def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from the cache.
+        :param write_info: The write to the collection.
+        """
+        affected_items = []
+        async for item in self._cache_collection.find(
+            MongoDBCacheDocuments.get_collection_filter(self._collection_name),
+            MongoDBCacheDocuments.get_invalidation_projection(),
+        ):
+            query_info = QueryInfo(**item[QUERY_INFO])
+            # Values are only read and decoded, if the decision depends on the cached result
+            value = None
+            if CacheInvalidator.needs_value(query_info, write_info):
+                value = await self._read_entry_value(item)
+            if CacheInvalidator.is_affected(query_info, value, write_info):
+                affected_items.append(item)
+        await self._delete_entries(affected_items, WriteConcern(w=0))
+
+    async def get_all(self) -> Dict[QueryInfo, Any]:
+        """Get all the values from the cache."""
+        entries = {}
+        async for item in self._cache_collection.find(
+            {
+                **MongoDBCacheDocuments.get_collection_filter(self._collection_name),
+                **MongoDBCacheDocuments.get_unexpired_filter(),
+            }
+        ):
+            entries[QueryInfo(**item[QUERY_INFO])] = await self._get_entry_value(item)
+        return entries
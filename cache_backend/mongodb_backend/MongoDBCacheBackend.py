@@ -1,36 +1,61 @@
 """ Class for caching MongoDB queries in a SQLite database. """
 import atexit
-from datetime import datetime
 from threading import Lock
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
+from bson import ObjectId
 from pymongo import IndexModel, ASCENDING, WriteConcern
 from pymongo.collection import Collection
 from pymongo.database import Database
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import _ServerMode
 
 from cache_backend.CacheEntry import CacheEntry
+from cache_backend.CacheInvalidator import CacheInvalidator
 from cache_backend.Constants import (
     VALUE,
     QUERY_INFO,
     CACHE_DATABASE,
     CACHE_ENTRIES,
+    CACHE_CHUNKS,
+    CHUNK_NUMBER,
     COLLECTION_NAME,
+    ENTRY_ID,
+    EXPIRES_AT,
     HASH_VAL,
-    TIMESTAMP,
-    ACCESS_COUNT,
+    NUM_CHUNKS,
+    SIZE,
 )
 from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo
 from cache_backend.base.CacheBackendBase import CacheBackendBase
 from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.ValueCodec import ValueCodec
 from cache_backend.mongodb_backend.MongoDBCacheCleanupHandler import (
     MongoDBCacheCleanupHandler,
 )
+from cache_backend.mongodb_backend.MongoDBCacheDocuments import MongoDBCacheDocuments
 
 
 class MongoDBCacheBackend(CacheBackendBase):
-    """Class for caching MongoDB queries in a Mongodb database."""
+    """
+    Class for caching MongoDB queries in a Mongodb database.
+
+    Hits are served by an indexed find_one, which can be sent to secondaries, the access statistics are written in
+    batches by the cleanup handler. Entries with a TTL store the point in time at which they expire, a TTL index lets
+    the server remove them, so expiry does not depend on the cleanup of any process. Values, which are larger than
+    the chunk threshold, are split into chunks in a separate collection, such that results beyond the 16 MB limit of
+    a document can be cached.
+    """
 
     _cache_collection = None
+    # The database qualified name of the collection, by which its entries are tagged
+    _collection_name: str = None
+    # The cache collection with the read preference of lookups
+    _read_collection = None
+    _chunk_collection = None
+    _read_chunk_collection = None
+    _chunk_threshold: int = 8 * 1024 * 1024
 
     def __init__(
         self,
@@ -39,92 +64,293 @@ class MongoDBCacheBackend(CacheBackendBase):
         max_item_size: int = 1 * 10**6,
         max_num_items: int = 1000,
         cache_cleanup_cycle_time: float = 1,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        read_preference: Optional[_ServerMode] = None,
+        access_batch_size: int = 100,
+        access_flush_interval: float = 1,
+        chunk_threshold: int = 8 * 1024 * 1024,
+        clear_on_exit: bool = True,
     ):
-        # TODO: Add TTL index
-        # TODO: Keep track of the number of items in the cache so no database query is needed if the cache is full
+        """
+        :param read_preference: The read preference of lookups, e.g. ReadPreference.SECONDARY_PREFERRED, the
+            read preference of the client if None. Entries are not seen before they are replicated.
+        :param access_batch_size: The number of accessed entries, whose statistics are written together.
+        :param access_flush_interval: The maximum time in seconds, for which the statistics of a hit are buffered.
+        :param chunk_threshold: The size in bytes, above which values are stored in chunks. The max_item_size has to
+            be raised to cache values larger than 1 MB.
+        :param clear_on_exit: Clear the entries of the collection when the program exits, False keeps them for
+            the next start, e.g. if the backend is the persistent tier of a TieredCacheBackend.
+        """
+        self._chunk_threshold = chunk_threshold
         super().__init__(
             collection,
             ttl,
             max_item_size,
             max_num_items,
             cache_cleanup_cycle_time=cache_cleanup_cycle_time,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
         )
+        self._collection_name = collection.full_name
         self._cache_collection = self._get_cache_collection()
+        self._read_collection = (
+            self._cache_collection
+            if read_preference is None
+            else self._cache_collection.with_options(read_preference=read_preference)
+        )
+        self._chunk_collection = self._get_chunk_collection()
+        self._read_chunk_collection = (
+            self._chunk_collection
+            if read_preference is None
+            else self._chunk_collection.with_options(read_preference=read_preference)
+        )
 
         self._cache_cleanup_handler = MongoDBCacheCleanupHandler(
             self.collection,
             max_item_size,
             max_num_items,
-            cleanup_strategy=CleanupStrategy.LRU,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
             cache_collection=self._cache_collection,
+            access_batch_size=access_batch_size,
+            access_flush_interval=access_flush_interval,
+            collection_name=self._collection_name,
+            chunk_collection=self._chunk_collection,
         )
 
-        # Register the clear function to be called when the program exits
-        atexit.register(self.clear)
+        if clear_on_exit:
+            # Register the clear function to be called when the program exits
+            atexit.register(self.clear)
 
     def _get_cache_collection(self) -> Collection:
         """Create the table if it doesn't exist."""
         client = self.collection.database.client
         db = Database(client, CACHE_DATABASE)
         coll = Collection(db, CACHE_ENTRIES)
-        coll.create_indexes(
-            [
-                IndexModel(
-                    [(COLLECTION_NAME, ASCENDING), (HASH_VAL, ASCENDING)],
-                    name="CacheIndex",
-                )
-            ]
-        )
+        coll.create_indexes(self.get_index_models())
+        return coll
+
+    @staticmethod
+    def get_index_models() -> List[IndexModel]:
+        """Get the indexes of the cache collection."""
+        return [
+            IndexModel(
+                [(COLLECTION_NAME, ASCENDING), (HASH_VAL, ASCENDING)],
+                name="CacheIndex",
+            ),
+            # The server removes entries once their expiry time has passed
+            IndexModel(
+                [(EXPIRES_AT, ASCENDING)],
+                name="CacheTTLIndex",
+                expireAfterSeconds=0,
+            ),
+        ] + MongoDBCacheCleanupHandler.get_index_models()
+
+    def _get_chunk_collection(self) -> Collection:
+        """Create the collection of the chunks of large values if it doesn't exist."""
+        client = self.collection.database.client
+        db = Database(client, CACHE_DATABASE)
+        coll = Collection(db, CACHE_CHUNKS)
+        coll.create_indexes(self.get_chunk_index_models())
         return coll
 
+    @staticmethod
+    def get_chunk_index_models() -> List[IndexModel]:
+        """Get the indexes of the collection of the chunks."""
+        return [
+            IndexModel(
+                [(ENTRY_ID, ASCENDING), (CHUNK_NUMBER, ASCENDING)],
+                name="ChunkIndex",
+            ),
+            IndexModel([(COLLECTION_NAME, ASCENDING)], name="ChunkCollectionIndex"),
+            # The chunks expire together with their entry
+            IndexModel(
+                [(EXPIRES_AT, ASCENDING)],
+                name="ChunkTTLIndex",
+                expireAfterSeconds=0,
+            ),
+        ]
+
     def get(self, key: QueryInfo) -> Any:
         """Get the value from the cache."""
-        entry = self._cache_collection.find_one_and_update(
-            {COLLECTION_NAME: self.collection.name, HASH_VAL: key.__hash__()},
-            {"$inc": {ACCESS_COUNT: 1}, "$set": {TIMESTAMP: datetime.now()}},
-            return_document=True,
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: QueryInfo) -> Tuple[Any, Optional[float]]:
+        """Get the value from the cache and its remaining time to live, which is derived from its expiry time."""
+        entry = self._read_collection.find_one(
+            {
+                **MongoDBCacheDocuments.get_key_filter(self._collection_name, key),
+                **MongoDBCacheDocuments.get_unexpired_filter(),
+            },
+            projection=MongoDBCacheDocuments.get_value_projection(),
         )
+        if entry is None:
+            return None, None
 
-        if entry is not None:
-            return entry[VALUE]
-        return None
+        value = self._get_entry_value(entry)
+        if value is None:
+            return None, None
+        self._cache_cleanup_handler.record_access(entry["_id"])
+        return value, MongoDBCacheDocuments.get_remaining_ttl(entry)
+
+    def _get_entry_value(self, entry: Dict[str, Any]) -> Any:
+        """
+        Get the value of a stored entry, values encoded by a codec are stored as binary data with its name.
+        Chunked values are read from their chunks, None is returned if chunks are missing.
+        """
+        data = entry.get(VALUE)
+        if entry.get(NUM_CHUNKS):
+            data = self._read_chunks(entry["_id"], entry[NUM_CHUNKS])
+            if data is None:
+                return None
+        return MongoDBCacheDocuments.decode_entry_value(
+            entry, data, self._decode_value, self.collection.database.codec_options
+        )
+
+    def _read_entry_value(self, item: Dict[str, Any]) -> Any:
+        """Read the value of an entry, which was found without its value, None if it was removed meanwhile."""
+        entry = self._cache_collection.find_one(
+            MongoDBCacheDocuments.get_entry_id_filter(item),
+            projection=MongoDBCacheDocuments.get_value_projection(),
+        )
+        if entry is None:
+            return None
+        return self._get_entry_value(entry)
+
+    def _read_chunks(self, entry_id: ObjectId, num_chunks: int) -> Optional[bytes]:
+        """
+        Read the chunks of a value in order, the cursor fetches them in batches.
+        :return: The data of the value or None if not all chunks exist.
+        """
+        return MongoDBCacheDocuments.join_chunks(
+            self._read_chunk_collection.find(
+                MongoDBCacheDocuments.get_chunk_filter(entry_id),
+                projection=MongoDBCacheDocuments.get_chunk_projection(),
+            ).sort(CHUNK_NUMBER, ASCENDING),
+            num_chunks,
+        )
 
     def set(
         self, key: QueryInfo, value: Any, execution_time_millis, ttl: int = None
     ) -> None:
         """Set the value in the cache.
-        :param ttl: The time to live for the key.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
         :param value: The value to set.
         :param key: The key to set.
         :param execution_time_millis: The execution time of the query in milliseconds.
         """
 
-        self._cache_cleanup_internal()
-
+        stored_value = self._encode_value(value)
         cache_entry = CacheEntry(
-            key, value, self.collection.name, key.__hash__(), execution_time_millis
+            key,
+            stored_value,
+            self._collection_name,
+            key.__hash__(),
+            execution_time_millis,
+        )
+        if self._cache_cleanup_handler.exceeds_max_item_size(cache_entry.size):
+            return
+
+        self._cache_cleanup_handler.cleanup_cache(
+            num_new_entries=1, num_new_bytes=cache_entry.size
         )
 
-        # Do not wait for writing to be acknowledged, such that we don't slow down the query
-        self._cache_collection.with_options(write_concern=WriteConcern(w=0)).insert_one(
-            cache_entry.to_dict(), bypass_document_validation=True
+        entry_dict = MongoDBCacheDocuments.create_entry(
+            cache_entry,
+            stored_value,
+            self._cache_cleanup_handler.get_initial_priority(cache_entry),
+            self.ttl if ttl is None else ttl,
         )
+        if cache_entry.size > self._chunk_threshold:
+            chunks = MongoDBCacheDocuments.create_chunks(
+                entry_dict, stored_value, self._collection_name
+            )
+            if chunks is None:
+                return
+            # The chunks are written acknowledged before the entry, such that a found entry has all chunks
+            self._chunk_collection.insert_many(chunks)
+            # Chunks without an entry are never removed if they do not expire, so the insert has to be acknowledged
+            try:
+                self._cache_collection.insert_one(
+                    entry_dict, bypass_document_validation=True
+                )
+            except PyMongoError:
+                self._cache_cleanup_handler.delete_chunks([entry_dict["_id"]])
+                return
+        else:
+            # Do not wait for writing to be acknowledged, such that we don't slow down the query
+            self._cache_collection.with_options(
+                write_concern=WriteConcern(w=0)
+            ).insert_one(entry_dict, bypass_document_validation=True)
+        self._cache_cleanup_handler.entry_added(cache_entry.size)
 
     def delete(self, key: QueryInfo) -> None:
-        """Delete the value from the cache."""
-        self._cache_collection.with_options(write_concern=WriteConcern(w=0)).delete_one(
-            {COLLECTION_NAME: self.collection.name, HASH_VAL: key.__hash__()}
+        """Delete the value and its chunks from the cache."""
+        entry = self._cache_collection.find_one_and_delete(
+            MongoDBCacheDocuments.get_key_filter(self._collection_name, key),
+            projection={SIZE: 1, NUM_CHUNKS: 1},
         )
+        if entry is None:
+            return
+        if entry.get(NUM_CHUNKS):
+            self._cache_cleanup_handler.delete_chunks([entry["_id"]], WriteConcern(w=0))
+        self._cache_cleanup_handler.entries_removed(1, entry.get(SIZE, 0))
 
     def clear(self) -> None:
         """Clear the cache."""
-        self._cache_collection.with_options(
-            write_concern=WriteConcern(w=0)
-        ).delete_many({COLLECTION_NAME: self.collection.name})
+        for collection in (self._cache_collection, self._chunk_collection):
+            collection.with_options(write_concern=WriteConcern(w=0)).delete_many(
+                MongoDBCacheDocuments.get_collection_filter(self._collection_name)
+            )
+        self._cache_cleanup_handler.cache_cleared()
+
+    def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from the cache.
+        :param write_info: The write to the collection.
+        """
+        # Values are only read and decoded, if the decision depends on the cached result
+        affected_items = [
+            item
+            for item in self._cache_collection.find(
+                MongoDBCacheDocuments.get_collection_filter(self._collection_name),
+                MongoDBCacheDocuments.get_invalidation_projection(),
+            )
+            if CacheInvalidator.is_affected_lazily(
+                QueryInfo(**item[QUERY_INFO]),
+                lambda item=item: self._read_entry_value(item),
+                write_info,
+            )
+        ]
+        if affected_items:
+            self._cache_cleanup_handler.delete_entries_by_id(
+                affected_items, WriteConcern(w=0)
+            )
+            self._cache_cleanup_handler.entries_removed(
+                len(affected_items), sum(item.get(SIZE, 0) for item in affected_items)
+            )
 
     def get_all(self) -> Dict[QueryInfo, Any]:
         """Get all the values from the cache."""
-        return {item[QUERY_INFO]: item[VALUE] for item in self.collection.find({})}
+        return {
+            QueryInfo(**item[QUERY_INFO]): self._get_entry_value(item)
+            for item in self._cache_collection.find(
+                {
+                    **MongoDBCacheDocuments.get_collection_filter(
+                        self._collection_name
+                    ),
+                    **MongoDBCacheDocuments.get_unexpired_filter(),
+                }
+            )
+        }
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.clear()
@@ -1,6 +1,10 @@
 """ The cache cleanup handler for MongoDB. """
-from typing import List
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from pymongo import ASCENDING, IndexModel, UpdateOne, WriteConcern
 from pymongo.collection import Collection
 
 from cache_backend.base.CacheCleanupHandlerBase import (
@@ -14,14 +18,47 @@ from cache_backend.Constants import (
     ACCESS_COUNT,
     TIMESTAMP,
     QUERY_INFO,
+    PRIORITY,
+    SIZE,
+    NUM_CHUNKS,
 )
+from cache_backend.CacheEntry import CacheEntry
 from cache_backend.QueryInfo import QueryInfo
+from cache_backend.mongodb_backend.MongoDBCacheDocuments import (
+    COUNTER_SYNC_INTERVAL,
+    MongoDBCacheDocuments,
+)
 
 
 class MongoDBCacheCleanupHandler(CacheCleanupHandlerBase):
-    """The cache cleanup handler for MongoDB."""
+    """
+    The cache cleanup handler for MongoDB.
+
+    Hits are served by plain reads, their access statistics are collected in memory and written as one unordered
+    bulk write, when the batch is full, the oldest hit is older than the flush interval or before the entries are
+    ranked for an eviction.
+
+    The number and the size of the entries of the collection are counted locally, such that checking the limits
+    does not query the shared cache collection. Entries, which are added or removed by other processes, are
+    counted when the counters are synchronized with an indexed count every few seconds.
+    """
 
     _cache_collection: Collection = None
+    # The collection, which holds the chunks of the values, which are too large for a document
+    _chunk_collection: Collection = None
+    # The database qualified name of the collection, by which its entries are tagged
+    _collection_name: str = None
+    _num_entries: int = 0
+    _num_bytes: int = 0
+    _last_counter_sync: Optional[float] = None
+    _counter_lock: Lock = None
+    _inflation: float = 0
+    _access_batch_size: int = 100
+    _access_flush_interval: float = 1  # In seconds
+    # Maps the _id of an accessed entry to the number of hits and the time of the last hit
+    _pending_accesses: Dict[Any, Tuple[int, datetime]] = None
+    _pending_since: float = 0
+    _pending_lock: Lock = None
 
     def __init__(
         self,
@@ -29,17 +66,286 @@ class MongoDBCacheCleanupHandler(CacheCleanupHandlerBase):
         max_item_size: int = 1 * 10**6,
         max_num_items: int = 1000,
         cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
         cache_collection: Collection = None,
+        access_batch_size: int = 100,
+        access_flush_interval: float = 1,
+        collection_name: str = None,
+        chunk_collection: Collection = None,
     ):
-        super().__init__(collection, max_item_size, max_num_items, cleanup_strategy)
+        """
+        :param cache_collection: The collection, which holds the entries of all cached collections.
+        :param chunk_collection: The collection, which holds the chunks of large values.
+        :param collection_name: The name of the collection in the cache collection, the full name if None.
+        :param access_batch_size: The number of accessed entries, whose statistics are written together.
+        :param access_flush_interval: The maximum time in seconds, for which the statistics of a hit are buffered.
+        """
+        super().__init__(
+            collection,
+            max_item_size,
+            max_num_items,
+            cleanup_strategy,
+            lfu_aging_interval,
+            max_total_bytes,
+        )
         self._cache_collection = cache_collection
+        self._chunk_collection = chunk_collection
+        self._collection_name = (
+            collection_name if collection_name is not None else collection.full_name
+        )
+        self._counter_lock = Lock()
+        self._access_batch_size = access_batch_size
+        self._access_flush_interval = access_flush_interval
+        self._pending_accesses = {}
+        self._pending_lock = Lock()
+
+    @staticmethod
+    def get_index_models() -> List[IndexModel]:
+        """Get the indexes of the cache collection, which scope the eviction queries to a collection."""
+        return [
+            IndexModel(
+                [(COLLECTION_NAME, ASCENDING), (field, ASCENDING)],
+                name=f"CacheIndex_{field}",
+            )
+            for field in MongoDBCacheDocuments.get_eviction_fields()
+        ]
+
+    def get_initial_priority(self, entry: CacheEntry) -> float:
+        """
+        Get the GreedyDual-Size-Frequency priority of a new entry.
+        :param entry: The new entry.
+        :return: The priority of the entry.
+        """
+        return self.calculate_priority(
+            self._inflation, entry.access_count, entry.execution_time, entry.size
+        )
+
+    def get_access_update(
+        self, count: int = 1, timestamp: Optional[datetime] = None
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Get the update, which is applied to an entry when it is accessed.
+        :param count: The number of accesses.
+        :param timestamp: The time of the last access, now if None.
+        :return: The update document or pipeline.
+        """
+        if timestamp is None:
+            timestamp = datetime.now()
+        return MongoDBCacheDocuments.get_access_update(
+            self._cleanup_strategy, self._inflation, count, timestamp
+        )
+
+    def record_access(self, entry_id: Any) -> None:
+        """
+        Record a hit of an entry, the statistics are written once the batch is full or the flush interval passed.
+        :param entry_id: The _id of the entry.
+        """
+        now = time.monotonic()
+        with self._pending_lock:
+            if not self._pending_accesses:
+                self._pending_since = now
+            count = self._pending_accesses.get(entry_id, (0, None))[0]
+            self._pending_accesses[entry_id] = (count + 1, datetime.now())
+            if (
+                len(self._pending_accesses) < self._access_batch_size
+                and now - self._pending_since < self._access_flush_interval
+            ):
+                return
+        self.flush_access_stats()
+
+    def flush_access_stats(self) -> None:
+        """Write the statistics of the recorded hits as one unordered bulk write."""
+        with self._pending_lock:
+            pending_accesses = self._pending_accesses
+            self._pending_accesses = {}
+        if not pending_accesses:
+            return
+
+        # Entries, which were removed in the meantime, are not matched
+        self._cache_collection.with_options(write_concern=WriteConcern(w=0)).bulk_write(
+            [
+                UpdateOne({"_id": entry_id}, self.get_access_update(count, timestamp))
+                for entry_id, (count, timestamp) in pending_accesses.items()
+            ],
+            ordered=False,
+        )
+
+    def cleanup_cache(self, num_new_entries: int = 0, num_new_bytes: int = 0):
+        """
+        Remove entries from the cache until it is within its limits, the pending hits are written first.
+        :param num_new_entries: The number of entries which are about to be added to the cache.
+        :param num_new_bytes: The number of bytes which are about to be added to the cache.
+        """
+        self.flush_access_stats()
+        super().cleanup_cache(num_new_entries, num_new_bytes)
+
+    def halve_access_counts(self) -> None:
+        """Halve the access counts of all entries of the collection in the cache."""
+        self.flush_access_stats()
+        self._cache_collection.update_many(
+            MongoDBCacheDocuments.get_collection_filter(self._collection_name),
+            MongoDBCacheDocuments.get_halve_access_counts_update(),
+        )
+
+    def _sync_counters_if_due(self) -> None:
+        """Recount the entries of the collection, if the counters were not synchronized recently."""
+        now = time.monotonic()
+        with self._counter_lock:
+            if (
+                self._last_counter_sync is not None
+                and now - self._last_counter_sync < COUNTER_SYNC_INTERVAL
+            ):
+                return
+            self._last_counter_sync = now
+
+        # Both queries use the indexes on the collection name
+        num_entries = self._cache_collection.count_documents(
+            MongoDBCacheDocuments.get_collection_filter(self._collection_name)
+        )
+        result = list(
+            self._cache_collection.aggregate(
+                MongoDBCacheDocuments.get_size_pipeline(self._collection_name)
+            )
+        )
+        with self._counter_lock:
+            self._num_entries = num_entries
+            self._num_bytes = result[0]["total"] if result else 0
+
+    def entry_added(self, size: int) -> None:
+        """
+        Count an entry, which was added to the cache.
+        :param size: The size of the entry in bytes.
+        """
+        with self._counter_lock:
+            self._num_entries += 1
+            self._num_bytes += size
+
+    def entries_removed(self, num_entries: int, num_bytes: int) -> None:
+        """
+        Uncount entries, which were removed from the cache.
+        :param num_entries: The number of removed entries.
+        :param num_bytes: The size of the removed entries in bytes.
+        """
+        with self._counter_lock:
+            self._num_entries = max(self._num_entries - num_entries, 0)
+            self._num_bytes = max(self._num_bytes - num_bytes, 0)
+
+    def cache_cleared(self) -> None:
+        """Reset the counters after the entries of the collection were removed."""
+        with self._counter_lock:
+            self._num_entries = 0
+            self._num_bytes = 0
 
     def get_elements_in_cache(self) -> int:
         """
-        Get the elements in the cache.
+        Get the number of entries of the collection in the cache, which is counted locally.
         :return: The current number of elements in the cache
         """
-        return self._cache_collection.count_documents({})
+        self._sync_counters_if_due()
+        return self._num_entries
+
+    def get_bytes_in_cache(self) -> int:
+        """
+        Get the size of all entries of the collection in the cache, which is counted locally.
+        :return: The current size of the cache in bytes
+        """
+        self._sync_counters_if_due()
+        return self._num_bytes
+
+    def evict_entries(self, n: int) -> int:
+        """
+        Remove the first n entries of the collection according to the cleanup strategy. The entries are selected by
+        an indexed range query on the collection name and the eviction field and deleted by their _id.
+        :param n: The number of entries to remove.
+        :return: The number of removed entries.
+        """
+        entries = list(
+            self._cache_collection.find(
+                MongoDBCacheDocuments.get_collection_filter(self._collection_name),
+                projection=MongoDBCacheDocuments.get_eviction_projection(),
+            )
+            .sort(MongoDBCacheDocuments.get_eviction_field(self._cleanup_strategy), 1)
+            .limit(n)
+        )
+        if not entries:
+            return 0
+        self._inflation = MongoDBCacheDocuments.get_inflation(
+            self._inflation, self._cleanup_strategy, entries
+        )
+
+        self._delete_and_uncount_entries(entries)
+        return len(entries)
+
+    def _delete_and_uncount_entries(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Delete entries by their _id and uncount the removed ones. If another process removed some of them first,
+        it is not known which ones were removed here, so the counters are synchronized on their next use.
+        :param entries: The entries with their _id, size and the number of chunks of their value.
+        """
+        deleted_count = self.delete_entries_by_id(entries)
+        if deleted_count == len(entries):
+            self.entries_removed(
+                deleted_count, sum(entry.get(SIZE, 0) for entry in entries)
+            )
+            return
+        with self._counter_lock:
+            self._num_entries = max(self._num_entries - deleted_count, 0)
+            self._last_counter_sync = None
+
+    def delete_entries_by_id(
+        self,
+        entries: List[Dict[str, Any]],
+        write_concern: Optional[WriteConcern] = None,
+    ) -> int:
+        """
+        Delete entries and the chunks of their values.
+        :param entries: The entries with their _id and the number of chunks of their value.
+        :param write_concern: The write concern of the deletes, the one of the cache collection if None.
+        :return: The number of deleted entries, 0 if the deletes are not acknowledged.
+        """
+        cache_collection = self._cache_collection
+        if write_concern is not None:
+            cache_collection = cache_collection.with_options(
+                write_concern=write_concern
+            )
+        result = cache_collection.delete_many(
+            MongoDBCacheDocuments.get_entry_ids_filter(entries)
+        )
+        self.delete_chunks(
+            MongoDBCacheDocuments.get_chunked_entry_ids(entries), write_concern
+        )
+        return result.deleted_count if result.acknowledged else 0
+
+    def delete_chunks(
+        self, entry_ids: List[Any], write_concern: Optional[WriteConcern] = None
+    ) -> None:
+        """
+        Delete the chunks of the values of entries.
+        :param entry_ids: The _ids of the entries, whose values are chunked.
+        :param write_concern: The write concern of the delete, the one of the chunk collection if None.
+        """
+        if not entry_ids or self._chunk_collection is None:
+            return
+        chunk_collection = self._chunk_collection
+        if write_concern is not None:
+            chunk_collection = chunk_collection.with_options(
+                write_concern=write_concern
+            )
+        chunk_collection.delete_many(
+            MongoDBCacheDocuments.get_chunks_of_entries_filter(entry_ids)
+        )
+
+    def _get_first_entries(self, field: str, n: int) -> List[Dict[str, Any]]:
+        """Get the first n entries of the collection ordered by the field."""
+        return list(
+            self._cache_collection.find(
+                {COLLECTION_NAME: self._collection_name},
+                projection={"_id": 0, QUERY_INFO: 1, PRIORITY: 1},
+            )
+            .sort(field, 1)
+            .limit(n)
+        )
 
     def get_n_oldest_entries(self, n: int) -> List[QueryInfo]:
         """
@@ -47,13 +353,8 @@ class MongoDBCacheCleanupHandler(CacheCleanupHandlerBase):
         :param n: The number of entries to get.
         :return: The n oldest entries in the cache.
         """
-        entries = list(
-            self._cache_collection.find({}, projection={"_id": 0})
-            .sort(TIMESTAMP, 1)
-            .limit(n)
-        )
-        entries = [QueryInfo(**entry[QUERY_INFO]) for entry in entries]
-        return entries
+        entries = self._get_first_entries(TIMESTAMP, n)
+        return [QueryInfo(**entry[QUERY_INFO]) for entry in entries]
 
     def get_n_least_frequent_entries(self, n: int) -> List[QueryInfo]:
         """
@@ -61,13 +362,8 @@ class MongoDBCacheCleanupHandler(CacheCleanupHandlerBase):
         :param n: The number of entries to get.
         :return: The n least frequent entries in the cache.
         """
-        entries = list(
-            self._cache_collection.find({}, projection={"_id": 0})
-            .sort(ACCESS_COUNT, 1)
-            .limit(n)
-        )
-        entries = [QueryInfo(**entry[QUERY_INFO]) for entry in entries]
-        return entries
+        entries = self._get_first_entries(ACCESS_COUNT, n)
+        return [QueryInfo(**entry[QUERY_INFO]) for entry in entries]
 
     def get_n_fastest_entries(self, n: int) -> List[QueryInfo]:
         """
@@ -75,22 +371,36 @@ class MongoDBCacheCleanupHandler(CacheCleanupHandlerBase):
         :param n: The number of entries to get.
         :return: The n fastest entries in the cache.
         """
-        entries = list(
-            self._cache_collection.find({}, projection={"_id": 0})
-            .sort(EXECUTION_TIME, 1)
-            .limit(n)
-        )
-        entries = [QueryInfo(**entry[QUERY_INFO]) for entry in entries]
-        return entries
+        entries = self._get_first_entries(EXECUTION_TIME, n)
+        return [QueryInfo(**entry[QUERY_INFO]) for entry in entries]
+
+    def get_n_least_valuable_entries(self, n: int) -> List[QueryInfo]:
+        """
+        Get the n entries with the lowest GreedyDual-Size-Frequency priority in the cache.
+        The inflation is raised to the highest priority of the returned entries.
+        :param n: The number of entries to get.
+        :return: The n least valuable entries in the cache.
+        """
+        entries = self._get_first_entries(PRIORITY, n)
+        for entry in entries:
+            self._inflation = max(self._inflation, entry.get(PRIORITY, 0))
+        return [QueryInfo(**entry[QUERY_INFO]) for entry in entries]
 
     def delete_entries(self, entries_to_remove: List[QueryInfo]) -> None:
         """
-        Delete the given entries from the cache.
+        Delete the given entries and the chunks of their values from the cache.
         :param entries_to_remove: The entries to remove.
         """
-        self._cache_collection.delete_many(
-            {
-                HASH_VAL: {"$in": [entry.__hash__() for entry in entries_to_remove]},
-                COLLECTION_NAME: self._collection.name,
-            }
+        entries = list(
+            self._cache_collection.find(
+                {
+                    HASH_VAL: {
+                        "$in": [entry.__hash__() for entry in entries_to_remove]
+                    },
+                    COLLECTION_NAME: self._collection_name,
+                },
+                projection={SIZE: 1, NUM_CHUNKS: 1},
+            )
         )
+        if entries:
+            self._delete_and_uncount_entries(entries)
@@ -0,0 +1,325 @@
+"""The documents and queries of the MongoDB cache, which are shared by the synchronous and asynchronous backend."""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.errors import InvalidDocument
+
+from cache_backend.CacheEntry import CacheEntry
+from cache_backend.Constants import (
+    ACCESS_COUNT,
+    CHUNK_DATA,
+    CHUNK_NUMBER,
+    COLLECTION_NAME,
+    ENTRY_ID,
+    EXECUTION_TIME,
+    EXPIRES_AT,
+    HASH_VAL,
+    NUM_CHUNKS,
+    PRIORITY,
+    QUERY_INFO,
+    QUERY_KEY,
+    SIZE,
+    TIMESTAMP,
+    VALUE,
+    VALUE_CODEC,
+)
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.ValueCodec import EncodedValue
+
+# The size of the chunks of large values in bytes
+_CHUNK_SIZE = 4 * 1024 * 1024
+# The time in seconds, after which the counters are synchronized with the cache collection
+COUNTER_SYNC_INTERVAL = 10
+# The field, by which the entries are evicted for each cleanup strategy
+_EVICTION_FIELDS = {
+    CleanupStrategy.LRU: TIMESTAMP,
+    CleanupStrategy.LFU: ACCESS_COUNT,
+    CleanupStrategy.EXECUTION_TIME: EXECUTION_TIME,
+    CleanupStrategy.GDSF: PRIORITY,
+}
+
+
+class MongoDBCacheDocuments:
+    """
+    The documents and queries of the MongoDB cache, which are shared by the synchronous and asynchronous backend.
+
+    The backends only differ in how they send the queries to the server, so both build their entries, chunks,
+    filters and updates here, and processes using either of them share the entries of the cache collection.
+    """
+
+    @staticmethod
+    def get_collection_filter(collection_name: str) -> Dict[str, Any]:
+        """Get the filter for all entries of the collection."""
+        return {COLLECTION_NAME: collection_name}
+
+    @staticmethod
+    def get_key_filter(collection_name: str, key: QueryInfo) -> Dict[str, Any]:
+        """
+        Get the filter for the entry of the key. The hash is covered by the index, the full key
+        is compared as well, such that a hash collision never returns the result of another query.
+        """
+        return {
+            COLLECTION_NAME: collection_name,
+            HASH_VAL: key.__hash__(),
+            QUERY_KEY: key.key,
+        }
+
+    @staticmethod
+    def get_unexpired_filter() -> Dict[str, Any]:
+        """
+        Get the filter for the entries, which have not expired. The server removes expired entries only about once a
+        minute, so they have to be skipped until then. Entries without an expiry time never expire.
+        """
+        return {EXPIRES_AT: {"$not": {"$lte": datetime.now(timezone.utc)}}}
+
+    @staticmethod
+    def get_value_projection() -> Dict[str, Any]:
+        """Get the projection of the fields, which are needed to read the value of an entry and its expiry time."""
+        return {VALUE: 1, VALUE_CODEC: 1, NUM_CHUNKS: 1, EXPIRES_AT: 1}
+
+    @staticmethod
+    def get_remaining_ttl(entry: Dict[str, Any]) -> Optional[float]:
+        """
+        Get the remaining time to live of an entry in seconds, 0 if it does not expire and None if it has expired.
+        """
+        expires_at = entry.get(EXPIRES_AT)
+        if expires_at is None:
+            return 0
+        # Dates are decoded without time zone, unless the client is time zone aware
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        remaining_ttl = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        return remaining_ttl if remaining_ttl > 0 else None
+
+    @staticmethod
+    def get_invalidation_projection() -> Dict[str, Any]:
+        """
+        Get the projection of the entries, which are checked for an invalidation. The values are read by their _id,
+        if the decision depends on the cached result.
+        """
+        return {QUERY_INFO: 1, SIZE: 1, NUM_CHUNKS: 1}
+
+    @staticmethod
+    def get_entry_id_filter(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the filter for an entry by its _id."""
+        return {"_id": entry["_id"]}
+
+    @staticmethod
+    def create_entry(
+        cache_entry: CacheEntry,
+        stored_value: Any,
+        priority: float,
+        ttl: Optional[int],
+    ) -> Dict[str, Any]:
+        """
+        Create the document of a new entry.
+        :param cache_entry: The entry, whose value is the stored value.
+        :param stored_value: The value, values encoded by a codec are stored as binary data with its name.
+        :param priority: The GreedyDual-Size-Frequency priority of the entry.
+        :param ttl: The time to live of the entry in seconds, the entry does not expire if it is 0 or None.
+        :return: The document of the entry.
+        """
+        entry = cache_entry.to_dict()
+        if isinstance(stored_value, EncodedValue):
+            entry[VALUE] = stored_value.data
+            entry[VALUE_CODEC] = stored_value.codec_name
+        entry[PRIORITY] = priority
+        # The TTL index only removes entries, whose field is a date
+        entry[EXPIRES_AT] = (
+            datetime.now(timezone.utc) + timedelta(seconds=ttl) if ttl else None
+        )
+        return entry
+
+    @staticmethod
+    def create_chunks(
+        entry: Dict[str, Any], stored_value: Any, collection_name: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Split the value of an entry into chunks and replace it in the entry by the number of chunks.
+        The chunks have to be written before the entry, such that a found entry has all chunks.
+        :param entry: The document of the entry, it gets an _id, which the chunks refer to.
+        :param stored_value: The value of the entry.
+        :param collection_name: The name of the collection, by which the chunks are tagged.
+        :return: The chunk documents or None if the value cannot be encoded.
+        """
+        if isinstance(stored_value, EncodedValue):
+            data = stored_value.data
+        else:
+            try:
+                data = bson.encode({VALUE: stored_value})
+            except (InvalidDocument, TypeError, OverflowError):
+                return None
+
+        entry["_id"] = ObjectId()
+        entry[VALUE] = None
+        entry[NUM_CHUNKS] = -(-len(data) // _CHUNK_SIZE)
+        return [
+            {
+                ENTRY_ID: entry["_id"],
+                COLLECTION_NAME: collection_name,
+                EXPIRES_AT: entry[EXPIRES_AT],
+                CHUNK_NUMBER: number,
+                CHUNK_DATA: data[start : start + _CHUNK_SIZE],
+            }
+            for number, start in enumerate(range(0, len(data), _CHUNK_SIZE))
+        ]
+
+    @staticmethod
+    def get_chunk_filter(entry_id: ObjectId) -> Dict[str, Any]:
+        """Get the filter for the chunks of the value of an entry, which are read sorted by their number."""
+        return {ENTRY_ID: entry_id}
+
+    @staticmethod
+    def get_chunk_projection() -> Dict[str, Any]:
+        """Get the projection of the fields, which are needed to join the chunks."""
+        return {"_id": 0, CHUNK_NUMBER: 1, CHUNK_DATA: 1}
+
+    @staticmethod
+    def join_chunks(
+        chunks: Iterable[Dict[str, Any]], num_chunks: int
+    ) -> Optional[bytes]:
+        """
+        Join the chunks of a value, which are sorted by their number.
+        :return: The data of the value or None if not all chunks exist.
+        """
+        data = bytearray()
+        num_read = 0
+        for chunk in chunks:
+            if chunk[CHUNK_NUMBER] != num_read:
+                return None
+            data += chunk[CHUNK_DATA]
+            num_read += 1
+        if num_read != num_chunks:
+            return None
+        return bytes(data)
+
+    @staticmethod
+    def decode_entry_value(
+        entry: Dict[str, Any],
+        data: Any,
+        decode_value: Callable[[EncodedValue], Any],
+        codec_options: CodecOptions,
+    ) -> Any:
+        """
+        Decode the value of an entry.
+        :param entry: The document of the entry.
+        :param data: The value of the entry or the joined chunks of a chunked value.
+        :param decode_value: The function of the backend, which decodes values encoded by a codec.
+        :param codec_options: The codec options of the cached collection.
+        :return: The value.
+        """
+        if entry.get(VALUE_CODEC) is not None:
+            return decode_value(EncodedValue(entry[VALUE_CODEC], data))
+        if entry.get(NUM_CHUNKS):
+            # Values without a codec are chunked as the BSON encoding of the value field
+            return bson.decode(data, codec_options=codec_options)[VALUE]
+        return data
+
+    @staticmethod
+    def get_eviction_field(cleanup_strategy: CleanupStrategy) -> str:
+        """Get the field, by which the entries are evicted for the cleanup strategy."""
+        return _EVICTION_FIELDS[cleanup_strategy]
+
+    @staticmethod
+    def get_eviction_fields() -> List[str]:
+        """Get the fields, by which the entries are evicted for any cleanup strategy."""
+        return list(_EVICTION_FIELDS.values())
+
+    @staticmethod
+    def get_eviction_projection() -> Dict[str, Any]:
+        """Get the projection of the entries, which are selected for an eviction."""
+        return {SIZE: 1, PRIORITY: 1, NUM_CHUNKS: 1}
+
+    @staticmethod
+    def get_inflation(
+        inflation: float,
+        cleanup_strategy: CleanupStrategy,
+        evicted_entries: List[Dict[str, Any]],
+    ) -> float:
+        """Get the GreedyDual-Size-Frequency inflation, which is raised to the highest priority of the evicted entries."""
+        if cleanup_strategy != CleanupStrategy.GDSF:
+            return inflation
+        return max([inflation] + [entry.get(PRIORITY, 0) for entry in evicted_entries])
+
+    @staticmethod
+    def get_entry_ids_filter(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Get the filter for the entries by their _id."""
+        return {"_id": {"$in": [entry["_id"] for entry in entries]}}
+
+    @staticmethod
+    def get_chunked_entry_ids(entries: List[Dict[str, Any]]) -> List[Any]:
+        """Get the _ids of the entries, whose values are chunked."""
+        return [entry["_id"] for entry in entries if entry.get(NUM_CHUNKS)]
+
+    @staticmethod
+    def get_chunks_of_entries_filter(entry_ids: List[Any]) -> Dict[str, Any]:
+        """Get the filter for the chunks of the values of the entries."""
+        return {ENTRY_ID: {"$in": entry_ids}}
+
+    @staticmethod
+    def get_size_pipeline(collection_name: str) -> List[Dict[str, Any]]:
+        """Get the pipeline, which sums up the size of the entries of the collection through the index."""
+        return [
+            {"$match": {COLLECTION_NAME: collection_name}},
+            {"$group": {"_id": None, "total": {"$sum": "$" + SIZE}}},
+        ]
+
+    @staticmethod
+    def get_access_update(
+        cleanup_strategy: CleanupStrategy,
+        inflation: float,
+        count: int,
+        timestamp: datetime,
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Get the update, which is applied to an entry when it is accessed.
+        :param cleanup_strategy: The cleanup strategy of the backend.
+        :param inflation: The current GreedyDual-Size-Frequency inflation.
+        :param count: The number of accesses.
+        :param timestamp: The time of the last access.
+        :return: The update document or pipeline.
+        """
+        if cleanup_strategy != CleanupStrategy.GDSF:
+            return {"$inc": {ACCESS_COUNT: count}, "$max": {TIMESTAMP: timestamp}}
+
+        # Same as calculate_priority, evaluated on the server with the incremented access count
+        return [
+            {
+                "$set": {
+                    ACCESS_COUNT: {"$add": ["$" + ACCESS_COUNT, count]},
+                    TIMESTAMP: {"$max": ["$" + TIMESTAMP, timestamp]},
+                    PRIORITY: {
+                        "$add": [
+                            inflation,
+                            {
+                                "$divide": [
+                                    {
+                                        "$multiply": [
+                                            {
+                                                "$add": [
+                                                    "$" + ACCESS_COUNT,
+                                                    count + 1,
+                                                ]
+                                            },
+                                            "$" + EXECUTION_TIME,
+                                        ]
+                                    },
+                                    {"$max": ["$" + SIZE, 1]},
+                                ]
+                            },
+                        ]
+                    },
+                }
+            }
+        ]
+
+    @staticmethod
+    def get_halve_access_counts_update() -> List[Dict[str, Any]]:
+        """Get the update pipeline, which halves the access counts for the aging of LFU."""
+        return [
+            {"$set": {ACCESS_COUNT: {"$floor": {"$divide": ["$" + ACCESS_COUNT, 2]}}}}
+        ]
@@ -0,0 +1,338 @@
+"""Class for caching MongoDB queries in Redis or a server, which speaks the Redis protocol."""
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+import bson
+from bson.errors import InvalidDocument
+from pymongo.collection import Collection
+
+from cache_backend.CacheInvalidator import CacheInvalidator
+from cache_backend.Constants import (
+    EXECUTION_TIME,
+    QUERY_INFO,
+    QUERY_KEY,
+    REDIS_KEY_PREFIX,
+    VALUE,
+    VALUE_CODEC,
+)
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo
+from cache_backend.base.CacheBackendBase import CacheBackendBase
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.ValueCodec import EncodedValue, ValueCodec
+
+# The number of keys, which are deleted with one command
+_DELETE_BATCH_SIZE = 1000
+
+
+class RedisCacheBackend(CacheBackendBase):
+    """
+    Class for caching MongoDB queries in Redis or a server, which speaks the Redis protocol.
+
+    Every entry is a hash under a key derived from the digest of the query, which holds the BSON encoded value and
+    the query. Its TTL is set with PEXPIRE, so the server removes expired entries, and the memory limit of the server
+    is enforced by its maxmemory policy. The keys of the entries of a collection are tagged in a sorted set, which is
+    scored by the last access time. It is used to clear the collection without SCAN and to evict the least recently
+    used entries, if the collection has more than max_num_items entries. The other cleanup strategies are not
+    applied. Hits are recorded in memory and written to the sorted set in batches with a single command.
+    The keys of a collection share a hash tag, so they are stored on the same node of a Redis cluster.
+    """
+
+    _redis = None
+    _index_key: str = None
+    _entry_key_prefix: str = None
+    _access_batch_size: int = 100
+    _pending_accesses: Dict[bytes, float] = None
+    _pending_lock: Lock = None
+
+    def __init__(
+        self,
+        collection: Collection,
+        ttl: int = 0,
+        max_item_size: int = 1 * 10**6,
+        max_num_items: int = 1000,
+        cache_cleanup_cycle_time: float = 1,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        redis_client: Any = None,
+        redis_url: str = "redis://localhost:6379/0",
+        key_prefix: str = REDIS_KEY_PREFIX,
+        access_batch_size: int = 100,
+    ):
+        """
+        :param redis_client: The client of the server, e.g. a redis.Redis instance, whose responses are not decoded.
+            A client is created from the redis_url if None.
+        :param redis_url: The URL of the server, if no client is given.
+        :param key_prefix: The prefix of all keys of the cache.
+        :param access_batch_size: The number of hits, whose access times are written together.
+        """
+        if redis_client is None:
+            if redis is None:
+                raise ImportError("The Redis backend requires the redis package")
+            redis_client = redis.Redis.from_url(redis_url)
+        self._redis = redis_client
+        # The hash tag in braces keeps the keys of the collection on one cluster node
+        self._entry_key_prefix = f"{key_prefix}:{{{collection.full_name}}}:"
+        self._index_key = f"{self._entry_key_prefix}index"
+        self._access_batch_size = access_batch_size
+        self._pending_accesses = {}
+        self._pending_lock = Lock()
+
+        # Expired entries are removed by the server, evictions happen when entries are set
+        super().__init__(
+            collection,
+            ttl,
+            max_item_size,
+            max_num_items,
+            cache_cleanup_cycle_time=None,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+        )
+
+    def _get_entry_key(self, key: QueryInfo) -> bytes:
+        """Get the Redis key of the entry of the query."""
+        return (self._entry_key_prefix + key.digest.hex()).encode()
+
+    def _decode_blob(self, data: bytes, codec_name: Optional[bytes]) -> Any:
+        """Decode a stored value."""
+        if codec_name:
+            return self._decode_value(EncodedValue(codec_name.decode(), data))
+        return bson.decode(data, codec_options=self.collection.database.codec_options)[
+            VALUE
+        ]
+
+    def _record_access(self, entry_key: bytes) -> None:
+        """Record a hit of an entry, the access times are written once the batch is full."""
+        with self._pending_lock:
+            self._pending_accesses[entry_key] = time.time()
+            if len(self._pending_accesses) < self._access_batch_size:
+                return
+        self.flush_access_stats()
+
+    def flush_access_stats(self) -> None:
+        """Write the access times of the recorded hits."""
+        with self._pending_lock:
+            pending_accesses = self._pending_accesses
+            self._pending_accesses = {}
+        if pending_accesses:
+            # Only updates the scores of the entries, which are still tagged
+            self._redis.zadd(self._index_key, pending_accesses, xx=True)
+
+    def get(self, key: QueryInfo) -> Any:
+        """Get the value from the cache."""
+        entry_key = self._get_entry_key(key)
+        data, codec_name, query_key = self._redis.hmget(
+            entry_key, [VALUE, VALUE_CODEC, QUERY_KEY]
+        )
+        # The key of the query rules out collisions of the digest
+        if data is None or query_key != key.key:
+            return None
+
+        self._record_access(entry_key)
+        return self._decode_blob(data, codec_name)
+
+    def get_with_ttl(self, key: QueryInfo) -> Tuple[Any, Optional[float]]:
+        """Get the value from the cache and its remaining time to live on the server with one round trip."""
+        entry_key = self._get_entry_key(key)
+        pipeline = self._redis.pipeline(transaction=False)
+        pipeline.hmget(entry_key, [VALUE, VALUE_CODEC, QUERY_KEY])
+        pipeline.pttl(entry_key)
+        (data, codec_name, query_key), remaining_millis = pipeline.execute()
+        if data is None or query_key != key.key:
+            return None, None
+
+        self._record_access(entry_key)
+        # -1 is returned for keys without a TTL, -2 for keys, which expired meanwhile
+        if remaining_millis == -1:
+            remaining_ttl = 0
+        elif remaining_millis > 0:
+            remaining_ttl = remaining_millis / 1000
+        else:
+            remaining_ttl = None
+        return self._decode_blob(data, codec_name), remaining_ttl
+
+    def set(
+        self, key: QueryInfo, value: Any, execution_time_millis: float, ttl: int = None
+    ) -> None:
+        """Set the value in the cache.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
+        :param value: The value to set.
+        :param key: The key to set.
+        :param execution_time_millis: The execution time of the query in milliseconds.
+        """
+        stored_value = self._encode_value(value)
+        try:
+            if isinstance(stored_value, EncodedValue):
+                data, codec_name = stored_value.data, stored_value.codec_name
+            else:
+                data, codec_name = bson.encode({VALUE: value}), ""
+            query_info = bson.encode(key.to_dict())
+        except (InvalidDocument, TypeError, OverflowError):
+            return
+        if len(data) > self.max_item_size:
+            return
+        if ttl is None:
+            ttl = self.ttl
+
+        entry_key = self._get_entry_key(key)
+        # One round trip, the transaction keeps readers from seeing a partially written entry
+        pipeline = self._redis.pipeline(transaction=True)
+        pipeline.delete(entry_key)
+        pipeline.hset(
+            entry_key,
+            mapping={
+                VALUE: data,
+                VALUE_CODEC: codec_name,
+                QUERY_KEY: key.key,
+                QUERY_INFO: query_info,
+                EXECUTION_TIME: execution_time_millis,
+            },
+        )
+        if ttl:
+            pipeline.pexpire(entry_key, int(ttl * 1000))
+        pipeline.zadd(self._index_key, {entry_key: time.time()})
+        pipeline.zcard(self._index_key)
+        num_entries = pipeline.execute()[-1]
+
+        if num_entries > self.max_num_items:
+            self._evict_entries(num_entries - self.max_num_items)
+
+    def _evict_entries(self, n: int) -> None:
+        """Remove the n least recently used entries of the collection."""
+        self.flush_access_stats()
+        evicted_keys = [
+            entry_key for entry_key, _ in self._redis.zpopmin(self._index_key, n)
+        ]
+        self._delete_keys(evicted_keys)
+
+    def _delete_keys(self, entry_keys: List[bytes]) -> None:
+        """Delete the entries in batches with one round trip."""
+        if not entry_keys:
+            return
+        pipeline = self._redis.pipeline(transaction=False)
+        for start in range(0, len(entry_keys), _DELETE_BATCH_SIZE):
+            pipeline.delete(*entry_keys[start : start + _DELETE_BATCH_SIZE])
+        pipeline.execute()
+
+    def _untag_and_delete_keys(self, entry_keys: List[bytes]) -> None:
+        """Remove the entries and their tags in batches with one round trip."""
+        if not entry_keys:
+            return
+        pipeline = self._redis.pipeline(transaction=False)
+        for start in range(0, len(entry_keys), _DELETE_BATCH_SIZE):
+            batch = entry_keys[start : start + _DELETE_BATCH_SIZE]
+            pipeline.zrem(self._index_key, *batch)
+            pipeline.delete(*batch)
+        pipeline.execute()
+
+    def delete(self, key: QueryInfo) -> None:
+        """Delete the value from the cache."""
+        self._untag_and_delete_keys([self._get_entry_key(key)])
+
+    def clear(self) -> None:
+        """Clear the cache."""
+        # Taking the tags and deleting the sorted set is atomic, so entries, which are set meanwhile, stay tagged
+        pipeline = self._redis.pipeline(transaction=True)
+        pipeline.zrange(self._index_key, 0, -1)
+        pipeline.delete(self._index_key)
+        entry_keys = pipeline.execute()[0]
+        self._delete_keys(entry_keys)
+
+    def _read_entries(
+        self, read_values: bool
+    ) -> List[Tuple[bytes, QueryInfo, Optional[bytes], Optional[bytes]]]:
+        """
+        Read the query infos and optionally the values of all entries of the collection with one round trip.
+        Tags of entries, which expired or were evicted by the server, are removed.
+        """
+        entry_keys = self._redis.zrange(self._index_key, 0, -1)
+        if not entry_keys:
+            return []
+        fields = [QUERY_INFO, VALUE, VALUE_CODEC] if read_values else [QUERY_INFO]
+        pipeline = self._redis.pipeline(transaction=False)
+        for entry_key in entry_keys:
+            pipeline.hmget(entry_key, fields)
+
+        entries = []
+        missing_keys = []
+        for entry_key, values in zip(entry_keys, pipeline.execute()):
+            if values[0] is None:
+                missing_keys.append(entry_key)
+                continue
+            query_info = QueryInfo(**bson.decode(values[0]))
+            if read_values:
+                entries.append((entry_key, query_info, values[1], values[2]))
+            else:
+                entries.append((entry_key, query_info, None, None))
+        if missing_keys:
+            self._redis.zrem(self._index_key, *missing_keys)
+        return entries
+
+    def _read_values(
+        self, entry_keys: List[bytes]
+    ) -> Dict[bytes, Tuple[Optional[bytes], Optional[bytes]]]:
+        """Read the values of the entries with one round trip."""
+        if not entry_keys:
+            return {}
+        pipeline = self._redis.pipeline(transaction=False)
+        for entry_key in entry_keys:
+            pipeline.hmget(entry_key, [VALUE, VALUE_CODEC])
+        return {
+            entry_key: (values[0], values[1])
+            for entry_key, values in zip(entry_keys, pipeline.execute())
+        }
+
+    def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from the cache.
+        :param write_info: The write to the collection.
+        """
+        entries = self._read_entries(False)
+        # Only the values, on which the decision depends, are transferred and decoded
+        values = self._read_values(
+            [
+                entry_key
+                for entry_key, key, _, _ in entries
+                if CacheInvalidator.needs_value(key, write_info)
+            ]
+        )
+
+        affected_keys = []
+        for entry_key, key, _, _ in entries:
+            value = None
+            if entry_key in values:
+                data, codec_name = values[entry_key]
+                if data is None:
+                    # The entry expired or was evicted meanwhile, so its tag is removed as well
+                    affected_keys.append(entry_key)
+                    continue
+                value = self._decode_blob(data, codec_name)
+            if CacheInvalidator.is_affected(key, value, write_info):
+                affected_keys.append(entry_key)
+        self._untag_and_delete_keys(affected_keys)
+
+    def get_all(self) -> Dict[QueryInfo, Any]:
+        """Get all the values from the cache."""
+        return {
+            key: self._decode_blob(data, codec_name)
+            for _, key, data, codec_name in self._read_entries(True)
+        }
+
+    def _cache_cleanup_internal(self) -> None:
+        """Write the recorded hits and remove the surplus entries of the collection."""
+        self.flush_access_stats()
+        num_entries = self._redis.zcard(self._index_key)
+        if num_entries > self.max_num_items:
+            self._evict_entries(num_entries - self.max_num_items)
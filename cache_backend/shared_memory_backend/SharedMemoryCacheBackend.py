@@ -0,0 +1,499 @@
+"""Class for caching MongoDB queries in a memory-mapped file, which is shared by several processes."""
+import mmap
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import bson
+from bson.errors import InvalidDocument
+from bson.raw_bson import RawBSONDocument
+from pymongo.collection import Collection
+
+from cache_backend.CacheInvalidator import CacheInvalidator
+from cache_backend.Constants import SHARED_MEMORY_FILE_PREFIX, VALUE
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo
+from cache_backend.base.CacheBackendBase import CacheBackendBase
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.ValueCodec import EncodedValue, ValueCodec, get_value_codec
+
+_MAGIC = b"PMCSHM01"
+# Magic, number of slots, size of the data area and the absolute write position in the data area
+_HEADER = struct.Struct("<8sI4xQQ")
+_HEADER_SIZE = 64
+# Digest of the key, absolute position and length of the record and the wall clock expiry time, 0 if none
+_SLOT = struct.Struct("<16sQI4xd")
+# Digest of the key, the lengths of the key, the query info, the value and the codec name and the flags
+_RECORD = struct.Struct("<16sIIIBB2x")
+# The value consists of RawBSONDocuments, which are returned without decoding them
+_RAW_VALUE = 1
+# The number of slots, which are searched for a key, starting at the slot of its hash
+_PROBE_LENGTH = 8
+_DEFAULT_DATA_SIZE = 64 * 2**20
+
+
+class SharedMemoryCacheBackend(CacheBackendBase):
+    """
+    Class for caching MongoDB queries in a memory-mapped file, which is shared by several processes.
+
+    The file consists of a fixed-size hash index and a ring buffer, which holds the BSON encoded entries. A new
+    entry is appended at the write position of the ring and overwrites the oldest entries, slots referring to
+    overwritten entries are free. So the entries are evicted in insertion order and the cleanup strategy is not
+    applied. Lookups read the index and the entry directly from the mapped memory, only the value is copied out of
+    the ring, and results of raw BSON queries are returned as RawBSONDocuments without decoding them.
+    Writes take an exclusive and reads a shared file lock, such that all processes, which map the file, see a
+    consistent cache. A forked process opens the file again on its first access, since a file lock belongs to the
+    open file and would otherwise be shared with the parent.
+    """
+
+    _file_path: str = None
+    _file_descriptor: int = None
+    # The process, which opened the file
+    _pid: int = None
+    _mmap: mmap.mmap = None
+    _num_slots: int = 0
+    _data_size: int = 0
+    _data_start: int = 0
+    # A file lock is held by the open file, so the threads of the process are serialized before taking it
+    _lock: Lock = None
+
+    def __init__(
+        self,
+        collection: Collection,
+        ttl: int = 0,
+        max_item_size: int = 1 * 10**6,
+        max_num_items: int = 1000,
+        cache_cleanup_cycle_time: float = 1,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        directory: Optional[str] = None,
+    ):
+        """
+        :param max_num_items: The number of slots of the index, i.e. the maximum number of entries.
+        :param max_total_bytes: The size of the ring buffer, which holds the entries (default: 64 MiB).
+        :param directory: The directory of the file, defaults to /dev/shm if it exists, else the temp directory.
+            A file, which already exists, keeps the number of slots and the size of the ring it was created with.
+        """
+        if fcntl is None:
+            raise ImportError(
+                "The shared memory backend requires fcntl, which is only available on POSIX systems"
+            )
+        if directory is None:
+            directory = (
+                "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            )
+        self._file_path = os.path.join(
+            directory, f"{SHARED_MEMORY_FILE_PREFIX}.{collection.full_name}.shm"
+        )
+        self._lock = Lock()
+        self._open_file(max(max_num_items, 1), max_total_bytes or _DEFAULT_DATA_SIZE)
+
+        # Overwritten and expired entries are replaced by new entries, so no cleanup thread is needed
+        super().__init__(
+            collection,
+            ttl,
+            max_item_size,
+            max_num_items,
+            cache_cleanup_cycle_time=None,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+        )
+
+    def _open_file(self, num_slots: int, data_size: int) -> None:
+        """Map the file, it is initialized if it does not exist or has another layout."""
+        self._pid = os.getpid()
+        self._file_descriptor = os.open(self._file_path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._file_descriptor, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self._file_descriptor, _HEADER.size, 0)
+            if len(header) == _HEADER.size:
+                magic, file_num_slots, file_data_size, _ = _HEADER.unpack(header)
+                if magic == _MAGIC and os.fstat(
+                    self._file_descriptor
+                ).st_size == _get_file_size(file_num_slots, file_data_size):
+                    num_slots, data_size = file_num_slots, file_data_size
+                else:
+                    header = b""
+            if len(header) != _HEADER.size:
+                # Truncating first zeroes the index
+                os.ftruncate(self._file_descriptor, 0)
+                os.ftruncate(
+                    self._file_descriptor, _get_file_size(num_slots, data_size)
+                )
+                os.pwrite(
+                    self._file_descriptor,
+                    _HEADER.pack(_MAGIC, num_slots, data_size, 0),
+                    0,
+                )
+        finally:
+            fcntl.flock(self._file_descriptor, fcntl.LOCK_UN)
+
+        self._num_slots = num_slots
+        self._data_size = data_size
+        self._data_start = _HEADER_SIZE + num_slots * _SLOT.size
+        self._mmap = mmap.mmap(
+            self._file_descriptor, _get_file_size(num_slots, data_size)
+        )
+
+    def _reopen_after_fork(self) -> None:
+        """Open and map the file again in a forked process, the descriptor of the parent is only closed."""
+        self._mmap.close()
+        os.close(self._file_descriptor)
+        self._open_file(self._num_slots, self._data_size)
+
+    def close(self) -> None:
+        """Unmap and close the file, the entries stay available for other processes."""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                os.close(self._file_descriptor)
+                self._mmap = None
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[memoryview]:
+        """Lock the file and provide a view of the mapped memory, which must not be used after the block."""
+        with self._lock:
+            if self._pid != os.getpid() and self._mmap is not None:
+                self._reopen_after_fork()
+            fcntl.flock(
+                self._file_descriptor, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            )
+            try:
+                with memoryview(self._mmap) as view:
+                    yield view
+            finally:
+                fcntl.flock(self._file_descriptor, fcntl.LOCK_UN)
+
+    def _get_probe_slots(self, digest: bytes) -> List[int]:
+        """Get the slots, which can hold the key with the digest."""
+        home = int.from_bytes(digest[:8], "little") % self._num_slots
+        return [
+            (home + i) % self._num_slots
+            for i in range(min(_PROBE_LENGTH, self._num_slots))
+        ]
+
+    def _read_slot(
+        self, view: memoryview, slot: int, write_position: int, now: float
+    ) -> Optional[Tuple[bytes, int, int]]:
+        """Get the digest, position and length of the entry in the slot, None if it is free."""
+        digest, position, length, expires_at = _SLOT.unpack_from(
+            view, _HEADER_SIZE + slot * _SLOT.size
+        )
+        if length == 0 or position < write_position - self._data_size:
+            # Empty or the entry was overwritten by newer entries
+            return None
+        if expires_at and expires_at <= now:
+            return None
+        return digest, position, length
+
+    def _get_record_offset(self, position: int) -> int:
+        """Get the offset of the record at the absolute position of the ring in the file."""
+        return self._data_start + position % self._data_size
+
+    def _find_slot(self, view: memoryview, key: QueryInfo) -> Optional[Tuple[int, int]]:
+        """Get the slot and the offset of the record of the key, None if it is not cached."""
+        write_position = _HEADER.unpack_from(view)[3]
+        now = time.time()
+        digest = key.digest
+        for slot in self._get_probe_slots(digest):
+            entry = self._read_slot(view, slot, write_position, now)
+            if entry is None or entry[0] != digest:
+                continue
+            offset = self._get_record_offset(entry[1])
+            record_digest, key_length = _RECORD.unpack_from(view, offset)[:2]
+            start = offset + _RECORD.size
+            # The digest identifies the key, comparing the key rules out collisions
+            if record_digest == digest and view[start : start + key_length] == key.key:
+                return slot, offset
+        return None
+
+    @staticmethod
+    def _read_record(
+        view: memoryview, offset: int, read_value: bool = True
+    ) -> Tuple[bytes, Optional[bytes], int, Optional[str]]:
+        """Copy the query info, the value, the flags and the codec name of the record out of the mapped memory."""
+        _, key_length, info_length, value_length, flags, codec_length = (
+            _RECORD.unpack_from(view, offset)
+        )
+        start = offset + _RECORD.size + key_length
+        query_info = bytes(view[start : start + info_length])
+        start += info_length
+        codec_name = (
+            bytes(view[start : start + codec_length]).decode() if codec_length else None
+        )
+        start += codec_length
+        value = bytes(view[start : start + value_length]) if read_value else None
+        return query_info, value, flags, codec_name
+
+    def _decode_record_value(
+        self, data: bytes, flags: int, codec_name: Optional[str]
+    ) -> Any:
+        """Decode the value of a record."""
+        if not flags & _RAW_VALUE:
+            if codec_name is not None:
+                return self._decode_value(EncodedValue(codec_name, data))
+            return bson.decode(
+                data, codec_options=self.collection.database.codec_options
+            )[VALUE]
+
+        if codec_name is not None:
+            data = get_value_codec(codec_name).decompress(data)
+        # The documents of the value are RawBSONDocuments, which reference the copied buffer
+        codec_options = self.collection.database.codec_options.with_options(
+            document_class=RawBSONDocument
+        )
+        return RawBSONDocument(data, codec_options)[VALUE]
+
+    def _encode_record(self, key: QueryInfo, value: Any) -> Optional[bytes]:
+        """Encode the key and the value as record of the ring, None if they cannot be encoded as BSON."""
+        stored_value = self._encode_value(value)
+        try:
+            query_info = bson.encode(key.to_dict())
+            if isinstance(stored_value, EncodedValue):
+                data, codec_name = stored_value.data, stored_value.codec_name.encode()
+            else:
+                data, codec_name = bson.encode({VALUE: value}), b""
+        except (InvalidDocument, TypeError, OverflowError):
+            return None
+        if len(data) > self.max_item_size:
+            return None
+
+        flags = _RAW_VALUE if _is_raw_value(value) else 0
+        header = _RECORD.pack(
+            key.digest,
+            len(key.key),
+            len(query_info),
+            len(data),
+            flags,
+            len(codec_name),
+        )
+        return b"".join((header, key.key, query_info, codec_name, data))
+
+    def get(self, key: QueryInfo) -> Any:
+        """Get the value from the cache."""
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: QueryInfo) -> Tuple[Any, Optional[float]]:
+        """Get the value from the cache and its remaining time to live, which is derived from its expiry time."""
+        with self._locked(exclusive=False) as view:
+            found = self._find_slot(view, key)
+            if found is None:
+                return None, None
+            slot_offset = _HEADER_SIZE + found[0] * _SLOT.size
+            expires_at = _SLOT.unpack_from(view, slot_offset)[3]
+            _, data, flags, codec_name = self._read_record(view, found[1])
+
+        # Decode the value outside the lock
+        remaining_ttl = 0
+        if expires_at:
+            remaining_ttl = expires_at - time.time()
+            if remaining_ttl <= 0:
+                remaining_ttl = None
+        return self._decode_record_value(data, flags, codec_name), remaining_ttl
+
+    def set(
+        self, key: QueryInfo, value: Any, execution_time_millis: float, ttl: int = None
+    ) -> None:
+        """Set the value in the cache.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
+        :param value: The value to set.
+        :param key: The key to set.
+        :param execution_time_millis: The execution time of the query in milliseconds.
+        """
+        record = self._encode_record(key, value)
+        if record is None or len(record) > self._data_size:
+            return
+        if ttl is None:
+            ttl = self.ttl
+        # Wall clock time, since the entries are shared with other processes
+        expires_at = time.time() + ttl if ttl else 0.0
+
+        with self._locked(exclusive=True) as view:
+            _, num_slots, data_size, write_position = _HEADER.unpack_from(view)
+            slot = self._choose_slot(view, key.digest, write_position)
+
+            # A record is never split at the end of the ring
+            offset = write_position % data_size
+            if offset + len(record) > data_size:
+                write_position += data_size - offset
+            start = self._get_record_offset(write_position)
+            view[start : start + len(record)] = record
+            _SLOT.pack_into(
+                view,
+                _HEADER_SIZE + slot * _SLOT.size,
+                key.digest,
+                write_position,
+                len(record),
+                expires_at,
+            )
+            _HEADER.pack_into(
+                view, 0, _MAGIC, num_slots, data_size, write_position + len(record)
+            )
+
+    def _choose_slot(self, view: memoryview, digest: bytes, write_position: int) -> int:
+        """
+        Get the slot for a new entry: the slot of the key if it is cached, else a free slot, else the slot of the
+        oldest entry, which is evicted.
+        """
+        now = time.time()
+        free_slot = None
+        oldest_slot, oldest_position = None, None
+        for slot in self._get_probe_slots(digest):
+            entry = self._read_slot(view, slot, write_position, now)
+            if entry is None:
+                if free_slot is None:
+                    free_slot = slot
+            elif entry[0] == digest:
+                return slot
+            elif oldest_position is None or entry[1] < oldest_position:
+                oldest_slot, oldest_position = slot, entry[1]
+        return free_slot if free_slot is not None else oldest_slot
+
+    def delete(self, key: QueryInfo) -> None:
+        """Delete the value from the cache."""
+        with self._locked(exclusive=True) as view:
+            found = self._find_slot(view, key)
+            if found is not None:
+                _clear_slot(view, found[0])
+
+    def clear(self) -> None:
+        """Clear the cache."""
+        with self._locked(exclusive=True) as view:
+            view[_HEADER_SIZE : self._data_start] = bytes(
+                self._data_start - _HEADER_SIZE
+            )
+
+    def _read_entries(
+        self, read_values: bool
+    ) -> List[Tuple[int, int, QueryInfo, Optional[bytes], int, Optional[str]]]:
+        """Copy the slots, positions, query infos and optionally the values of all valid entries."""
+        entries = []
+        with self._locked(exclusive=False) as view:
+            write_position = _HEADER.unpack_from(view)[3]
+            now = time.time()
+            for slot in range(self._num_slots):
+                entry = self._read_slot(view, slot, write_position, now)
+                if entry is not None:
+                    offset = self._get_record_offset(entry[1])
+                    entries.append(
+                        (slot, entry[1])
+                        + self._read_record(view, offset, read_value=read_values)
+                    )
+        return [
+            (slot, position, QueryInfo(**bson.decode(query_info)), data, flags, codec)
+            for slot, position, query_info, data, flags, codec in entries
+        ]
+
+    def _read_values(
+        self, slots: List[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], Optional[Tuple[bytes, int, Optional[str]]]]:
+        """
+        Copy the values, the flags and the codec names of the entries in the slots at the positions.
+        :return: The records by slot and position, None for entries, which are not valid anymore.
+        """
+        if not slots:
+            return {}
+        records = {}
+        with self._locked(exclusive=False) as view:
+            write_position = _HEADER.unpack_from(view)[3]
+            now = time.time()
+            for slot, position in slots:
+                entry = self._read_slot(view, slot, write_position, now)
+                if entry is None or entry[1] != position:
+                    records[(slot, position)] = None
+                    continue
+                offset = self._get_record_offset(position)
+                records[(slot, position)] = self._read_record(view, offset)[1:]
+        return records
+
+    def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from the cache.
+        :param write_info: The write to the collection.
+        """
+        entries = self._read_entries(False)
+        # Only the values, on which the decision depends, are copied, such that the lock is held briefly
+        values = self._read_values(
+            [
+                (slot, position)
+                for slot, position, key, _, _, _ in entries
+                if CacheInvalidator.needs_value(key, write_info)
+            ]
+        )
+
+        # Match the entries outside the lock, such that readers are not blocked
+        affected_slots = []
+        for slot, position, key, _, _, _ in entries:
+            value = None
+            if (slot, position) in values:
+                record = values[(slot, position)]
+                if record is None:
+                    # The entry was overwritten or expired meanwhile
+                    continue
+                value = self._decode_record_value(*record)
+            if CacheInvalidator.is_affected(key, value, write_info):
+                affected_slots.append((slot, position))
+        if not affected_slots:
+            return
+
+        with self._locked(exclusive=True) as view:
+            for slot, position in affected_slots:
+                # The slot can have been reused in the meantime
+                if (
+                    _SLOT.unpack_from(view, _HEADER_SIZE + slot * _SLOT.size)[1]
+                    == position
+                ):
+                    _clear_slot(view, slot)
+
+    def get_all(self) -> Dict[QueryInfo, Any]:
+        """Get all the values from the cache."""
+        return {
+            key: self._decode_record_value(data, flags, codec_name)
+            for _, _, key, data, flags, codec_name in self._read_entries(True)
+        }
+
+    def _cache_cleanup_internal(self) -> None:
+        """Free the slots of expired and overwritten entries."""
+        with self._locked(exclusive=True) as view:
+            write_position = _HEADER.unpack_from(view)[3]
+            now = time.time()
+            for slot in range(self._num_slots):
+                if self._read_slot(view, slot, write_position, now) is None:
+                    _clear_slot(view, slot)
+
+
+def _get_file_size(num_slots: int, data_size: int) -> int:
+    """Get the size of the file with the number of slots and the size of the ring."""
+    return _HEADER_SIZE + num_slots * _SLOT.size + data_size
+
+
+def _clear_slot(view: memoryview, slot: int) -> None:
+    """Free the slot."""
+    start = _HEADER_SIZE + slot * _SLOT.size
+    view[start : start + _SLOT.size] = bytes(_SLOT.size)
+
+
+def _is_raw_value(value: Any) -> bool:
+    """Check if the value is a RawBSONDocument or a non-empty list of RawBSONDocuments."""
+    if isinstance(value, RawBSONDocument):
+        return True
+    return (
+        isinstance(value, list)
+        and len(value) > 0
+        and all(isinstance(document, RawBSONDocument) for document in value)
+    )
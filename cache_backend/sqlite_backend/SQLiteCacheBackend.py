@@ -0,0 +1,316 @@
+"""Class for caching MongoDB queries in a SQLite database."""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import bson
+from bson.errors import InvalidDocument
+from pymongo.collection import Collection
+
+from cache_backend.CacheInvalidator import CacheInvalidator
+from cache_backend.Constants import (
+    ACCESS_COUNT,
+    CACHE_ENTRIES,
+    COLLECTION_NAME,
+    EXECUTION_TIME,
+    EXPIRES_AT,
+    HASH_VAL,
+    PRIORITY,
+    QUERY_INFO,
+    QUERY_KEY,
+    SIZE,
+    SQLITE_DATABASE_FILE,
+    TIMESTAMP,
+    VALUE,
+    VALUE_CODEC,
+)
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo
+from cache_backend.base.CacheBackendBase import CacheBackendBase
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.ValueCodec import EncodedValue, ValueCodec
+from cache_backend.sqlite_backend.SQLiteCacheCleanupHandler import (
+    SQLiteCacheCleanupHandler,
+)
+
+
+class SQLiteCacheBackend(CacheBackendBase):
+    """
+    Class for caching MongoDB queries in a SQLite database.
+
+    The database file can be shared by several processes. It uses the WAL journal, such that readers do not block
+    the writer. Every thread uses its own connection, the values are stored as BSON BLOBs.
+    """
+
+    _database_path: str = None
+    _collection_name: str = None
+    _busy_timeout: float = 30
+    _local: threading.local = None
+
+    def __init__(
+        self,
+        collection: Collection,
+        ttl: int = 0,
+        max_item_size: int = 1 * 10**6,
+        max_num_items: int = 1000,
+        cache_cleanup_cycle_time: float = 1,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        database_path: Optional[str] = None,
+        busy_timeout: float = 30,
+        access_batch_size: int = 100,
+    ):
+        """
+        :param database_path: The path of the SQLite database file, defaults to a file in the temp directory.
+        :param busy_timeout: The time in seconds, which a connection waits for the lock of another writer.
+        :param access_batch_size: The number of hits, whose access statistics are written together.
+        """
+        if database_path is None:
+            database_path = os.path.join(tempfile.gettempdir(), SQLITE_DATABASE_FILE)
+        self._database_path = database_path
+        self._busy_timeout = busy_timeout
+        # The database name is part of the name, since the file can be shared by all databases
+        self._collection_name = collection.full_name
+        self._local = threading.local()
+        self._create_table()
+
+        super().__init__(
+            collection,
+            ttl,
+            max_item_size,
+            max_num_items,
+            cache_cleanup_cycle_time=cache_cleanup_cycle_time,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+        )
+        self._cache_cleanup_handler = SQLiteCacheCleanupHandler(
+            collection,
+            max_item_size,
+            max_num_items,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            get_connection=self._get_connection,
+            collection_name=self._collection_name,
+            access_batch_size=access_batch_size,
+        )
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread, SQLite connections must not be shared by threads."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode, transactions are started explicitly
+            connection = sqlite3.connect(
+                self._database_path, timeout=self._busy_timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Execute the statements of the block in one write transaction."""
+        connection = self._get_connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _create_table(self) -> None:
+        """Create the table and the indexes if they don't exist."""
+        connection = self._get_connection()
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {CACHE_ENTRIES} ("
+            f"{COLLECTION_NAME} TEXT NOT NULL, {HASH_VAL} INTEGER NOT NULL, {QUERY_KEY} BLOB NOT NULL, "
+            f"{QUERY_INFO} BLOB NOT NULL, {VALUE} BLOB NOT NULL, {VALUE_CODEC} TEXT, "
+            f"{EXECUTION_TIME} REAL NOT NULL, {TIMESTAMP} REAL NOT NULL, {ACCESS_COUNT} INTEGER NOT NULL, "
+            f"{SIZE} INTEGER NOT NULL, {PRIORITY} REAL NOT NULL, {EXPIRES_AT} REAL)"
+        )
+        for column in (HASH_VAL, TIMESTAMP, ACCESS_COUNT, EXECUTION_TIME, PRIORITY):
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {CACHE_ENTRIES}_{column} "
+                f"ON {CACHE_ENTRIES} ({COLLECTION_NAME}, {column})"
+            )
+        # Partial index, entries without TTL are never expired
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {CACHE_ENTRIES}_{EXPIRES_AT} "
+            f"ON {CACHE_ENTRIES} ({COLLECTION_NAME}, {EXPIRES_AT}) WHERE {EXPIRES_AT} IS NOT NULL"
+        )
+
+    def _encode_blob(self, value: Any) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Encode the value as BLOB and the name of its codec, None if it cannot be encoded as BSON."""
+        stored_value = self._encode_value(value)
+        if isinstance(stored_value, EncodedValue):
+            return stored_value.data, stored_value.codec_name
+        try:
+            return bson.encode({VALUE: value}), None
+        except (InvalidDocument, TypeError, OverflowError):
+            return None
+
+    def _decode_blob(self, data: bytes, codec_name: Optional[str]) -> Any:
+        """Decode a value, which was encoded by _encode_blob."""
+        if codec_name is not None:
+            return self._decode_value(EncodedValue(codec_name, data))
+        return bson.decode(data, codec_options=self.collection.database.codec_options)[
+            VALUE
+        ]
+
+    def get(self, key: QueryInfo) -> Any:
+        """Get the value from the cache."""
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: QueryInfo) -> Tuple[Any, Optional[float]]:
+        """Get the value from the cache and its remaining time to live, which is derived from its expiry time."""
+        now = time.time()
+        row = (
+            self._get_connection()
+            .execute(
+                f"SELECT rowid, {VALUE}, {VALUE_CODEC}, {EXPIRES_AT} FROM {CACHE_ENTRIES} "
+                f"WHERE {COLLECTION_NAME} = ? AND {HASH_VAL} = ? AND {QUERY_KEY} = ? "
+                f"AND ({EXPIRES_AT} IS NULL OR {EXPIRES_AT} > ?)",
+                (self._collection_name, key.__hash__(), key.key, now),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None, None
+
+        self._cache_cleanup_handler.record_access(row[0])
+        return self._decode_blob(row[1], row[2]), (
+            0 if row[3] is None else row[3] - now
+        )
+
+    def set(
+        self, key: QueryInfo, value: Any, execution_time_millis: float, ttl: int = None
+    ) -> None:
+        """Set the value in the cache.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
+        :param value: The value to set.
+        :param key: The key to set.
+        :param execution_time_millis: The execution time of the query in milliseconds.
+        """
+        blob = self._encode_blob(value)
+        if blob is None:
+            return
+        data, codec_name = blob
+        try:
+            query_info = bson.encode(key.to_dict())
+        except (InvalidDocument, TypeError, OverflowError):
+            return
+        if self._cache_cleanup_handler.exceeds_max_item_size(len(data)):
+            return
+
+        if ttl is None:
+            ttl = self.ttl
+        # Wall clock time, since the entries are shared with other processes
+        expires_at = time.time() + ttl if ttl else None
+
+        with self._transaction() as connection:
+            connection.execute(
+                f"DELETE FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ? AND {HASH_VAL} = ?",
+                (self._collection_name, key.__hash__()),
+            )
+            self._cache_cleanup_handler.cleanup_cache(
+                num_new_entries=1, num_new_bytes=len(data)
+            )
+            connection.execute(
+                f"INSERT INTO {CACHE_ENTRIES} VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (
+                    self._collection_name,
+                    key.__hash__(),
+                    key.key,
+                    query_info,
+                    data,
+                    codec_name,
+                    execution_time_millis,
+                    time.time(),
+                    len(data),
+                    self._cache_cleanup_handler.get_initial_priority(
+                        execution_time_millis, len(data)
+                    ),
+                    expires_at,
+                ),
+            )
+
+    def delete(self, key: QueryInfo) -> None:
+        """Delete the value from the cache."""
+        self._cache_cleanup_handler.delete_entries([key])
+
+    def clear(self) -> None:
+        """Clear the cache."""
+        self._get_connection().execute(
+            f"DELETE FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ?",
+            (self._collection_name,),
+        )
+
+    def _read_value(self, rowid: int) -> Any:
+        """Read and decode the value of an entry, None if the entry was removed meanwhile."""
+        row = (
+            self._get_connection()
+            .execute(
+                f"SELECT {VALUE}, {VALUE_CODEC} FROM {CACHE_ENTRIES} WHERE rowid = ?",
+                (rowid,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return self._decode_blob(row[0], row[1])
+
+    def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from the cache.
+        :param write_info: The write to the collection.
+        """
+        rows = (
+            self._get_connection()
+            .execute(
+                f"SELECT rowid, {QUERY_INFO} FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ?",
+                (self._collection_name,),
+            )
+            .fetchall()
+        )
+        # Values are only loaded and decoded, if the decision depends on the cached result
+        affected_ids = [
+            (row[0],)
+            for row in rows
+            if CacheInvalidator.is_affected_lazily(
+                QueryInfo(**bson.decode(row[1])),
+                lambda rowid=row[0]: self._read_value(rowid),
+                write_info,
+            )
+        ]
+        if affected_ids:
+            self._get_connection().executemany(
+                f"DELETE FROM {CACHE_ENTRIES} WHERE rowid = ?", affected_ids
+            )
+
+    def get_all(self) -> Dict[QueryInfo, Any]:
+        """Get all the values from the cache."""
+        rows = self._get_connection().execute(
+            f"SELECT {QUERY_INFO}, {VALUE}, {VALUE_CODEC} FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ?",
+            (self._collection_name,),
+        )
+        return {
+            QueryInfo(**bson.decode(row[0])): self._decode_blob(row[1], row[2])
+            for row in rows
+        }
+
+    def _cache_cleanup_internal(self) -> None:
+        """Clean up the cache."""
+        with self._transaction():
+            self._cache_cleanup_handler.cleanup_cache()
@@ -0,0 +1,249 @@
+"""The cache cleanup handler for SQLite."""
+import sqlite3
+import time
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+import bson
+from pymongo.collection import Collection
+
+from cache_backend.base.CacheCleanupHandlerBase import (
+    CacheCleanupHandlerBase,
+    CleanupStrategy,
+)
+from cache_backend.Constants import (
+    ACCESS_COUNT,
+    CACHE_ENTRIES,
+    COLLECTION_NAME,
+    EXECUTION_TIME,
+    EXPIRES_AT,
+    HASH_VAL,
+    PRIORITY,
+    QUERY_INFO,
+    SIZE,
+    TIMESTAMP,
+)
+from cache_backend.QueryInfo import QueryInfo
+
+# The column, by which the entries are evicted for each cleanup strategy
+_EVICTION_COLUMNS = {
+    CleanupStrategy.LRU: TIMESTAMP,
+    CleanupStrategy.LFU: ACCESS_COUNT,
+    CleanupStrategy.EXECUTION_TIME: EXECUTION_TIME,
+    CleanupStrategy.GDSF: PRIORITY,
+}
+
+
+class SQLiteCacheCleanupHandler(CacheCleanupHandlerBase):
+    """
+    The cache cleanup handler for SQLite.
+
+    Every eviction column is indexed together with the collection name, so evicting the n first entries of a
+    strategy is a single indexed DELETE. The access statistics of hits are collected in memory and written in one
+    batch, when the batch is full or before the entries are ranked for an eviction.
+    """
+
+    _get_connection: Callable[[], sqlite3.Connection] = None
+    _collection_name: str = None
+    _inflation: float = 0
+    _access_batch_size: int = 100
+    _pending_accesses: Dict[int, int] = None
+    _pending_lock: Lock = None
+
+    def __init__(
+        self,
+        collection: Collection,
+        max_item_size: int = 1 * 10**6,
+        max_num_items: int = 1000,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        get_connection: Callable[[], sqlite3.Connection] = None,
+        collection_name: str = None,
+        access_batch_size: int = 100,
+    ):
+        """
+        :param get_connection: Returns the SQLite connection of the current thread.
+        :param collection_name: The name of the collection in the cache table.
+        :param access_batch_size: The number of hits, whose statistics are written together.
+        """
+        super().__init__(
+            collection,
+            max_item_size,
+            max_num_items,
+            cleanup_strategy,
+            lfu_aging_interval,
+            max_total_bytes,
+        )
+        self._get_connection = get_connection
+        self._collection_name = collection_name
+        self._access_batch_size = access_batch_size
+        self._pending_accesses = {}
+        self._pending_lock = Lock()
+
+    def get_initial_priority(self, execution_time: float, size: int) -> float:
+        """
+        Get the GreedyDual-Size-Frequency priority of a new entry.
+        :param execution_time: The execution time of the query in milliseconds.
+        :param size: The size of the entry in bytes.
+        :return: The priority of the entry.
+        """
+        return self.calculate_priority(self._inflation, 0, execution_time, size)
+
+    def record_access(self, entry_id: int) -> None:
+        """
+        Record a hit of an entry, the statistics are written once the batch is full.
+        :param entry_id: The row id of the entry.
+        """
+        with self._pending_lock:
+            self._pending_accesses[entry_id] = (
+                self._pending_accesses.get(entry_id, 0) + 1
+            )
+            if len(self._pending_accesses) < self._access_batch_size:
+                return
+        self.flush_access_stats()
+
+    def flush_access_stats(self) -> None:
+        """Write the statistics of the recorded hits."""
+        with self._pending_lock:
+            pending_accesses = self._pending_accesses
+            self._pending_accesses = {}
+        if not pending_accesses:
+            return
+
+        now = time.time()
+        # Same as calculate_priority with the incremented access count
+        self._get_connection().executemany(
+            f"UPDATE {CACHE_ENTRIES} SET {ACCESS_COUNT} = {ACCESS_COUNT} + ?, {TIMESTAMP} = ?, "
+            f"{PRIORITY} = ? + ({ACCESS_COUNT} + ? + 1) * {EXECUTION_TIME} / MAX({SIZE}, 1) WHERE rowid = ?",
+            [
+                (count, now, self._inflation, count, entry_id)
+                for entry_id, count in pending_accesses.items()
+            ],
+        )
+
+    def cleanup_cache(self, num_new_entries: int = 0, num_new_bytes: int = 0):
+        """
+        Remove entries from the cache until it is within its limits, the pending hits are written first.
+        :param num_new_entries: The number of entries which are about to be added to the cache.
+        :param num_new_bytes: The number of bytes which are about to be added to the cache.
+        """
+        self.flush_access_stats()
+        super().cleanup_cache(num_new_entries, num_new_bytes)
+
+    def remove_expired_entries(self) -> None:
+        """Remove the entries of the collection, whose TTL has passed."""
+        self._get_connection().execute(
+            f"DELETE FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ? AND {EXPIRES_AT} <= ?",
+            (self._collection_name, time.time()),
+        )
+
+    def halve_access_counts(self) -> None:
+        """Halve the access counts of all entries of the collection in the cache."""
+        self.flush_access_stats()
+        self._get_connection().execute(
+            f"UPDATE {CACHE_ENTRIES} SET {ACCESS_COUNT} = {ACCESS_COUNT} / 2 WHERE {COLLECTION_NAME} = ?",
+            (self._collection_name,),
+        )
+
+    def get_elements_in_cache(self) -> int:
+        """
+        Get the number of entries of the collection in the cache.
+        :return: The current number of elements in the cache
+        """
+        return (
+            self._get_connection()
+            .execute(
+                f"SELECT COUNT(*) FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ?",
+                (self._collection_name,),
+            )
+            .fetchone()[0]
+        )
+
+    def get_bytes_in_cache(self) -> int:
+        """
+        Get the size of all entries of the collection in the cache.
+        :return: The current size of the cache in bytes
+        """
+        return (
+            self._get_connection()
+            .execute(
+                f"SELECT COALESCE(SUM({SIZE}), 0) FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ?",
+                (self._collection_name,),
+            )
+            .fetchone()[0]
+        )
+
+    def evict_entries(self, n: int) -> int:
+        """
+        Remove the first n entries of the cleanup strategy with a single indexed DELETE.
+        :param n: The number of entries to remove.
+        :return: The number of removed entries.
+        """
+        column = _EVICTION_COLUMNS[self._cleanup_strategy]
+        selection = (
+            f"SELECT rowid, {PRIORITY} FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ? "
+            f"ORDER BY {column} LIMIT ?"
+        )
+        connection = self._get_connection()
+        if self._cleanup_strategy == CleanupStrategy.GDSF:
+            # The inflation is raised to the highest priority of the evicted entries
+            max_priority = connection.execute(
+                f"SELECT MAX({PRIORITY}) FROM ({selection})", (self._collection_name, n)
+            ).fetchone()[0]
+            if max_priority is not None:
+                self._inflation = max(self._inflation, max_priority)
+        return connection.execute(
+            f"DELETE FROM {CACHE_ENTRIES} WHERE rowid IN (SELECT rowid FROM ({selection}))",
+            (self._collection_name, n),
+        ).rowcount
+
+    def _get_first_entries(self, column: str, n: int) -> List[QueryInfo]:
+        """Get the first n entries of the collection ordered by the column."""
+        rows = self._get_connection().execute(
+            f"SELECT {QUERY_INFO} FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ? ORDER BY {column} LIMIT ?",
+            (self._collection_name, n),
+        )
+        return [QueryInfo(**bson.decode(row[0])) for row in rows]
+
+    def get_n_oldest_entries(self, n: int) -> List[QueryInfo]:
+        """
+        Get the n oldest entries in the cache.
+        :param n: The number of entries to get.
+        :return: The n oldest entries in the cache.
+        """
+        return self._get_first_entries(TIMESTAMP, n)
+
+    def get_n_least_frequent_entries(self, n: int) -> List[QueryInfo]:
+        """
+        Get the n least frequent entries in the cache.
+        :param n: The number of entries to get.
+        :return: The n least frequent entries in the cache.
+        """
+        return self._get_first_entries(ACCESS_COUNT, n)
+
+    def get_n_fastest_entries(self, n: int) -> List[QueryInfo]:
+        """
+        Get the n fastest entries in the cache.
+        :param n: The number of entries to get.
+        :return: The n fastest entries in the cache.
+        """
+        return self._get_first_entries(EXECUTION_TIME, n)
+
+    def get_n_least_valuable_entries(self, n: int) -> List[QueryInfo]:
+        """
+        Get the n entries with the lowest GreedyDual-Size-Frequency priority in the cache.
+        :param n: The number of entries to get.
+        :return: The n least valuable entries in the cache.
+        """
+        return self._get_first_entries(PRIORITY, n)
+
+    def delete_entries(self, entries_to_remove: List[QueryInfo]) -> None:
+        """
+        Delete the given entries from the cache.
+        :param entries_to_remove: The entries to remove.
+        """
+        self._get_connection().executemany(
+            f"DELETE FROM {CACHE_ENTRIES} WHERE {COLLECTION_NAME} = ? AND {HASH_VAL} = ?",
+            [(self._collection_name, entry.__hash__()) for entry in entries_to_remove],
+        )
@@ -0,0 +1,21 @@
+"""Hit statistics of the tiers of a tiered cache backend."""
+from dataclasses import dataclass
+
+
+@dataclass
+class TierStats:
+    """Hit statistics of one tier of a tiered cache backend."""
+
+    hits: int = 0
+    misses: int = 0
+    # Entries, which were copied into the tier from the other one
+    promotions: int = 0
+    demotions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """The ratio of the hits to all lookups of the tier, 0 if it was not used yet."""
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return self.hits / lookups
@@ -0,0 +1,253 @@
+"""Class for caching MongoDB queries in a small in-memory cache over a persistent cache backend."""
+
+import math
+import threading
+import time
+from dataclasses import replace
+from threading import Lock, RLock
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.collection import Collection
+
+from cache_backend.CacheBackend import CacheBackend, CacheBackendFactory
+from cache_backend.CacheEntry import CacheEntry
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo
+from cache_backend.base.CacheBackendBase import CacheBackendBase
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.CodecStats import CodecStats
+from cache_backend.codec.ValueCodec import ValueCodec
+from cache_backend.in_memory_backend.InMemoryCacheBackend import InMemoryCacheBackend
+from cache_backend.tiered_backend.TierStats import TierStats
+
+L1 = "l1"
+L2 = "l2"
+
+
+class TieredCacheBackend(CacheBackendBase):
+    """
+    Class for caching MongoDB queries in a small in-memory cache (L1) over a persistent cache backend (L2).
+
+    Lookups are answered by L1 if possible, hits of L2 are promoted into L1. New entries are written to both tiers,
+    or, if evictions are demoted, only to L1 and to L2 when L1 evicts them. Deletes, invalidations and clears are
+    applied to both tiers. The tiers register themselves for the collection as well, the tiered backend registers
+    itself last, so writes and change stream events reach it instead of a single tier.
+    """
+
+    _l1: InMemoryCacheBackend = None
+    _l2: CacheBackendBase = None
+    _demote_evictions: bool = False
+    _stats: Dict[str, TierStats] = None
+    _stats_lock: Lock = None
+    # Incremented before and after entries are removed from L2. Promotions and demotions, which started before,
+    # are skipped, so they cannot restore removed entries. The lock makes checking and copying atomic.
+    _removal_generation: int = 0
+    _copy_lock: RLock = None
+    # The removal generation at the start of the set in L1 of the current thread, whose evictions are demoted
+    _local: threading.local = None
+
+    def __init__(
+        self,
+        collection: Collection,
+        ttl: int = 0,
+        max_item_size: int = 1 * 10**6,
+        max_num_items: int = 1000,
+        cache_cleanup_cycle_time: float = 1,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        l2_cache_backend: CacheBackend = CacheBackend.MONGODB,
+        l2_options: Optional[Dict[str, Any]] = None,
+        l1_max_num_items: int = 100,
+        l1_max_total_bytes: Optional[int] = None,
+        demote_evictions: bool = False,
+    ):
+        """
+        :param max_num_items: The maximum number of entries of L2.
+        :param max_total_bytes: The maximum size of the entries of L2 in bytes.
+        :param value_codec: The codec of L2, the values in L1 are not compressed.
+        :param l2_cache_backend: The backend of L2.
+        :param l2_options: Further arguments of the backend of L2, e.g. the database_path of the SQLite backend.
+        :param l1_max_num_items: The maximum number of entries of L1.
+        :param l1_max_total_bytes: The maximum size of the entries of L1 in bytes.
+        :param demote_evictions: Write new entries only to L1 and to L2 when they are evicted from L1, else new
+            entries are written to both tiers.
+        """
+        self._demote_evictions = demote_evictions
+        self._stats = {L1: TierStats(), L2: TierStats()}
+        self._stats_lock = Lock()
+        self._copy_lock = RLock()
+        self._local = threading.local()
+        self._l1 = InMemoryCacheBackend(
+            collection,
+            ttl,
+            max_item_size,
+            l1_max_num_items,
+            cache_cleanup_cycle_time=cache_cleanup_cycle_time,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=l1_max_total_bytes,
+            eviction_listener=self._entries_evicted if demote_evictions else None,
+        )
+        if l2_cache_backend == CacheBackend.MONGODB:
+            # The entries of L2 have to survive the exit of the process, other processes may share them as well
+            l2_options = {"clear_on_exit": False, **(l2_options or {})}
+        self._l2 = CacheBackendFactory.get_cache_backend(l2_cache_backend)(
+            collection,
+            ttl,
+            max_item_size,
+            max_num_items,
+            cache_cleanup_cycle_time=cache_cleanup_cycle_time,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+            **(l2_options or {}),
+        )
+
+        # The tiers clean up themselves
+        super().__init__(
+            collection,
+            ttl,
+            max_item_size,
+            max_num_items,
+            cache_cleanup_cycle_time=None,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+        )
+
+    def _record(self, tier: str, field: str, n: int = 1) -> None:
+        """Increment a statistic of the tier."""
+        with self._stats_lock:
+            stats = self._stats[tier]
+            setattr(stats, field, getattr(stats, field) + n)
+
+    def get_tier_stats(self) -> Dict[str, TierStats]:
+        """Get the hit statistics of L1 and L2."""
+        with self._stats_lock:
+            return {tier: replace(stats) for tier, stats in self._stats.items()}
+
+    def get_codec_stats(self) -> CodecStats:
+        """Get the statistics of the value codec of L2."""
+        return self._l2.get_codec_stats()
+
+    def get(self, key: QueryInfo) -> Any:
+        """Get the value from L1 or, if it is not cached there, from L2 and promote it into L1."""
+        value = self._l1.get(key)
+        if value is not None:
+            self._record(L1, "hits")
+            return value
+        self._record(L1, "misses")
+
+        removal_generation = self._removal_generation
+        start = time.perf_counter()
+        value, remaining_ttl = self._l2.get_with_ttl(key)
+        if value is None:
+            self._record(L2, "misses")
+            return None
+        self._record(L2, "hits")
+
+        # The lookup in L2 is what a miss in L1 costs. The entry expires in L1 when it expires in L2, entries, whose
+        # remaining TTL is not known, are not promoted, as they could outlive the entry in L2
+        if remaining_ttl is None:
+            return value
+        execution_time_millis = (time.perf_counter() - start) * 1000
+        with self._copy_lock:
+            if removal_generation == self._removal_generation:
+                self._set_in_l1(
+                    key, value, execution_time_millis, remaining_ttl, removal_generation
+                )
+                self._record(L1, "promotions")
+        return value
+
+    def set(
+        self, key: QueryInfo, value: Any, execution_time_millis: float, ttl: int = None
+    ) -> None:
+        """Set the value in the cache.
+        :param ttl: The time to live for the key in seconds, overrides the TTL of the backend if not None.
+        :param value: The value to set.
+        :param key: The key to set.
+        :param execution_time_millis: The execution time of the query in milliseconds.
+        """
+        if not self._demote_evictions:
+            self._l2.set(key, value, execution_time_millis, ttl)
+            self._l1.set(key, value, execution_time_millis, ttl)
+            return
+
+        self._set_in_l1(
+            key, value, execution_time_millis, ttl, self._removal_generation
+        )
+
+    def _set_in_l1(
+        self,
+        key: QueryInfo,
+        value: Any,
+        execution_time_millis: float,
+        ttl: Optional[int],
+        removal_generation: int,
+    ) -> None:
+        """Set the value in L1, the entries, which it evicts, are demoted unless entries were removed since."""
+        self._local.removal_generation = removal_generation
+        try:
+            self._l1.set(key, value, execution_time_millis, ttl)
+        finally:
+            self._local.removal_generation = None
+
+    def _entries_evicted(self, evicted_entries: List[CacheEntry]) -> None:
+        """Write the entries, which were evicted from L1, to L2."""
+        # Evictions by the cleanup thread of L1 cannot be ordered with removals and are dropped
+        removal_generation = getattr(self._local, "removal_generation", None)
+        now = time.monotonic()
+        with self._copy_lock:
+            if removal_generation != self._removal_generation:
+                return
+            for entry in evicted_entries:
+                if entry.expires_at is None:
+                    ttl = 0
+                elif entry.expires_at > now:
+                    ttl = math.ceil(entry.expires_at - now)
+                else:
+                    continue
+                self._l2.set(entry.query_info, entry.value, entry.execution_time, ttl)
+                self._record(L2, "demotions")
+
+    def _remove_from_tiers(self, remove: Callable[[CacheBackendBase], None]) -> None:
+        """Remove entries from L2 and then from L1, such that removed entries are neither promoted nor demoted."""
+        with self._copy_lock:
+            self._removal_generation += 1
+        remove(self._l2)
+        with self._copy_lock:
+            self._removal_generation += 1
+        remove(self._l1)
+
+    def delete(self, key: QueryInfo) -> None:
+        """Delete the value from both tiers."""
+        self._remove_from_tiers(lambda tier: tier.delete(key))
+
+    def clear(self) -> None:
+        """Clear both tiers."""
+        self._remove_from_tiers(lambda tier: tier.clear())
+
+    def invalidate(self, write_info: WriteInfo) -> None:
+        """
+        Remove the entries, whose result can be changed by the write, from both tiers.
+        :param write_info: The write to the collection.
+        """
+        self._remove_from_tiers(lambda tier: tier.invalidate(write_info))
+
+    def get_all(self) -> Dict[QueryInfo, Any]:
+        """Get all the values from both tiers, the values of L1 take precedence."""
+        entries = self._l2.get_all()
+        entries.update((key, entry.value) for key, entry in self._l1.get_all().items())
+        return entries
+
+    def _cache_cleanup_internal(self) -> None:
+        """Clean up both tiers."""
+        self._l1._cache_cleanup_internal()
+        self._l2._cache_cleanup_internal()
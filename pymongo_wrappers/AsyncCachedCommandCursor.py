@@ -0,0 +1,79 @@
+"""Asynchronous command cursor for cached aggregations, which supports the API of the pymongo AsyncCommandCursor."""
+from typing import Any, Iterator, List, Optional
+
+
+class AsyncCachedCommandCursor:
+    """
+    Asynchronous command cursor for cached aggregations, which supports the API of the pymongo AsyncCommandCursor.
+
+    The aggregation is executed when it is awaited, like with the async driver. The cursor iterates over the
+    cached result or, in case of a miss, over the result, which was stored in the cache.
+    """
+
+    _iterator: Iterator[Any] = None
+    _alive: bool = True
+
+    def __init__(self, iterator: Iterator[Any]):
+        """
+        :param iterator: The iterator over the result of the aggregation.
+        """
+        self._iterator = iterator
+        self._alive = True
+
+    @property
+    def alive(self) -> bool:
+        """Does this cursor have the potential to return more data?"""
+        return self._alive
+
+    def batch_size(self, batch_size: int) -> "AsyncCachedCommandCursor":
+        """Set the batch size of the cursor, which has no influence on the cached result."""
+        if not isinstance(batch_size, int):
+            raise TypeError("batch_size must be an integer")
+        if batch_size < 0:
+            raise ValueError("batch_size must be >= 0")
+        return self
+
+    async def close(self) -> None:
+        """Close the cursor."""
+        self._alive = False
+
+    def __aiter__(self) -> "AsyncCachedCommandCursor":
+        return self
+
+    async def __anext__(self) -> Any:
+        if not self._alive:
+            raise StopAsyncIteration
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._alive = False
+            raise StopAsyncIteration
+
+    next = __anext__
+
+    async def try_next(self) -> Optional[Any]:
+        """Get the next document or None if there are no more documents."""
+        try:
+            return await self.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    async def to_list(self, length: Optional[int] = None) -> List[Any]:
+        """
+        Get the remaining documents of the cursor as a list.
+        :param length: The maximum number of documents to return, None returns all remaining documents.
+        """
+        if length is not None and length < 1:
+            raise ValueError("to_list() length must be greater than 0")
+        documents = []
+        async for document in self:
+            documents.append(document)
+            if length is not None and len(documents) >= length:
+                break
+        return documents
+
+    async def __aenter__(self) -> "AsyncCachedCommandCursor":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,176 @@
+"""Asynchronous cursor for cached find queries, which supports the chaining API of the pymongo AsyncCursor."""
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+from pymongo import ASCENDING
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import InvalidOperation
+
+
+class AsyncCachedCursor:
+    """
+    Asynchronous cursor for cached find queries, which supports the chaining API of the pymongo AsyncCursor.
+
+    Like the CachedCursor, the modifiers only record the arguments of the query and the cache key is built on the
+    first iteration, so find(...).sort(...).limit(...) is cached exactly like find(..., sort=..., limit=...).
+    The query cannot be modified after the iteration has started.
+    """
+
+    _collection: AsyncCollection = None
+    _filter: Optional[Mapping[str, Any]] = None
+    _args: Tuple[Any, ...] = ()
+    _kwargs: Dict[str, Any] = None
+    _cache_ttl: Optional[int] = None
+    _iterator: Optional[Iterator[Any]] = None
+    _alive: bool = True
+
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        filter: Optional[Mapping[str, Any]] = None,
+        *args: Any,
+        cache_ttl: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        """
+        :param collection: The AsyncMongoCollectionWithCache, which executes the query.
+        :param filter: A query expression for MongoDb.
+        :param cache_ttl: The time to live of the cached result in seconds, overrides the TTL of the collection.
+        """
+        self._collection = collection
+        self._filter = filter
+        self._args = args
+        self._kwargs = dict(kwargs)
+        self._cache_ttl = cache_ttl
+        self._iterator = None
+        self._alive = True
+
+    @property
+    def collection(self) -> AsyncCollection:
+        """The collection of the cursor."""
+        return self._collection
+
+    @property
+    def alive(self) -> bool:
+        """Does this cursor have the potential to return more data?"""
+        return self._alive
+
+    def _check_okay_to_chain(self) -> None:
+        """Check if the query can still be modified."""
+        if self._iterator is not None:
+            raise InvalidOperation("cannot set options after executing query")
+
+    def _set_option(self, name: str, value: Any) -> "AsyncCachedCursor":
+        """Set an argument of the query and return the cursor for chaining."""
+        self._check_okay_to_chain()
+        self._kwargs[name] = value
+        return self
+
+    def sort(
+        self,
+        key_or_list: Union[str, List[Tuple[str, Any]], Mapping[str, Any]],
+        direction: Optional[Union[int, str]] = None,
+    ) -> "AsyncCachedCursor":
+        """Sort the results of the query."""
+        if isinstance(key_or_list, str):
+            sort = [(key_or_list, ASCENDING if direction is None else direction)]
+        elif isinstance(key_or_list, Mapping):
+            sort = list(key_or_list.items())
+        else:
+            sort = [tuple(item) for item in key_or_list]
+        return self._set_option("sort", sort)
+
+    def limit(self, limit: int) -> "AsyncCachedCursor":
+        """Limit the number of results of the query."""
+        if not isinstance(limit, int):
+            raise TypeError("limit must be an integer")
+        return self._set_option("limit", limit)
+
+    def skip(self, skip: int) -> "AsyncCachedCursor":
+        """Skip the first results of the query."""
+        if not isinstance(skip, int):
+            raise TypeError("skip must be an integer")
+        if skip < 0:
+            raise ValueError("skip must be >= 0")
+        return self._set_option("skip", skip)
+
+    def batch_size(self, batch_size: int) -> "AsyncCachedCursor":
+        """Set the batch size of the query, which has no influence on the cached result."""
+        if not isinstance(batch_size, int):
+            raise TypeError("batch_size must be an integer")
+        if batch_size < 0:
+            raise ValueError("batch_size must be >= 0")
+        return self._set_option("batch_size", batch_size)
+
+    def max_time_ms(self, max_time_ms: Optional[int]) -> "AsyncCachedCursor":
+        """Set the time limit of the query, which has no influence on the cached result."""
+        return self._set_option("max_time_ms", max_time_ms)
+
+    def hint(self, index: Any) -> "AsyncCachedCursor":
+        """Set the index, which is used by the query."""
+        return self._set_option("hint", index)
+
+    def collation(self, collation: Optional[Mapping[str, Any]]) -> "AsyncCachedCursor":
+        """Set the collation of the query."""
+        return self._set_option("collation", collation)
+
+    def comment(self, comment: Any) -> "AsyncCachedCursor":
+        """Set the comment of the query, which has no influence on the cached result."""
+        return self._set_option("comment", comment)
+
+    def rewind(self) -> "AsyncCachedCursor":
+        """Rewind the cursor, such that the query is executed again on the next iteration."""
+        self._iterator = None
+        self._alive = True
+        return self
+
+    def clone(self) -> "AsyncCachedCursor":
+        """Get a clone of the cursor, which has not been iterated yet."""
+        return AsyncCachedCursor(
+            self._collection,
+            self._filter,
+            *self._args,
+            cache_ttl=self._cache_ttl,
+            **self._kwargs,
+        )
+
+    async def close(self) -> None:
+        """Close the cursor."""
+        self._alive = False
+
+    def __aiter__(self) -> "AsyncCachedCursor":
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._iterator is None:
+            if not self._alive:
+                raise StopAsyncIteration
+            self._iterator = await self._collection._find_with_cache(
+                self._filter, self._args, self._kwargs, self._cache_ttl
+            )
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._alive = False
+            raise StopAsyncIteration
+
+    next = __anext__
+
+    async def to_list(self, length: Optional[int] = None) -> List[Any]:
+        """
+        Get the remaining documents of the cursor as a list.
+        :param length: The maximum number of documents to return, None returns all remaining documents.
+        """
+        if length is not None and length < 1:
+            raise ValueError("to_list() length must be greater than 0")
+        documents = []
+        async for document in self:
+            documents.append(document)
+            if length is not None and len(documents) >= length:
+                break
+        return documents
+
+    async def __aenter__(self) -> "AsyncCachedCursor":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,482 @@
+"""Collection class, which derives from the pymongo AsyncCollection class, and
+adds a cache to speed up queries of asyncio applications, which are requested multiple times.
+"""
+
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from bson.raw_bson import RawBSONDocument
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.command_cursor import AsyncCommandCursor
+from pymongo.asynchronous.cursor import AsyncCursor
+from pymongo.results import (
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+from pymongo.typings import _DocumentType, _Pipeline
+
+from cache_backend.AsyncSingleFlight import AsyncSingleFlight
+from cache_backend.CacheBackend import CacheBackend, CacheBackendFactory
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+from cache_backend.base.AsyncCacheBackendBase import AsyncCacheBackendBase
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.CodecStats import CodecStats
+from cache_backend.codec.ValueCodec import ValueCodec
+from pymongo_wrappers.AsyncCachedCommandCursor import AsyncCachedCommandCursor
+from pymongo_wrappers.AsyncCachedCursor import AsyncCachedCursor
+from pymongo_wrappers.CacheFunctions import DEFAULT_CACHE_FUNCTIONS, CacheFunctions
+from pymongo_wrappers.CollectionCachingMixin import CollectionCachingMixin
+from pymongo_wrappers.DefaultCachingBehavior import DefaultCachingBehavior
+
+
+class AsyncMongoCollectionWithCache(CollectionCachingMixin, AsyncCollection):
+    """
+    Collection class for asyncio applications, which caches the results of find_one, find and aggregate like the
+    MongoCollectionWithCache. The cache backend and the single flight are asynchronous, so neither a lookup nor a
+    miss blocks the event loop. Writes invalidate the affected entries after they are executed.
+    """
+
+    _cache_backend: AsyncCacheBackendBase = None
+    _cache_cleanup_cycle_time = None
+    _max_num_items = 1000
+    _max_item_size = 1 * 10**6
+    _max_total_bytes = None
+    _value_codec = None
+    _compression_threshold = 4096
+    _ttl = 0
+    _cleanup_strategy = CleanupStrategy.LRU
+    _lfu_aging_interval = None
+    _single_flight_timeout = 10
+    _cache_backend_options = None
+    _single_flight: AsyncSingleFlight = None
+
+    def __init__(
+        self,
+        *args,
+        cache_backend: CacheBackend = CacheBackend.IN_MEMORY,
+        functions_to_cache: Optional[List[CacheFunctions]] = None,
+        cache_cleanup_cycle_time: Optional[float] = None,
+        max_num_items: int = 1000,
+        max_item_size: int = 1 * 10**6,
+        ttl: int = 0,
+        default_caching_behavior: bool = DefaultCachingBehavior.CACHE_ALL,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        single_flight_timeout: Optional[float] = 10,
+        cache_backend_options: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._cache_backend = CacheBackendFactory.get_async_cache_backend(
+            cache_backend
+        )(
+            self,
+            cache_cleanup_cycle_time=cache_cleanup_cycle_time,
+            max_num_items=max_num_items,
+            max_item_size=max_item_size,
+            ttl=ttl,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+            **(cache_backend_options or {}),
+        )
+
+        if functions_to_cache is None:
+            self._functions_to_cache = DEFAULT_CACHE_FUNCTIONS
+        else:
+            self._functions_to_cache = functions_to_cache
+
+        self._cache_cleanup_cycle_time = cache_cleanup_cycle_time
+        self._max_num_items = max_num_items
+        self._max_item_size = max_item_size
+        self._ttl = ttl
+        self._default_caching_behavior = default_caching_behavior
+        self._cleanup_strategy = cleanup_strategy
+        self._lfu_aging_interval = lfu_aging_interval
+        self._max_total_bytes = max_total_bytes
+        self._value_codec = value_codec
+        self._compression_threshold = compression_threshold
+        self._single_flight_timeout = single_flight_timeout
+        self._cache_backend_options = cache_backend_options
+        # Concurrent misses of the same query await the first one instead of querying the database as well
+        self._single_flight = AsyncSingleFlight(timeout=single_flight_timeout)
+
+    def get_cache_codec_stats(self) -> CodecStats:
+        """Get the compression ratio and the time spent for encoding and decoding the cached values of the collection."""
+        return self._cache_backend.get_codec_stats()
+
+    def _get_query_collection(self) -> AsyncCollection:
+        """Get a regular collection, which executes the queries without the cache."""
+        return AsyncCollection(self.database, self.name)
+
+    async def _get_with_cache(
+        self,
+        query_info: QueryInfo,
+        execute: Callable[[], Awaitable[Any]],
+        cache_ttl: Optional[int],
+    ) -> Any:
+        """Get the result of the query from the cache or execute it once for all concurrent misses and cache it."""
+        item = await self._cache_backend.get(query_info)
+        if item is not None:
+            return item
+
+        async def execute_and_cache():
+            start = time.time_ns()
+            result = await execute()
+            exec_in_ms = (time.time_ns() - start) / 1e6
+            await self._cache_backend.set(query_info, result, exec_in_ms, ttl=cache_ttl)
+            return result
+
+        return await self._single_flight.do(query_info, execute_and_cache)
+
+    async def find_one(
+        self,
+        filter: Optional[Any] = None,
+        *args: Any,
+        cache_always: bool = False,
+        cache_ttl: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        """
+        Find a single document in the collection.
+        :param cache_always: If true, the query will always be cached, even
+            if the function is not in the functions to cache or the default caching behavior is CACHE_NONE.
+        :param cache_ttl: The time to live of the cached result in seconds, overrides the TTL of the collection.
+        :param filter: A query expression for MongoDb.
+        """
+        function_enum = CacheFunctions.FIND_ONE
+        if not self._check_caching_allowed(function_enum) and not cache_always:
+            return await self._get_query_collection().find_one(filter, *args, **kwargs)
+
+        query_info = self._get_find_query_info(function_enum, filter, args, kwargs)
+        return await self._get_with_cache(
+            query_info,
+            lambda: self._get_query_collection().find_one(filter, *args, **kwargs),
+            cache_ttl,
+        )
+
+    def find(
+        self,
+        filter: Optional[dict] = None,
+        *args: Any,
+        cache_always: bool = False,
+        cache_ttl: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Union[AsyncCachedCursor, AsyncCursor]:
+        """
+        Query the collection, the query is executed when the cursor is iterated.
+        :param cache_always: If true, the query will always be cached, even
+            if the function is not in the functions to cache or the default caching behavior is CACHE_NONE.
+        :param cache_ttl: The time to live of the cached result in seconds, overrides the TTL of the collection.
+        :param filter: A query expression for MongoDb.
+        """
+        function_enum = CacheFunctions.FIND
+        if not self._check_caching_allowed(function_enum) and not cache_always:
+            return self._get_query_collection().find(filter, *args, **kwargs)
+
+        # The cursor builds the cache key on its first iteration, such that chained modifiers are part of it
+        return AsyncCachedCursor(self, filter, *args, cache_ttl=cache_ttl, **kwargs)
+
+    async def _find_with_cache(
+        self,
+        filter: Optional[Any],
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+        cache_ttl: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """Get an iterator over the result of the find query, which is taken from the cache if possible."""
+        query_info = self._get_find_query_info(
+            CacheFunctions.FIND, filter, args, kwargs
+        )
+        result = await self._get_with_cache(
+            query_info,
+            lambda: self._get_query_collection()
+            .find(filter, *args, **kwargs)
+            .to_list(),
+            cache_ttl,
+        )
+        return iter(result)
+
+    async def aggregate(
+        self,
+        pipeline: _Pipeline,
+        *args: Any,
+        cache_always: bool = False,
+        cache_ttl: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Union[AsyncCachedCommandCursor, AsyncCommandCursor]:
+        """
+        Perform an aggregation using the aggregation framework on this collection.
+        :param cache_always: If true, the query will always be cached, even
+            if the function is not in the functions to cache or the default caching behavior is CACHE_NONE.
+        :param cache_ttl: The time to live of the cached result in seconds, overrides the TTL of the collection.
+        """
+        function_enum = CacheFunctions.AGGREGATE
+        # Always check if the pipeline is modifying any collection
+        modifying_pipe_info = self._get_database_and_collection_from_modifying_pipeline(
+            pipeline
+        )
+        if modifying_pipe_info is not None:
+            database, coll = modifying_pipe_info
+            await self._cache_backend.clear_cache_for_database_and_collection(
+                collection_name=coll, database_name=database
+            )
+
+        # The result of a pipeline, which is modifying a collection, is neither cached nor taken from the cache
+        if (
+            not self._check_caching_allowed(function_enum) and not cache_always
+        ) or modifying_pipe_info is not None:
+            return await self._get_query_collection().aggregate(
+                pipeline, *args, **kwargs
+            )
+
+        pipeline_query_info = QueryInfo(
+            function_enum.name,
+            pipeline=pipeline,
+            options=self._get_query_options(
+                {**kwargs, "args": list(args) if args else None}
+            ),
+        )
+
+        async def execute():
+            cursor = await self._get_query_collection().aggregate(
+                pipeline, *args, **kwargs
+            )
+            return await cursor.to_list()
+
+        result = await self._get_with_cache(pipeline_query_info, execute, cache_ttl)
+        return AsyncCachedCommandCursor(iter(result))
+
+    async def insert_one(
+        self, document: Union[_DocumentType, RawBSONDocument], *args: Any, **kwargs: Any
+    ) -> InsertOneResult:
+        """Insert a single document."""
+        try:
+            return await self._get_query_collection().insert_one(
+                document, *args, **kwargs
+            )
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(WriteOperation.INSERT, documents=[document])
+            )
+
+    async def insert_many(
+        self,
+        documents: Iterable[Union[_DocumentType, RawBSONDocument]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> InsertManyResult:
+        """Insert an iterable of documents."""
+        # Inserted documents get their _id assigned by pymongo, so they must be materialized first
+        documents = list(documents)
+        try:
+            return await self._get_query_collection().insert_many(
+                documents, *args, **kwargs
+            )
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(WriteOperation.INSERT, documents=documents)
+            )
+
+    async def update_one(
+        self,
+        filter: Mapping[str, Any],
+        update: Union[Mapping[str, Any], _Pipeline],
+        upsert: bool = False,
+        **kwargs: Any,
+    ) -> UpdateResult:
+        """Update a single document matching the filter."""
+        try:
+            return await self._get_query_collection().update_one(
+                filter, update, upsert=upsert, **kwargs
+            )
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.UPDATE,
+                    filter=filter,
+                    update=update,
+                    upsert=upsert,
+                    collation=kwargs.get("collation"),
+                )
+            )
+
+    async def update_many(
+        self,
+        filter: Mapping[str, Any],
+        update: Union[Mapping[str, Any], _Pipeline],
+        upsert: bool = False,
+        **kwargs: Any,
+    ) -> UpdateResult:
+        """Update one or more documents that match the filter."""
+        try:
+            return await self._get_query_collection().update_many(
+                filter, update, upsert=upsert, **kwargs
+            )
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.UPDATE,
+                    filter=filter,
+                    update=update,
+                    upsert=upsert,
+                    collation=kwargs.get("collation"),
+                )
+            )
+
+    async def replace_one(
+        self,
+        filter: Mapping[str, Any],
+        replacement: Mapping[str, Any],
+        upsert: bool = False,
+        **kwargs: Any,
+    ) -> UpdateResult:
+        """Replace a single document matching the filter."""
+        try:
+            return await self._get_query_collection().replace_one(
+                filter, replacement, upsert=upsert, **kwargs
+            )
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.REPLACE,
+                    filter=filter,
+                    replacement=replacement,
+                    upsert=upsert,
+                    collation=kwargs.get("collation"),
+                )
+            )
+
+    async def delete_one(
+        self, filter: Mapping[str, Any], **kwargs: Any
+    ) -> DeleteResult:
+        """Delete a single document in the collection."""
+        try:
+            return await self._get_query_collection().delete_one(filter, **kwargs)
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.DELETE,
+                    filter=filter,
+                    collation=kwargs.get("collation"),
+                )
+            )
+
+    async def delete_many(
+        self, filter: Mapping[str, Any], **kwargs: Any
+    ) -> DeleteResult:
+        """Delete documents in the collection."""
+        try:
+            return await self._get_query_collection().delete_many(filter, **kwargs)
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.DELETE,
+                    filter=filter,
+                    collation=kwargs.get("collation"),
+                )
+            )
+
+    async def find_one_and_delete(
+        self, filter: Mapping[str, Any], *args: Any, **kwargs: Any
+    ) -> _DocumentType:
+        """Find a single document and delete it, returning the document."""
+        try:
+            return await self._get_query_collection().find_one_and_delete(
+                filter, *args, **kwargs
+            )
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.DELETE,
+                    filter=filter,
+                    collation=kwargs.get("collation"),
+                )
+            )
+
+    async def find_one_and_replace(
+        self,
+        filter: Mapping[str, Any],
+        replacement: Mapping[str, Any],
+        projection: Optional[Union[Mapping[str, Any], Iterable[str]]] = None,
+        sort: Optional[Any] = None,
+        upsert: bool = False,
+        **kwargs: Any,
+    ) -> _DocumentType:
+        """Find a single document and replace it, returning either the original or the replaced document."""
+        try:
+            return await self._get_query_collection().find_one_and_replace(
+                filter,
+                replacement,
+                projection=projection,
+                sort=sort,
+                upsert=upsert,
+                **kwargs,
+            )
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.REPLACE,
+                    filter=filter,
+                    replacement=replacement,
+                    upsert=upsert,
+                    collation=kwargs.get("collation"),
+                )
+            )
+
+    async def find_one_and_update(
+        self,
+        filter: Mapping[str, Any],
+        update: Union[Mapping[str, Any], _Pipeline],
+        projection: Optional[Union[Mapping[str, Any], Iterable[str]]] = None,
+        sort: Optional[Any] = None,
+        upsert: bool = False,
+        **kwargs: Any,
+    ) -> _DocumentType:
+        """Find a single document and update it, returning either the original or the updated document."""
+        try:
+            return await self._get_query_collection().find_one_and_update(
+                filter,
+                update,
+                projection=projection,
+                sort=sort,
+                upsert=upsert,
+                **kwargs,
+            )
+        finally:
+            await self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.UPDATE,
+                    filter=filter,
+                    update=update,
+                    upsert=upsert,
+                    collation=kwargs.get("collation"),
+                )
+            )
+
+    async def drop(self, *args: Any, **kwargs: Any) -> None:
+        """Drop this collection."""
+        # Override the drop function, such that we can clear the cache
+        await self._cache_backend.clear()
+
+        return await self._get_query_collection().drop(*args, **kwargs)
@@ -0,0 +1,101 @@
+"""Async Mongo database class with cache."""
+from typing import Any, Dict, Optional
+
+from pymongo.asynchronous.database import AsyncDatabase
+
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.ValueCodec import ValueCodec
+from cache_backend.CacheBackend import CacheBackend
+from pymongo_wrappers.AsyncMongoCollectionWithCache import (
+    AsyncMongoCollectionWithCache,
+)
+from pymongo_wrappers.CacheFunctions import DEFAULT_CACHE_FUNCTIONS
+from pymongo_wrappers.DefaultCachingBehavior import DefaultCachingBehavior
+
+
+class AsyncMongoDatabaseWithCache(AsyncDatabase):
+    """
+    Async Mongo database class with cache.
+    """
+
+    _cache_backend: CacheBackend = CacheBackend.IN_MEMORY
+    _functions_to_cache = None
+    _collections_created = None
+    _cache_cleanup_cycle_time = None
+    _max_num_items = 1000
+    _max_item_size = 1 * 10**6
+    _max_total_bytes = None
+    _value_codec = None
+    _compression_threshold = 4096
+    _ttl = 0
+    _cleanup_strategy = CleanupStrategy.LRU
+    _lfu_aging_interval = None
+    _single_flight_timeout = 10
+    _cache_backend_options = None
+    _default_caching_behavior = None
+
+    def __init__(
+        self,
+        *args,
+        cache_backend: CacheBackend = CacheBackend.IN_MEMORY,
+        functions_to_cache=None,
+        cache_cleanup_cycle_time: Optional[float] = None,
+        max_num_items: int = 1000,
+        max_item_size: int = 1 * 10**6,
+        ttl: int = 0,
+        default_caching_behavior: bool = DefaultCachingBehavior.CACHE_ALL,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        single_flight_timeout: Optional[float] = 10,
+        cache_backend_options: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self._cache_backend = cache_backend
+        if functions_to_cache is None:
+            self._functions_to_cache = DEFAULT_CACHE_FUNCTIONS
+        else:
+            self._functions_to_cache = functions_to_cache
+        self._collections_created = {}
+        self._cache_cleanup_cycle_time = cache_cleanup_cycle_time
+        self._max_num_items = max_num_items
+        self._max_item_size = max_item_size
+        self._ttl = ttl
+        self._default_caching_behavior = default_caching_behavior
+        self._cleanup_strategy = cleanup_strategy
+        self._lfu_aging_interval = lfu_aging_interval
+        self._max_total_bytes = max_total_bytes
+        self._value_codec = value_codec
+        self._compression_threshold = compression_threshold
+        self._single_flight_timeout = single_flight_timeout
+        self._cache_backend_options = cache_backend_options
+
+    def __getitem__(self, item):
+        # Collections are only created on the event loop, which does not switch tasks here, so no lock is needed
+        if item in self._collections_created:
+            return self._collections_created[item]
+
+        coll = AsyncMongoCollectionWithCache(
+            self,
+            item,
+            cache_backend=self._cache_backend,
+            functions_to_cache=self._functions_to_cache,
+            cache_cleanup_cycle_time=self._cache_cleanup_cycle_time,
+            max_num_items=self._max_num_items,
+            max_item_size=self._max_item_size,
+            ttl=self._ttl,
+            default_caching_behavior=self._default_caching_behavior,
+            cleanup_strategy=self._cleanup_strategy,
+            lfu_aging_interval=self._lfu_aging_interval,
+            max_total_bytes=self._max_total_bytes,
+            value_codec=self._value_codec,
+            compression_threshold=self._compression_threshold,
+            single_flight_timeout=self._single_flight_timeout,
+            cache_backend_options=self._cache_backend_options,
+        )
+        self._collections_created[item] = coll
+
+        return coll
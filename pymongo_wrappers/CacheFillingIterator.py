@@ -0,0 +1,114 @@
+"""Iterator over a cursor, which fills the cache while the results are consumed."""
+import time
+from typing import Any, Callable, Iterator, List, Optional
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.ValueSize import get_value_size
+from cache_backend.base.CacheBackendBase import CacheBackendBase
+
+
+class CacheFillingIterator:
+    """
+    Iterator over a cursor, which fills the cache while the results are consumed.
+
+    Every document is passed to the caller as soon as the cursor returns it and is additionally collected in a
+    pending cache entry. The entry is stored in the cache only after the cursor is exhausted. It is abandoned if
+    the caller stops early, the cursor raises an error or the collected documents exceed the maximum item size.
+    The execution time of the entry only covers the time spent in the cursor, not the time spent by the caller.
+    """
+
+    _cursor: Any = None
+    _cache_backend: CacheBackendBase = None
+    _query_info: QueryInfo = None
+    _max_item_size: int = 0
+    _ttl: Optional[int] = None
+    _documents: Optional[List[Any]] = None
+    _size: int = 0
+    _execution_time_ns: int = 0
+    _decode_document: Optional[Callable[[Any], Any]] = None
+
+    def __init__(
+        self,
+        cursor: Iterator[Any],
+        cache_backend: CacheBackendBase,
+        query_info: QueryInfo,
+        max_item_size: int,
+        ttl: Optional[int] = None,
+        execution_time_ns: int = 0,
+        decode_document: Optional[Callable[[Any], Any]] = None,
+    ):
+        """
+        :param cursor: The cursor to iterate.
+        :param cache_backend: The cache backend, which receives the result.
+        :param query_info: The key of the result.
+        :param max_item_size: The maximum size of the result in bytes, larger results are not cached, 0 means unlimited.
+        :param ttl: The time to live of the result in seconds, None uses the TTL of the backend.
+        :param execution_time_ns: The time, which was spent to create the cursor, in nanoseconds.
+        :param decode_document: Converts the cached form of a document into the one returned to the caller.
+        """
+        self._cursor = cursor
+        self._cache_backend = cache_backend
+        self._query_info = query_info
+        self._max_item_size = max_item_size
+        self._ttl = ttl
+        self._documents = []
+        self._size = 0
+        self._execution_time_ns = execution_time_ns
+        self._decode_document = decode_document
+
+    def __iter__(self) -> "CacheFillingIterator":
+        return self
+
+    def __next__(self) -> Any:
+        if self._cursor is None:
+            raise StopIteration
+
+        start = time.time_ns()
+        try:
+            document = next(self._cursor)
+        except StopIteration:
+            self._execution_time_ns += time.time_ns() - start
+            self._commit()
+            raise
+        except BaseException:
+            self.close()
+            raise
+        self._execution_time_ns += time.time_ns() - start
+
+        if self._documents is not None:
+            self._size += get_value_size(document)
+            if self._max_item_size and self._size > self._max_item_size:
+                # The result is too large for the cache, stop collecting it
+                self._documents = None
+            else:
+                self._documents.append(document)
+        if self._decode_document is not None:
+            return self._decode_document(document)
+        return document
+
+    def _commit(self) -> None:
+        """Store the collected result in the cache."""
+        documents = self._documents
+        self._documents = None
+        self._cursor = None
+        if documents is not None:
+            self._cache_backend.set(
+                self._query_info,
+                documents,
+                self._execution_time_ns / 1e6,
+                ttl=self._ttl,
+            )
+
+    def close(self) -> None:
+        """Abandon the pending cache entry and close the cursor."""
+        self._documents = None
+        cursor = self._cursor
+        self._cursor = None
+        if cursor is not None and hasattr(cursor, "close"):
+            cursor.close()
+
+    def __enter__(self) -> "CacheFillingIterator":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
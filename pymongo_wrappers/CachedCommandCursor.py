@@ -0,0 +1,81 @@
+"""Command cursor for cached aggregations, which supports the API of the pymongo CommandCursor."""
+from typing import Any, Iterator, List, Optional
+
+
+class CachedCommandCursor:
+    """
+    Command cursor for cached aggregations, which supports the API of the pymongo CommandCursor.
+
+    The aggregation is executed when it is created, like a pymongo CommandCursor. The cursor iterates over the
+    cached result or, in case of a miss, over the result, which is filling the cache.
+    """
+
+    _iterator: Iterator[Any] = None
+    _alive: bool = True
+
+    def __init__(self, iterator: Iterator[Any]):
+        """
+        :param iterator: The iterator over the result of the aggregation.
+        """
+        self._iterator = iterator
+        self._alive = True
+
+    @property
+    def alive(self) -> bool:
+        """Does this cursor have the potential to return more data?"""
+        return self._alive
+
+    def batch_size(self, batch_size: int) -> "CachedCommandCursor":
+        """Set the batch size of the cursor, which has no influence on the cached result."""
+        if not isinstance(batch_size, int):
+            raise TypeError("batch_size must be an integer")
+        if batch_size < 0:
+            raise ValueError("batch_size must be >= 0")
+        return self
+
+    def close(self) -> None:
+        """Close the cursor, a pending cache fill of the cursor is abandoned."""
+        self._alive = False
+        if hasattr(self._iterator, "close"):
+            self._iterator.close()
+
+    def __iter__(self) -> "CachedCommandCursor":
+        return self
+
+    def __next__(self) -> Any:
+        if not self._alive:
+            raise StopIteration
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._alive = False
+            raise
+
+    next = __next__
+
+    def try_next(self) -> Optional[Any]:
+        """Get the next document or None if there are no more documents."""
+        try:
+            return next(self)
+        except StopIteration:
+            return None
+
+    def to_list(self, length: Optional[int] = None) -> List[Any]:
+        """
+        Get the remaining documents of the cursor as a list.
+        :param length: The maximum number of documents to return, None returns all remaining documents.
+        """
+        if length is not None and length < 1:
+            raise ValueError("to_list() length must be greater than 0")
+        documents = []
+        for document in self:
+            documents.append(document)
+            if length is not None and len(documents) >= length:
+                break
+        return documents
+
+    def __enter__(self) -> "CachedCommandCursor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,233 @@
+"""Cursor for cached find queries, which supports the chaining API of the pymongo Cursor."""
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from pymongo.errors import InvalidOperation
+
+
+class CachedCursor:
+    """
+    Cursor for cached find queries, which supports the chaining API of the pymongo Cursor.
+
+    The modifiers only record the arguments of the query. The cache key is built on the first iteration, so
+    chained calls like find(...).sort(...).limit(...) are cached exactly like find(..., sort=..., limit=...).
+    Like a pymongo Cursor, the query cannot be modified after the iteration has started. Attributes, which are not
+    supported, are forwarded to a regular pymongo Cursor with the same arguments, which does not use the cache.
+    """
+
+    _collection: Collection = None
+    _filter: Optional[Mapping[str, Any]] = None
+    _args: Tuple[Any, ...] = ()
+    _kwargs: Dict[str, Any] = None
+    _cache_ttl: Optional[int] = None
+    _iterator: Optional[Iterator[Any]] = None
+    _alive: bool = True
+    # Set by a slice, whose stop equals its start, an empty cursor returns no documents without a query
+    _empty: bool = False
+
+    def __init__(
+        self,
+        collection: Collection,
+        filter: Optional[Mapping[str, Any]] = None,
+        *args: Any,
+        cache_ttl: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        """
+        :param collection: The MongoCollectionWithCache, which executes the query.
+        :param filter: A query expression for MongoDb.
+        :param cache_ttl: The time to live of the cached result in seconds, overrides the TTL of the collection.
+        """
+        self._collection = collection
+        self._filter = filter
+        self._args = args
+        self._kwargs = dict(kwargs)
+        self._cache_ttl = cache_ttl
+        self._iterator = None
+        self._alive = True
+
+    @property
+    def collection(self) -> Collection:
+        """The collection of the cursor."""
+        return self._collection
+
+    @property
+    def alive(self) -> bool:
+        """Does this cursor have the potential to return more data?"""
+        return self._alive
+
+    def _check_okay_to_chain(self) -> None:
+        """Check if the query can still be modified."""
+        if self._iterator is not None:
+            raise InvalidOperation("cannot set options after executing query")
+
+    def _set_option(self, name: str, value: Any) -> "CachedCursor":
+        """Set an argument of the query and return the cursor for chaining."""
+        self._check_okay_to_chain()
+        self._kwargs[name] = value
+        return self
+
+    def sort(
+        self,
+        key_or_list: Union[str, List[Tuple[str, Any]], Mapping[str, Any]],
+        direction: Optional[Union[int, str]] = None,
+    ) -> "CachedCursor":
+        """Sort the results of the query."""
+        if isinstance(key_or_list, str):
+            sort = [(key_or_list, ASCENDING if direction is None else direction)]
+        elif isinstance(key_or_list, Mapping):
+            sort = list(key_or_list.items())
+        else:
+            sort = [tuple(item) for item in key_or_list]
+        return self._set_option("sort", sort)
+
+    def limit(self, limit: int) -> "CachedCursor":
+        """Limit the number of results of the query."""
+        if not isinstance(limit, int):
+            raise TypeError("limit must be an integer")
+        self._set_option("limit", limit)
+        self._empty = False
+        return self
+
+    def skip(self, skip: int) -> "CachedCursor":
+        """Skip the first results of the query."""
+        if not isinstance(skip, int):
+            raise TypeError("skip must be an integer")
+        if skip < 0:
+            raise ValueError("skip must be >= 0")
+        return self._set_option("skip", skip)
+
+    def batch_size(self, batch_size: int) -> "CachedCursor":
+        """Set the batch size of the query, which has no influence on the cached result."""
+        if not isinstance(batch_size, int):
+            raise TypeError("batch_size must be an integer")
+        if batch_size < 0:
+            raise ValueError("batch_size must be >= 0")
+        return self._set_option("batch_size", batch_size)
+
+    def max_time_ms(self, max_time_ms: Optional[int]) -> "CachedCursor":
+        """Set the time limit of the query, which has no influence on the cached result."""
+        return self._set_option("max_time_ms", max_time_ms)
+
+    def hint(self, index: Any) -> "CachedCursor":
+        """Set the index, which is used by the query."""
+        return self._set_option("hint", index)
+
+    def collation(self, collation: Optional[Mapping[str, Any]]) -> "CachedCursor":
+        """Set the collation of the query."""
+        return self._set_option("collation", collation)
+
+    def comment(self, comment: Any) -> "CachedCursor":
+        """Set the comment of the query, which has no influence on the cached result."""
+        return self._set_option("comment", comment)
+
+    def rewind(self) -> "CachedCursor":
+        """Rewind the cursor, such that the query is executed again on the next iteration."""
+        self.close()
+        self._iterator = None
+        self._alive = True
+        return self
+
+    def clone(self) -> "CachedCursor":
+        """Get a clone of the cursor, which has not been iterated yet."""
+        clone = CachedCursor(
+            self._collection,
+            self._filter,
+            *self._args,
+            cache_ttl=self._cache_ttl,
+            **self._kwargs,
+        )
+        clone._empty = self._empty
+        return clone
+
+    def close(self) -> None:
+        """Close the cursor, a pending cache fill of the cursor is abandoned."""
+        self._alive = False
+        if self._iterator is not None and hasattr(self._iterator, "close"):
+            self._iterator.close()
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        """Get a single document or apply skip and limit for a slice."""
+        self._check_okay_to_chain()
+        if isinstance(index, slice):
+            # Like the pymongo Cursor, a slice replaces the skip and the limit of the cursor
+            if index.step is not None:
+                raise IndexError("Cursor instances do not support slice steps")
+            skip = 0
+            if index.start is not None:
+                if index.start < 0:
+                    raise IndexError("Cursor instances do not support negative indices")
+                skip = index.start
+            limit = 0
+            if index.stop is not None:
+                limit = index.stop - skip
+                if limit < 0:
+                    raise IndexError(
+                        f"stop index must be greater than start index for slice {index!r}"
+                    )
+            self.skip(skip)
+            self.limit(limit)
+            self._empty = index.stop is not None and limit == 0
+            return self
+
+        if isinstance(index, int):
+            if index < 0:
+                raise IndexError("Cursor instances do not support negative indices")
+            clone = self.clone()
+            clone.skip(index + self._kwargs.get("skip", 0))
+            clone.limit(-1)
+            for document in clone:
+                return document
+            raise IndexError("no such item for Cursor instance")
+
+        raise TypeError(f"index {index!r} cannot be applied to Cursor instances")
+
+    def __iter__(self) -> "CachedCursor":
+        return self
+
+    def __next__(self) -> Any:
+        if self._iterator is None:
+            if self._empty:
+                self._alive = False
+            if not self._alive:
+                raise StopIteration
+            self._iterator = self._collection._find_with_cache(
+                self._filter, self._args, self._kwargs, self._cache_ttl
+            )
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._alive = False
+            raise
+
+    next = __next__
+
+    def to_list(self, length: Optional[int] = None) -> List[Any]:
+        """
+        Get the remaining documents of the cursor as a list.
+        :param length: The maximum number of documents to return, None returns all remaining documents.
+        """
+        if length is not None and length < 1:
+            raise ValueError("to_list() length must be greater than 0")
+        documents = []
+        for document in self:
+            documents.append(document)
+            if length is not None and len(documents) >= length:
+                break
+        return documents
+
+    def __enter__(self) -> "CachedCursor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward unsupported attributes to a regular pymongo Cursor, which does not use the cache."""
+        if name.startswith("_"):
+            raise AttributeError(name)
+        cursor = Collection(self._collection.database, self._collection.name).find(
+            self._filter, *self._args, **self._kwargs
+        )
+        return getattr(cursor, name)
@@ -0,0 +1,114 @@
+"""Mixin with the parts of the collections with cache, which do not depend on the driver being sync or async."""
+from typing import Any, Mapping, Optional, Sequence, Tuple
+
+from pymongo.typings import _Pipeline
+
+from cache_backend.QueryInfo import QueryInfo
+from pymongo_wrappers.CacheFunctions import CacheFunctions
+from pymongo_wrappers.DefaultCachingBehavior import DefaultCachingBehavior
+
+# Arguments of the query functions, which do not influence the result and are therefore not part of the cache key
+_ARGUMENTS_NOT_IN_KEY = {
+    "session",
+    "comment",
+    "batch_size",
+    "batchSize",
+    "max_time_ms",
+    "maxTimeMS",
+}
+# Arguments of find and find_one, which have their own field in the QueryInfo
+_FIND_ARGUMENTS_IN_QUERY_INFO = {"projection", "sort", "skip", "limit"}
+
+
+class CollectionCachingMixin:
+    """
+    Mixin with the parts of the collections with cache, which do not depend on the driver being sync or async.
+    It decides which calls are cached and builds their cache keys.
+    """
+
+    _functions_to_cache = None
+    _default_caching_behavior = None
+
+    def _check_caching_allowed(self, function_enum: CacheFunctions) -> bool:
+        """Checks if caching is allowed for the given function and due to the default caching behavior."""
+        if (
+            function_enum in self._functions_to_cache
+            and self._default_caching_behavior == DefaultCachingBehavior.CACHE_ALL
+        ):
+            return True
+        elif self._default_caching_behavior == DefaultCachingBehavior.CACHE_ALL:
+            # CACHE_ALL only caches the functions in the functions_to_cache list
+            return False
+        elif self._default_caching_behavior == DefaultCachingBehavior.CACHE_NONE:
+            return False
+        else:
+            raise ValueError(
+                f"Invalid default caching behavior: {self._default_caching_behavior}"
+            )
+
+    @staticmethod
+    def _get_query_options(kwargs: Mapping[str, Any]) -> Optional[dict]:
+        """Get the arguments, which influence the result of a query, without the ones that have no influence."""
+        options = {
+            name: value
+            for name, value in kwargs.items()
+            if name not in _ARGUMENTS_NOT_IN_KEY and value is not None
+        }
+        return options or None
+
+    def _get_find_query_info(
+        self,
+        function_enum: CacheFunctions,
+        filter: Optional[Any],
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+    ) -> QueryInfo:
+        """Create the query info for a find or find_one call, which covers all arguments that influence the result."""
+        options = self._get_query_options(
+            {
+                name: value
+                for name, value in kwargs.items()
+                if name not in _FIND_ARGUMENTS_IN_QUERY_INFO
+            }
+        )
+        if args:
+            options = {**(options or {}), "args": list(args)}
+
+        return QueryInfo(
+            function_enum.name,
+            query=filter,
+            projection=kwargs.get("projection", None),
+            sort=kwargs.get("sort", None),
+            skip=kwargs.get("skip", None),
+            limit=kwargs.get("limit", None),
+            options=options,
+        )
+
+    def _get_database_and_collection_from_modifying_pipeline(
+        self,
+        pipeline: _Pipeline,
+    ) -> Optional[Tuple[str, str]]:
+        """Get the database and collection from the modifying pipeline."""
+
+        if len(pipeline) == 0:
+            return None
+
+        # $out and $merge must be the last stages in the pipeline
+        last_stage = pipeline[-1]
+        if last_stage is None:
+            return None
+
+        if "$out" in last_stage:
+            last_stage = last_stage["$out"]
+        elif "$merge" in last_stage and "into" in last_stage["$merge"]:
+            last_stage = last_stage["$merge"]["into"]
+        else:
+            return None
+
+        if isinstance(last_stage, str):
+            return self.database.name, last_stage
+
+        if isinstance(last_stage, dict) and "db" in last_stage and "coll" in last_stage:
+            return last_stage["db"], last_stage["coll"]
+
+        return None
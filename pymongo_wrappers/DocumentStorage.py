@@ -0,0 +1,14 @@
+"""Contains an enum for the storage of the cached documents of a collection."""
+
+from enum import Enum
+
+
+class DocumentStorage(Enum):
+    """Enum for the storage of the cached documents of a collection."""
+
+    # The documents are decoded when they are read from the database and cached as python objects
+    DECODED = 1
+    # The documents are cached as RawBSONDocument and decoded when the caller reads them
+    RAW_BSON = 2
+    # The cached RawBSONDocuments are returned, they decode their fields on first access and keep them decoded
+    RAW_BSON_LAZY = 3
@@ -1,12 +1,25 @@
 """Mongo client class with cache."""
 from threading import Lock
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 
 from pymongo import MongoClient
+from pymongo.database import Database
 
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
 from cache_backend.CacheBackend import CacheBackend
+from cache_backend.codec.ValueCodec import ValueCodec
+from cache_backend.change_stream.ChangeEventSource import (
+    ChangeEventSource,
+    MongoChangeEventSource,
+)
+from cache_backend.change_stream.ChangeStreamListener import ChangeStreamListener
+from cache_backend.change_stream.ResumeTokenStore import (
+    ResumeTokenStore,
+    MongoResumeTokenStore,
+)
 from pymongo_wrappers.CacheFunctions import DEFAULT_CACHE_FUNCTIONS
 from pymongo_wrappers.DefaultCachingBehavior import DefaultCachingBehavior
+from pymongo_wrappers.DocumentStorage import DocumentStorage
 from pymongo_wrappers.MongoDatabaseWithCache import MongoDatabaseWithCache
 
 _client_dict_lock: Lock = Lock()
@@ -22,6 +35,23 @@ class MongoClientWithCache(MongoClient):
     :param max_item_size: The maximum size of an item in the cache.
     :param ttl: The time to live for an item in the cache.
     :param default_caching_behavior: The default caching behavior to use (def.
+    :param cleanup_strategy: The strategy which decides which entries are removed from a full cache.
+    :param lfu_aging_interval: The interval in seconds in which the access counts are halved for the LFU strategy.
+    :param max_total_bytes: The maximum size of all items in the cache of a collection in bytes.
+    :param single_flight_timeout: The maximum time in seconds, which concurrent misses of the same query wait for
+        the first one to fill the cache, before they query the database themselves. None waits forever.
+    :param stream_cache_fill: If true, find and aggregate return the documents of a miss while they are read from the
+        cursor, the result is cached once the cursor is exhausted. Concurrent misses are not coalesced then.
+    :param document_storage: How the documents of cached results are stored, see DocumentStorage.
+    :param value_codec: The codec, which compresses cached values, None stores the values as they are.
+    :param compression_threshold: The minimum size of a value in bytes, which is compressed by the value codec.
+    :param cache_backend_options: Further arguments of the cache backend, e.g. the database_path of the SQLite backend.
+    :param change_stream_invalidation: If true, a change stream is opened for every used database, such that
+        writes of other processes invalidate the cache as well. Requires a replica set or sharded cluster.
+    :param change_event_source_factory: Creates the source of the change events for a database, defaults to a
+        MongoDB change stream of the database.
+    :param resume_token_store: The store for the resume tokens of the change streams, defaults to a collection in
+        the cache database.
     """
 
     _cache_backend: CacheBackend = CacheBackend.IN_MEMORY
@@ -30,8 +60,21 @@ class MongoClientWithCache(MongoClient):
     _cache_cleanup_cycle_time = None
     _max_num_items = 1000
     _max_item_size = 1 * 10**6
+    _max_total_bytes = None
     _ttl = 0
+    _cleanup_strategy = CleanupStrategy.LRU
+    _lfu_aging_interval = None
+    _single_flight_timeout = 10
+    _stream_cache_fill = False
+    _document_storage = DocumentStorage.DECODED
+    _value_codec = None
+    _compression_threshold = 4096
+    _cache_backend_options = None
     _default_caching_behavior = DefaultCachingBehavior.CACHE_ALL
+    _change_stream_invalidation = False
+    _change_event_source_factory = None
+    _resume_token_store = None
+    _change_stream_listeners: Dict[str, ChangeStreamListener] = None
 
     def __init__(
         self,
@@ -43,6 +86,20 @@ class MongoClientWithCache(MongoClient):
         max_item_size: int = 1 * 10**6,
         ttl: int = 0,
         default_caching_behavior: bool = DefaultCachingBehavior.CACHE_ALL,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        single_flight_timeout: Optional[float] = 10,
+        stream_cache_fill: bool = False,
+        document_storage: DocumentStorage = DocumentStorage.DECODED,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        cache_backend_options: Optional[Dict[str, Any]] = None,
+        change_stream_invalidation: bool = False,
+        change_event_source_factory: Optional[
+            Callable[[Database], ChangeEventSource]
+        ] = None,
+        resume_token_store: Optional[ResumeTokenStore] = None,
         **kwargs
     ):
         super().__init__(*args, **kwargs)
@@ -58,6 +115,25 @@ class MongoClientWithCache(MongoClient):
         self._max_item_size = max_item_size
         self._ttl = ttl
         self._default_caching_behavior = default_caching_behavior
+        self._cleanup_strategy = cleanup_strategy
+        self._lfu_aging_interval = lfu_aging_interval
+        self._max_total_bytes = max_total_bytes
+        self._single_flight_timeout = single_flight_timeout
+        self._stream_cache_fill = stream_cache_fill
+        self._document_storage = document_storage
+        self._value_codec = value_codec
+        self._compression_threshold = compression_threshold
+        self._cache_backend_options = cache_backend_options
+        self._change_stream_invalidation = change_stream_invalidation
+        self._change_stream_listeners = {}
+        if change_event_source_factory is None:
+            self._change_event_source_factory = MongoChangeEventSource
+        else:
+            self._change_event_source_factory = change_event_source_factory
+        if resume_token_store is None and change_stream_invalidation:
+            self._resume_token_store = MongoResumeTokenStore(self)
+        else:
+            self._resume_token_store = resume_token_store
 
     def __getitem__(self, name: str) -> MongoDatabaseWithCache:
         with _client_dict_lock:
@@ -74,8 +150,39 @@ class MongoClientWithCache(MongoClient):
                 max_item_size=self._max_item_size,
                 ttl=self._ttl,
                 default_caching_behavior=self._default_caching_behavior,
+                cleanup_strategy=self._cleanup_strategy,
+                lfu_aging_interval=self._lfu_aging_interval,
+                max_total_bytes=self._max_total_bytes,
+                single_flight_timeout=self._single_flight_timeout,
+                stream_cache_fill=self._stream_cache_fill,
+                document_storage=self._document_storage,
+                value_codec=self._value_codec,
+                compression_threshold=self._compression_threshold,
+                cache_backend_options=self._cache_backend_options,
             )
 
             self._database_created[name] = db
 
+            if self._change_stream_invalidation:
+                self._start_change_stream_listener(db)
+
             return db
+
+    def _start_change_stream_listener(self, db: Database) -> None:
+        """Start listening for the change events of the database."""
+        listener = ChangeStreamListener(
+            db.name,
+            self._change_event_source_factory(db),
+            resume_token_store=self._resume_token_store,
+        )
+        listener.start()
+        self._change_stream_listeners[db.name] = listener
+
+    def close(self) -> None:
+        """Stop the change stream listeners and close the client."""
+        with _client_dict_lock:
+            listeners = self._change_stream_listeners or {}
+            self._change_stream_listeners = {}
+        for listener in listeners.values():
+            listener.stop()
+        super().close()
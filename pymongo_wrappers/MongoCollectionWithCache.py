@@ -1,9 +1,21 @@
 """Collection class, which derives from the pymongo Collection class, and
-   adds a cache to speed up queries, which are requested multiple times.
+adds a cache to speed up queries, which are requested multiple times.
 """
+
 import time
-from typing import Any, Optional, Mapping, List, Iterable, Union, Sequence, Tuple
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Mapping,
+    List,
+    Iterable,
+    Iterator,
+    Union,
+    Sequence,
+)
 
+import bson
 from bson.raw_bson import RawBSONDocument
 from pymongo import ReturnDocument
 from pymongo.client_session import ClientSession
@@ -21,19 +33,39 @@ from pymongo.typings import _Pipeline, _CollationIn
 
 from cache_backend.CacheBackend import CacheBackend, CacheBackendFactory
 from cache_backend.QueryInfo import QueryInfo
+from cache_backend.SingleFlight import SingleFlight
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
 from cache_backend.base.CacheBackendBase import CacheBackendBase
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.CodecStats import CodecStats
+from cache_backend.codec.ValueCodec import ValueCodec
+from pymongo_wrappers.CacheFillingIterator import CacheFillingIterator
+from pymongo_wrappers.CachedCommandCursor import CachedCommandCursor
+from pymongo_wrappers.CachedCursor import CachedCursor
 from pymongo_wrappers.CacheFunctions import DEFAULT_CACHE_FUNCTIONS, CacheFunctions
+from pymongo_wrappers.CollectionCachingMixin import CollectionCachingMixin
 from pymongo_wrappers.DefaultCachingBehavior import DefaultCachingBehavior
+from pymongo_wrappers.DocumentStorage import DocumentStorage
 
 
-class MongoCollectionWithCache(Collection):
+class MongoCollectionWithCache(CollectionCachingMixin, Collection):
     _cache_backend: CacheBackendBase = None
     _functions_to_cache = None
     _cache_cleanup_cycle_time = None
     _max_num_items = 1000
     _max_item_size = 1 * 10**6
+    _max_total_bytes = None
     _ttl = 0
+    _cleanup_strategy = CleanupStrategy.LRU
+    _lfu_aging_interval = None
+    _single_flight_timeout = 10
+    _stream_cache_fill = False
+    _document_storage = DocumentStorage.DECODED
+    _value_codec = None
+    _compression_threshold = 4096
+    _cache_backend_options = None
     _default_caching_behavior = None
+    _single_flight: SingleFlight = None
 
     def __init__(
         self,
@@ -45,6 +77,15 @@ class MongoCollectionWithCache(Collection):
         max_item_size: int = 1 * 10**6,
         ttl: int = 0,
         default_caching_behavior: bool = DefaultCachingBehavior.CACHE_ALL,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        single_flight_timeout: Optional[float] = 10,
+        stream_cache_fill: bool = False,
+        document_storage: DocumentStorage = DocumentStorage.DECODED,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        cache_backend_options: Optional[Dict[str, Any]] = None,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
@@ -54,6 +95,12 @@ class MongoCollectionWithCache(Collection):
             max_num_items=max_num_items,
             max_item_size=max_item_size,
             ttl=ttl,
+            cleanup_strategy=cleanup_strategy,
+            lfu_aging_interval=lfu_aging_interval,
+            max_total_bytes=max_total_bytes,
+            value_codec=value_codec,
+            compression_threshold=compression_threshold,
+            **(cache_backend_options or {}),
         )
 
         if functions_to_cache is None:
@@ -66,35 +113,58 @@ class MongoCollectionWithCache(Collection):
         self._max_item_size = max_item_size
         self._ttl = ttl
         self._default_caching_behavior = default_caching_behavior
+        self._cleanup_strategy = cleanup_strategy
+        self._lfu_aging_interval = lfu_aging_interval
+        self._max_total_bytes = max_total_bytes
+        self._single_flight_timeout = single_flight_timeout
+        self._stream_cache_fill = stream_cache_fill
+        self._document_storage = document_storage
+        self._value_codec = value_codec
+        self._compression_threshold = compression_threshold
+        self._cache_backend_options = cache_backend_options
+        # Concurrent misses of the same query wait for the first one instead of querying the database as well
+        self._single_flight = SingleFlight(timeout=single_flight_timeout)
+
+    def get_cache_codec_stats(self) -> CodecStats:
+        """Get the compression ratio and the time spent for encoding and decoding the cached values of the collection."""
+        return self._cache_backend.get_codec_stats()
+
+    def _get_query_collection(self) -> Collection:
+        """Get a regular collection, which executes the queries, whose results are cached."""
+        if self._document_storage == DocumentStorage.DECODED:
+            return Collection(self.database, self.name)
+        codec_options = self.database.codec_options.with_options(
+            document_class=RawBSONDocument
+        )
+        return Collection(self.database, self.name, codec_options=codec_options)
 
-    def _check_caching_allowed(self, function_enum: CacheFunctions) -> bool:
-        """Checks if caching is allowed for the given function and due to the default caching behavior."""
-        if (
-            function_enum in self._functions_to_cache
-            and self._default_caching_behavior == DefaultCachingBehavior.CACHE_ALL
+    def _decode_document(self, document: Any) -> Any:
+        """Decode a cached raw document into the document class of the database, if the storage requires it."""
+        if self._document_storage != DocumentStorage.RAW_BSON or not isinstance(
+            document, RawBSONDocument
         ):
-            return True
-        elif self._default_caching_behavior == DefaultCachingBehavior.CACHE_ALL:
-            # CACHE_ALL only caches the functions in the functions_to_cache list
-            return False
-        elif self._default_caching_behavior == DefaultCachingBehavior.CACHE_NONE:
-            return False
-        else:
-            raise ValueError(
-                f"Invalid default caching behavior: {self._default_caching_behavior}"
-            )
+            return document
+        return bson.decode(document.raw, codec_options=self.database.codec_options)
+
+    def _decode_documents(self, documents: Iterable[Any]) -> Iterator[Any]:
+        """Get an iterator, which decodes the cached documents when the caller reads them."""
+        if self._document_storage != DocumentStorage.RAW_BSON:
+            return iter(documents)
+        return map(self._decode_document, documents)
 
     def find_one(
         self,
         filter: Optional[Any] = None,
         *args: Any,
         cache_always: bool = False,
+        cache_ttl: Optional[int] = None,
         **kwargs: Any,
     ):
         """
         Find a single document in the collection.
         :param cache_always: If true, the query will always be cached, even
             if the function is not in the functions to cache or the default caching behavior is CACHE_NONE.
+        :param cache_ttl: The time to live of the cached result in seconds, overrides the TTL of the collection.
         :param filter: A query expression for MongoDb.
         """
         # If the find_one function is not in the functions to cache, then just return the result of the regular find_one
@@ -104,39 +174,35 @@ class MongoCollectionWithCache(Collection):
                 filter, *args, **kwargs
             )
 
-        query_info = QueryInfo(
-            function_enum.name,
-            query=filter,
-            sort=kwargs.get("sort", None),
-            skip=kwargs.get("skip", None),
-            limit=kwargs.get("limit", None),
-            pipeline=kwargs.get("pipeline", None),
-        )
+        query_info = self._get_find_query_info(function_enum, filter, args, kwargs)
 
         item = self._cache_backend.get(query_info)
         if item is not None:
-            return item
-        else:
+            return self._decode_document(item)
+
+        def execute():
             start = time.time_ns()
-            result = Collection(self.database, self.name).find_one(
-                filter, *args, **kwargs
-            )
+            result = self._get_query_collection().find_one(filter, *args, **kwargs)
             end = time.time_ns()
             exec_in_ms = (end - start) / 1e6
-            self._cache_backend.set(query_info, result, exec_in_ms)
+            self._cache_backend.set(query_info, result, exec_in_ms, ttl=cache_ttl)
             return result
 
+        return self._decode_document(self._single_flight.do(query_info, execute))
+
     def find(
         self,
         filter: Optional[dict] = None,
         *args: Any,
         cache_always: bool = False,
+        cache_ttl: Optional[int] = None,
         **kwargs: Any,
     ):
         """
         Query the collection.
         :param cache_always: If true, the query will always be cached, even
             if the function is not in the functions to cache or the default caching behavior is CACHE_NONE.
+        :param cache_ttl: The time to live of the cached result in seconds, overrides the TTL of the collection.
         :param filter: A query expression for MongoDb.
         """
         # If the find function is not in the functions to cache, then just return the result of the regular find
@@ -144,25 +210,47 @@ class MongoCollectionWithCache(Collection):
         if not self._check_caching_allowed(function_enum) and not cache_always:
             return Collection(self.database, self.name).find(filter, *args, **kwargs)
 
-        query_info = QueryInfo(
-            function_enum.name,
-            query=filter,
-            sort=kwargs.get("sort", None),
-            skip=kwargs.get("skip", None),
-            limit=kwargs.get("limit", None),
-            pipeline=kwargs.get("pipeline", None),
+        # The cursor builds the cache key on its first iteration, such that chained modifiers are part of it
+        return CachedCursor(self, filter, *args, cache_ttl=cache_ttl, **kwargs)
+
+    def _find_with_cache(
+        self,
+        filter: Optional[Any],
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+        cache_ttl: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """Get an iterator over the result of the find query, which is taken from the cache if possible."""
+        query_info = self._get_find_query_info(
+            CacheFunctions.FIND, filter, args, kwargs
         )
 
         item = self._cache_backend.get(query_info)
         if item is not None:
-            return iter(item)
-        else:
+            return self._decode_documents(item)
+
+        if self._stream_cache_fill:
             start = time.time_ns()
-            result = Collection(self.database, self.name).find(filter, *args, **kwargs)
+            cursor = self._get_query_collection().find(filter, *args, **kwargs)
+            return CacheFillingIterator(
+                cursor,
+                self._cache_backend,
+                query_info,
+                self._max_item_size,
+                ttl=cache_ttl,
+                execution_time_ns=time.time_ns() - start,
+                decode_document=self._decode_document,
+            )
+
+        def execute():
+            start = time.time_ns()
+            result = list(self._get_query_collection().find(filter, *args, **kwargs))
             end = time.time_ns()
             exec_in_ms = (end - start) / 1e6
-            self._cache_backend.set(query_info, list(result), exec_in_ms)
-            return iter(self._cache_backend.get(query_info))
+            self._cache_backend.set(query_info, result, exec_in_ms, ttl=cache_ttl)
+            return result
+
+        return self._decode_documents(self._single_flight.do(query_info, execute))
 
     def aggregate(
         self,
@@ -171,12 +259,14 @@ class MongoCollectionWithCache(Collection):
         let: Optional[Mapping[str, Any]] = None,
         comment: Optional[Any] = None,
         cache_always: bool = False,
+        cache_ttl: Optional[int] = None,
         **kwargs: Any,
     ) -> CommandCursor:
         """
         Perform an aggregation using the aggregation framework on this collection.
         :param cache_always: If true, the query will always be cached, even
             if the function is not in the functions to cache or the default caching behavior is CACHE_NONE.
+        :param cache_ttl: The time to live of the cached result in seconds, overrides the TTL of the collection.
         """
         function_enum = CacheFunctions.AGGREGATE
         # Always check if the pipeline is modifying any collection
@@ -186,7 +276,9 @@ class MongoCollectionWithCache(Collection):
         # Clear the cache if the pipeline is modifying any collection
         if modifying_pipe_info is not None:
             database, coll = modifying_pipe_info
-            self._cache_backend.clear_cache_for_database_and_collection(database, coll)
+            self._cache_backend.clear_cache_for_database_and_collection(
+                collection_name=coll, database_name=database
+            )
 
         # If the aggregate function is not in the functions to cache, then just return the result of the regular
         # aggregate. Also, if the pipeline is modifying any collection, then we cannot cache the result or retrieve
@@ -200,19 +292,49 @@ class MongoCollectionWithCache(Collection):
 
         # If the pipeline is modifying any collection, then we cannot cache the result
         # or retrieve the result from the cache
-        pipeline_query_info = QueryInfo(function_enum.name, pipeline=pipeline)
+        pipeline_query_info = QueryInfo(
+            function_enum.name,
+            pipeline=pipeline,
+            options=self._get_query_options({"let": let, **kwargs}),
+        )
         item = self._cache_backend.get(pipeline_query_info)
         if item is not None:
-            return iter(item)
-        else:
+            return CachedCommandCursor(self._decode_documents(item))
+
+        if self._stream_cache_fill:
             start = time.time_ns()
-            result = Collection(self.database, self.name).aggregate(
+            cursor = self._get_query_collection().aggregate(
                 pipeline, session=session, let=let, comment=comment, **kwargs
             )
+            return CachedCommandCursor(
+                CacheFillingIterator(
+                    cursor,
+                    self._cache_backend,
+                    pipeline_query_info,
+                    self._max_item_size,
+                    ttl=cache_ttl,
+                    execution_time_ns=time.time_ns() - start,
+                    decode_document=self._decode_document,
+                )
+            )
+
+        def execute():
+            start = time.time_ns()
+            result = list(
+                self._get_query_collection().aggregate(
+                    pipeline, session=session, let=let, comment=comment, **kwargs
+                )
+            )
             end = time.time_ns()
             exec_in_ms = (end - start) / 1e6
-            self._cache_backend.set(pipeline_query_info, list(result), exec_in_ms)
-            return iter(self._cache_backend.get(pipeline_query_info))
+            self._cache_backend.set(
+                pipeline_query_info, result, exec_in_ms, ttl=cache_ttl
+            )
+            return result
+
+        return CachedCommandCursor(
+            self._decode_documents(self._single_flight.do(pipeline_query_info, execute))
+        )
 
     def insert_many(
         self,
@@ -224,16 +346,22 @@ class MongoCollectionWithCache(Collection):
     ) -> InsertManyResult:
         """Insert an iterable of documents."""
 
-        # Override the insert_many function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).insert_many(
-            documents,
-            ordered=ordered,
-            bypass_document_validation=bypass_document_validation,
-            session=session,
-            comment=comment,
-        )
+        # Inserted documents get their _id assigned by pymongo, so they must be materialized first
+        documents = list(documents)
+
+        # Override the insert_many function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).insert_many(
+                documents,
+                ordered=ordered,
+                bypass_document_validation=bypass_document_validation,
+                session=session,
+                comment=comment,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(WriteOperation.INSERT, documents=documents)
+            )
 
     def insert_one(
         self,
@@ -244,15 +372,18 @@ class MongoCollectionWithCache(Collection):
     ) -> InsertOneResult:
         """Insert a single document."""
 
-        # Override the insert_one function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).insert_one(
-            document,
-            bypass_document_validation=bypass_document_validation,
-            session=session,
-            comment=comment,
-        )
+        # Override the insert_one function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).insert_one(
+                document,
+                bypass_document_validation=bypass_document_validation,
+                session=session,
+                comment=comment,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(WriteOperation.INSERT, documents=[document])
+            )
 
     def update_one(
         self,
@@ -269,21 +400,30 @@ class MongoCollectionWithCache(Collection):
     ) -> UpdateResult:
         """Update a single document matching the filter."""
 
-        # Override the update_one function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).update_one(
-            filter,
-            update,
-            upsert=upsert,
-            bypass_document_validation=bypass_document_validation,
-            collation=collation,
-            array_filters=array_filters,
-            hint=hint,
-            session=session,
-            let=let,
-            comment=comment,
-        )
+        # Override the update_one function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).update_one(
+                filter,
+                update,
+                upsert=upsert,
+                bypass_document_validation=bypass_document_validation,
+                collation=collation,
+                array_filters=array_filters,
+                hint=hint,
+                session=session,
+                let=let,
+                comment=comment,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.UPDATE,
+                    filter=filter,
+                    update=update,
+                    upsert=upsert,
+                    collation=collation,
+                )
+            )
 
     def update_many(
         self,
@@ -300,21 +440,30 @@ class MongoCollectionWithCache(Collection):
     ) -> UpdateResult:
         """Update one or more documents that match the filter."""
 
-        # Override the update_many function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).update_many(
-            filter,
-            update,
-            upsert=upsert,
-            array_filters=array_filters,
-            bypass_document_validation=bypass_document_validation,
-            collation=collation,
-            hint=hint,
-            session=session,
-            let=let,
-            comment=comment,
-        )
+        # Override the update_many function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).update_many(
+                filter,
+                update,
+                upsert=upsert,
+                array_filters=array_filters,
+                bypass_document_validation=bypass_document_validation,
+                collation=collation,
+                hint=hint,
+                session=session,
+                let=let,
+                comment=comment,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.UPDATE,
+                    filter=filter,
+                    update=update,
+                    upsert=upsert,
+                    collation=collation,
+                )
+            )
 
     def delete_many(
         self,
@@ -327,17 +476,20 @@ class MongoCollectionWithCache(Collection):
     ) -> DeleteResult:
         """Delete documents in the collection."""
 
-        # Override the delete_many function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).delete_many(
-            filter,
-            collation=collation,
-            hint=hint,
-            session=session,
-            let=let,
-            comment=comment,
-        )
+        # Override the delete_many function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).delete_many(
+                filter,
+                collation=collation,
+                hint=hint,
+                session=session,
+                let=let,
+                comment=comment,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(WriteOperation.DELETE, filter=filter, collation=collation)
+            )
 
     def delete_one(
         self,
@@ -350,17 +502,20 @@ class MongoCollectionWithCache(Collection):
     ) -> DeleteResult:
         """Delete a single document in the collection."""
 
-        # Override the delete_one function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).delete_one(
-            filter,
-            collation=collation,
-            hint=hint,
-            session=session,
-            let=let,
-            comment=comment,
-        )
+        # Override the delete_one function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).delete_one(
+                filter,
+                collation=collation,
+                hint=hint,
+                session=session,
+                let=let,
+                comment=comment,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(WriteOperation.DELETE, filter=filter, collation=collation)
+            )
 
     def drop(
         self,
@@ -388,19 +543,26 @@ class MongoCollectionWithCache(Collection):
         **kwargs: Any,
     ) -> _DocumentType:
         """Find a single document and delete it, returning the document."""
-        # Override the find_one_and_delete function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).find_one_and_delete(
-            filter,
-            projection=projection,
-            sort=sort,
-            hint=hint,
-            session=session,
-            let=let,
-            comment=comment,
-            **kwargs,
-        )
+        # Override the find_one_and_delete function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).find_one_and_delete(
+                filter,
+                projection=projection,
+                sort=sort,
+                hint=hint,
+                session=session,
+                let=let,
+                comment=comment,
+                **kwargs,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.DELETE,
+                    filter=filter,
+                    collation=kwargs.get("collation"),
+                )
+            )
 
     def find_one_and_replace(
         self,
@@ -417,22 +579,31 @@ class MongoCollectionWithCache(Collection):
         **kwargs: Any,
     ) -> _DocumentType:
         """Find a single document and replace it, returning either the original or the replaced document."""
-        # Override the find_one_and_replace function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).find_one_and_replace(
-            filter,
-            replacement,
-            projection=projection,
-            sort=sort,
-            upsert=upsert,
-            return_document=return_document,
-            hint=hint,
-            session=session,
-            let=let,
-            comment=comment,
-            **kwargs,
-        )
+        # Override the find_one_and_replace function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).find_one_and_replace(
+                filter,
+                replacement,
+                projection=projection,
+                sort=sort,
+                upsert=upsert,
+                return_document=return_document,
+                hint=hint,
+                session=session,
+                let=let,
+                comment=comment,
+                **kwargs,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.REPLACE,
+                    filter=filter,
+                    replacement=replacement,
+                    upsert=upsert,
+                    collation=kwargs.get("collation"),
+                )
+            )
 
     def find_one_and_update(
         self,
@@ -450,23 +621,32 @@ class MongoCollectionWithCache(Collection):
         **kwargs: Any,
     ) -> _DocumentType:
         """Find a single document and update it, returning either the original or the updated document."""
-        # Override the find_one_and_update function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).find_one_and_update(
-            filter,
-            update,
-            projection=projection,
-            sort=sort,
-            upsert=upsert,
-            return_document=return_document,
-            array_filters=array_filters,
-            hint=hint,
-            session=session,
-            let=let,
-            comment=comment,
-            **kwargs,
-        )
+        # Override the find_one_and_update function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).find_one_and_update(
+                filter,
+                update,
+                projection=projection,
+                sort=sort,
+                upsert=upsert,
+                return_document=return_document,
+                array_filters=array_filters,
+                hint=hint,
+                session=session,
+                let=let,
+                comment=comment,
+                **kwargs,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.UPDATE,
+                    filter=filter,
+                    update=update,
+                    upsert=upsert,
+                    collation=kwargs.get("collation"),
+                )
+            )
 
     def replace_one(
         self,
@@ -481,46 +661,26 @@ class MongoCollectionWithCache(Collection):
         comment: Optional[Any] = None,
     ) -> UpdateResult:
         """Replace a single document matching the filter."""
-        # Override the replace_one function, such that we can clear the cache
-        self._cache_backend.clear()
-
-        return Collection(self.database, self.name).replace_one(
-            filter,
-            replacement,
-            upsert=upsert,
-            bypass_document_validation=bypass_document_validation,
-            collation=collation,
-            hint=hint,
-            session=session,
-            let=let,
-            comment=comment,
-        )
-
-    def _get_database_and_collection_from_modifying_pipeline(
-        self,
-        pipeline: _Pipeline,
-    ) -> Optional[Tuple[str, str]]:
-        """Get the database and collection from the modifying pipeline."""
-
-        if len(pipeline) == 0:
-            return None
-
-        # $out and $merge must be the last stages in the pipeline
-        last_stage = pipeline[-1]
-        if last_stage is None:
-            return None
-
-        if "$out" in last_stage:
-            last_stage = last_stage["$out"]
-        elif "$merge" in last_stage and "into" in last_stage["$merge"]:
-            last_stage = last_stage["$merge"]["into"]
-        else:
-            return None
-
-        if isinstance(last_stage, str):
-            return self.database.name, last_stage
-
-        if isinstance(last_stage, dict) and "db" in last_stage and "coll" in last_stage:
-            return last_stage["db"], last_stage["coll"]
-
-        return None
+        # Override the replace_one function, such that we can invalidate the affected cache entries
+        try:
+            return Collection(self.database, self.name).replace_one(
+                filter,
+                replacement,
+                upsert=upsert,
+                bypass_document_validation=bypass_document_validation,
+                collation=collation,
+                hint=hint,
+                session=session,
+                let=let,
+                comment=comment,
+            )
+        finally:
+            self._cache_backend.invalidate(
+                WriteInfo(
+                    WriteOperation.REPLACE,
+                    filter=filter,
+                    replacement=replacement,
+                    upsert=upsert,
+                    collation=collation,
+                )
+            )
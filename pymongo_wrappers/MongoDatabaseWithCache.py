@@ -1,12 +1,15 @@
 """Mongo database class with cache."""
 from threading import Lock
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from pymongo.database import Database
 
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
 from cache_backend.CacheBackend import CacheBackend
+from cache_backend.codec.ValueCodec import ValueCodec
 from pymongo_wrappers.CacheFunctions import DEFAULT_CACHE_FUNCTIONS
 from pymongo_wrappers.DefaultCachingBehavior import DefaultCachingBehavior
+from pymongo_wrappers.DocumentStorage import DocumentStorage
 from pymongo_wrappers.MongoCollectionWithCache import MongoCollectionWithCache
 
 _database_dict_lock: Lock = Lock()
@@ -23,7 +26,16 @@ class MongoDatabaseWithCache(Database):
     _cache_cleanup_cycle_time = None
     _max_num_items = 1000
     _max_item_size = 1 * 10**6
+    _max_total_bytes = None
     _ttl = 0
+    _cleanup_strategy = CleanupStrategy.LRU
+    _lfu_aging_interval = None
+    _single_flight_timeout = 10
+    _stream_cache_fill = False
+    _document_storage = DocumentStorage.DECODED
+    _value_codec = None
+    _compression_threshold = 4096
+    _cache_backend_options = None
     _default_caching_behavior = None
 
     def __init__(
@@ -36,6 +48,15 @@ class MongoDatabaseWithCache(Database):
         max_item_size: int = 1 * 10**6,
         ttl: int = 0,
         default_caching_behavior: bool = DefaultCachingBehavior.CACHE_ALL,
+        cleanup_strategy: CleanupStrategy = CleanupStrategy.LRU,
+        lfu_aging_interval: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        single_flight_timeout: Optional[float] = 10,
+        stream_cache_fill: bool = False,
+        document_storage: DocumentStorage = DocumentStorage.DECODED,
+        value_codec: Optional[ValueCodec] = None,
+        compression_threshold: int = 4096,
+        cache_backend_options: Optional[Dict[str, Any]] = None,
         **kwargs
     ):
         super().__init__(*args, **kwargs)
@@ -50,6 +71,15 @@ class MongoDatabaseWithCache(Database):
         self._max_item_size = max_item_size
         self._ttl = ttl
         self._default_caching_behavior = default_caching_behavior
+        self._cleanup_strategy = cleanup_strategy
+        self._lfu_aging_interval = lfu_aging_interval
+        self._max_total_bytes = max_total_bytes
+        self._single_flight_timeout = single_flight_timeout
+        self._stream_cache_fill = stream_cache_fill
+        self._document_storage = document_storage
+        self._value_codec = value_codec
+        self._compression_threshold = compression_threshold
+        self._cache_backend_options = cache_backend_options
 
     def __getitem__(self, item):
         # Lock the dictionary to prevent concurrent access
@@ -67,6 +97,15 @@ class MongoDatabaseWithCache(Database):
                 max_item_size=self._max_item_size,
                 ttl=self._ttl,
                 default_caching_behavior=self._default_caching_behavior,
+                cleanup_strategy=self._cleanup_strategy,
+                lfu_aging_interval=self._lfu_aging_interval,
+                max_total_bytes=self._max_total_bytes,
+                single_flight_timeout=self._single_flight_timeout,
+                stream_cache_fill=self._stream_cache_fill,
+                document_storage=self._document_storage,
+                value_codec=self._value_codec,
+                compression_threshold=self._compression_threshold,
+                cache_backend_options=self._cache_backend_options,
             )
             self._collections_created[item] = coll
 
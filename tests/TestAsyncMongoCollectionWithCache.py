@@ -0,0 +1,133 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import InvalidOperation
+
+from cache_backend.CacheBackend import CacheBackend
+from cache_backend.codec.ValueCodec import ZlibCodec
+from pymongo_wrappers.AsyncMongoClientWithCache import AsyncMongoClientWithCache
+from pymongo_wrappers.AsyncMongoCollectionWithCache import (
+    AsyncMongoCollectionWithCache,
+)
+
+
+def _cursor(documents):
+    """Create a mocked async cursor, which returns the documents."""
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=list(documents))
+    return cursor
+
+
+class TestAsyncMongoCollectionWithCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = AsyncMongoClientWithCache(cache_backend=CacheBackend.IN_MEMORY)
+        self.collection = self.client["test"]["test_async"]
+        await self.collection._cache_backend.clear()
+        self.documents = [{"_id": i, "name": "a"} for i in range(3)]
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def test_wrappers_are_created_once(self):
+        self.assertIsInstance(self.collection, AsyncMongoCollectionWithCache)
+        self.assertIs(self.client["test"]["test_async"], self.collection)
+        self.assertIs(self.client.test.test_async, self.collection)
+
+    @patch.object(AsyncCollection, "find_one", new_callable=AsyncMock)
+    async def test_values_are_compressed_by_the_value_codec(self, mock_find_one):
+        client = AsyncMongoClientWithCache(
+            cache_backend=CacheBackend.IN_MEMORY,
+            value_codec=ZlibCodec(),
+            compression_threshold=0,
+        )
+        collection = client["test"]["test_async_codec"]
+        await collection._cache_backend.clear()
+        mock_find_one.return_value = {"_id": 1, "name": "a" * 1000}
+
+        self.assertEqual(
+            await collection.find_one({"_id": 1}), {"_id": 1, "name": "a" * 1000}
+        )
+        self.assertEqual(
+            await collection.find_one({"_id": 1}), {"_id": 1, "name": "a" * 1000}
+        )
+        mock_find_one.assert_awaited_once()
+        self.assertEqual(collection.get_cache_codec_stats().encoded_values, 1)
+        await client.close()
+
+    @patch.object(AsyncCollection, "find_one", new_callable=AsyncMock)
+    async def test_concurrent_misses_query_the_database_once(self, mock_find_one):
+        release = asyncio.Event()
+
+        async def find_one(*args, **kwargs):
+            await release.wait()
+            return self.documents[0]
+
+        mock_find_one.side_effect = find_one
+        calls = [
+            asyncio.create_task(self.collection.find_one({"_id": 0})) for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        self.assertEqual(await asyncio.gather(*calls), [self.documents[0]] * 3)
+
+        self.assertEqual(await self.collection.find_one({"_id": 0}), self.documents[0])
+        mock_find_one.assert_called_once_with({"_id": 0})
+
+    @patch.object(AsyncCollection, "find")
+    async def test_chained_modifiers_are_part_of_the_cache_key(self, mock_find):
+        mock_find.side_effect = lambda *args, **kwargs: _cursor(self.documents[:2])
+
+        cursor = self.collection.find({"name": "a"}).sort("_id", -1).limit(2)
+        self.assertEqual(await cursor.to_list(), self.documents[:2])
+        mock_find.assert_called_once_with({"name": "a"}, sort=[("_id", -1)], limit=2)
+        with self.assertRaises(InvalidOperation):
+            cursor.skip(1)
+
+        # The same query with keyword arguments hits the cache
+        result = [
+            document
+            async for document in self.collection.find(
+                {"name": "a"}, sort=[("_id", -1)], limit=2
+            )
+        ]
+        self.assertEqual(result, self.documents[:2])
+        mock_find.assert_called_once()
+
+    @patch.object(AsyncCollection, "aggregate", new_callable=AsyncMock)
+    async def test_aggregate_is_cached(self, mock_aggregate):
+        mock_aggregate.side_effect = lambda *args, **kwargs: _cursor(self.documents)
+        pipeline = [{"$match": {"name": "a"}}]
+
+        cursor = await self.collection.aggregate(pipeline)
+        self.assertEqual(await cursor.to_list(1), self.documents[:1])
+        self.assertEqual(await cursor.to_list(), self.documents[1:])
+        self.assertFalse(cursor.alive)
+
+        cursor = await self.collection.aggregate(pipeline)
+        self.assertEqual(await cursor.to_list(), self.documents)
+        mock_aggregate.assert_called_once()
+
+    @patch.object(AsyncCollection, "insert_one", new_callable=AsyncMock)
+    @patch.object(AsyncCollection, "find_one", new_callable=AsyncMock)
+    async def test_writes_invalidate_affected_entries(
+        self, mock_find_one, mock_insert_one
+    ):
+        mock_find_one.return_value = None
+        self.assertIsNone(await self.collection.find_one({"name": "b"}))
+        mock_find_one.return_value = self.documents[0]
+        await self.collection.find_one({"name": "a"})
+
+        await self.collection.insert_one({"_id": 5, "name": "b"})
+        mock_insert_one.assert_called_once()
+
+        # Only the entry, whose result can be changed by the insert, is removed
+        await self.collection.find_one({"name": "a"})
+        self.assertEqual(mock_find_one.call_count, 2)
+        await self.collection.find_one({"name": "b"})
+        self.assertEqual(mock_find_one.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from pymongo import AsyncMongoClient
+from pymongo.errors import PyMongoError
+
+from cache_backend.Constants import (
+    ACCESS_COUNT,
+    ENTRY_ID,
+    NUM_CHUNKS,
+    QUERY_INFO,
+    SIZE,
+    VALUE,
+    VALUE_CODEC,
+)
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.ValueCodec import ZlibCodec
+from cache_backend.mongodb_backend.AsyncMongoDBCacheBackend import (
+    AsyncMongoDBCacheBackend,
+)
+
+
+def _collection():
+    """Create a mocked async collection, whose finds return no documents."""
+    collection = MagicMock()
+    collection.with_options.return_value = collection
+    for method in (
+        "find_one",
+        "find_one_and_delete",
+        "insert_one",
+        "insert_many",
+        "delete_many",
+        "update_many",
+        "bulk_write",
+        "create_indexes",
+    ):
+        setattr(collection, method, AsyncMock())
+    collection.find_one.return_value = None
+    # Like unacknowledged deletes, which do not report the number of deleted documents
+    collection.delete_many.return_value = MagicMock(acknowledged=False)
+    collection.count_documents = AsyncMock(return_value=0)
+    collection.aggregate = AsyncMock(return_value=_cursor([]))
+    collection.find.return_value = _cursor([])
+    return collection
+
+
+def _cursor(documents):
+    """Create a mocked async cursor, which returns the documents."""
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=list(documents))
+    return cursor
+
+
+class TestAsyncMongoDBCacheBackend(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = AsyncMongoClient()
+        self.cache_collection = _collection()
+        self.chunk_collection = _collection()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def _create_backend(self, **kwargs) -> AsyncMongoDBCacheBackend:
+        with patch.object(
+            AsyncMongoDBCacheBackend,
+            "_get_cache_collection",
+            return_value=self.cache_collection,
+        ), patch.object(
+            AsyncMongoDBCacheBackend,
+            "_get_chunk_collection",
+            return_value=self.chunk_collection,
+        ):
+            return AsyncMongoDBCacheBackend(
+                self.client["test"]["test_async_mongodb"],
+                access_flush_interval=60,
+                **kwargs,
+            )
+
+    async def test_failed_index_creation_is_repeated(self):
+        backend = self._create_backend()
+        self.cache_collection.create_indexes.side_effect = [PyMongoError(), None]
+        key = QueryInfo("FIND", query={"i": 1})
+
+        with self.assertRaises(PyMongoError):
+            await backend.get(key)
+        self.assertFalse(backend._indexes_created)
+
+        self.assertIsNone(await backend.get(key))
+        self.assertTrue(backend._indexes_created)
+        self.assertEqual(self.cache_collection.create_indexes.await_count, 2)
+        self.chunk_collection.create_indexes.assert_awaited_once()
+
+    async def test_max_total_bytes_evicts_entries_by_the_strategy(self):
+        backend = self._create_backend(
+            max_total_bytes=1000, cleanup_strategy=CleanupStrategy.LFU
+        )
+        self.cache_collection.count_documents.return_value = 1
+        self.cache_collection.aggregate.return_value = _cursor([{"total": 1000}])
+        self.cache_collection.find.return_value = _cursor([{"_id": 1, SIZE: 1000}])
+        self.cache_collection.delete_many.return_value = MagicMock(
+            acknowledged=True, deleted_count=1
+        )
+
+        await backend.set(QueryInfo("FIND", query={"i": 1}), [{"i": 1}], 1)
+
+        self.cache_collection.find.return_value.sort.assert_called_once_with(
+            ACCESS_COUNT, 1
+        )
+        self.cache_collection.delete_many.assert_awaited_once_with(
+            {"_id": {"$in": [1]}}
+        )
+        self.cache_collection.insert_one.assert_awaited_once()
+        self.assertEqual(backend._num_entries, 1)
+        self.assertLess(backend._num_bytes, 1000)
+
+    async def test_entries_removed_by_another_process_resync_the_counters(self):
+        backend = self._create_backend()
+        backend._num_entries, backend._num_bytes = 5, 100
+        backend._last_counter_sync = 0
+        self.cache_collection.delete_many.return_value = MagicMock(
+            acknowledged=True, deleted_count=1
+        )
+
+        await backend._delete_entries([{"_id": 1, SIZE: 10}, {"_id": 2, SIZE: 20}])
+
+        self.assertEqual((backend._num_entries, backend._num_bytes), (4, 100))
+        self.assertIsNone(backend._last_counter_sync)
+
+    async def test_values_are_written_with_the_value_codec(self):
+        backend = self._create_backend(value_codec=ZlibCodec(), compression_threshold=0)
+        key = QueryInfo("FIND", query={"i": 1})
+        value = [{"name": "a" * 1000}]
+
+        await backend.set(key, value, 1)
+
+        entry = self.cache_collection.insert_one.call_args.args[0]
+        self.assertEqual(entry[VALUE_CODEC], "zlib")
+        self.assertIsInstance(entry[VALUE], bytes)
+        self.cache_collection.find_one.return_value = {
+            "_id": 1,
+            VALUE: entry[VALUE],
+            VALUE_CODEC: entry[VALUE_CODEC],
+        }
+        self.assertEqual(await backend.get(key), value)
+
+    @patch("cache_backend.mongodb_backend.MongoDBCacheDocuments._CHUNK_SIZE", 16)
+    async def test_chunks_are_deleted_if_their_entry_cannot_be_inserted(self):
+        backend = self._create_backend(chunk_threshold=0)
+        self.cache_collection.insert_one.side_effect = PyMongoError()
+
+        await backend.set(QueryInfo("FIND", query={"i": 1}), [{"i": 1}], 1)
+
+        chunks = self.chunk_collection.insert_many.call_args.args[0]
+        entry = self.cache_collection.insert_one.call_args.args[0]
+        self.assertEqual(entry[NUM_CHUNKS], len(chunks))
+        self.chunk_collection.delete_many.assert_awaited_once_with(
+            {ENTRY_ID: {"$in": [entry["_id"]]}}
+        )
+        self.assertEqual(backend._num_entries, 0)
+
+    async def test_access_stats_are_flushed_while_the_cache_is_idle(self):
+        backend = self._create_backend(cache_cleanup_cycle_time=0.01)
+        self.cache_collection.find_one.return_value = {"_id": 1, VALUE: [{"i": 1}]}
+
+        self.assertEqual(
+            await backend.get(QueryInfo("FIND", query={"i": 1})), [{"i": 1}]
+        )
+        self.cache_collection.bulk_write.assert_not_awaited()
+
+        await asyncio.sleep(0.05)
+        self.cache_collection.bulk_write.assert_awaited_once()
+        self.assertEqual(backend._pending_accesses, {})
+
+    async def test_values_are_only_read_if_invalidation_needs_them(self):
+        backend = self._create_backend()
+        aggregate_entry = {
+            "_id": 1,
+            QUERY_INFO: QueryInfo("AGGREGATE", pipeline=[]).to_dict(),
+            SIZE: 10,
+        }
+        find_entry = {
+            "_id": 2,
+            QUERY_INFO: QueryInfo("FIND", query={"i": 1}).to_dict(),
+            SIZE: 10,
+        }
+        cursor = MagicMock()
+        cursor.__aiter__.return_value = [aggregate_entry, find_entry]
+        self.cache_collection.find.return_value = cursor
+        self.cache_collection.find_one.return_value = {"_id": 2, VALUE: [{"i": 1}]}
+
+        await backend.invalidate(WriteInfo(WriteOperation.DELETE, filter={"i": 7}))
+
+        self.assertNotIn(VALUE, self.cache_collection.find.call_args.args[1])
+        self.cache_collection.find_one.assert_awaited_once()
+        self.assertEqual(self.cache_collection.find_one.call_args.args[0], {"_id": 2})
+        self.cache_collection.delete_many.assert_awaited_once_with(
+            {"_id": {"$in": [1]}}
+        )
+
+    async def test_access_counts_are_halved_after_the_aging_interval(self):
+        backend = self._create_backend(
+            cleanup_strategy=CleanupStrategy.LFU, lfu_aging_interval=0
+        )
+
+        await backend.set(QueryInfo("FIND", query={"i": 1}), [{"i": 1}], 1)
+
+        self.cache_collection.update_many.assert_awaited_once()
+        self.assertEqual(
+            self.cache_collection.update_many.call_args.args[1][0]["$set"].keys(),
+            {ACCESS_COUNT},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
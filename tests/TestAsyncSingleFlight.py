@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+from cache_backend.AsyncSingleFlight import AsyncSingleFlight
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_execute_once(self):
+        single_flight = AsyncSingleFlight(timeout=5)
+        release = asyncio.Event()
+        executions = []
+
+        async def query():
+            executions.append(1)
+            await release.wait()
+            return [{"i": 1}]
+
+        calls = [asyncio.create_task(single_flight.do("key", query)) for _ in range(4)]
+        # Give the followers the time to join the execution of the leader
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*calls)
+
+        self.assertEqual(len(executions), 1)
+        self.assertTrue(all(result == [{"i": 1}] for result in results))
+
+    async def test_errors_are_propagated_to_waiting_callers(self):
+        single_flight = AsyncSingleFlight(timeout=5)
+        release = asyncio.Event()
+
+        async def query():
+            await release.wait()
+            raise ValueError("query failed")
+
+        calls = [asyncio.create_task(single_flight.do("key", query)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    async def test_waiting_callers_execute_when_the_leader_is_cancelled(self):
+        single_flight = AsyncSingleFlight(timeout=5)
+        executions = []
+
+        async def query():
+            executions.append(1)
+            if len(executions) == 1:
+                await asyncio.sleep(10)
+            return [{"i": 1}]
+
+        leader = asyncio.create_task(single_flight.do("key", query))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(single_flight.do("key", query))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        self.assertEqual(await follower, [{"i": 1}])
+        self.assertEqual(len(executions), 2)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+
+    async def test_waiting_callers_execute_after_the_timeout(self):
+        single_flight = AsyncSingleFlight(timeout=0.05)
+        release = asyncio.Event()
+
+        async def slow_query():
+            await release.wait()
+            return "slow"
+
+        async def query():
+            return "fast"
+
+        leader = asyncio.create_task(single_flight.do("key", slow_query))
+        await asyncio.sleep(0.01)
+        self.assertEqual(await single_flight.do("key", query), "fast")
+        release.set()
+        self.assertEqual(await leader, "slow")
+
+
+if __name__ == "__main__":
+    unittest.main()
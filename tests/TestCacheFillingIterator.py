@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch
+
+from pymongo import MongoClient
+from pymongo.collection import Collection
+
+from cache_backend.CacheBackend import CacheBackend
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.in_memory_backend.InMemoryCacheBackend import InMemoryCacheBackend
+from pymongo_wrappers.CacheFillingIterator import CacheFillingIterator
+from pymongo_wrappers.MongoClientWithCache import MongoClientWithCache
+
+
+class TestCacheFillingIterator(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient()
+        self.backend = InMemoryCacheBackend(
+            self.client["test"]["test"], cache_cleanup_cycle_time=None
+        )
+        self.key = QueryInfo("FIND", query={"i": {"$lt": 3}})
+        self.documents = [{"i": i} for i in range(3)]
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_result_is_cached_after_cursor_is_exhausted(self):
+        iterator = CacheFillingIterator(
+            iter(self.documents), self.backend, self.key, max_item_size=1000
+        )
+
+        self.assertEqual(next(iterator), {"i": 0})
+        self.assertIsNone(self.backend.get(self.key))
+        self.assertEqual(list(iterator), [{"i": 1}, {"i": 2}])
+        self.assertEqual(self.backend.get(self.key), self.documents)
+
+    def test_result_is_abandoned_if_caller_stops_early(self):
+        with CacheFillingIterator(
+            iter(self.documents), self.backend, self.key, max_item_size=1000
+        ) as iterator:
+            next(iterator)
+
+        self.assertEqual(list(iterator), [])
+        self.assertIsNone(self.backend.get(self.key))
+
+    def test_result_is_abandoned_if_it_exceeds_max_item_size(self):
+        iterator = CacheFillingIterator(
+            iter(self.documents), self.backend, self.key, max_item_size=30
+        )
+
+        self.assertEqual(list(iterator), self.documents)
+        self.assertIsNone(self.backend.get(self.key))
+
+    def test_max_item_size_zero_does_not_limit_the_result(self):
+        iterator = CacheFillingIterator(
+            iter(self.documents), self.backend, self.key, max_item_size=0
+        )
+
+        self.assertEqual(list(iterator), self.documents)
+        self.assertEqual(self.backend.get(self.key), self.documents)
+
+    @patch.object(Collection, "find")
+    def test_find_streams_results_of_a_miss(self, mock_find):
+        client = MongoClientWithCache(
+            cache_backend=CacheBackend.IN_MEMORY, stream_cache_fill=True
+        )
+        collection = client["test"]["test_stream"]
+        mock_find.return_value = iter(self.documents)
+
+        self.assertEqual(list(collection.find({"i": {"$lt": 3}})), self.documents)
+        self.assertEqual(list(collection.find({"i": {"$lt": 3}})), self.documents)
+        mock_find.assert_called_once()
+        client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+
+from cache_backend.CacheInvalidator import CacheInvalidator
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+
+
+class TestCacheInvalidator(unittest.TestCase):
+    def test_insert_affects_matching_queries_only(self):
+        write_info = WriteInfo(
+            WriteOperation.INSERT, documents=[{"_id": 3, "name": "a", "count": 5}]
+        )
+
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "a"}), [], write_info
+            )
+        )
+        self.assertFalse(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "b"}), [], write_info
+            )
+        )
+        self.assertFalse(
+            CacheInvalidator.is_affected(
+                QueryInfo(
+                    "AGGREGATE",
+                    pipeline=[{"$match": {"count": {"$gt": 10}}}, {"$count": "n"}],
+                ),
+                [{"n": 1}],
+                write_info,
+            )
+        )
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("AGGREGATE", pipeline=[{"$group": {"_id": "$name"}}]),
+                [],
+                write_info,
+            )
+        )
+
+    def test_insert_without_id_affects_queries_on_id(self):
+        write_info = WriteInfo(WriteOperation.INSERT, documents=[{"name": "a"}])
+
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND_ONE", query={"_id": 1}), None, write_info
+            )
+        )
+
+    def test_delete_affects_queries_containing_deleted_documents(self):
+        write_info = WriteInfo(WriteOperation.DELETE, filter={"_id": 1})
+        query_info = QueryInfo("FIND", query={"name": "a"})
+
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                query_info, [{"_id": 1, "name": "a"}], write_info
+            )
+        )
+        self.assertFalse(
+            CacheInvalidator.is_affected(
+                query_info, [{"_id": 2, "name": "a"}], write_info
+            )
+        )
+        # Deleting a document in front of the skipped documents shifts the result
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "a"}, skip=1),
+                [{"_id": 2, "name": "a"}],
+                write_info,
+            )
+        )
+        # The projection removes the _id, so the deleted document cannot be recognized
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "a"}, projection={"_id": 0}),
+                [{"name": "a"}],
+                write_info,
+            )
+        )
+
+    def test_update_affects_queries_on_updated_fields(self):
+        write_info = WriteInfo(
+            WriteOperation.UPDATE, filter={"_id": 1}, update={"$set": {"count": 2}}
+        )
+        result = [{"_id": 2, "name": "a", "count": 1}]
+
+        self.assertFalse(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "a"}), result, write_info
+            )
+        )
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"count": 1}), result, write_info
+            )
+        )
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "a"}, sort=[("count", 1)]),
+                result,
+                write_info,
+            )
+        )
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "a"}),
+                result,
+                WriteInfo(
+                    WriteOperation.UPDATE,
+                    filter={"_id": 1},
+                    update=[{"$set": {"name": "b"}}],
+                ),
+            )
+        )
+
+    def test_replace_checks_old_and_new_documents(self):
+        write_info = WriteInfo(
+            WriteOperation.REPLACE, filter={"_id": 1}, replacement={"name": "b"}
+        )
+
+        self.assertFalse(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "a"}),
+                [{"_id": 2, "name": "a"}],
+                write_info,
+            )
+        )
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "b"}), [], write_info
+            )
+        )
+        self.assertTrue(
+            CacheInvalidator.is_affected(
+                QueryInfo("FIND", query={"name": "a"}),
+                [{"_id": 1, "name": "a"}],
+                write_info,
+            )
+        )
+
+    def test_value_is_only_needed_if_the_decision_depends_on_it(self):
+        query_info = QueryInfo("FIND", query={"name": "a"})
+
+        self.assertFalse(
+            CacheInvalidator.needs_value(
+                query_info, WriteInfo(WriteOperation.INSERT, documents=[{"a": 1}])
+            )
+        )
+        self.assertTrue(
+            CacheInvalidator.needs_value(
+                query_info, WriteInfo(WriteOperation.DELETE, filter={"_id": 1})
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import patch
+
+from pymongo.collection import Collection
+from pymongo.errors import InvalidOperation
+
+from cache_backend.CacheBackend import CacheBackend
+from pymongo_wrappers.MongoClientWithCache import MongoClientWithCache
+
+
+class TestCachedCursor(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClientWithCache(cache_backend=CacheBackend.IN_MEMORY)
+        self.collection = self.client["test"]["test_cursor"]
+        self.collection._cache_backend.clear()
+        self.documents = [{"_id": i, "name": "a"} for i in range(3)]
+
+    def tearDown(self):
+        self.client.close()
+
+    @patch.object(Collection, "find")
+    def test_chained_modifiers_are_part_of_the_cache_key(self, mock_find):
+        mock_find.side_effect = lambda *args, **kwargs: iter(self.documents[:2])
+
+        cursor = self.collection.find({"name": "a"}).sort("_id", -1).limit(2)
+        self.assertEqual(cursor.to_list(), self.documents[:2])
+        mock_find.assert_called_once_with({"name": "a"}, sort=[("_id", -1)], limit=2)
+
+        # The same query with keyword arguments hits the cache
+        result = list(self.collection.find({"name": "a"}, sort=[("_id", -1)], limit=2))
+        self.assertEqual(result, self.documents[:2])
+        mock_find.assert_called_once()
+
+        # A window, which is not covered by the cached result, is a different query
+        list(self.collection.find({"name": "a"}).sort("_id", -1).skip(1).limit(2))
+        self.assertEqual(mock_find.call_count, 2)
+
+    @patch.object(Collection, "find")
+    def test_cursor_api(self, mock_find):
+        mock_find.side_effect = lambda *args, **kwargs: iter(self.documents)
+
+        cursor = self.collection.find({"name": "a"}).batch_size(10)
+        self.assertEqual(next(cursor), self.documents[0])
+        with self.assertRaises(InvalidOperation):
+            cursor.skip(1)
+        self.assertEqual(cursor.to_list(1), [self.documents[1]])
+        self.assertTrue(cursor.alive)
+
+        clone = cursor.clone()
+        self.assertEqual(list(cursor), [self.documents[2]])
+        self.assertFalse(cursor.alive)
+        self.assertEqual(list(cursor.rewind()), self.documents)
+        self.assertEqual(list(clone), self.documents)
+        mock_find.assert_called_once()
+
+    @patch.object(Collection, "find")
+    def test_slices_replace_the_skip_and_limit(self, mock_find):
+        mock_find.side_effect = lambda *args, **kwargs: iter(self.documents[1:3])
+
+        cursor = self.collection.find({"name": "a"}).skip(5)[1:3]
+        self.assertEqual(cursor.to_list(), self.documents[1:3])
+        mock_find.assert_called_once_with({"name": "a"}, skip=1, limit=2)
+
+    @patch.object(Collection, "find")
+    def test_empty_slices_return_no_documents(self, mock_find):
+        mock_find.side_effect = lambda *args, **kwargs: iter(self.documents)
+
+        cursor = self.collection.find({"name": "a"})[2:2]
+        self.assertEqual(list(cursor), [])
+        self.assertFalse(cursor.alive)
+        self.assertEqual(list(cursor.clone()), [])
+        mock_find.assert_not_called()
+
+        with self.assertRaises(IndexError):
+            self.collection.find({"name": "a"})[2:1]
+
+    @patch.object(Collection, "aggregate")
+    def test_aggregate_returns_command_cursor(self, mock_aggregate):
+        mock_aggregate.return_value = iter(self.documents)
+
+        cursor = self.collection.aggregate([{"$match": {"name": "a"}}]).batch_size(1)
+        self.assertEqual(cursor.try_next(), self.documents[0])
+        self.assertEqual(cursor.to_list(), self.documents[1:])
+        self.assertIsNone(cursor.try_next())
+        self.assertFalse(cursor.alive)
+
+        cursor = self.collection.aggregate([{"$match": {"name": "a"}}])
+        self.assertEqual(cursor.to_list(), self.documents)
+        mock_aggregate.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import queue
+import time
+import unittest
+from typing import Any, Dict, Mapping, Optional
+
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.change_stream.ChangeEventSource import ChangeEventSource
+from cache_backend.change_stream.ChangeStreamListener import ChangeStreamListener
+from cache_backend.change_stream.ResumeTokenStore import ResumeTokenStore
+from cache_backend.in_memory_backend.InMemoryCacheBackend import InMemoryCacheBackend
+
+
+class FakeChangeStream:
+    def __init__(self, events: "queue.Queue"):
+        self._events = events
+        self.resume_token = None
+
+    def try_next(self) -> Optional[Mapping[str, Any]]:
+        try:
+            event = self._events.get(timeout=0.01)
+        except queue.Empty:
+            return None
+        self.resume_token = event["_id"]
+        return event
+
+    def close(self):
+        pass
+
+
+class FakeChangeEventSource(ChangeEventSource):
+    def __init__(self):
+        self.events = queue.Queue()
+        self.resume_tokens = []
+        self.start_tokens = []
+        # Errors, which are raised by the next calls of open
+        self.errors = []
+
+    def open(
+        self,
+        resume_after: Optional[Mapping[str, Any]] = None,
+        start_after: Optional[Mapping[str, Any]] = None,
+    ) -> Any:
+        self.resume_tokens.append(resume_after)
+        self.start_tokens.append(start_after)
+        if self.errors:
+            raise self.errors.pop(0)
+        return FakeChangeStream(self.events)
+
+
+class DictResumeTokenStore(ResumeTokenStore):
+    def __init__(self):
+        self.tokens: Dict[str, Any] = {}
+
+    def load(self, database_name: str) -> Optional[Mapping[str, Any]]:
+        return self.tokens.get(database_name)
+
+    def save(
+        self, database_name: str, resume_token: Optional[Mapping[str, Any]]
+    ) -> None:
+        self.tokens[database_name] = resume_token
+
+
+class TestChangeStreamListener(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient()
+        self.backend = InMemoryCacheBackend(
+            self.client["test"]["test_change_stream"], cache_cleanup_cycle_time=None
+        )
+        self.backend.set(
+            QueryInfo("FIND", query={"name": "a"}), [{"_id": 1, "name": "a"}], 1.0
+        )
+        self.backend.set(
+            QueryInfo("FIND", query={"name": "b"}), [{"_id": 2, "name": "b"}], 1.0
+        )
+        self.event_source = FakeChangeEventSource()
+        self.token_store = DictResumeTokenStore()
+        self.listener = ChangeStreamListener(
+            "test",
+            self.event_source,
+            self.token_store,
+            token_save_interval=0,
+            retry_interval=0.01,
+        )
+
+    def tearDown(self):
+        self.listener.stop()
+        self.client.close()
+
+    def _wait_for_events(self):
+        deadline = time.monotonic() + 5
+        while not self.event_source.events.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Give the listener the chance to process the last event
+        time.sleep(0.1)
+
+    def _event(self, token: int, operation_type: str, **kwargs) -> Dict[str, Any]:
+        return {
+            "_id": {"_data": str(token)},
+            "operationType": operation_type,
+            "ns": {"db": "test", "coll": "test_change_stream"},
+            **kwargs,
+        }
+
+    def test_events_invalidate_affected_entries(self):
+        self.listener.start()
+        self.event_source.events.put(self._event(1, "delete", documentKey={"_id": 2}))
+        self.event_source.events.put(
+            self._event(
+                2,
+                "insert",
+                fullDocument={"_id": 3, "name": "c"},
+                documentKey={"_id": 3},
+            )
+        )
+        self._wait_for_events()
+
+        self.assertEqual(
+            list(self.backend.get_all().keys()),
+            [QueryInfo("FIND", query={"name": "a"})],
+        )
+        self.assertEqual(self.token_store.tokens["test"], {"_data": "2"})
+
+    def test_listener_resumes_after_saved_token(self):
+        self.token_store.tokens["test"] = {"_data": "41"}
+        self.listener.start()
+        self.event_source.events.put(self._event(42, "drop"))
+        self._wait_for_events()
+        self.listener.stop()
+
+        self.assertEqual(self.event_source.resume_tokens[0], {"_data": "41"})
+        self.assertEqual(self.backend.get_all(), {})
+        self.assertEqual(self.token_store.tokens["test"], {"_data": "42"})
+
+    def test_stream_is_started_after_an_invalidate_event(self):
+        self.listener.start()
+        self.event_source.events.put(
+            {"_id": {"_data": "7"}, "operationType": "invalidate"}
+        )
+        self.event_source.events.put(self._event(8, "drop"))
+        self._wait_for_events()
+        self.listener.stop()
+
+        self.assertEqual(self.event_source.resume_tokens[:2], [None, None])
+        self.assertEqual(self.event_source.start_tokens[:2], [None, {"_data": "7"}])
+        self.assertEqual(self.token_store.tokens["test"], {"_data": "8"})
+
+    def test_invalid_resume_token_clears_the_cache(self):
+        self.token_store.tokens["test"] = {"_data": "invalid"}
+        self.event_source.errors.append(OperationFailure("invalid token", code=260))
+        self.listener.start()
+        self._wait_for_events()
+        self.listener.stop()
+
+        self.assertEqual(
+            self.event_source.resume_tokens[:2], [{"_data": "invalid"}, None]
+        )
+        self.assertEqual(self.backend.get_all(), {})
+        self.assertIsNone(self.token_store.tokens["test"])
+
+    def test_unexpected_errors_are_logged_and_clear_the_cache(self):
+        self.event_source.errors.append(RuntimeError("unexpected"))
+        with self.assertLogs(
+            "cache_backend.change_stream.ChangeStreamListener", "ERROR"
+        ):
+            self.listener.start()
+            self._wait_for_events()
+        self.assertEqual(self.backend.get_all(), {})
+
+        # The listener keeps running after the error
+        self.backend.set(QueryInfo("FIND", query={"name": "a"}), [], 1.0)
+        self.event_source.events.put(self._event(1, "drop"))
+        self._wait_for_events()
+        self.assertEqual(self.backend.get_all(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo.collection import Collection
+
+from cache_backend.CacheBackend import CacheBackend
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.ValueSize import get_value_size
+from pymongo_wrappers.DocumentStorage import DocumentStorage
+from pymongo_wrappers.MongoClientWithCache import MongoClientWithCache
+
+
+class TestDocumentStorage(unittest.TestCase):
+    def setUp(self):
+        self.documents = [{"_id": i, "name": "a", "nested": {"i": i}} for i in range(3)]
+
+    def _get_collection(self, document_storage: DocumentStorage):
+        self.client = MongoClientWithCache(
+            cache_backend=CacheBackend.IN_MEMORY, document_storage=document_storage
+        )
+        self.addCleanup(self.client.close)
+        collection = self.client["test"]["test_document_storage"]
+        collection._cache_backend.clear()
+        return collection
+
+    def _find(self, collection, *args, **kwargs):
+        # Return raw documents, if the collection requests them like the server would
+        document_class = collection.codec_options.document_class
+        return iter(
+            [
+                (
+                    bson.decode(bson.encode(document), collection.codec_options)
+                    if document_class is RawBSONDocument
+                    else document
+                )
+                for document in self.documents
+            ]
+        )
+
+    def test_raw_bson_documents_are_decoded_on_access(self):
+        collection = self._get_collection(DocumentStorage.RAW_BSON)
+        with patch.object(Collection, "find", autospec=True) as mock_find:
+            mock_find.side_effect = self._find
+
+            self.assertEqual(list(collection.find({"name": "a"})), self.documents)
+            cached_result = list(collection.find({"name": "a"}))
+            mock_find.assert_called_once()
+
+        self.assertEqual(cached_result, self.documents)
+        self.assertIsInstance(cached_result[0], dict)
+        cached_value = collection._cache_backend.get(
+            QueryInfo("FIND", query={"name": "a"})
+        )
+        self.assertIsInstance(cached_value[0], RawBSONDocument)
+        self.assertEqual(get_value_size(cached_value), get_value_size(self.documents))
+
+    def test_lazy_raw_bson_documents_are_returned(self):
+        collection = self._get_collection(DocumentStorage.RAW_BSON_LAZY)
+        with patch.object(Collection, "find", autospec=True) as mock_find:
+            mock_find.side_effect = self._find
+            list(collection.find({"name": "a"}))
+            result = list(collection.find({"name": "a"}))
+
+        self.assertIsInstance(result[0], RawBSONDocument)
+        self.assertEqual(result[1]["nested"]["i"], 1)
+
+    def test_decoded_storage_uses_the_database_codec_options(self):
+        collection = self._get_collection(DocumentStorage.DECODED)
+        with patch.object(Collection, "find", autospec=True) as mock_find:
+            mock_find.side_effect = self._find
+            self.assertEqual(list(collection.find({"name": "a"})), self.documents)
+
+        cached_value = collection._cache_backend.get(
+            QueryInfo("FIND", query={"name": "a"})
+        )
+        self.assertIsInstance(cached_value[0], dict)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+import time
+import unittest
+
+import bson
+from pymongo import MongoClient
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.in_memory_backend.InMemoryCacheBackend import InMemoryCacheBackend
+
+
+class TestInMemoryCacheBackend(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient()
+        self.collection = self.client["test"]["test"]
+        self.backend = InMemoryCacheBackend(
+            self.collection, max_num_items=3, cache_cleanup_cycle_time=None
+        )
+
+    def tearDown(self):
+        self.client.close()
+
+    @staticmethod
+    def _key(i: int) -> QueryInfo:
+        return QueryInfo("FIND", query={"i": i})
+
+    def test_max_num_items_is_not_exceeded(self):
+        for i in range(10):
+            self.backend.set(self._key(i), [{"i": i}], 1.0)
+
+        self.assertEqual(len(self.backend.get_all()), 3)
+        self.assertEqual(self.backend.get(self._key(9)), [{"i": 9}])
+        self.assertIsNone(self.backend.get(self._key(0)))
+
+    def test_lru_eviction_keeps_recently_used_entries(self):
+        for i in range(3):
+            self.backend.set(self._key(i), [{"i": i}], 1.0)
+
+        # Accessing the oldest entry makes the second entry the least recently used one
+        self.assertEqual(self.backend.get(self._key(0)), [{"i": 0}])
+        self.backend.set(self._key(3), [{"i": 3}], 1.0)
+
+        self.assertIsNone(self.backend.get(self._key(1)))
+        self.assertEqual(self.backend.get(self._key(0)), [{"i": 0}])
+        self.assertEqual(self.backend.get(self._key(2)), [{"i": 2}])
+        self.assertEqual(self.backend.get(self._key(3)), [{"i": 3}])
+
+    def test_setting_existing_key_does_not_evict(self):
+        for i in range(3):
+            self.backend.set(self._key(i), [{"i": i}], 1.0)
+
+        self.backend.set(self._key(0), [{"i": 42}], 1.0)
+
+        self.assertEqual(len(self.backend.get_all()), 3)
+        self.assertEqual(self.backend.get(self._key(0)), [{"i": 42}])
+        self.assertEqual(self.backend.get(self._key(1)), [{"i": 1}])
+
+    def test_lfu_eviction_removes_least_frequently_used_entry(self):
+        backend = InMemoryCacheBackend(
+            self.collection,
+            max_num_items=3,
+            cache_cleanup_cycle_time=None,
+            cleanup_strategy=CleanupStrategy.LFU,
+        )
+        for i in range(3):
+            backend.set(self._key(i), [{"i": i}], 1.0)
+
+        for _ in range(3):
+            backend.get(self._key(0))
+        backend.get(self._key(2))
+        backend.set(self._key(3), [{"i": 3}], 1.0)
+
+        self.assertIsNone(backend.get(self._key(1)))
+        self.assertEqual(backend.get(self._key(0)), [{"i": 0}])
+        self.assertEqual(backend.get(self._key(2)), [{"i": 2}])
+
+    def test_lfu_aging_halves_access_counts(self):
+        backend = InMemoryCacheBackend(
+            self.collection,
+            max_num_items=2,
+            cache_cleanup_cycle_time=None,
+            cleanup_strategy=CleanupStrategy.LFU,
+            lfu_aging_interval=0,
+        )
+        backend.set(self._key(0), [{"i": 0}], 1.0)
+        for _ in range(4):
+            backend.get(self._key(0))
+        backend.set(self._key(1), [{"i": 1}], 1.0)
+
+        self.assertEqual(backend.get_all()[self._key(0)].access_count, 2)
+
+        # Aging runs again on the next fill, so the formerly hot entry only has a single access left
+        for _ in range(5):
+            backend.get(self._key(1))
+        backend.set(self._key(2), [{"i": 2}], 1.0)
+
+        self.assertIsNone(backend.get(self._key(0)))
+        self.assertEqual(backend.get(self._key(1)), [{"i": 1}])
+
+    def test_gdsf_eviction_prefers_large_and_cheap_entries(self):
+        backend = InMemoryCacheBackend(
+            self.collection,
+            max_num_items=2,
+            cache_cleanup_cycle_time=None,
+            cleanup_strategy=CleanupStrategy.GDSF,
+        )
+        large_cheap_value = [{"i": i, "payload": "x" * 100} for i in range(100)]
+        backend.set(self._key(0), large_cheap_value, 1.0)
+        backend.set(self._key(1), [{"i": 1}], 50.0)
+        backend.set(self._key(2), [{"i": 2}], 10.0)
+
+        self.assertIsNone(backend.get(self._key(0)))
+        self.assertEqual(backend.get(self._key(1)), [{"i": 1}])
+        self.assertEqual(backend.get(self._key(2)), [{"i": 2}])
+
+    def test_gdsf_hits_protect_entries(self):
+        backend = InMemoryCacheBackend(
+            self.collection,
+            max_num_items=2,
+            cache_cleanup_cycle_time=None,
+            cleanup_strategy=CleanupStrategy.GDSF,
+        )
+        backend.set(self._key(0), [{"i": 0}], 10.0)
+        backend.set(self._key(1), [{"i": 1}], 10.0)
+        for _ in range(3):
+            backend.get(self._key(0))
+        backend.set(self._key(2), [{"i": 2}], 10.0)
+
+        self.assertIsNone(backend.get(self._key(1)))
+        self.assertEqual(backend.get(self._key(0)), [{"i": 0}])
+
+    def test_oversized_items_are_not_cached(self):
+        backend = InMemoryCacheBackend(
+            self.collection, max_item_size=100, cache_cleanup_cycle_time=None
+        )
+        backend.set(self._key(0), [{"i": 0}], 1.0)
+        backend.set(self._key(1), [{"payload": "x" * 100}], 1.0)
+
+        self.assertEqual(backend.get(self._key(0)), [{"i": 0}])
+        self.assertIsNone(backend.get(self._key(1)))
+
+    def test_max_total_bytes_evicts_until_budget_is_met(self):
+        value = [{"payload": "x" * 100}]
+        entry_size = len(bson.encode({"value": value}))
+        backend = InMemoryCacheBackend(
+            self.collection,
+            max_total_bytes=3 * entry_size,
+            cache_cleanup_cycle_time=None,
+        )
+        for i in range(5):
+            backend.set(self._key(i), value, 1.0)
+
+        self.assertEqual(len(backend.get_all()), 3)
+        self.assertIsNone(backend.get(self._key(1)))
+        self.assertEqual(backend.get(self._key(4)), value)
+
+    def test_expired_entries_are_not_returned(self):
+        self.backend.set(self._key(0), [{"i": 0}], 1.0, ttl=0.05)
+        self.backend.set(self._key(1), [{"i": 1}], 1.0)
+
+        self.assertEqual(self.backend.get(self._key(0)), [{"i": 0}])
+        time.sleep(0.1)
+        self.assertIsNone(self.backend.get(self._key(0)))
+        self.assertEqual(self.backend.get(self._key(1)), [{"i": 1}])
+
+    def test_cleanup_removes_expired_entries(self):
+        backend = InMemoryCacheBackend(
+            self.collection, ttl=0.05, cache_cleanup_cycle_time=None
+        )
+        backend.set(self._key(0), [{"i": 0}], 1.0)
+        backend.set(self._key(1), [{"i": 1}], 1.0, ttl=0)
+
+        time.sleep(0.1)
+        backend._cache_cleanup_internal()
+
+        self.assertEqual(list(backend.get_all().keys()), [self._key(1)])
+
+    def test_related_find_queries_are_served_from_the_cache(self):
+        documents = [{"_id": i} for i in range(5)]
+        self.backend.set(
+            QueryInfo("FIND", query={"a": 1}, sort=[("_id", 1)]), documents, 1.0
+        )
+
+        self.assertEqual(
+            self.backend.get(
+                QueryInfo("FIND", query={"a": 1}, sort=[("_id", 1)], skip=1, limit=2)
+            ),
+            documents[1:3],
+        )
+        self.assertEqual(
+            self.backend.get(QueryInfo("FIND_ONE", query={"a": 1}, sort=[("_id", -1)])),
+            documents[4],
+        )
+        self.assertIsNone(self.backend.get(QueryInfo("FIND", query={"a": 2}, limit=2)))
+
+        # Removing the superset removes it from the index of related queries as well
+        self.backend.delete(QueryInfo("FIND", query={"a": 1}, sort=[("_id", 1)]))
+        self.assertIsNone(self.backend.get(QueryInfo("FIND", query={"a": 1}, limit=2)))
+
+    def test_find_one_by_id_is_served_from_cached_results(self):
+        documents = [{"_id": i, "a": 1} for i in range(3)]
+        self.backend.set(QueryInfo("FIND", query={"a": 1}), documents, 1.0)
+
+        self.assertIs(
+            self.backend.get(QueryInfo("FIND_ONE", query={"_id": 2})), documents[2]
+        )
+        self.assertIs(
+            self.backend.get(QueryInfo("FIND_ONE", query={"_id": {"$eq": 1.0}})),
+            documents[1],
+        )
+        self.assertIsNone(self.backend.get(QueryInfo("FIND_ONE", query={"_id": 3})))
+        self.assertIsNone(
+            self.backend.get(
+                QueryInfo("FIND_ONE", query={"_id": 2}, projection={"a": 1})
+            )
+        )
+
+        # Results with a projection do not contain whole documents
+        self.backend.set(
+            QueryInfo("FIND", query={"a": 2}, projection={"a": 1}), [{"_id": 5}], 1.0
+        )
+        self.assertIsNone(self.backend.get(QueryInfo("FIND_ONE", query={"_id": 5})))
+
+        self.backend.delete(QueryInfo("FIND", query={"a": 1}))
+        self.assertIsNone(self.backend.get(QueryInfo("FIND_ONE", query={"_id": 2})))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -33,7 +33,8 @@ class TestMongoCollectionWithCacheCacheInteraction(unittest.TestCase):
         self.collection._cache_backend = MagicMock()
         mock_insert_one.return_value = {"_id": 1, "name": "test"}
         self.collection.insert_one({"_id": 1, "name": "test"})
-        self.collection._cache_backend.clear.assert_called_once()
+        self.collection._cache_backend.invalidate.assert_called_once()
+        self.collection._cache_backend.clear.assert_not_called()
         self.collection._cache_backend.get.assert_not_called()
 
     @patch.object(Collection, "update_one")
@@ -41,7 +42,8 @@ class TestMongoCollectionWithCacheCacheInteraction(unittest.TestCase):
         self.collection._cache_backend = MagicMock()
         mock_update_one.return_value = {"_id": 1, "name": "test"}
         self.collection.update_one({"_id": 1}, {"$set": {"name": "test"}})
-        self.collection._cache_backend.clear.assert_called_once()
+        self.collection._cache_backend.invalidate.assert_called_once()
+        self.collection._cache_backend.clear.assert_not_called()
         self.collection._cache_backend.get.assert_not_called()
 
     @patch.object(Collection, "delete_one")
@@ -49,7 +51,8 @@ class TestMongoCollectionWithCacheCacheInteraction(unittest.TestCase):
         self.collection._cache_backend = MagicMock()
         mock_delete_one.return_value = {"_id": 1, "name": "test"}
         self.collection.delete_one({"_id": 1})
-        self.collection._cache_backend.clear.assert_called_once()
+        self.collection._cache_backend.invalidate.assert_called_once()
+        self.collection._cache_backend.clear.assert_not_called()
         self.collection._cache_backend.get.assert_not_called()
 
     @patch.object(Collection, "delete_many")
@@ -57,7 +60,8 @@ class TestMongoCollectionWithCacheCacheInteraction(unittest.TestCase):
         self.collection._cache_backend = MagicMock()
         mock_delete_many.return_value = {"_id": 1, "name": "test"}
         self.collection.delete_many({"_id": 1})
-        self.collection._cache_backend.clear.assert_called_once()
+        self.collection._cache_backend.invalidate.assert_called_once()
+        self.collection._cache_backend.clear.assert_not_called()
         self.collection._cache_backend.get.assert_not_called()
 
     @patch.object(Collection, "replace_one")
@@ -65,9 +69,64 @@ class TestMongoCollectionWithCacheCacheInteraction(unittest.TestCase):
         self.collection._cache_backend = MagicMock()
         mock_replace_one.return_value = {"_id": 1, "name": "test"}
         self.collection.replace_one({"_id": 1}, {"_id": 1, "name": "test"})
-        self.collection._cache_backend.clear.assert_called_once()
+        self.collection._cache_backend.invalidate.assert_called_once()
+        self.collection._cache_backend.clear.assert_not_called()
         self.collection._cache_backend.get.assert_not_called()
 
+    @patch.object(Collection, "insert_one")
+    @patch.object(Collection, "find")
+    def test_insert_only_invalidates_matching_queries(self, mock_find, mock_insert_one):
+        mock_find.side_effect = lambda filter, *args, **kwargs: iter(
+            [{"_id": 1, "name": filter["name"]}]
+        )
+        list(self.collection.find({"name": "a"}))
+        list(self.collection.find({"name": "b"}))
+
+        self.collection.insert_one({"_id": 2, "name": "b"})
+
+        list(self.collection.find({"name": "a"}))
+        list(self.collection.find({"name": "b"}))
+        # Only the query matching the inserted document is executed again
+        self.assertEqual(mock_find.call_count, 3)
+        self.assertEqual(mock_find.call_args.args[0], {"name": "b"})
+
+    @patch.object(Collection, "update_many")
+    @patch.object(Collection, "find")
+    def test_update_invalidates_queries_on_updated_fields(
+        self, mock_find, mock_update_many
+    ):
+        mock_find.side_effect = lambda filter, *args, **kwargs: iter(
+            [{"_id": 1, "name": "a", "count": 1}]
+        )
+        list(self.collection.find({"name": "a"}))
+        list(self.collection.find({"count": 1}))
+
+        # The update does not touch the cached document, but it can change which documents match the second query
+        self.collection.update_many({"_id": 2}, {"$inc": {"count": 1}})
+
+        list(self.collection.find({"name": "a"}))
+        list(self.collection.find({"count": 1}))
+        self.assertEqual(mock_find.call_count, 3)
+        self.assertEqual(mock_find.call_args.args[0], {"count": 1})
+
+    @patch.object(Collection, "update_one")
+    @patch.object(Collection, "find_one")
+    @patch.object(Collection, "find")
+    def test_find_one_by_id_after_find(self, mock_find, mock_find_one, mock_update_one):
+        mock_find.side_effect = lambda *args, **kwargs: iter(
+            [{"_id": 1, "name": "a"}, {"_id": 2, "name": "a"}]
+        )
+        mock_find_one.return_value = {"_id": 2, "name": "b"}
+        list(self.collection.find({"name": "a"}))
+
+        self.assertEqual(self.collection.find_one({"_id": 2}), {"_id": 2, "name": "a"})
+        mock_find_one.assert_not_called()
+
+        # The update invalidates the cached find, so the document is read again
+        self.collection.update_one({"_id": 2}, {"$set": {"name": "b"}})
+        self.assertEqual(self.collection.find_one({"_id": 2}), {"_id": 2, "name": "b"})
+        mock_find_one.assert_called_once()
+
     @patch.object(Collection, "aggregate")
     def test_cache_clearing_not_called_non_modifying_aggregate(self, mock_aggregate):
         self.collection._cache_backend = MagicMock()
@@ -0,0 +1,256 @@
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from pymongo import MongoClient, UpdateOne, WriteConcern
+from pymongo.errors import PyMongoError
+
+from cache_backend.Constants import (
+    ACCESS_COUNT,
+    CHUNK_DATA,
+    COLLECTION_NAME,
+    ENTRY_ID,
+    EXPIRES_AT,
+    NUM_CHUNKS,
+    PRIORITY,
+    SIZE,
+    TIMESTAMP,
+    VALUE,
+)
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+from cache_backend.mongodb_backend.MongoDBCacheBackend import MongoDBCacheBackend
+
+
+class TestMongoDBCacheBackend(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient()
+        self.cache_collection = MagicMock()
+        self.cache_collection.with_options.return_value = self.cache_collection
+        self.cache_collection.count_documents.return_value = 0
+        self.cache_collection.aggregate.return_value = []
+        self.chunk_collection = MagicMock()
+        self.chunk_collection.with_options.return_value = self.chunk_collection
+        self.backend = self._create_backend()
+
+    def _create_backend(self, **kwargs) -> MongoDBCacheBackend:
+        with patch.object(
+            MongoDBCacheBackend,
+            "_get_cache_collection",
+            return_value=self.cache_collection,
+        ), patch.object(
+            MongoDBCacheBackend,
+            "_get_chunk_collection",
+            return_value=self.chunk_collection,
+        ):
+            return MongoDBCacheBackend(
+                self.client["test"]["test_mongodb"],
+                cache_cleanup_cycle_time=None,
+                access_batch_size=2,
+                access_flush_interval=60,
+                **kwargs,
+            )
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_hits_are_plain_reads_with_batched_access_stats(self):
+        self.cache_collection.find_one.return_value = {"_id": 1, VALUE: [{"i": 1}]}
+        key = QueryInfo("FIND", query={"i": 1})
+
+        self.assertEqual(self.backend.get(key), [{"i": 1}])
+        self.assertEqual(self.backend.get(key), [{"i": 1}])
+        self.cache_collection.find_one_and_update.assert_not_called()
+        self.cache_collection.bulk_write.assert_not_called()
+
+        # The second accessed entry fills the batch, the hits of an entry are merged into one update
+        self.cache_collection.find_one.return_value = {"_id": 2, VALUE: [{"i": 2}]}
+        self.backend.get(QueryInfo("FIND", query={"i": 2}))
+        self.cache_collection.bulk_write.assert_called_once()
+        requests = self.cache_collection.bulk_write.call_args.args[0]
+        self.assertFalse(self.cache_collection.bulk_write.call_args.kwargs["ordered"])
+        self.assertEqual(len(requests), 2)
+        self.assertIsInstance(requests[0], UpdateOne)
+        self.assertEqual(requests[0]._filter, {"_id": 1})
+        self.assertEqual(requests[0]._doc["$inc"], {ACCESS_COUNT: 2})
+
+    def test_hits_return_their_remaining_ttl(self):
+        key = QueryInfo("FIND", query={"i": 1})
+        self.cache_collection.find_one.return_value = {"_id": 1, VALUE: [{"i": 1}]}
+        self.assertEqual(self.backend.get_with_ttl(key), ([{"i": 1}], 0))
+
+        # Dates are decoded without time zone by default
+        self.cache_collection.find_one.return_value = {
+            "_id": 1,
+            VALUE: [{"i": 1}],
+            EXPIRES_AT: datetime.now(timezone.utc).replace(tzinfo=None)
+            + timedelta(seconds=60),
+        }
+        value, remaining_ttl = self.backend.get_with_ttl(key)
+        self.assertEqual(value, [{"i": 1}])
+        self.assertAlmostEqual(remaining_ttl, 60, delta=1)
+
+    def test_pending_hits_are_written_before_a_cleanup(self):
+        self.cache_collection.find_one.return_value = {"_id": 1, VALUE: [{"i": 1}]}
+        self.backend.get(QueryInfo("FIND", query={"i": 1}))
+        self.cache_collection.bulk_write.assert_not_called()
+
+        self.backend._cache_cleanup_internal()
+        self.cache_collection.bulk_write.assert_called_once()
+
+    def test_limits_are_checked_with_local_counters(self):
+        for i in range(3):
+            self.backend.set(QueryInfo("FIND", query={"i": i}), [{"i": i}], 1.0)
+
+        # Only the first check counts the entries of the collection in the cache collection
+        self.cache_collection.count_documents.assert_called_once_with(
+            {COLLECTION_NAME: "test.test_mongodb"}
+        )
+        self.assertEqual(self.backend._cache_cleanup_handler.get_elements_in_cache(), 3)
+        self.cache_collection.find.assert_not_called()
+
+    def test_eviction_is_scoped_to_the_collection(self):
+        backend = self._create_backend(max_num_items=2)
+        cursor = self.cache_collection.find.return_value.sort.return_value.limit
+        cursor.return_value = [{"_id": 1, SIZE: 10, PRIORITY: 0}]
+        self.cache_collection.delete_many.return_value.deleted_count = 1
+        for i in range(3):
+            backend.set(QueryInfo("FIND", query={"i": i}), [{"i": i}], 1.0)
+
+        self.cache_collection.find.assert_called_once_with(
+            {COLLECTION_NAME: "test.test_mongodb"},
+            projection={SIZE: 1, PRIORITY: 1, NUM_CHUNKS: 1},
+        )
+        self.cache_collection.find.return_value.sort.assert_called_once_with(
+            TIMESTAMP, 1
+        )
+        cursor.assert_called_once_with(1)
+        self.cache_collection.delete_many.assert_called_once_with({"_id": {"$in": [1]}})
+        self.assertEqual(backend._cache_cleanup_handler.get_elements_in_cache(), 2)
+
+    def test_entries_removed_by_another_process_resync_the_counters(self):
+        handler = self.backend._cache_cleanup_handler
+        cursor = self.cache_collection.find.return_value.sort.return_value.limit
+        cursor.return_value = [{"_id": 1, SIZE: 10}, {"_id": 2, SIZE: 20}]
+        handler._num_entries, handler._num_bytes = 5, 100
+        handler._last_counter_sync = time.monotonic()
+
+        self.cache_collection.delete_many.return_value.deleted_count = 2
+        handler.evict_entries(2)
+        self.assertEqual((handler._num_entries, handler._num_bytes), (3, 70))
+        self.assertIsNotNone(handler._last_counter_sync)
+
+        # Only one of the selected entries is removed here, its size is not known
+        self.cache_collection.delete_many.return_value.deleted_count = 1
+        handler.evict_entries(2)
+        self.assertEqual((handler._num_entries, handler._num_bytes), (2, 70))
+        self.cache_collection.count_documents.reset_mock()
+        self.cache_collection.count_documents.return_value = 1
+        self.assertEqual(handler.get_elements_in_cache(), 1)
+        self.cache_collection.count_documents.assert_called_once()
+
+    def test_entries_store_their_expiry_time(self):
+        self.backend.set(QueryInfo("FIND", query={"i": 1}), [{"i": 1}], 1.0, ttl=60)
+        self.backend.set(QueryInfo("FIND", query={"i": 2}), [{"i": 2}], 1.0)
+
+        inserted = [
+            call.args[0] for call in self.cache_collection.insert_one.call_args_list
+        ]
+        expires_at = inserted[0][EXPIRES_AT]
+        now = datetime.now(timezone.utc)
+        self.assertLess(expires_at - now, timedelta(seconds=60))
+        self.assertGreater(expires_at - now, timedelta(seconds=55))
+        # Entries without a TTL are never removed by the TTL index
+        self.assertIsNone(inserted[1][EXPIRES_AT])
+
+        # Lookups skip the entries, which expired, but were not removed by the server yet
+        self.cache_collection.find_one.return_value = None
+        self.assertIsNone(self.backend.get(QueryInfo("FIND", query={"i": 1})))
+        lookup_filter = self.cache_collection.find_one.call_args.args[0]
+        self.assertLessEqual(
+            lookup_filter[EXPIRES_AT]["$not"]["$lte"], datetime.now(timezone.utc)
+        )
+
+    @patch("cache_backend.mongodb_backend.MongoDBCacheDocuments._CHUNK_SIZE", 16)
+    def test_large_values_are_stored_in_chunks(self):
+        backend = self._create_backend(chunk_threshold=20)
+        key = QueryInfo("FIND", query={"i": 1})
+        value = [{"i": i} for i in range(5)]
+        backend.set(key, value, 1.0)
+
+        entry = self.cache_collection.insert_one.call_args.args[0]
+        chunks = self.chunk_collection.insert_many.call_args.args[0]
+        self.assertIsNone(entry[VALUE])
+        self.assertEqual(entry[NUM_CHUNKS], len(chunks))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(chunk[ENTRY_ID] == entry["_id"] for chunk in chunks))
+        self.assertTrue(all(len(chunk[CHUNK_DATA]) <= 16 for chunk in chunks))
+
+        self.cache_collection.find_one.return_value = entry
+        self.chunk_collection.find.return_value.sort.return_value = chunks
+        self.assertEqual(backend.get(key), value)
+        # A value, whose chunks are incomplete, is a miss
+        self.chunk_collection.find.return_value.sort.return_value = chunks[1:]
+        self.assertIsNone(backend.get(key))
+
+        self.cache_collection.find_one_and_delete.return_value = entry
+        backend.delete(key)
+        self.chunk_collection.delete_many.assert_called_once_with(
+            {ENTRY_ID: {"$in": [entry["_id"]]}}
+        )
+        backend.clear()
+        self.chunk_collection.delete_many.assert_called_with(
+            {COLLECTION_NAME: "test.test_mongodb"}
+        )
+
+    @patch("cache_backend.mongodb_backend.MongoDBCacheDocuments._CHUNK_SIZE", 16)
+    def test_values_are_only_read_if_invalidation_needs_them(self):
+        backend = self._create_backend(chunk_threshold=20)
+        value = [{"i": i} for i in range(5)]
+        backend.set(QueryInfo("AGGREGATE", pipeline=[]), value, 1.0)
+        aggregate_entry = self.cache_collection.insert_one.call_args.args[0]
+        backend.set(QueryInfo("FIND", query={"i": {"$lt": 5}}), value, 1.0)
+        find_entry = self.cache_collection.insert_one.call_args.args[0]
+        chunks = self.chunk_collection.insert_many.call_args.args[0]
+
+        self.cache_collection.find.return_value = [aggregate_entry, find_entry]
+        self.cache_collection.find_one.return_value = find_entry
+        self.chunk_collection.find.return_value.sort.return_value = chunks
+        backend.invalidate(WriteInfo(WriteOperation.DELETE, filter={"i": 7}))
+
+        # The entries are found without their values, only the value of the find is read by its _id
+        self.assertNotIn(VALUE, self.cache_collection.find.call_args.args[1])
+        self.cache_collection.find_one.assert_called_once()
+        self.assertEqual(
+            self.cache_collection.find_one.call_args.args[0], {"_id": find_entry["_id"]}
+        )
+        # The aggregation is affected without its result, the result of the find decides it is not affected
+        self.chunk_collection.find.assert_called_once()
+        self.assertEqual(
+            self.chunk_collection.find.call_args.args[0], {ENTRY_ID: find_entry["_id"]}
+        )
+        deleted = self.cache_collection.delete_many.call_args.args[0]
+        self.assertEqual(deleted, {"_id": {"$in": [aggregate_entry["_id"]]}})
+
+    @patch("cache_backend.mongodb_backend.MongoDBCacheDocuments._CHUNK_SIZE", 16)
+    def test_chunks_are_deleted_if_their_entry_cannot_be_inserted(self):
+        backend = self._create_backend(chunk_threshold=20)
+        self.cache_collection.insert_one.side_effect = PyMongoError("failed")
+        backend.set(
+            QueryInfo("FIND", query={"i": 1}), [{"i": i} for i in range(5)], 1.0
+        )
+
+        chunks = self.chunk_collection.insert_many.call_args.args[0]
+        self.chunk_collection.delete_many.assert_called_once_with(
+            {ENTRY_ID: {"$in": [chunks[0][ENTRY_ID]]}}
+        )
+        # The chunked entry is inserted acknowledged
+        self.assertNotIn(
+            {"write_concern": WriteConcern(w=0)},
+            [call.kwargs for call in self.cache_collection.with_options.call_args_list],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from cache_backend.QueryInfo import QueryInfo
+
+
+class TestQueryInfo(unittest.TestCase):
+    def test_equal_queries_have_equal_keys(self):
+        query_info = QueryInfo("FIND", query={"a": 1}, sort=[("b", -1)])
+        other_query_info = QueryInfo("FIND", query={"a": 1}, sort=[["b", -1]])
+
+        self.assertEqual(query_info, other_query_info)
+        self.assertEqual(hash(query_info), hash(other_query_info))
+        self.assertEqual({query_info: 1}[other_query_info], 1)
+
+    def test_all_fields_are_part_of_the_key(self):
+        query_info = QueryInfo("FIND", query={"a": 1})
+
+        self.assertNotEqual(query_info, QueryInfo("FIND_ONE", query={"a": 1}))
+        self.assertNotEqual(query_info, QueryInfo("FIND", query={"a": 2}))
+        self.assertNotEqual(
+            query_info, QueryInfo("FIND", query={"a": 1}, projection={"a": 1})
+        )
+        self.assertNotEqual(
+            query_info, QueryInfo("FIND", query={"a": 1}, options={"hint": "a_1"})
+        )
+
+    def test_key_is_memoized(self):
+        query_info = QueryInfo("FIND", query={"a": 1})
+        key = query_info.key
+
+        self.assertIs(query_info.key, key)
+        self.assertEqual(len(query_info.digest), 16)
+        self.assertTrue(-(2**63) <= hash(query_info) < 2**63)
+
+    def test_queries_which_are_no_valid_bson_can_be_used_as_key(self):
+        query_info = QueryInfo("FIND", query={1: "a"})
+
+        self.assertEqual(query_info, QueryInfo("FIND", query={1: "a"}))
+        self.assertNotEqual(query_info, QueryInfo("FIND", query={2: "a"}))
+
+    def test_to_dict_can_be_used_to_recreate_the_query(self):
+        query_info = QueryInfo("FIND", query={"a": 1}, limit=5)
+        _ = query_info.key
+
+        self.assertEqual(QueryInfo(**query_info.to_dict()), query_info)
+
+    def test_changing_the_arguments_does_not_change_the_key(self):
+        query = {"a": {"$in": [1, 2]}}
+        pipeline = [{"$match": {"a": 1}}]
+        query_info = QueryInfo("FIND", query=query)
+        pipeline_query_info = QueryInfo("AGGREGATE", pipeline=pipeline)
+
+        query["a"]["$in"].append(3)
+        pipeline[0]["$match"]["a"] = 2
+
+        self.assertEqual(query_info, QueryInfo("FIND", query={"a": {"$in": [1, 2]}}))
+        self.assertEqual(
+            hash(query_info), hash(QueryInfo("FIND", query={"a": {"$in": [1, 2]}}))
+        )
+        self.assertEqual(
+            pipeline_query_info,
+            QueryInfo("AGGREGATE", pipeline=[{"$match": {"a": 1}}]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
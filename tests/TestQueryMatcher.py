@@ -0,0 +1,101 @@
+import unittest
+from datetime import datetime, timezone
+
+from bson import ObjectId, Regex
+
+from cache_backend.QueryMatcher import QueryMatcher
+
+
+class TestQueryMatcher(unittest.TestCase):
+    def test_equality(self):
+        document = {"name": "a", "count": 1, "tags": ["x", "y"]}
+
+        self.assertTrue(QueryMatcher.matches({"name": "a"}, document))
+        self.assertTrue(QueryMatcher.matches({"count": 1.0}, document))
+        self.assertTrue(QueryMatcher.matches({"tags": "x"}, document))
+        self.assertTrue(QueryMatcher.matches({"tags": ["x", "y"]}, document))
+        self.assertFalse(QueryMatcher.matches({"name": "b"}, document))
+        self.assertFalse(QueryMatcher.matches({"count": True}, document))
+        self.assertFalse(QueryMatcher.matches({"count": "1"}, document))
+
+    def test_embedded_documents_are_compared_in_order(self):
+        document = {"a": {"x": 1, "y": 2}}
+
+        self.assertTrue(QueryMatcher.matches({"a": {"x": 1, "y": 2}}, document))
+        self.assertFalse(QueryMatcher.matches({"a": {"y": 2, "x": 1}}, document))
+        self.assertTrue(
+            QueryMatcher.matches({"a": {"$ne": {"y": 2, "x": 1}}}, document)
+        )
+        self.assertTrue(
+            QueryMatcher.matches({"a": {"$nin": [{"y": 2, "x": 1}]}}, document)
+        )
+
+    def test_null_matches_missing_fields(self):
+        self.assertTrue(QueryMatcher.matches({"name": None}, {"count": 1}))
+        self.assertFalse(QueryMatcher.matches({"name": None}, {"name": "a"}))
+        self.assertTrue(QueryMatcher.matches({"name": {"$ne": "a"}}, {"count": 1}))
+
+    def test_operators(self):
+        document = {
+            "_id": ObjectId("000000000000000000000001"),
+            "count": 5,
+            "created": datetime(2024, 1, 1),
+        }
+
+        self.assertTrue(
+            QueryMatcher.matches({"count": {"$gt": 4, "$lte": 5}}, document)
+        )
+        self.assertFalse(QueryMatcher.matches({"count": {"$lt": 5}}, document))
+        self.assertFalse(QueryMatcher.matches({"count": {"$gt": "4"}}, document))
+        self.assertTrue(QueryMatcher.matches({"count": {"$in": [1, 5]}}, document))
+        self.assertFalse(QueryMatcher.matches({"count": {"$nin": [1, 5]}}, document))
+        self.assertTrue(QueryMatcher.matches({"missing": {"$exists": False}}, document))
+        self.assertTrue(QueryMatcher.matches({"count": {"$not": {"$gt": 5}}}, document))
+        self.assertTrue(
+            QueryMatcher.matches(
+                {"_id": ObjectId("000000000000000000000001")}, document
+            )
+        )
+        self.assertTrue(
+            QueryMatcher.matches(
+                {"created": {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}},
+                document,
+            )
+        )
+
+    def test_logical_operators_and_paths(self):
+        document = {"a": {"b": 1}, "c": 2}
+
+        self.assertTrue(QueryMatcher.matches({"a.b": 1}, document))
+        self.assertTrue(QueryMatcher.matches({"$or": [{"a.b": 2}, {"c": 2}]}, document))
+        self.assertFalse(
+            QueryMatcher.matches({"$and": [{"a.b": 1}, {"c": 3}]}, document)
+        )
+        self.assertFalse(QueryMatcher.matches({"$nor": [{"c": 2}]}, document))
+
+    def test_unsupported_queries_are_unknown(self):
+        document = {"name": "a", "items": [{"b": 1}]}
+
+        self.assertIsNone(QueryMatcher.matches({"$where": "true"}, document))
+        self.assertIsNone(QueryMatcher.matches({"name": Regex("^a")}, document))
+        self.assertIsNone(QueryMatcher.matches({"name": {"$regex": "^a"}}, document))
+        self.assertIsNone(QueryMatcher.matches({"items.b": 1}, document))
+        # A definite mismatch wins over an unknown condition
+        self.assertFalse(
+            QueryMatcher.matches({"$where": "true", "name": "b"}, document)
+        )
+        self.assertTrue(
+            QueryMatcher.matches({"$or": [{"$where": "true"}, {"name": "a"}]}, document)
+        )
+
+    def test_get_fields(self):
+        self.assertEqual(
+            QueryMatcher.get_fields({"a.b": 1, "$or": [{"c": 1}, {"d": {"$gt": 1}}]}),
+            {"a", "c", "d"},
+        )
+        self.assertEqual(QueryMatcher.get_fields(None), set())
+        self.assertIsNone(QueryMatcher.get_fields({"$expr": {"$eq": ["$a", 1]}}))
+
+
+if __name__ == "__main__":
+    unittest.main()
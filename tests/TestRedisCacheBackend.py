@@ -0,0 +1,122 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from pymongo import MongoClient
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+from cache_backend.codec.ValueCodec import ZlibCodec
+from cache_backend.redis_backend.RedisCacheBackend import RedisCacheBackend
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestRedisCacheBackend(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient()
+        self.collection = self.client["test"]["test_redis"]
+        self.redis = fakeredis.FakeRedis()
+        self.backend = self._create_backend()
+
+    def tearDown(self):
+        self.client.close()
+
+    def _create_backend(self, **kwargs) -> RedisCacheBackend:
+        return RedisCacheBackend(
+            self.collection,
+            max_num_items=3,
+            redis_client=self.redis,
+            access_batch_size=1,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _key(i: int) -> QueryInfo:
+        return QueryInfo("FIND", query={"i": i}, sort=[("_id", 1)])
+
+    def test_values_are_stored_and_shared(self):
+        self.backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        self.assertEqual(self.backend.get(self._key(1)), [{"_id": 1, "i": 1}])
+        self.assertIsNone(self.backend.get(self._key(2)))
+
+        # Another backend on the same server, e.g. on another host, sees the entry
+        self.assertEqual(self._create_backend().get(self._key(1)), [{"_id": 1, "i": 1}])
+        # The keys of the collection share a hash tag
+        self.assertTrue(
+            all(b"{test.test_redis}" in key for key in self.redis.keys("*"))
+        )
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for i in range(3):
+            self.backend.set(self._key(i), [{"i": i}], 1.0)
+            time.sleep(0.01)
+
+        self.assertEqual(self.backend.get(self._key(0)), [{"i": 0}])
+        self.backend.set(self._key(3), [{"i": 3}], 1.0)
+
+        self.assertEqual(len(self.backend.get_all()), 3)
+        self.assertIsNone(self.backend.get(self._key(1)))
+        self.assertEqual(self.backend.get(self._key(0)), [{"i": 0}])
+
+    def test_ttl_is_set_on_the_server(self):
+        self.backend.set(self._key(1), [{"i": 1}], 1.0, ttl=60)
+        self.backend.set(self._key(2), [{"i": 2}], 1.0)
+        self.assertGreater(
+            self.redis.pttl(self.backend._get_entry_key(self._key(1))), 0
+        )
+        self.assertEqual(self.redis.pttl(self.backend._get_entry_key(self._key(2))), -1)
+
+        # Entries, which were removed by the server, are untagged
+        self.redis.delete(self.backend._get_entry_key(self._key(1)))
+        self.assertEqual(list(self.backend.get_all()), [self._key(2)])
+        self.assertEqual(self.redis.zcard(self.backend._index_key), 1)
+
+    def test_invalidate_only_removes_affected_entries(self):
+        self.backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        self.backend.set(self._key(2), [{"_id": 2, "i": 2}], 1.0)
+
+        self.backend.invalidate(WriteInfo(WriteOperation.DELETE, filter={"_id": 1}))
+        self.assertIsNone(self.backend.get(self._key(1)))
+        self.assertEqual(self.backend.get(self._key(2)), [{"_id": 2, "i": 2}])
+
+    def test_invalidate_only_reads_the_values_it_needs(self):
+        aggregate_key = QueryInfo("AGGREGATE", pipeline=[{"$match": {"i": 1}}])
+        self.backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        self.backend.set(aggregate_key, [{"_id": 1, "i": 1}], 1.0)
+
+        with patch.object(
+            self.backend, "_read_values", wraps=self.backend._read_values
+        ) as read_values:
+            self.backend.invalidate(WriteInfo(WriteOperation.DELETE, filter={"_id": 2}))
+        read_values.assert_called_once_with([self.backend._get_entry_key(self._key(1))])
+        self.assertEqual(self.backend.get(self._key(1)), [{"_id": 1, "i": 1}])
+        self.assertIsNone(self.backend.get(aggregate_key))
+
+    def test_clear_only_removes_the_collection(self):
+        other_backend = RedisCacheBackend(
+            self.client["test"]["test_redis_other"], redis_client=self.redis
+        )
+        other_backend.set(self._key(1), [{"i": 1}], 1.0)
+        self.backend.set(self._key(1), [{"i": 1}], 1.0)
+
+        self.backend.clear()
+        self.assertIsNone(self.backend.get(self._key(1)))
+        self.assertEqual(other_backend.get(self._key(1)), [{"i": 1}])
+
+    def test_compressed_values(self):
+        backend = self._create_backend(
+            value_codec=ZlibCodec(), compression_threshold=100
+        )
+        documents = [{"_id": i, "report": "quarterly" * 10} for i in range(20)]
+        backend.set(self._key(1), documents, 1.0)
+        self.assertEqual(backend.get(self._key(1)), documents)
+        self.assertEqual(backend.get_codec_stats().encoded_values, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
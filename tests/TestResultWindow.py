@@ -0,0 +1,143 @@
+import unittest
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.ResultWindow import ResultWindow
+
+
+class TestResultWindow(unittest.TestCase):
+    def setUp(self):
+        self.documents = [{"_id": i, "x": 9 - i} for i in range(10)]
+
+    @staticmethod
+    def _find(**kwargs) -> QueryInfo:
+        return QueryInfo("FIND", query={"a": 1}, **kwargs)
+
+    def test_related_queries_share_the_base_key(self):
+        base_key = ResultWindow.get_base_key(self._find())
+        self.assertEqual(
+            ResultWindow.get_base_key(self._find(sort=[("x", 1)], skip=2, limit=3)),
+            base_key,
+        )
+        self.assertEqual(
+            ResultWindow.get_base_key(QueryInfo("FIND_ONE", query={"a": 1})), base_key
+        )
+        self.assertNotEqual(
+            ResultWindow.get_base_key(QueryInfo("FIND", query={"a": 2})), base_key
+        )
+        self.assertIsNone(ResultWindow.get_base_key(QueryInfo("AGGREGATE")))
+
+    def test_window_of_a_complete_result(self):
+        cached = self._find(sort=[("_id", 1)])
+        self.assertEqual(
+            ResultWindow.get_window(
+                self._find(sort=[("_id", 1)], skip=2, limit=3), cached, self.documents
+            ),
+            self.documents[2:5],
+        )
+        self.assertEqual(
+            ResultWindow.get_window(
+                self._find(sort=[("_id", 1)], skip=8, limit=5), cached, self.documents
+            ),
+            self.documents[8:],
+        )
+        self.assertEqual(
+            ResultWindow.get_window(
+                QueryInfo("FIND_ONE", query={"a": 1}, sort=[("_id", 1)], skip=4),
+                cached,
+                self.documents,
+            ),
+            [self.documents[4]],
+        )
+
+    def test_window_of_a_limited_result(self):
+        cached = self._find(sort=[("_id", 1)], skip=2, limit=5)
+        value = self.documents[2:7]
+        self.assertEqual(
+            ResultWindow.get_window(
+                self._find(sort=[("_id", 1)], skip=3, limit=2), cached, value
+            ),
+            self.documents[3:5],
+        )
+        # The window starts before or ends after the cached result
+        self.assertIsNone(
+            ResultWindow.get_window(
+                self._find(sort=[("_id", 1)], limit=2), cached, value
+            )
+        )
+        self.assertIsNone(
+            ResultWindow.get_window(
+                self._find(sort=[("_id", 1)], skip=5, limit=5), cached, value
+            )
+        )
+        self.assertIsNone(
+            ResultWindow.get_window(
+                self._find(sort=[("_id", 1)], skip=3), cached, value
+            )
+        )
+
+    def test_short_result_reaches_the_end(self):
+        cached = self._find(sort=[("_id", 1)], limit=20)
+        self.assertEqual(
+            ResultWindow.get_window(
+                self._find(sort=[("_id", 1)], skip=5), cached, self.documents
+            ),
+            self.documents[5:],
+        )
+
+    def test_complete_result_is_sorted_locally(self):
+        cached = self._find()
+        self.assertEqual(
+            ResultWindow.get_window(
+                self._find(sort=[("x", 1)], limit=3), cached, self.documents
+            ),
+            [self.documents[9], self.documents[8], self.documents[7]],
+        )
+        # A limited result cannot be sorted differently
+        self.assertIsNone(
+            ResultWindow.get_window(
+                self._find(sort=[("x", 1)], limit=3),
+                self._find(limit=5),
+                self.documents[:5],
+            )
+        )
+
+    def test_local_sort_follows_the_bson_type_order(self):
+        documents = [{"_id": 0, "x": "a"}, {"_id": 1, "x": 2}, {"_id": 2}]
+        self.assertEqual(
+            ResultWindow.get_window(
+                self._find(sort=[("x", -1)]), self._find(), documents
+            ),
+            documents,
+        )
+        self.assertEqual(
+            ResultWindow.get_window(
+                self._find(sort=[("x", 1)]), self._find(), documents
+            ),
+            documents[::-1],
+        )
+
+    def test_unsupported_local_sorts(self):
+        documents = [{"_id": 0, "x": [1, 2]}, {"_id": 1, "x": 2}]
+        self.assertIsNone(
+            ResultWindow.get_window(
+                self._find(sort=[("x", 1)]), self._find(), documents
+            )
+        )
+        self.assertIsNone(
+            ResultWindow.get_window(
+                self._find(sort=[("x", 1)], projection={"x": 0}),
+                self._find(projection={"x": 0}),
+                [{"_id": 0}],
+            )
+        )
+        self.assertIsNone(
+            ResultWindow.get_window(
+                self._find(sort=[("score", {"$meta": "textScore"})]),
+                self._find(),
+                self.documents,
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from pymongo import MongoClient
+
+from cache_backend.Constants import CACHE_ENTRIES
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+from cache_backend.base.CacheCleanupHandlerBase import CleanupStrategy
+from cache_backend.codec.ValueCodec import ZlibCodec
+from cache_backend.sqlite_backend.SQLiteCacheBackend import SQLiteCacheBackend
+
+
+class TestSQLiteCacheBackend(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient()
+        self.collection = self.client["test"]["test_sqlite"]
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_path = os.path.join(self.directory.name, "cache.sqlite")
+        self.backend = self._create_backend()
+
+    def tearDown(self):
+        self.client.close()
+        self.directory.cleanup()
+
+    def _create_backend(self, **kwargs) -> SQLiteCacheBackend:
+        return SQLiteCacheBackend(
+            self.collection,
+            max_num_items=3,
+            cache_cleanup_cycle_time=None,
+            database_path=self.database_path,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _key(i: int) -> QueryInfo:
+        return QueryInfo("FIND", query={"i": i}, sort=[("_id", 1)])
+
+    def test_values_are_stored_and_shared(self):
+        self.backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        self.assertEqual(self.backend.get(self._key(1)), [{"_id": 1, "i": 1}])
+        self.assertIsNone(self.backend.get(self._key(2)))
+
+        # Another backend on the same file, e.g. in another process, sees the entry
+        self.assertEqual(self._create_backend().get(self._key(1)), [{"_id": 1, "i": 1}])
+        with sqlite3.connect(self.database_path) as connection:
+            journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(journal_mode, "wal")
+
+    def test_lru_eviction_uses_batched_access_stats(self):
+        for i in range(3):
+            self.backend.set(self._key(i), [{"i": i}], 1.0)
+            time.sleep(0.01)
+
+        # The access is written before the eviction, so the first entry is not the oldest anymore
+        self.assertEqual(self.backend.get(self._key(0)), [{"i": 0}])
+        self.backend.set(self._key(3), [{"i": 3}], 1.0)
+
+        self.assertEqual(len(self.backend.get_all()), 3)
+        self.assertIsNone(self.backend.get(self._key(1)))
+        self.assertEqual(self.backend.get(self._key(0)), [{"i": 0}])
+
+    def test_every_strategy_evicts(self):
+        for cleanup_strategy in CleanupStrategy:
+            backend = self._create_backend(cleanup_strategy=cleanup_strategy)
+            backend.clear()
+            for i in range(5):
+                backend.set(self._key(i), [{"i": i}], float(i))
+            self.assertEqual(len(backend.get_all()), 3, cleanup_strategy)
+
+    def test_expired_entries_are_not_returned(self):
+        self.backend.set(self._key(1), [{"i": 1}], 1.0, ttl=0.05)
+        self.assertEqual(self.backend.get(self._key(1)), [{"i": 1}])
+        time.sleep(0.1)
+        self.assertIsNone(self.backend.get(self._key(1)))
+
+    def test_invalidate_only_removes_affected_entries(self):
+        self.backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        self.backend.set(self._key(2), [{"_id": 2, "i": 2}], 1.0)
+
+        self.backend.invalidate(WriteInfo(WriteOperation.DELETE, filter={"_id": 1}))
+        self.assertIsNone(self.backend.get(self._key(1)))
+        self.assertEqual(self.backend.get(self._key(2)), [{"_id": 2, "i": 2}])
+
+    def test_invalidate_only_reads_the_values_it_needs(self):
+        aggregate_key = QueryInfo("AGGREGATE", pipeline=[{"$match": {"i": 1}}])
+        self.backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        self.backend.set(aggregate_key, [{"_id": 1, "i": 1}], 1.0)
+
+        with patch.object(
+            self.backend, "_read_value", wraps=self.backend._read_value
+        ) as read_value:
+            self.backend.invalidate(WriteInfo(WriteOperation.DELETE, filter={"_id": 2}))
+        read_value.assert_called_once()
+        self.assertEqual(self.backend.get(self._key(1)), [{"_id": 1, "i": 1}])
+        self.assertIsNone(self.backend.get(aggregate_key))
+
+    def test_compressed_values(self):
+        backend = self._create_backend(
+            value_codec=ZlibCodec(), compression_threshold=100
+        )
+        documents = [{"_id": i, "report": "quarterly" * 10} for i in range(20)]
+        backend.set(self._key(1), documents, 1.0)
+        self.assertEqual(backend.get(self._key(1)), documents)
+        self.assertEqual(backend.get_codec_stats().encoded_values, 1)
+
+    def test_connections_are_per_thread(self):
+        self.backend.set(self._key(1), [{"i": 1}], 1.0)
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(self.backend.get(self._key(1)))
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [[{"i": 1}]])
+
+        with sqlite3.connect(self.database_path) as connection:
+            count = connection.execute(
+                f"SELECT COUNT(*) FROM {CACHE_ENTRIES}"
+            ).fetchone()[0]
+        self.assertEqual(count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import fcntl
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+from cache_backend.codec.ValueCodec import ZlibCodec
+from cache_backend.shared_memory_backend.SharedMemoryCacheBackend import (
+    SharedMemoryCacheBackend,
+)
+
+
+def _set_in_child_process(directory: str) -> None:
+    client = MongoClient()
+    backend = SharedMemoryCacheBackend(
+        client["test"]["test_shared_memory"], max_num_items=3, directory=directory
+    )
+    backend.set(QueryInfo("FIND", query={"i": 7}), [{"_id": 7}], 1.0)
+    backend.close()
+    client.close()
+
+
+class TestSharedMemoryCacheBackend(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient()
+        self.collection = self.client["test"]["test_shared_memory"]
+        self.directory = tempfile.TemporaryDirectory()
+        self.backends = []
+        self.backend = self._create_backend()
+
+    def tearDown(self):
+        for backend in self.backends:
+            backend.close()
+        self.client.close()
+        self.directory.cleanup()
+
+    def _create_backend(self, **kwargs) -> SharedMemoryCacheBackend:
+        kwargs.setdefault("max_num_items", 3)
+        backend = SharedMemoryCacheBackend(
+            self.collection, directory=self.directory.name, **kwargs
+        )
+        self.backends.append(backend)
+        return backend
+
+    @staticmethod
+    def _key(i: int) -> QueryInfo:
+        return QueryInfo("FIND", query={"i": i}, sort=[("_id", 1)])
+
+    def test_entries_are_shared_between_processes(self):
+        self.backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        self.assertEqual(self.backend.get(self._key(1)), [{"_id": 1, "i": 1}])
+        self.assertIsNone(self.backend.get(self._key(2)))
+
+        process = multiprocessing.get_context("fork").Process(
+            target=_set_in_child_process, args=(self.directory.name,)
+        )
+        process.start()
+        process.join()
+        self.assertEqual(
+            self.backend.get(QueryInfo("FIND", query={"i": 7})), [{"_id": 7}]
+        )
+
+        # A backend, which maps the existing file, keeps its layout
+        other_backend = self._create_backend(max_num_items=100)
+        self.assertEqual(other_backend.get(self._key(1)), [{"_id": 1, "i": 1}])
+        other_backend.delete(self._key(1))
+        self.assertIsNone(self.backend.get(self._key(1)))
+
+    def test_forked_process_takes_its_own_file_lock(self):
+        self.backend.set(self._key(1), [{"_id": 1}], 1.0)
+        locked_read, locked_write = os.pipe()
+        release_read, release_write = os.pipe()
+
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                with self.backend._locked(exclusive=True):
+                    os.write(locked_write, b"1")
+                    os.read(release_read, 1)
+                exit_code = 0
+            finally:
+                os._exit(exit_code)
+
+        try:
+            os.read(locked_read, 1)
+            # The lock of the child must block the parent
+            with self.assertRaises(BlockingIOError):
+                fcntl.flock(
+                    self.backend._file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB
+                )
+        finally:
+            os.write(release_write, b"1")
+            _, status = os.waitpid(pid, 0)
+            for descriptor in (locked_read, locked_write, release_read, release_write):
+                os.close(descriptor)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(self.backend.get(self._key(1)), [{"_id": 1}])
+
+    def test_index_and_ring_evict_the_oldest_entries(self):
+        for i in range(5):
+            self.backend.set(self._key(i), [{"i": i}], 1.0)
+        self.assertEqual(
+            sorted(key.query["i"] for key in self.backend.get_all()), [2, 3, 4]
+        )
+
+        self.backend.clear()
+        self.assertEqual(self.backend.get_all(), {})
+        # The ring of another collection only holds two of the entries
+        backend = SharedMemoryCacheBackend(
+            self.client["test"]["test_small_ring"],
+            max_num_items=10,
+            max_total_bytes=1000,
+            directory=self.directory.name,
+        )
+        self.backends.append(backend)
+        for i in range(5):
+            backend.set(self._key(i), [{"i": i, "padding": "x" * 100}], 1.0)
+        self.assertEqual(sorted(key.query["i"] for key in backend.get_all()), [3, 4])
+
+    def test_raw_documents_are_returned_without_decoding(self):
+        documents = [RawBSONDocument(bson.encode({"_id": i})) for i in range(3)]
+        self.backend.set(self._key(1), documents, 1.0)
+        value = self.backend.get(self._key(1))
+        self.assertTrue(
+            all(isinstance(document, RawBSONDocument) for document in value)
+        )
+        self.assertEqual(
+            [document.raw for document in value], [d.raw for d in documents]
+        )
+
+    def test_expired_entries_are_not_returned(self):
+        self.backend.set(self._key(1), [{"i": 1}], 1.0, ttl=0.05)
+        self.assertEqual(self.backend.get(self._key(1)), [{"i": 1}])
+        time.sleep(0.1)
+        self.assertIsNone(self.backend.get(self._key(1)))
+
+    def test_invalidate_only_removes_affected_entries(self):
+        self.backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        self.backend.set(self._key(2), [{"_id": 2, "i": 2}], 1.0)
+
+        self.backend.invalidate(WriteInfo(WriteOperation.DELETE, filter={"_id": 1}))
+        self.assertIsNone(self.backend.get(self._key(1)))
+        self.assertEqual(self.backend.get(self._key(2)), [{"_id": 2, "i": 2}])
+
+    def test_invalidate_only_reads_the_values_it_needs(self):
+        aggregate_key = QueryInfo("AGGREGATE", pipeline=[{"$match": {"i": 1}}])
+        self.backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        self.backend.set(aggregate_key, [{"_id": 1, "i": 1}], 1.0)
+
+        with patch.object(
+            self.backend, "_read_values", wraps=self.backend._read_values
+        ) as read_values:
+            self.backend.invalidate(WriteInfo(WriteOperation.DELETE, filter={"_id": 2}))
+        self.assertEqual(len(read_values.call_args.args[0]), 1)
+        self.assertEqual(self.backend.get(self._key(1)), [{"_id": 1, "i": 1}])
+        self.assertIsNone(self.backend.get(aggregate_key))
+
+    def test_compressed_values(self):
+        backend = self._create_backend(
+            value_codec=ZlibCodec(), compression_threshold=100
+        )
+        documents = [{"_id": i, "report": "quarterly" * 10} for i in range(20)]
+        backend.set(self._key(1), documents, 1.0)
+        self.assertEqual(backend.get(self._key(1)), documents)
+        self.assertEqual(backend.get_codec_stats().encoded_values, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+from cache_backend.SingleFlight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_execute_once(self):
+        single_flight = SingleFlight(timeout=5)
+        started = Event()
+        release = Event()
+        executions = []
+
+        def query():
+            executions.append(1)
+            started.set()
+            release.wait(5)
+            return [{"i": 1}]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(single_flight.do, "key", query)
+            started.wait(5)
+            followers = [
+                executor.submit(single_flight.do, "key", query) for _ in range(3)
+            ]
+            # Give the followers the time to join the execution of the leader
+            time.sleep(0.1)
+            release.set()
+            results = [leader.result()] + [future.result() for future in followers]
+
+        self.assertEqual(len(executions), 1)
+        self.assertTrue(all(result == [{"i": 1}] for result in results))
+
+    def test_errors_are_propagated_to_waiting_callers(self):
+        single_flight = SingleFlight(timeout=5)
+        started = Event()
+        release = Event()
+
+        def query():
+            started.set()
+            release.wait(5)
+            raise ValueError("query failed")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(single_flight.do, "key", query)
+            started.wait(5)
+            follower = executor.submit(single_flight.do, "key", lambda: "not called")
+            time.sleep(0.1)
+            release.set()
+
+            with self.assertRaises(ValueError):
+                leader.result()
+            with self.assertRaises(ValueError):
+                follower.result()
+
+    def test_waiting_callers_execute_on_their_own_after_timeout(self):
+        single_flight = SingleFlight(timeout=0.05)
+        started = Event()
+        release = Event()
+
+        def slow_query():
+            started.set()
+            release.wait(5)
+            return "slow"
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(single_flight.do, "key", slow_query)
+            started.wait(5)
+            self.assertEqual(single_flight.do("key", lambda: "fast"), "fast")
+            release.set()
+            self.assertEqual(leader.result(), "slow")
+
+        # A finished execution is not reused for later calls
+        self.assertEqual(single_flight.do("key", lambda: "new"), "new")
+
+
+if __name__ == "__main__":
+    unittest.main()
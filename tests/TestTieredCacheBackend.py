@@ -0,0 +1,143 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pymongo import MongoClient
+
+from cache_backend.CacheBackend import CacheBackend
+from cache_backend.Constants import VALUE
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+from cache_backend.base.CacheBackendBase import CacheBackendBase
+from cache_backend.mongodb_backend.MongoDBCacheBackend import MongoDBCacheBackend
+from cache_backend.tiered_backend.TieredCacheBackend import L1, L2, TieredCacheBackend
+
+
+class TestTieredCacheBackend(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient()
+        self.collection = self.client["test"]["test_tiered"]
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_path = os.path.join(self.directory.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.client.close()
+        self.directory.cleanup()
+
+    def _create_backend(self, **kwargs) -> TieredCacheBackend:
+        return TieredCacheBackend(
+            self.collection,
+            max_num_items=10,
+            cache_cleanup_cycle_time=None,
+            l2_cache_backend=CacheBackend.SQLITE,
+            l2_options={"database_path": self.database_path},
+            l1_max_num_items=2,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _key(i: int) -> QueryInfo:
+        return QueryInfo("FIND", query={"i": i}, sort=[("_id", 1)])
+
+    def test_l2_hits_are_promoted(self):
+        backend = self._create_backend()
+        self.assertIs(
+            CacheBackendBase.get_cache_backend_for_database_and_collection(
+                "test_tiered", "test"
+            ),
+            backend,
+        )
+        for i in range(3):
+            backend.set(self._key(i), [{"_id": i}], 1.0)
+
+        # The first entry was evicted from L1, but is still in L2
+        self.assertEqual(backend.get(self._key(0)), [{"_id": 0}])
+        self.assertEqual(backend.get(self._key(0)), [{"_id": 0}])
+        self.assertIsNone(backend.get(self._key(5)))
+
+        stats = backend.get_tier_stats()
+        self.assertEqual((stats[L1].hits, stats[L1].misses), (1, 2))
+        self.assertEqual((stats[L2].hits, stats[L2].misses), (1, 1))
+        self.assertEqual(stats[L1].promotions, 1)
+        self.assertEqual(stats[L1].hit_ratio, 1 / 3)
+
+        # A restarted process finds the entries in L2
+        self.assertEqual(self._create_backend().get(self._key(1)), [{"_id": 1}])
+
+    def test_promoted_entries_keep_their_remaining_ttl(self):
+        backend = self._create_backend()
+        backend.set(self._key(0), [{"_id": 0}], 1.0, ttl=0.2)
+        for i in range(1, 3):
+            backend.set(self._key(i), [{"_id": i}], 1.0)
+
+        self.assertEqual(backend.get(self._key(0)), [{"_id": 0}])
+        self.assertEqual(backend.get_tier_stats()[L1].promotions, 1)
+        time.sleep(0.3)
+        self.assertIsNone(backend.get(self._key(0)))
+
+    def test_entries_with_unknown_ttl_are_not_promoted(self):
+        backend = self._create_backend()
+        for i in range(3):
+            backend.set(self._key(i), [{"_id": i}], 1.0)
+
+        with patch.object(
+            backend._l2, "get_with_ttl", return_value=([{"_id": 0}], None)
+        ):
+            self.assertEqual(backend.get(self._key(0)), [{"_id": 0}])
+        self.assertEqual(backend.get_tier_stats()[L1].promotions, 0)
+        self.assertNotIn(self._key(0), backend._l1.get_all())
+
+    def test_default_l2_is_kept_when_the_process_exits(self):
+        cache_collection = MagicMock()
+        cache_collection.with_options.return_value = cache_collection
+        cache_collection.count_documents.return_value = 0
+        with patch.object(
+            MongoDBCacheBackend, "_get_cache_collection", return_value=cache_collection
+        ), patch.object(
+            MongoDBCacheBackend, "_get_chunk_collection", return_value=MagicMock()
+        ), patch(
+            "cache_backend.mongodb_backend.MongoDBCacheBackend.atexit.register"
+        ) as mock_register:
+            backend = TieredCacheBackend(self.collection, cache_cleanup_cycle_time=None)
+
+        self.assertIsInstance(backend._l2, MongoDBCacheBackend)
+        registered = [call.args[0] for call in mock_register.call_args_list]
+        self.assertNotIn(backend._l2.clear, registered)
+
+        # A restarted process finds the entries in L2
+        cache_collection.find_one.return_value = {"_id": 1, VALUE: [{"_id": 1}]}
+        self.assertEqual(backend.get(self._key(1)), [{"_id": 1}])
+        self.assertEqual(backend.get_tier_stats()[L2].hits, 1)
+
+    def test_evictions_are_demoted(self):
+        backend = self._create_backend(demote_evictions=True)
+        backend.set(self._key(0), [{"_id": 0}], 1.0, ttl=60)
+        backend.set(self._key(1), [{"_id": 1}], 1.0)
+        self.assertEqual(len(backend._l2.get_all()), 0)
+
+        backend.set(self._key(2), [{"_id": 2}], 1.0)
+        self.assertEqual(list(backend._l2.get_all()), [self._key(0)])
+        self.assertEqual(backend.get_tier_stats()[L2].demotions, 1)
+        self.assertEqual(backend.get(self._key(0)), [{"_id": 0}])
+
+    def test_removals_reach_both_tiers(self):
+        backend = self._create_backend()
+        backend.set(self._key(1), [{"_id": 1, "i": 1}], 1.0)
+        backend.set(self._key(2), [{"_id": 2, "i": 2}], 1.0)
+
+        backend.invalidate(WriteInfo(WriteOperation.DELETE, filter={"_id": 1}))
+        self.assertIsNone(backend.get(self._key(1)))
+        self.assertEqual(list(backend.get_all()), [self._key(2)])
+
+        backend.delete(self._key(2))
+        self.assertEqual(backend.get_all(), {})
+        backend.set(self._key(3), [{"_id": 3}], 1.0)
+        backend.clear()
+        self.assertEqual(backend._l2.get_all(), {})
+        self.assertIsNone(backend.get(self._key(3)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+from pymongo import MongoClient
+
+from cache_backend.QueryInfo import QueryInfo
+from cache_backend.WriteInfo import WriteInfo, WriteOperation
+from cache_backend.codec.ValueCodec import (
+    EncodedValue,
+    IdentityCodec,
+    LZ4Codec,
+    ZlibCodec,
+    ZstdCodec,
+    get_value_codec,
+    lz4_frame,
+    zstandard,
+)
+from cache_backend.in_memory_backend.InMemoryCacheBackend import InMemoryCacheBackend
+
+
+class TestValueCodec(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient()
+        self.collection = self.client["test"]["test_value_codec"]
+        self.backend = InMemoryCacheBackend(
+            self.collection,
+            cache_cleanup_cycle_time=None,
+            value_codec=ZlibCodec(),
+            compression_threshold=1024,
+        )
+        self.documents = [
+            {"_id": i, "report": "quarterly", "values": list(range(20))}
+            for i in range(50)
+        ]
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_codecs_round_trip(self):
+        data = b"repetitive " * 100
+        codecs = [IdentityCodec(), ZlibCodec(level=1)]
+        if zstandard is not None:
+            codecs.append(ZstdCodec())
+        if lz4_frame is not None:
+            codecs.append(LZ4Codec())
+        for codec in codecs:
+            self.assertEqual(codec.decompress(codec.compress(data)), data)
+            self.assertIsInstance(get_value_codec(codec.name), type(codec))
+
+    def test_large_values_are_compressed(self):
+        key = QueryInfo("FIND", query={"report": "quarterly"})
+        self.backend.set(key, self.documents, 1.0)
+
+        entry = self.backend.get_all()[key]
+        self.assertIsInstance(entry.value, EncodedValue)
+        self.assertEqual(self.backend.get(key), self.documents)
+
+        stats = self.backend.get_codec_stats()
+        self.assertEqual(stats.encoded_values, 1)
+        self.assertEqual(stats.decoded_values, 1)
+        self.assertEqual(entry.size, stats.output_bytes)
+        self.assertGreater(stats.compression_ratio, 4)
+
+    def test_small_values_are_stored_raw(self):
+        key = QueryInfo("FIND", query={"_id": 1})
+        self.backend.set(key, self.documents[:1], 1.0)
+
+        self.assertEqual(self.backend.get_all()[key].value, self.documents[:1])
+        self.assertEqual(self.backend.get_codec_stats().raw_values, 1)
+        self.assertEqual(self.backend.get_codec_stats().compression_ratio, 1.0)
+
+    def test_compressed_values_are_invalidated(self):
+        key = QueryInfo("FIND", query={"report": "quarterly"})
+        other_key = QueryInfo("FIND", query={"report": "yearly"})
+        self.backend.set(key, self.documents, 1.0)
+        self.backend.set(other_key, [], 1.0)
+
+        self.backend.invalidate(
+            WriteInfo(WriteOperation.DELETE, filter={"_id": 3, "report": "quarterly"})
+        )
+        self.assertIsNone(self.backend.get(key))
+        self.assertEqual(self.backend.get(other_key), [])
+
+    def test_values_are_only_decoded_if_invalidation_needs_them(self):
+        key = QueryInfo("FIND", query={"report": "quarterly"})
+        aggregate_key = QueryInfo("AGGREGATE", pipeline=[{"$match": {"_id": 1}}])
+        self.backend.set(key, self.documents, 1.0)
+        self.backend.set(aggregate_key, self.documents, 1.0)
+
+        self.backend.invalidate(
+            WriteInfo(
+                WriteOperation.UPDATE,
+                filter={"_id": 3},
+                update={"$set": {"report": "yearly"}},
+            )
+        )
+        self.assertEqual(self.backend.get_all(), {})
+        self.assertEqual(self.backend.get_codec_stats().decoded_values, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()